@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+RouterAgent Concurrency Benchmark
+RouterAgent並行実行ベンチマーク
+
+Compares the throughput of concurrent routers when classification goes through
+the synchronous LLMClassifier.classify (what RouterAgent.run_async used to call)
+and when it is awaited (LLMClassifier.aclassify).
+
+This is a simulation: the LLM is replaced by a pipeline that sleeps for a fixed
+latency, so no API key is needed. Because the synchronous path blocks the event
+loop, its throughput is bounded by about 1/latency by construction; the numbers
+show the shape of the change, not production throughput.
+同期のLLMClassifier.classify（以前のRouterAgent.run_asyncが呼び出していたもの）を
+経由する場合と、待機される場合（LLMClassifier.aclassify）で並行ルーターの
+スループットを比較します。
+
+これはシミュレーションです。LLMは一定のレイテンシだけ待機するパイプラインに
+置き換えられるため、APIキーは不要です。同期経路はイベントループをブロックするため、
+そのスループットは構造上おおよそ1/レイテンシに制限されます。数値は変更の傾向を
+示すもので、本番環境のスループットではありません。
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add the src directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from refinire import Context
+from refinire.agents.router import LLMClassifier, RouterAgent, RouterConfig
+
+
+class SimulatedPipeline:
+    """
+    Pipeline answering after a fixed delay in place of an LLM call
+    LLM呼び出しの代わりに一定の遅延後に応答するパイプライン
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def run_async(self, prompt: str, ctx: Context) -> str:
+        await asyncio.sleep(self.latency)
+        return "question"
+
+
+class SynchronousClassifier:
+    """
+    Adapter calling the synchronous LLMClassifier.classify from aclassify
+    aclassifyから同期のLLMClassifier.classifyを呼び出すアダプター
+    """
+
+    def __init__(self, classifier: LLMClassifier):
+        self.classifier = classifier
+
+    async def aclassify(self, input_data, context):
+        # The former RouterAgent.run_async called classify from inside the event loop
+        # 以前のRouterAgent.run_asyncはイベントループ内からclassifyを呼び出していた
+        return self.classifier.classify(input_data, context)
+
+
+async def measure(router: RouterAgent, requests: int) -> float:
+    """
+    Route requests concurrently and return requests per second
+    リクエストを並行にルーティングし、1秒あたりのリクエスト数を返す
+    """
+    started = time.perf_counter()
+    await asyncio.gather(*(router.run_async(f"How does feature {i} work?", Context()) for i in range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="RouterAgent concurrency benchmark")
+    parser.add_argument("--requests", type=int, default=50, help="Concurrent routing requests")
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated LLM latency in seconds")
+    args = parser.parse_args()
+
+    config = RouterConfig(
+        name="benchmark_router",
+        routes={"question": "qa_step", "request": "service_step"},
+        classifier_type="llm"
+    )
+    pipeline = SimulatedPipeline(args.latency)
+    router = RouterAgent(config, pipeline)
+
+    router.classifier = SynchronousClassifier(LLMClassifier(pipeline, "Classify", list(config.routes)))
+    before = await measure(router, args.requests)
+
+    router.classifier = LLMClassifier(pipeline, "Classify", list(config.routes))
+    after = await measure(router, args.requests)
+
+    print(f"🔀 {args.requests} concurrent routers, {args.latency:.2f}s simulated LLM latency (simulation)")
+    print(f"Synchronous classify : {before:8.1f} req/s")
+    print(f"Async aclassify      : {after:8.1f} req/s ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -24,6 +24,7 @@ from .core import (
     ProviderType, 
     get_available_models,
     get_available_models_async,
+    CompositeModel,
     PromptStore,
     StoredPrompt,
     PromptReference,
@@ -34,8 +35,18 @@ from .core import (
     disable_tracing,
     TraceRegistry,
     TraceMetadata,
+    RetentionPolicy,
     get_global_registry,
     set_global_registry,
+    MetricsRegistry,
+    get_metrics_registry,
+    set_metrics_registry,
+    RoutingCache,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    RefinireCircuitOpenError,
+    get_circuit_breaker_registry,
+    set_circuit_breaker_registry,
     enable_opentelemetry_tracing,
     disable_opentelemetry_tracing,
     is_opentelemetry_enabled,
@@ -136,6 +147,7 @@ __all__ = [
     "ProviderType",
     "get_available_models", 
     "get_available_models_async",
+    "CompositeModel",
     "PromptStore",
     "StoredPrompt",
     "PromptReference",
@@ -216,8 +228,18 @@ __all__ = [
     "disable_tracing", 
     "TraceRegistry",
     "TraceMetadata",
+    "RetentionPolicy",
     "get_global_registry",
     "set_global_registry",
+    "MetricsRegistry",
+    "get_metrics_registry",
+    "set_metrics_registry",
+    "RoutingCache",
+    "CircuitBreaker",
+    "CircuitBreakerRegistry",
+    "RefinireCircuitOpenError",
+    "get_circuit_breaker_registry",
+    "set_circuit_breaker_registry",
     "enable_opentelemetry_tracing",
     "disable_opentelemetry_tracing",
     "is_opentelemetry_enabled", 
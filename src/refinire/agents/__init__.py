@@ -42,7 +42,8 @@ from .pipeline import (
     create_evaluated_agent,
     create_tool_enabled_agent,
     create_simple_interactive_agent,
-    create_evaluated_interactive_agent
+    create_evaluated_interactive_agent,
+    EvaluationGate,
 )
 
 # Import implemented agents
@@ -92,12 +93,19 @@ from .validator import (
     create_custom_validator,
 )
 
+from .shared_agents import (
+    SharedAgentRegistry,
+    get_shared_agent_registry,
+    set_shared_agent_registry
+)
+
 from .router import (
     RouterAgent,
     RouterConfig,
     RouteClassifier,
     LLMClassifier,
     RuleBasedClassifier,
+    EmbeddingClassifier,
     create_intent_router,
     create_content_type_router
 )
@@ -155,6 +163,7 @@ __all__ = [
     "create_tool_enabled_agent",
     "create_simple_interactive_agent",
     "create_evaluated_interactive_agent",
+    "EvaluationGate",
     
     # Clarification Agents
     "ClarifyAgent",
@@ -198,12 +207,18 @@ __all__ = [
     "create_length_validator",
     "create_custom_validator",
     
+    # Shared helper models and SDK agents
+    "SharedAgentRegistry",
+    "get_shared_agent_registry",
+    "set_shared_agent_registry",
+    
     # Decision Agents
     "RouterAgent",
     "RouterConfig",
     "RouteClassifier",
     "LLMClassifier",
     "RuleBasedClassifier",
+    "EmbeddingClassifier",
     "create_intent_router",
     "create_content_type_router",
     
@@ -6,10 +6,84 @@ This module provides the base interface for all context providers in RefinireAge
 RefinireAgentのすべてのコンテキストプロバイダーの基本インターフェースを提供します。
 """
 
+import asyncio
+import threading
 from abc import ABC, abstractmethod
 from typing import Dict, Any, ClassVar, Optional
 
 
+# Guards lazy creation of per-provider in-flight locks
+# プロバイダーごとの実行中ロックの遅延作成を保護
+_IN_FLIGHT_GUARD = threading.Lock()
+
+
+def _in_flight_lock(provider: Any) -> Optional[threading.Lock]:
+    """Lock held while a worker thread runs provider.get_context (None if it cannot be attached) / ワーカースレッドでget_contextを実行中に保持されるロック（付与できない場合None）"""
+    lock = getattr(provider, "_in_flight_lock", None)
+    if lock is None:
+        with _IN_FLIGHT_GUARD:
+            lock = getattr(provider, "_in_flight_lock", None)
+            if lock is None:
+                lock = threading.Lock()
+                try:
+                    setattr(provider, "_in_flight_lock", lock)
+                except (AttributeError, TypeError, ValueError):
+                    return None
+    return lock
+
+
+async def get_context_in_thread(provider: Any, query: str, previous_context: Optional[str] = None, **kwargs: Any) -> str:
+    """
+    Run provider.get_context in a worker thread, one call per provider at a time
+    provider.get_contextをワーカースレッドで実行（プロバイダーごとに同時に1呼び出し）
+    
+    A worker thread keeps running when its caller times out, and providers are
+    not thread-safe. While an earlier call of the same provider is still running,
+    the provider is skipped and contributes no context.
+    呼び出し元がタイムアウトしてもワーカースレッドは実行を続け、プロバイダーは
+    スレッドセーフではありません。同じプロバイダーの以前の呼び出しが実行中の間は
+    プロバイダーをスキップし、コンテキストを提供しません。
+    
+    Args:
+        provider: Object with a get_context method / get_contextメソッドを持つオブジェクト
+        query: Current user query / 現在のユーザークエリ
+        previous_context: Context provided by previous providers / 前のプロバイダーが提供したコンテキスト
+        **kwargs: Additional parameters / 追加パラメータ
+    
+    Returns:
+        str: Context string (empty while a previous call is in flight) / コンテキスト文字列（以前の呼び出しが実行中の場合は空）
+    """
+    lock = _in_flight_lock(provider)
+    if lock is None:
+        return await asyncio.to_thread(provider.get_context, query, previous_context, **kwargs)
+    if not lock.acquire(blocking=False):
+        return ""
+    # The worker releases the lock; a call cancelled before the worker starts releases it here
+    # ロックはワーカーが解放し、ワーカー開始前にキャンセルされた場合はここで解放する
+    state_lock = threading.Lock()
+    state = {"started": False, "abandoned": False}
+    
+    def run() -> str:
+        with state_lock:
+            if state["abandoned"]:
+                return ""
+            state["started"] = True
+        try:
+            context: str = provider.get_context(query, previous_context, **kwargs)
+            return context
+        finally:
+            lock.release()
+    
+    try:
+        return await asyncio.to_thread(run)
+    except BaseException:
+        with state_lock:
+            if not state["started"]:
+                state["abandoned"] = True
+                lock.release()
+        raise
+
+
 class ContextProvider(ABC):
     """
     Single interface for all context providers
@@ -28,6 +102,16 @@ class ContextProvider(ABC):
     # プロバイダー名のクラス変数
     provider_name: ClassVar[str] = "base"
     
+    # Whether get_context reads previous_context. Providers that do are run
+    # after all preceding providers; independent ones run concurrently.
+    # get_contextがprevious_contextを参照するか。参照する場合は先行プロバイダーの
+    # 完了後に実行され、独立したプロバイダーは並行実行されます。
+    uses_previous_context: bool = True
+    
+    # Time budget in seconds for aget_context (None for no limit)
+    # aget_contextの制限時間（秒、Noneで制限なし）
+    timeout: Optional[float] = None
+    
     @classmethod
     def get_config_schema(cls) -> Dict[str, Any]:
         """
@@ -74,6 +158,31 @@ class ContextProvider(ABC):
         """
         pass
     
+    async def aget_context(self, query: str, previous_context: Optional[str] = None, **kwargs: Any) -> str:
+        """
+        Get context for the given query asynchronously
+        与えられたクエリ用のコンテキストを非同期で取得
+        
+        The default implementation runs get_context in a worker thread so that
+        blocking I/O does not stall the event loop. Calls are not overlapped:
+        while an earlier call is still running (e.g. after its caller timed out),
+        the provider returns an empty context. Providers with native async I/O
+        may override this method.
+        デフォルト実装はget_contextをワーカースレッドで実行し、ブロッキングI/Oが
+        イベントループを止めないようにします。呼び出しは重複しません：以前の呼び出しが
+        実行中の間（呼び出し元がタイムアウトした後など）は空のコンテキストを返します。
+        ネイティブな非同期I/Oを持つプロバイダーはこのメソッドをオーバーライドできます。
+        
+        Args:
+            query: Current user query / 現在のユーザークエリ
+            previous_context: Context provided by previous providers / 前のプロバイダーが提供したコンテキスト
+            **kwargs: Additional parameters / 追加パラメータ
+            
+        Returns:
+            str: Context string (empty string if no context) / コンテキスト文字列（コンテキストがない場合は空文字列）
+        """
+        return await get_context_in_thread(self, query, previous_context, **kwargs)
+    
     @abstractmethod
     def update(self, interaction: Dict[str, Any]) -> None:
         """
@@ -157,6 +157,13 @@ class ContextProviderFactory:
         provider_cls = cls._provider_classes.get(provider_type)
         if not provider_cls:
             raise ValueError("Unknown provider type")
+        timeout = provider_config.get("timeout")
+        if timeout is not None:
+            try:
+                if float(timeout) <= 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                raise ValueError("Parameter 'timeout' must be a positive number")
         schema = provider_cls.get_config_schema()
         params = schema.get("parameters", {})
         for key, param in params.items():
@@ -197,10 +204,16 @@ class ContextProviderFactory:
         provider_cls = cls._provider_classes.get(provider_type)
         if not provider_cls:
             raise ValueError(f"Unknown provider type: {provider_type}")
-        # Remove 'type' key before passing to provider
+        # Remove 'type' and 'timeout' keys before passing to provider
         config = dict(provider_config)
         config.pop("type", None)
-        return provider_cls.from_config(config)
+        timeout = config.pop("timeout", None)
+        provider = provider_cls.from_config(config)
+        if timeout is not None:
+            # Per-provider time budget, applied by RefinireAgent
+            # プロバイダーごとの制限時間（RefinireAgentが適用）
+            provider.timeout = float(timeout)
+        return provider
     
     @classmethod
     def create_providers(cls, configs: List[Dict[str, Any]], validate: bool = False) -> List[ContextProvider]:
@@ -5,11 +5,15 @@ RefinireAgent出力品質評価専用エージェント
 """
 
 import asyncio
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Sequence, Tuple, Union, cast
 from pydantic import BaseModel, Field
+from agents import Agent
+from agents.exceptions import ModelBehaviorError
 
-from ..core.llm import get_llm
 from .flow.context import Context
+from ..core.metrics import RequestMeter
+from ..core.tokenizer import Tokenizer, TokenBudget, get_tokenizer
+from .shared_agents import get_shared_agent_registry
 
 
 class EvaluationResult(BaseModel):
@@ -23,6 +27,19 @@ class EvaluationResult(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional evaluation metadata")
 
 
+class BatchItemScore(BaseModel):
+    """Score of one item in a batch evaluation"""
+    index: int = Field(description="Item number as given in the prompt")
+    score: float = Field(ge=0.0, le=1.0, description="Overall evaluation score")
+    feedback: str = Field(description="Brief evaluation feedback")
+    suggestions: List[str] = Field(default_factory=list, description="Improvement suggestions")
+
+
+class BatchEvaluationOutput(BaseModel):
+    """Structured output of a batch evaluation"""
+    results: List[BatchItemScore] = Field(description="One score per item")
+
+
 class EvaluationAgent:
     """
     Single-purpose evaluation agent for RefinireAgent output quality assessment
@@ -35,6 +52,10 @@ class EvaluationAgent:
     - Compatible with RefinireAgent interface
     """
     
+    # Tokens always kept for the generation, even when the budget is used up
+    # 予算を使い切った場合でも生成結果用に必ず確保するトークン数
+    MIN_GENERATION_TOKENS = 256
+    
     def __init__(
         self,
         name: str,
@@ -45,6 +66,8 @@ class EvaluationAgent:
         temperature: float = 0.2,  # 低温度で一貫した評価
         max_retries: int = 3,
         timeout: Optional[float] = None,
+        prompt_token_budget: Optional[int] = None,
+        tokenizer: Union[str, Tokenizer, None] = None,
         **kwargs
     ):
         """
@@ -60,6 +83,8 @@ class EvaluationAgent:
             # provider: Automatically detected from model name patterns and environment variables
             max_retries: Maximum retry attempts
             timeout: Request timeout
+            prompt_token_budget: Token budget of the evaluation prompt (None for no limit, the default)
+            tokenizer: Tokenizer instance or name used for prompt_token_budget
         """
         self.name = name
         self.evaluation_instruction = evaluation_instruction
@@ -70,14 +95,16 @@ class EvaluationAgent:
         self.max_retries = max_retries
         self.timeout = timeout
         self.kwargs = kwargs
+        self.prompt_token_budget = prompt_token_budget
+        self._tokenizer = get_tokenizer(tokenizer, model=model) if prompt_token_budget is not None else None
+        self._static_prefix: Optional[str] = None
+        self._batch_prefix: Optional[str] = None
+        self._batch_sdk_agent: Optional[Agent[Any]] = None
         
-        # Initialize LLM
-        # LLMを初期化
-        self.llm = get_llm(
-            model=model,
-            temperature=temperature,
-            **kwargs
-        )
+        # Share the model and SDK agent with other helpers of the same configuration
+        # 同じ設定の他の補助エージェントとモデルとSDKエージェントを共有
+        self.llm = get_shared_agent_registry().get_model(model, temperature, **kwargs)
+        self._sdk_agent: Optional[Agent[Any]] = None
     
     async def run_async(
         self, 
@@ -109,11 +136,14 @@ class EvaluationAgent:
             # shared_stateを使用して評価プロンプトを構築
             evaluation_prompt = self._build_evaluation_prompt(context, input_text)
             
-            # Execute LLM call with structured output
-            # 構造化出力でLLM呼び出しを実行
+            # Execute LLM call with structured output; all attempts are metered as one request
+            # 構造化出力でLLM呼び出しを実行。全試行を1件のリクエストとして計測
+            meter = RequestMeter(self.model_name, self.name)
             for attempt in range(self.max_retries):
                 try:
+                    meter.start_attempt()
                     llm_result = await self._execute_llm_call(evaluation_prompt)
+                    meter.add_usage(llm_result)
                     
                     # Parse evaluation result
                     # 評価結果を解析
@@ -127,11 +157,13 @@ class EvaluationAgent:
                     # 結果をcontextに保存
                     context.evaluation_result = evaluation_result
                     context.result = self._create_llm_result(evaluation_result, True)
+                    meter.record(success=True)
                     
                     return context
                     
                 except Exception as e:
                     if attempt == self.max_retries - 1:
+                        meter.record(success=False)
                         # Final attempt failed, create error evaluation result
                         # 最終試行が失敗、エラー評価結果を作成
                         error_evaluation = EvaluationResult(
@@ -169,67 +201,284 @@ class EvaluationAgent:
         """Synchronous wrapper for run_async"""
         return asyncio.run(self.run_async(input_text, context, **kwargs))
     
+    async def evaluate_batch_async(
+        self,
+        items: Sequence[Tuple[str, str]],
+        batch_size: int = 10,
+        max_concurrency: int = 4
+    ) -> List[EvaluationResult]:
+        """
+        Evaluate many (prompt, generation) pairs with one LLM call per batch
+        多数の（プロンプト, 生成結果）ペアをバッチごとに1回のLLM呼び出しで評価
+        
+        Args:
+            items: (original prompt, generation) pairs / （元のプロンプト, 生成結果）のペア
+            batch_size: Items packed into one request / 1リクエストにまとめる項目数
+            max_concurrency: Maximum concurrent LLM requests / 同時LLMリクエストの最大数
+            
+        Returns:
+            List[EvaluationResult]: Results in the order of items / itemsと同じ順序の評価結果
+            
+        Process:
+            1. Split items into batches of batch_size
+            2. Request per-item scores with structured output (BatchEvaluationOutput)
+            3. If a response cannot be parsed or misses items, split the batch in
+               half and retry each half; a single item falls back to run_async
+            4. Apply pass_threshold to each item (failed calls score 0.0)
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        items = list(items)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        batches = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+        results = await asyncio.gather(*(self._evaluate_batch(batch, semaphore) for batch in batches))
+        return [result for batch_results in results for result in batch_results]
+    
+    def evaluate_batch(
+        self,
+        items: Sequence[Tuple[str, str]],
+        batch_size: int = 10,
+        max_concurrency: int = 4
+    ) -> List[EvaluationResult]:
+        """Synchronous wrapper for evaluate_batch_async"""
+        return asyncio.run(self.evaluate_batch_async(items, batch_size, max_concurrency))
+    
+    async def _evaluate_batch(
+        self,
+        batch: List[Tuple[str, str]],
+        semaphore: asyncio.Semaphore
+    ) -> List[EvaluationResult]:
+        """Evaluate one batch, splitting it when the response is unusable"""
+        if len(batch) == 1:
+            # A single item uses the regular path with its retries and fallbacks
+            # 単一項目は通常の経路（リトライとフォールバック付き）を使用
+            context = Context()
+            context.shared_state['_last_prompt'], context.shared_state['_last_generation'] = batch[0]
+            async with semaphore:
+                await self.run_async("", context)
+            # run_async always stores an EvaluationResult
+            # run_asyncは常にEvaluationResultを格納する
+            return [cast(EvaluationResult, context.evaluation_result)]
+        
+        meter = RequestMeter(self.model_name, self.name)
+        try:
+            async with semaphore:
+                meter.start_attempt()
+                llm_result = await self._execute_batch_llm_call(self._build_batch_prompt(batch))
+                meter.add_usage(llm_result)
+            results = self._parse_batch_result(llm_result, batch)
+            meter.record(success=True)
+            return results
+        except (ValueError, ModelBehaviorError):
+            meter.record(success=False)
+            # Unparseable or incomplete response: retry each half separately
+            # 解析不能または不完全な応答：半分ずつ個別に再試行
+            middle = len(batch) // 2
+            first, second = await asyncio.gather(
+                self._evaluate_batch(batch[:middle], semaphore),
+                self._evaluate_batch(batch[middle:], semaphore)
+            )
+            return first + second
+        except Exception as e:
+            meter.record(success=False)
+            return [
+                EvaluationResult(
+                    content=last_generation,
+                    score=0.0,
+                    passed=False,
+                    feedback=f"Batch evaluation failed: {str(e)}",
+                    suggestions=["Check LLM availability"],
+                    metadata={"error": str(e), "batch_size": len(batch)}
+                )
+                for _, last_generation in batch
+            ]
+    
+    def _build_batch_prompt(self, batch: List[Tuple[str, str]]) -> str:
+        """Build a prompt evaluating every item of the batch"""
+        prefix = self._get_batch_prefix()
+        sections = [prefix]
+        item_budget = None
+        if self.prompt_token_budget is not None and self._tokenizer is not None:
+            # The whole batch prompt shares one budget, split evenly across items
+            # バッチプロンプト全体で1つの予算を共有し、項目間で均等に分割
+            item_budget = max(0, self.prompt_token_budget - self._tokenizer.count(prefix)) // len(batch)
+        for index, (last_prompt, last_generation) in enumerate(batch):
+            last_prompt, last_generation = self._fit_pair(last_prompt, last_generation, "", item_budget)
+            sections.append(
+                f"=== 項目 {index} ===\n--- 元のプロンプト ---\n{last_prompt}\n--- 生成結果 ---\n{last_generation}"
+            )
+        return "\n\n".join(sections)
+    
+    def _get_batch_prefix(self) -> str:
+        """
+        Build (once) the part of the batch prompt shared by every batch
+        すべてのバッチで共有されるバッチプロンプト部分を（一度だけ）構築
+        """
+        if self._batch_prefix is None:
+            self._batch_prefix = f"""以下の各項目について、元のプロンプトに対する生成結果を個別に評価してください。
+
+=== 評価指示 ===
+{self.evaluation_instruction}
+
+=== 評価基準 ===
+{self._format_evaluation_criteria()}
+
+すべての項目について、項目番号(index)ごとにscore(0.0-1.0)、簡潔なfeedback、suggestionsを出力してください（生成結果の再掲は不要です）。
+重要: {self.pass_threshold}以上が合格基準です。"""
+        return self._batch_prefix
+    
+    async def _execute_batch_llm_call(self, prompt: str) -> Any:
+        """Execute a batch evaluation call with structured output"""
+        from agents import Runner
+        
+        if self._batch_sdk_agent is None:
+            self._batch_sdk_agent = get_shared_agent_registry().get_agent(
+                name="batch_evaluation_agent",
+                instructions="You are an evaluation agent. Score every item independently.",
+                model=self.model_name,
+                temperature=self.temperature,
+                output_type=BatchEvaluationOutput,
+                **self.kwargs
+            )
+        
+        if self.timeout:
+            return await asyncio.wait_for(
+                Runner.run(self._batch_sdk_agent, prompt),
+                timeout=self.timeout
+            )
+        return await Runner.run(self._batch_sdk_agent, prompt)
+    
+    def _parse_batch_result(self, llm_result: Any, batch: List[Tuple[str, str]]) -> List[EvaluationResult]:
+        """
+        Parse a batch response, raising ValueError unless every item is scored exactly once
+        バッチ応答を解析（すべての項目がちょうど1回ずつ採点されていなければValueError）
+        """
+        output = getattr(llm_result, 'final_output', llm_result)
+        if isinstance(output, str):
+            output = BatchEvaluationOutput.model_validate_json(output.strip())
+        elif not isinstance(output, BatchEvaluationOutput):
+            output = BatchEvaluationOutput.model_validate(output)
+        
+        scores = {item.index: item for item in output.results}
+        if len(output.results) != len(batch) or set(scores) != set(range(len(batch))):
+            raise ValueError(f"Expected scores for {len(batch)} items, got indices {sorted(scores)}")
+        
+        return [
+            EvaluationResult(
+                content=last_generation,
+                score=scores[index].score,
+                passed=scores[index].score >= self.pass_threshold,
+                feedback=scores[index].feedback,
+                suggestions=scores[index].suggestions,
+                metadata={"batch_size": len(batch)}
+            )
+            for index, (_, last_generation) in enumerate(batch)
+        ]
+    
     def _build_evaluation_prompt(self, context: Context, input_text: str) -> str:
         """
         Build evaluation prompt using context shared_state
         
         Template:
         ```
-        直前の生成プロセスを評価してください。
+        {static prefix: task, evaluation instruction, criteria, JSON format}
         
         === 元のプロンプト ===
         {context.shared_state.get('_last_prompt', 'N/A')}
         
         === 生成結果 ===
         {context.shared_state.get('_last_generation', 'N/A')}
-        
-        === 評価指示 ===
-        {self.evaluation_instruction}
-        
-        === 評価基準 ===
-        {self._format_evaluation_criteria()}
-        
-        上記の内容を評価し、指定されたJSON形式で評価結果を出力してください。
         ```
+        
+        The static prefix is built once and comes first, so repeated
+        evaluations share an identical prompt prefix. With prompt_token_budget
+        set, the generation is admitted first (keeping at least a quarter of
+        the remaining budget for the original prompt), and the original prompt
+        is compacted to its beginning and end. The generation always keeps at
+        least MIN_GENERATION_TOKENS, even if that exceeds the budget.
+        静的プレフィックスは一度だけ構築されて先頭に置かれるため、繰り返しの評価で
+        同一のプロンプトプレフィックスを共有します。prompt_token_budgetが設定されている
+        場合、生成結果を先に受け入れ（残り予算の少なくとも4分の1は元のプロンプト用に
+        確保）、元のプロンプトは先頭と末尾に圧縮されます。生成結果は予算を超える場合でも
+        少なくともMIN_GENERATION_TOKENSを保持します。
         """
-        last_prompt = context.shared_state.get('_last_prompt', 'N/A')
-        last_generation = context.shared_state.get('_last_generation', 'N/A')
-        criteria_text = self._format_evaluation_criteria()
+        static_prefix = self._get_static_prefix()
+        last_prompt, last_generation = self._fit_pair(
+            context.shared_state.get('_last_prompt', 'N/A'),
+            context.shared_state.get('_last_generation', 'N/A'),
+            static_prefix
+        )
         
-        prompt = f"""直前の生成プロセスを評価してください。
+        return f"""{static_prefix}
 
 === 元のプロンプト ===
 {last_prompt}
 
 === 生成結果 ===
-{last_generation}
+{last_generation}"""
+    
+    def _get_static_prefix(self) -> str:
+        """
+        Build (once) the part of the prompt shared by every evaluation
+        すべての評価で共有されるプロンプト部分を（一度だけ）構築
+        """
+        if self._static_prefix is None:
+            self._static_prefix = f"""直前の生成プロセスを評価してください。
 
 === 評価指示 ===
 {self.evaluation_instruction}
 
 === 評価基準 ===
-{criteria_text}
-
-上記の内容を評価し、以下のJSON形式で評価結果を出力してください：
+{self._format_evaluation_criteria()}
 
-{{
-  "content": "評価対象コンテンツのコピー",
-  "score": 0.0〜1.0の総合評価スコア,
-  "criteria_scores": {{
-    "基準1": スコア,
-    "基準2": スコア
-  }},
-  "feedback": "詳細な評価フィードバック",
-  "suggestions": ["改善提案1", "改善提案2"],
-  "metadata": {{
-    "評価者": "{self.name}",
-    "評価日時": "現在時刻"
-  }}
-}}
+以下の元のプロンプトと生成結果を評価し、次のJSON形式で評価結果を出力してください（生成結果の再掲は不要です）：
+{{"score": 0.0〜1.0の総合評価スコア, "criteria_scores": {{"基準名": スコア}}, "feedback": "簡潔な評価フィードバック", "suggestions": ["改善提案"]}}
 
 重要: scoreは0.0-1.0の範囲で、{self.pass_threshold}以上が合格基準です。"""
+        return self._static_prefix
+    
+    def _fit_pair(
+        self,
+        last_prompt: str,
+        last_generation: str,
+        prefix: str,
+        max_tokens: Optional[int] = None
+    ) -> Tuple[str, str]:
+        """
+        Fit an original prompt and its generation into the budget left after prefix
+        プレフィックスの後に残る予算に元のプロンプトと生成結果を収める
         
-        return prompt
+        max_tokens overrides prompt_token_budget (used for batch items).
+        max_tokensはprompt_token_budgetを上書きします（バッチ項目で使用）。
+        """
+        if self.prompt_token_budget is None or self._tokenizer is None:
+            return last_prompt, last_generation
+        budget = TokenBudget(self.prompt_token_budget if max_tokens is None else max_tokens, self._tokenizer)
+        budget.reserve(prefix)
+        budget.reserve("=== 元のプロンプト ===\n=== 生成結果 ===")
+        prompt_share = min(budget.tokenizer.count(last_prompt), budget.remaining // 4)
+        # A prefix using up the budget must not cut the generation to nothing
+        # プレフィックスが予算を使い切っても生成結果を空にしない
+        generation_tokens = max(budget.remaining - prompt_share, self.MIN_GENERATION_TOKENS)
+        last_generation = budget.tokenizer.truncate(last_generation, generation_tokens, keep="start")
+        budget.reserve(last_generation)
+        return self._compact_text(last_prompt, budget.remaining, budget.tokenizer), last_generation
+    
+    @staticmethod
+    def _compact_text(text: str, max_tokens: int, tokenizer: Tokenizer) -> str:
+        """
+        Cut text to max_tokens, keeping its beginning (instructions) and end (user input)
+        テキストをmax_tokens以内にカットし、先頭（指示）と末尾（ユーザー入力）を保持
+        """
+        if tokenizer.count(text) <= max_tokens:
+            return text
+        marker = "\n...\n"
+        available = max_tokens - tokenizer.count(marker)
+        if available <= 0:
+            return tokenizer.truncate(text, max_tokens, keep="end")
+        head = tokenizer.truncate(text, available // 3, keep="start")
+        tail = tokenizer.truncate(text, available - tokenizer.count(head), keep="end")
+        return f"{head}{marker}{tail}" if head else tail
     
     def _format_evaluation_criteria(self) -> str:
         """Format evaluation criteria for prompt inclusion"""
@@ -244,20 +493,35 @@ class EvaluationAgent:
     
     async def _execute_llm_call(self, prompt: str) -> Any:
         """Execute LLM call with timeout handling"""
+        from agents import Runner
+        
+        # Build the SDK agent once and reuse it for every call and retry
+        # SDKエージェントを一度だけ構築し、すべての呼び出しとリトライで再利用
+        if self._sdk_agent is None:
+            self._sdk_agent = get_shared_agent_registry().get_agent(
+                name="evaluation_agent",
+                instructions="You are an evaluation agent. Provide JSON output as requested.",
+                model=self.model_name,
+                temperature=self.temperature,
+                **self.kwargs
+            )
+        
         if self.timeout:
             return await asyncio.wait_for(
-                self.llm.generate_async(prompt),
+                Runner.run(self._sdk_agent, prompt),
                 timeout=self.timeout
             )
         else:
-            return await self.llm.generate_async(prompt)
+            return await Runner.run(self._sdk_agent, prompt)
     
     def _parse_evaluation_result(self, llm_result: Any, context: Context) -> EvaluationResult:
         """Parse LLM result into EvaluationResult"""
         try:
             # Try to extract content from LLM result
             # LLM結果からコンテンツを抽出を試行
-            if hasattr(llm_result, 'content'):
+            if hasattr(llm_result, 'final_output'):
+                content = llm_result.final_output
+            elif hasattr(llm_result, 'content'):
                 content = llm_result.content
             else:
                 content = str(llm_result)
@@ -220,7 +220,7 @@ class Context(BaseModel):
     _user_input_event: Optional[asyncio.Event] = PrivateAttr(default=None)
     _awaiting_prompt_event: Optional[asyncio.Event] = PrivateAttr(default=None)
     
-    def __init__(self, **data):
+    def __init__(self, **data: Any) -> None:
         """
         Initialize Context with async events and proper defaults
         非同期イベントと適切なデフォルト値でContextを初期化
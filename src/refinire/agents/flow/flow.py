@@ -231,10 +231,15 @@ class Flow:
         """
         Register trace in global registry
         グローバルレジストリにトレースを登録
+        
+        The registration is queued on the registry's write-behind queue so
+        it adds no lock contention or I/O to flow execution.
+        登録はレジストリのwrite-behindキューに入れられるため、フロー実行に
+        ロック競合やI/Oを加えません。
         """
         try:
             registry = get_global_registry()
-            registry.register_trace(
+            registry.submit_register(
                 trace_id=self.trace_id,
                 flow_name=self.name,
                 flow_id=self.flow_id,
@@ -301,7 +306,7 @@ class Flow:
             registry = get_global_registry()
             trace_summary = self.context.get_trace_summary()
             
-            registry.update_trace(
+            registry.submit_update(
                 trace_id=self.trace_id,
                 status="completed",
                 total_spans=trace_summary.get("total_spans", 0),
@@ -327,7 +332,7 @@ class Flow:
             registry = get_global_registry()
             trace_summary = self.context.get_trace_summary()
             
-            registry.update_trace(
+            registry.submit_update(
                 trace_id=self.trace_id,
                 status="error",
                 total_spans=trace_summary.get("total_spans", 0),
@@ -23,6 +23,7 @@ from .llm_pipeline import (
     create_simple_interactive_agent,
     create_evaluated_interactive_agent
 )
+from .evaluation_gate import EvaluationGate, GateDecision
 
 # Legacy AgentPipeline (deprecated - removed)
 # from .pipeline import AgentPipeline, EvaluationResult, Comment, CommentImportance
@@ -41,5 +42,7 @@ __all__ = [
     "create_web_search_agent",
     "create_calculator_agent",
     "create_simple_interactive_agent",
-    "create_evaluated_interactive_agent"
+    "create_evaluated_interactive_agent",
+    "EvaluationGate",
+    "GateDecision"
 ]
\ No newline at end of file
@@ -0,0 +1,204 @@
+"""
+Evaluation Gate - Cheap checks and sampling in front of LLM evaluation
+評価ゲート - LLM評価の前段に置く安価なチェックとサンプリング
+
+Outputs first go through deterministic local checks (empty output, length
+bounds, schema validation, custom heuristics). Outputs that fail them are
+rejected without an LLM call. Once recent LLM evaluations pass consistently,
+only a sampled fraction of the remaining outputs is sent to the evaluator.
+出力はまず決定的なローカルチェック（空出力、長さの範囲、スキーマ検証、カスタム
+ヒューリスティック）を通ります。これに失敗した出力はLLMを呼ばずに却下されます。
+最近のLLM評価が安定して合格している間は、残りの出力の一部のみがサンプリング
+されて評価器に送られます。
+"""
+
+import json
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+
+@dataclass
+class GateDecision:
+    """
+    Outcome of the gate for one output
+    1件の出力に対するゲートの判定結果
+
+    Attributes:
+        evaluate: Whether the LLM evaluation should run / LLM評価を実行すべきか
+        score: Score to use when the LLM evaluation is skipped (0-100) / LLM評価を省略する場合のスコア（0-100）
+        passed: Pass/fail when the LLM evaluation is skipped / LLM評価を省略する場合の合否
+        reason: Why the evaluation was skipped / 評価を省略した理由
+    """
+    evaluate: bool
+    score: Optional[float] = None
+    passed: Optional[bool] = None
+    reason: Optional[str] = None
+
+
+class EvaluationGate:
+    """
+    Tiered evaluator front end: local checks, then sampled LLM evaluation
+    段階的評価のフロントエンド：ローカルチェックの後にサンプリングされたLLM評価
+    """
+
+    def __init__(
+        self,
+        min_length: Optional[int] = 1,
+        max_length: Optional[int] = None,
+        output_model: Optional[Type[BaseModel]] = None,
+        checks: Optional[List[Callable[[Any], bool]]] = None,
+        sample_rate: float = 1.0,
+        warmup: int = 20,
+        stable_pass_rate: float = 0.95,
+        window: int = 100,
+        seed: Optional[int] = None
+    ):
+        """
+        Initialize evaluation gate
+        評価ゲートを初期化
+
+        Args:
+            min_length: Minimum stripped output length (None disables) / 前後空白を除いた出力の最小長（Noneで無効）
+            max_length: Maximum output length (None disables) / 出力の最大長（Noneで無効）
+            output_model: Pydantic model that text/dict outputs must validate against / テキスト・辞書出力が満たすべきPydanticモデル
+            checks: Heuristics returning False to reject an output / 出力を却下する場合Falseを返すヒューリスティック
+            sample_rate: Fraction of outputs evaluated by the LLM once stable / 安定後にLLMで評価する出力の割合
+            warmup: LLM evaluations required before sampling starts / サンプリング開始前に必要なLLM評価数
+            stable_pass_rate: Recent pass rate required for sampling / サンプリングに必要な最近の合格率
+            window: Number of recent LLM evaluations tracked / 追跡する最近のLLM評価数
+            seed: Seed for sampling decisions / サンプリング判定のシード
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"sample_rate must be between 0 and 1: {sample_rate}")
+        self.min_length = min_length
+        self.max_length = max_length
+        self.output_model = output_model
+        self.checks = checks or []
+        self.sample_rate = sample_rate
+        self.warmup = warmup
+        self.stable_pass_rate = stable_pass_rate
+
+        self._recent: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        # Counters / カウンター
+        self.total = 0
+        self.local_failures = 0
+        self.skipped = 0
+        self.llm_evaluations = 0
+
+    def check(self, output: Any) -> Optional[str]:
+        """
+        Run the local checks
+        ローカルチェックを実行
+
+        Args:
+            output: Generated output / 生成された出力
+
+        Returns:
+            Optional[str]: Failure reason, or None if all checks pass / 失敗理由（すべて合格の場合None）
+        """
+        if output is None:
+            return "Empty output"
+        text = output if isinstance(output, str) else None
+        if text is not None:
+            length = len(text.strip())
+            if self.min_length is not None and length < self.min_length:
+                return "Empty output" if length == 0 else f"Output shorter than {self.min_length} characters"
+            if self.max_length is not None and len(text) > self.max_length:
+                return f"Output longer than {self.max_length} characters"
+        if self.output_model is not None and not isinstance(output, self.output_model):
+            try:
+                if isinstance(output, str):
+                    self.output_model.model_validate_json(output)
+                else:
+                    self.output_model.model_validate(output)
+            except (ValidationError, json.JSONDecodeError, ValueError) as e:
+                return f"Output does not match {self.output_model.__name__}: {e.__class__.__name__}"
+        for check in self.checks:
+            try:
+                if not check(output):
+                    return f"Heuristic check failed: {getattr(check, '__name__', 'check')}"
+            except Exception as e:
+                return f"Heuristic check error: {e}"
+        return None
+
+    def decide(self, output: Any) -> GateDecision:
+        """
+        Decide whether an output needs an LLM evaluation
+        出力にLLM評価が必要かどうかを判定
+
+        Args:
+            output: Generated output / 生成された出力
+
+        Returns:
+            GateDecision: Gate outcome / ゲートの判定結果
+        """
+        reason = self.check(output)
+        with self._lock:
+            self.total += 1
+            if reason is not None:
+                self.local_failures += 1
+                return GateDecision(evaluate=False, score=0.0, passed=False, reason=reason)
+            if self._sampling_active() and self._random.random() >= self.sample_rate:
+                self.skipped += 1
+                mean_score = sum(score for score, _ in self._recent) / len(self._recent)
+                return GateDecision(
+                    evaluate=False,
+                    score=mean_score,
+                    passed=True,
+                    reason=f"Skipped by sampling (recent pass rate {self._pass_rate():.0%})"
+                )
+            return GateDecision(evaluate=True)
+
+    def record(self, score: float, passed: bool) -> None:
+        """
+        Record the result of an LLM evaluation
+        LLM評価の結果を記録
+
+        Args:
+            score: Evaluation score (0-100) / 評価スコア（0-100）
+            passed: Whether the evaluation passed / 評価が合格したか
+        """
+        with self._lock:
+            self.llm_evaluations += 1
+            self._recent.append((score, passed))
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get gate statistics
+        ゲートの統計を取得
+
+        Returns:
+            Dict[str, Any]: Counters, skip rate and recent pass rate / カウンター、省略率、最近の合格率
+        """
+        with self._lock:
+            avoided = self.local_failures + self.skipped
+            return {
+                "total": self.total,
+                "local_failures": self.local_failures,
+                "skipped": self.skipped,
+                "llm_evaluations": self.llm_evaluations,
+                "llm_evaluations_avoided": avoided,
+                "avoided_rate": avoided / self.total if self.total else 0.0,
+                "recent_pass_rate": self._pass_rate() if self._recent else None,
+                "sampling_active": self._sampling_active(),
+            }
+
+    def _sampling_active(self) -> bool:
+        """Whether recent evaluations are stable enough to sample (lock held) / 最近の評価がサンプリングできるほど安定しているか（ロック保持中）"""
+        return (
+            self.sample_rate < 1.0
+            and len(self._recent) >= self.warmup
+            and len(self._recent) > 0
+            and self._pass_rate() >= self.stable_pass_rate
+        )
+
+    def _pass_rate(self) -> float:
+        return sum(1 for _, passed in self._recent if passed) / len(self._recent)
@@ -21,10 +21,21 @@ from pydantic import BaseModel, ValidationError
 
 from ..flow.step import Step
 from ..flow.context import Context
+from ..context_provider import ContextProvider, get_context_in_thread
 from ..context_provider_factory import ContextProviderFactory
 from ...core.trace_registry import TraceRegistry
 from ...core import PromptReference
 from ...core.llm import get_llm
+from ...core.tokenizer import Tokenizer, TokenBudget, get_tokenizer
+from ...core.metrics import MetricsRegistry, extract_usage, get_metrics_registry
+from ...core.routing_cache import RoutingCache
+from ...core.circuit_breaker import (
+    CircuitBreaker,
+    RefinireCircuitOpenError,
+    get_circuit_breaker_registry,
+    resolve_endpoint,
+)
+from .evaluation_gate import EvaluationGate
 from ...core.exceptions import (
     RefinireNetworkError, RefinireConnectionError, RefinireTimeoutError,
     RefinireAuthenticationError, RefinireRateLimitError, RefinireAPIError,
@@ -104,6 +115,11 @@ class RefinireAgent(Step):
         tools: Optional[List[Callable]] = None,
         mcp_servers: Optional[List[str]] = None,
         context_providers_config: Optional[Union[str, List[Dict[str, Any]]]] = None,
+        context_provider_timeout: Optional[float] = None,
+        prompt_token_budget: Optional[int] = None,
+        tokenizer: Union[str, Tokenizer, None] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        circuit_breaker: Union[CircuitBreaker, bool] = True,
         # Flow integration parameters / Flow統合パラメータ
         next_step: Optional[str] = None,
         store_result_key: Optional[str] = None,
@@ -112,6 +128,9 @@ class RefinireAgent(Step):
         # New routing parameters / 新しいルーティングパラメータ
         routing_instruction: Optional[str] = None,
         routing_destinations: Optional[List[str]] = None,
+        routing_cache: Optional[RoutingCache] = None,
+        # Evaluation gate / 評価ゲート
+        evaluation_gate: Optional[EvaluationGate] = None,
         # Environment variable namespace / 環境変数名前空間
         namespace: Optional[str] = None
     ) -> None:
@@ -140,11 +159,18 @@ class RefinireAgent(Step):
             tools: OpenAI function tools / OpenAI関数ツール
             mcp_servers: MCP server identifiers / MCPサーバー識別子
             context_providers_config: Configuration for context providers (YAML-like string or dict list) / コンテキストプロバイダーの設定（YAMLライクな文字列または辞書リスト）
+            context_provider_timeout: Default time budget in seconds for each context provider / 各コンテキストプロバイダーのデフォルト制限時間（秒）
+            prompt_token_budget: Token budget shared by instructions, context, history and input (None for no limit) / 指示・コンテキスト・履歴・入力で共有するトークン予算（Noneで制限なし）
+            tokenizer: Tokenizer instance or name used for prompt_token_budget / prompt_token_budgetに使うTokenizerインスタンスまたは名前
+            metrics: Registry receiving latency/token/cost metrics (None uses the global registry) / レイテンシ・トークン・コストのメトリクスを受け取るレジストリ（Noneでグローバルレジストリ）
+            circuit_breaker: Breaker of the model endpoint (True uses the shared per-endpoint breaker, False disables it) / モデルエンドポイントのブレーカー（Trueでエンドポイントごとの共有ブレーカー、Falseで無効）
             next_step: Next step for Flow integration / Flow統合用次ステップ
             store_result_key: Key to store result in Flow context / Flow context内での結果保存キー
             orchestration_mode: Enable orchestration mode with structured JSON output / 構造化JSON出力付きオーケストレーションモード有効化
             routing_instruction: Instruction for routing decision / ルーティング決定用指示
             routing_destinations: List of possible routing destinations / 可能なルーティング先のリスト
+            routing_cache: Cache of routing decisions reused for repeated generations / 繰り返しの生成結果に再利用するルーティング判断のキャッシュ
+            evaluation_gate: Local checks and sampling applied before LLM evaluation / LLM評価の前に適用するローカルチェックとサンプリング
             namespace: Environment variable namespace for oneenv / oneenv用環境変数名前空間
         """
         # Initialize Step base class
@@ -159,6 +185,8 @@ class RefinireAgent(Step):
         # ルーティングパラメータを保存
         self.routing_instruction = routing_instruction
         self.routing_destinations = routing_destinations
+        self.routing_cache = routing_cache
+        self.evaluation_gate = evaluation_gate
         
         # Validate routing parameters consistency  
         # ルーティングパラメータの整合性を検証
@@ -341,6 +369,27 @@ class RefinireAgent(Step):
         
         # Context providers
         self.context_providers = []
+        self.context_provider_timeout = context_provider_timeout
+        
+        # Token budget shared by the whole prompt builder
+        # プロンプトビルダー全体で共有するトークン予算
+        self.prompt_token_budget = prompt_token_budget
+        self._tokenizer = get_tokenizer(tokenizer, model=self.model_name) if prompt_token_budget is not None else None
+        
+        # LLM request metrics / LLMリクエストのメトリクス
+        self.metrics = metrics
+        
+        # Circuit breaker of the model endpoint / モデルエンドポイントのサーキットブレーカー
+        self.circuit_breaker: Optional[CircuitBreaker]
+        if isinstance(circuit_breaker, CircuitBreaker):
+            self.circuit_breaker = circuit_breaker
+        elif circuit_breaker:
+            provider = self._detect_provider("openai")
+            self.circuit_breaker = get_circuit_breaker_registry().get(
+                resolve_endpoint(self.model, f"{provider}:{self.model_name}"), provider=provider
+            )
+        else:
+            self.circuit_breaker = None
         # Store original config for inheritance by routing agents
         # ルーティングエージェントの継承用に元の設定を保存
         self._original_context_providers_config = context_providers_config
@@ -575,9 +624,10 @@ IMPORTANT: Do not deviate from this format."""
             ctx = Context()
             ctx.add_user_message(user_input)
         
+        started = None
         try:
             # Build prompt using existing method / 既存メソッドを使用してプロンプトを構築
-            full_prompt = self._build_prompt(user_input, include_instructions=False)
+            full_prompt = await self._abuild_prompt(user_input, include_instructions=False)
             
             # Apply generation instructions to agent / エージェントに生成指示を適用
             original_instructions = self._sdk_agent.instructions
@@ -585,6 +635,8 @@ IMPORTANT: Do not deviate from this format."""
             
             # Use Runner.run_streamed for streaming execution
             # ストリーミング実行のためにRunner.run_streamedを使用
+            started = time.perf_counter()
+            time_to_first_token = None
             stream_result = Runner.run_streamed(self._sdk_agent, full_prompt)
             
             full_content = ""
@@ -597,6 +649,8 @@ IMPORTANT: Do not deviate from this format."""
                         if stream_event.data.__class__.__name__ == 'ResponseTextDeltaEvent':
                             if hasattr(stream_event.data, 'delta') and stream_event.data.delta:
                                 chunk = stream_event.data.delta
+                                if time_to_first_token is None:
+                                    time_to_first_token = time.perf_counter() - started
                                 full_content += chunk
                                 
                                 # Call callback if provided / コールバックが提供されている場合は呼び出し
@@ -606,6 +660,12 @@ IMPORTANT: Do not deviate from this format."""
                                 # Yield the chunk / チャンクをyield
                                 yield chunk
             
+            self._record_llm_metrics(
+                time.perf_counter() - started,
+                usage=self._extract_usage(stream_result),
+                time_to_first_token=time_to_first_token
+            )
+            
             # Store result in context if provided / 提供されている場合はコンテキストに結果を保存
             if ctx is not None:
                 ctx.result = full_content
@@ -616,6 +676,8 @@ IMPORTANT: Do not deviate from this format."""
         except Exception as e:
             # Restore original instructions on error / エラー時に元の指示を復元
             self._sdk_agent.instructions = original_instructions
+            if started is not None:
+                self._record_llm_metrics(time.perf_counter() - started, success=False)
             from ...core.exceptions import RefinireError
             raise RefinireError(f"Streaming execution failed: {e}", details={"error": str(e)})
             yield f"Error: {str(e)}"
@@ -649,7 +711,7 @@ IMPORTANT: Do not deviate from this format."""
             else:
                 # Save prompt to shared_state before execution for routing/evaluation
                 # routing/evaluation用に実行前にプロンプトをshared_stateに保存
-                full_prompt = self._build_prompt(input_text, include_instructions=True)
+                full_prompt = await self._abuild_prompt(input_text, include_instructions=True)
                 ctx.shared_state['_last_prompt'] = full_prompt
                 
                 # Execute RefinireAgent and get LLMResult
@@ -794,7 +856,7 @@ IMPORTANT: Do not deviate from this format."""
             )
         
         # 会話履歴とユーザー入力を含むプロンプトを構築（指示文は除く）
-        full_prompt = self._build_prompt(user_input, include_instructions=False, ctx=ctx)
+        full_prompt = await self._abuild_prompt(user_input, include_instructions=False, ctx=ctx)
         
         # Store original instructions to restore later
         # 後で復元するために元の指示を保存
@@ -857,10 +919,32 @@ IMPORTANT: Do not deviate from this format."""
             
             # Execute with OpenAI Agents SDK using custom timeout if available
             # カスタムタイムアウトが利用可能な場合はそれを使用してOpenAI Agents SDKで実行
-            if custom_run_config:
-                result = await Runner.run(self._sdk_agent, full_prompt, run_config=custom_run_config)
-            else:
-                result = await Runner.run(self._sdk_agent, full_prompt)
+            # Fail fast while the endpoint's circuit is open
+            # エンドポイントのサーキットが開いている間は即座に失敗
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_call()
+            started = time.perf_counter()
+            try:
+                if custom_run_config:
+                    result = await Runner.run(self._sdk_agent, full_prompt, run_config=custom_run_config)
+                else:
+                    result = await Runner.run(self._sdk_agent, full_prompt)
+            except Exception as call_error:
+                self._record_llm_metrics(time.perf_counter() - started, success=False)
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_error(self._map_provider_exception(call_error) or call_error)
+                raise
+            except BaseException:
+                # Cancelled calls have no outcome but must give back a trial slot
+                # キャンセルされた呼び出しは結果を持たないが、試行枠は返却する
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.release()
+                raise
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_success()
+            call_metrics = self._record_llm_metrics(
+                time.perf_counter() - started, usage=self._extract_usage(result)
+            )
             content = result.final_output
             if not content and hasattr(result, 'output') and result.output:
                 content = result.output
@@ -894,6 +978,7 @@ IMPORTANT: Do not deviate from this format."""
                 "attempts": 1,
                 "sdk": True
             }
+            metadata.update(call_metrics)
             if self._generation_prompt_metadata:
                 metadata.update(self._generation_prompt_metadata)
             if self._evaluation_prompt_metadata:
@@ -974,69 +1059,110 @@ IMPORTANT: Do not deviate from this format."""
             # Restore original instructions before handling error
             # エラー処理前に元の指示を復元
             self._sdk_agent.instructions = original_instructions
+            if isinstance(e, RefinireCircuitOpenError):
+                raise
             
-            # Check if this is a network-related error and raise custom exception immediately
-            # ネットワーク関連エラーかチェックし、即座にカスタム例外を発生
-            import openai
-            import httpx
-            
-            if isinstance(e, (openai.APIConnectionError, openai.APITimeoutError, 
-                             openai.AuthenticationError, openai.RateLimitError,
-                             openai.APIStatusError, openai.APIError)):
-                # Determine provider from model name
-                # モデル名からプロバイダーを判定
-                provider = "openai"
-                if "anthropic" in self.model_name.lower() or "claude" in self.model_name.lower():
-                    provider = "anthropic"
-                elif "gemini" in self.model_name.lower() or "google" in self.model_name.lower():
-                    provider = "google"
-                elif "ollama" in self.model_name.lower() or "llama" in self.model_name.lower():
-                    provider = "ollama"
-                elif "openrouter" in self.model_name.lower():
-                    provider = "openrouter"
-                elif "groq" in self.model_name.lower():
-                    provider = "groq"
-                elif "lmstudio" in self.model_name.lower():
-                    provider = "lmstudio"
-                
-                # Map OpenAI exception to Refinire custom exception and raise immediately
-                # OpenAI例外をRefinireカスタム例外にマップして即座に発生
-                raise map_openai_exception(e, provider)
-            
-            elif isinstance(e, (httpx.ConnectError, httpx.TimeoutException,
-                               httpx.HTTPStatusError, httpx.RequestError)):
-                # Determine provider from model name
-                # モデル名からプロバイダーを判定
-                provider = "unknown"
-                if "anthropic" in self.model_name.lower() or "claude" in self.model_name.lower():
-                    provider = "anthropic"
-                elif "gemini" in self.model_name.lower() or "google" in self.model_name.lower():
-                    provider = "google"
-                elif "ollama" in self.model_name.lower() or "llama" in self.model_name.lower():
-                    provider = "ollama"
-                elif "openrouter" in self.model_name.lower():
-                    provider = "openrouter"
-                elif "groq" in self.model_name.lower():
-                    provider = "groq"
-                elif "lmstudio" in self.model_name.lower():
-                    provider = "lmstudio"
-                
-                # Map httpx exception to Refinire custom exception and raise immediately
-                # httpx例外をRefinireカスタム例外にマップして即座に発生
-                raise map_httpx_exception(e, provider)
+            # Map network-related errors to custom exceptions and raise immediately
+            # ネットワーク関連エラーをカスタム例外にマップし、即座に発生
+            mapped_error = self._map_provider_exception(e)
+            if mapped_error is not None:
+                raise mapped_error
             
-            else:
-                # For non-network errors, return LLMResult with error
-                # ネットワークエラー以外の場合は、エラー付きでLLMResultを返す
-                return LLMResult(
-                    content=None,
-                    success=False,
-                    metadata={"error": str(e), "attempts": 1, "sdk": True}
-                )
+            # For non-network errors, return LLMResult with error
+            # ネットワークエラー以外の場合は、エラー付きでLLMResultを返す
+            return LLMResult(
+                content=None,
+                success=False,
+                metadata={"error": str(e), "attempts": 1, "sdk": True}
+            )
+    
+    def _detect_provider(self, default: str) -> str:
+        """
+        Determine provider from model name
+        モデル名からプロバイダーを判定
+        """
+        model_name = str(self.model_name).lower()
+        if "anthropic" in model_name or "claude" in model_name:
+            return "anthropic"
+        elif "gemini" in model_name or "google" in model_name:
+            return "google"
+        elif "ollama" in model_name or "llama" in model_name:
+            return "ollama"
+        elif "openrouter" in model_name:
+            return "openrouter"
+        elif "groq" in model_name:
+            return "groq"
+        elif "lmstudio" in model_name:
+            return "lmstudio"
+        return default
+    
+    def _map_provider_exception(self, e: Exception) -> Optional[Exception]:
+        """
+        Map OpenAI/httpx errors to Refinire exceptions (None for other errors)
+        OpenAI/httpxのエラーをRefinire例外にマップ（その他のエラーはNone）
+        """
+        import openai
+        import httpx
+        
+        if isinstance(e, (openai.APIConnectionError, openai.APITimeoutError, 
+                         openai.AuthenticationError, openai.RateLimitError,
+                         openai.APIStatusError, openai.APIError)):
+            return map_openai_exception(e, self._detect_provider("openai"))
+        if isinstance(e, (httpx.ConnectError, httpx.TimeoutException,
+                         httpx.HTTPStatusError, httpx.RequestError)):
+            return map_httpx_exception(e, self._detect_provider("unknown"))
+        return None
     
     
     
     
+    @staticmethod
+    def _extract_usage(result: Any) -> Optional[Dict[str, int]]:
+        """
+        Extract token usage from an SDK run result
+        SDKの実行結果からトークン使用量を抽出
+        
+        Returns:
+            Optional[Dict[str, int]]: prompt/completion/total tokens, or None if unavailable / トークン数（取得できない場合None）
+        """
+        return extract_usage(result)
+    
+    def _record_llm_metrics(
+        self,
+        latency: float,
+        success: bool = True,
+        usage: Optional[Dict[str, int]] = None,
+        time_to_first_token: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Record one LLM request in the metrics registry
+        1件のLLMリクエストをメトリクスレジストリに記録
+        
+        Returns:
+            Dict[str, Any]: Latency, usage and cost for LLMResult.metadata / LLMResult.metadata用のレイテンシ・使用量・コスト
+        """
+        call_metrics: Dict[str, Any] = {"latency_seconds": latency}
+        if usage is not None:
+            call_metrics["usage"] = usage
+        try:
+            registry = getattr(self, "metrics", None) or get_metrics_registry()
+            cost = registry.record_request(
+                self.model_name,
+                self.name,
+                latency,
+                success=success,
+                time_to_first_token=time_to_first_token,
+                prompt_tokens=usage["prompt_tokens"] if usage else 0,
+                completion_tokens=usage["completion_tokens"] if usage else 0
+            )
+        except Exception:
+            # Metrics must never break agent execution
+            # メトリクスがエージェントの実行を壊してはならない
+            return call_metrics
+        if cost is not None:
+            call_metrics["cost_usd"] = cost
+        return call_metrics
+    
     def _validate_input(self, user_input: str) -> bool:
         """Validate input using guardrails / ガードレールを使用して入力を検証"""
         for guardrail in self.input_guardrails:
@@ -1150,6 +1276,7 @@ IMPORTANT: Do not deviate from this format."""
                 routing_destinations=self.routing_destinations,
                 model=self.model_name,
                 temperature=0.1,  # Low temperature for consistent routing
+                cache=self.routing_cache,
                 namespace=self.namespace
             )
         
@@ -1447,60 +1574,171 @@ IMPORTANT: Do not deviate from this format."""
             include_instructions: 指示文を含めるかどうか（OpenAI Agents SDKの場合はFalse）
             ctx: Context for variable substitution / 変数置換用のコンテキスト
         """
+        context_parts = self._collect_context(user_input)
+        return self._assemble_prompt(user_input, context_parts, include_instructions, ctx)
+    
+    async def _abuild_prompt(self, user_input: str, include_instructions: bool = True, ctx: Optional[Context] = None) -> str:
+        """
+        Build complete prompt without blocking the event loop
+        イベントループをブロックせずに完全なプロンプトを構築
+        
+        Context providers are queried concurrently (see _acollect_context).
+        コンテキストプロバイダーは並行して問い合わせられます（_acollect_context参照）。
+        
+        Args:
+            user_input: User input / ユーザー入力
+            include_instructions: Whether to include instructions / 指示文を含めるかどうか
+            ctx: Context for variable substitution / 変数置換用のコンテキスト
+        """
+        context_parts = await self._acollect_context(user_input)
+        return self._assemble_prompt(user_input, context_parts, include_instructions, ctx)
+    
+    def _collect_context(self, user_input: str) -> List[str]:
+        """
+        Query context providers sequentially (with chaining)
+        コンテキストプロバイダーに順番に問い合わせ（連鎖機能付き）
+        
+        Returns:
+            List[str]: Non-empty context strings in provider order / プロバイダー順の空でないコンテキスト文字列
+        """
+        context_parts = []
+        previous_context = ""
+        for provider in getattr(self, 'context_providers', None) or []:
+            try:
+                provider_context = provider.get_context(user_input, previous_context)
+                # Ensure provider_context is a string (convert None to empty string)
+                # provider_contextが文字列であることを保証（Noneは空文字列に変換）
+                if provider_context:
+                    context_parts.append(provider_context)
+                    previous_context = provider_context
+            except Exception:
+                # Context provider failed, continue with others
+                # コンテキストプロバイダーが失敗しても他のプロバイダーは続行
+                continue
+        return context_parts
+    
+    async def _acollect_context(self, user_input: str) -> List[str]:
+        """
+        Query context providers concurrently within their time budgets
+        制限時間内でコンテキストプロバイダーに並行して問い合わせ
+        
+        Providers that do not read previous_context run concurrently. A provider
+        with uses_previous_context waits for every provider before it, so it sees
+        the same previous_context as in sequential execution. A provider that
+        fails or exceeds its timeout contributes no context.
+        previous_contextを参照しないプロバイダーは並行実行されます。
+        uses_previous_contextが有効なプロバイダーは先行するすべてのプロバイダーを
+        待つため、逐次実行と同じprevious_contextを受け取ります。失敗または制限時間を
+        超えたプロバイダーはコンテキストを提供しません。
+        
+        Returns:
+            List[str]: Non-empty context strings in provider order / プロバイダー順の空でないコンテキスト文字列
+        """
+        providers = getattr(self, 'context_providers', None) or []
+        results: List[str] = [""] * len(providers)
+        
+        async def run_provider(index: int, provider: Any, previous_context: str) -> None:
+            timeout = getattr(provider, 'timeout', None)
+            if timeout is None:
+                timeout = getattr(self, 'context_provider_timeout', None)
+            if isinstance(provider, ContextProvider):
+                call = provider.aget_context(user_input, previous_context)
+            else:
+                # Duck-typed provider without aget_context, offload to a thread
+                # aget_contextを持たないダックタイプのプロバイダーはスレッドで実行
+                call = get_context_in_thread(provider, user_input, previous_context)
+            try:
+                provider_context = await asyncio.wait_for(call, timeout=timeout)
+            except Exception:
+                # Failed or timed out, degrade to no context from this provider
+                # 失敗またはタイムアウトした場合はこのプロバイダーのコンテキストなしで続行
+                return
+            results[index] = provider_context or ""
+        
+        pending: List[asyncio.Task[Any]] = []
+        for index, provider in enumerate(providers):
+            if getattr(provider, 'uses_previous_context', True):
+                # Chained provider: wait for all earlier providers first
+                # 連鎖プロバイダー: 先行するすべてのプロバイダーを待機
+                if pending:
+                    await asyncio.gather(*pending)
+                    pending = []
+                previous_context = next((r for r in reversed(results[:index]) if r), "")
+            else:
+                previous_context = ""
+            pending.append(asyncio.ensure_future(run_provider(index, provider, previous_context)))
+        if pending:
+            await asyncio.gather(*pending)
+        
+        return [r for r in results if r]
+    
+    def _has_conversation_provider(self) -> bool:
+        """Check if any context provider is for conversation history / 会話履歴用のコンテキストプロバイダーがあるかチェック"""
+        for provider in getattr(self, 'context_providers', None) or []:
+            if getattr(provider, 'provider_name', None) == 'conversation_history':
+                return True
+            if provider.__class__.__name__ == 'ConversationHistoryProvider':
+                return True
+        return False
+    
+    def _assemble_prompt(
+        self,
+        user_input: str,
+        context_parts: List[str],
+        include_instructions: bool = True,
+        ctx: Optional[Context] = None
+    ) -> str:
+        """
+        Assemble prompt from instructions, collected context, and history
+        指示、収集済みコンテキスト、履歴からプロンプトを組み立て
+        
+        With prompt_token_budget set, instructions and user input are charged
+        first, then context parts are admitted in order and history keeps its
+        most recent part, so the prompt never exceeds the budget.
+        prompt_token_budgetが設定されている場合、指示とユーザー入力を先に計上し、
+        続いてコンテキストを順に受け入れ、履歴は最新部分を残すため、プロンプトが
+        予算を超えることはありません。
+        """
         prompt_parts = []
         
+        # Apply variable substitution to generation instructions and user input
+        # generation_instructionsとユーザー入力に変数置換を適用
+        processed_instructions = self._substitute_variables(self.generation_instructions, ctx)
+        processed_user_input = self._substitute_variables(user_input, ctx)
+        
+        budget = None
+        prompt_token_budget = getattr(self, 'prompt_token_budget', None)
+        if prompt_token_budget is not None:
+            # Instructions count even when sent separately to the SDK
+            # SDKに別途送信される場合も指示はトークンを消費する
+            budget = TokenBudget(prompt_token_budget, self._tokenizer)
+            budget.reserve(processed_instructions)
+            budget.reserve(f"User input: {processed_user_input}")
+            if context_parts:
+                budget.reserve("Context:")
+                context_parts = budget.fit_all(context_parts)
+        
         # Add instructions only if requested (not for OpenAI Agents SDK)
         # 要求された場合のみ指示文を追加（OpenAI Agents SDKの場合は除く）
         if include_instructions:
-            # Apply variable substitution to generation instructions
-            # generation_instructionsにも変数置換を適用
-            processed_instructions = self._substitute_variables(self.generation_instructions, ctx)
             prompt_parts.append(processed_instructions)
         
-        # Add context from context providers (with chaining)
-        # コンテキストプロバイダーからのコンテキストを追加（連鎖機能付き）
-        has_conversation_provider = False
-        if hasattr(self, 'context_providers') and self.context_providers:
-            context_parts = []
-            previous_context = ""
-            
-            # Check if any context provider is for conversation history
-            # 会話履歴用のコンテキストプロバイダーがあるかチェック
-            for provider in self.context_providers:
-                if hasattr(provider, 'provider_name') and provider.provider_name == 'conversation_history':
-                    has_conversation_provider = True
-                elif provider.__class__.__name__ == 'ConversationHistoryProvider':
-                    has_conversation_provider = True
-            
-            for provider in self.context_providers:
-                try:
-                    provider_context = provider.get_context(user_input, previous_context)
-                    # Ensure provider_context is a string (convert None to empty string)
-                    # provider_contextが文字列であることを保証（Noneは空文字列に変換）
-                    if provider_context is None:
-                        provider_context = ""
-                    if provider_context:
-                        context_parts.append(provider_context)
-                        previous_context = provider_context
-                except Exception as e:
-                    # Log error but continue with other providers
-                    # エラーをログに記録するが、他のプロバイダーは続行
-                    # Context provider failed, continue with others
-                    continue
-            
-            if context_parts:
-                context_text = "\n\n".join(context_parts)
-                prompt_parts.append(f"Context:\n{context_text}")
+        # Add context from context providers
+        # コンテキストプロバイダーからのコンテキストを追加
+        if context_parts:
+            context_text = "\n\n".join(context_parts)
+            prompt_parts.append(f"Context:\n{context_text}")
         
         # Add history if available and no conversation provider is used
         # 利用可能で会話プロバイダーが使用されていない場合は履歴を追加
-        if self.session_history and not has_conversation_provider:
+        if self.session_history and not self._has_conversation_provider():
             history_text = "\n".join(self.session_history[-self.history_size:])
-            prompt_parts.append(f"Previous context:\n{history_text}")
+            if budget is not None:
+                budget.reserve("Previous context:")
+                history_text = budget.fit(history_text, keep="end")
+            if history_text:
+                prompt_parts.append(f"Previous context:\n{history_text}")
         
-        # Substitute variables in user input before adding
-        # ユーザー入力を追加する前に変数を置換
-        processed_user_input = self._substitute_variables(user_input, ctx)
         prompt_parts.append(f"User input: {processed_user_input}")
         
         return "\n\n".join(prompt_parts)
@@ -1587,6 +1825,23 @@ IMPORTANT: Do not deviate from this format."""
         Returns:
             EvaluationResult with evaluation details
         """
+        # Cheap local checks and sampling before any LLM call
+        # LLM呼び出し前の安価なローカルチェックとサンプリング
+        if self.evaluation_gate is not None:
+            decision = self.evaluation_gate.decide(generated_content)
+            if not decision.evaluate:
+                return EvaluationResult(
+                    score=decision.score or 0.0,
+                    passed=bool(decision.passed),
+                    feedback=decision.reason,
+                    metadata={
+                        "evaluation_type": "gate",
+                        "local_failure": not decision.passed,
+                        "sampled_out": decision.passed
+                    }
+                )
+
+        evaluation_result: Optional[EvaluationResult] = None
         try:
             # Use dedicated EvaluationAgent if available
             # 利用可能な場合は専用EvaluationAgentを使用
@@ -1601,17 +1856,23 @@ IMPORTANT: Do not deviate from this format."""
                         feedback=result_context.evaluation_result.feedback,
                         metadata=result_context.evaluation_result.metadata
                     )
-                    return evaluation_result
             
-            # Fallback to legacy evaluation implementation
-            # レガシー評価実装にフォールバック
-            return self._evaluate_content(user_input, generated_content, ctx)
+            if evaluation_result is None:
+                # Fallback to legacy evaluation implementation
+                # レガシー評価実装にフォールバック
+                evaluation_result = self._evaluate_content(user_input, generated_content, ctx)
             
         except Exception as e:
             print(f"Warning: Evaluation execution failed: {e}")
             # Fallback to legacy evaluation
             # レガシー評価にフォールバック
-            return self._evaluate_content(user_input, generated_content, ctx)
+            evaluation_result = self._evaluate_content(user_input, generated_content, ctx)
+        
+        # Every evaluated output feeds the gate's sampling statistics
+        # 評価したすべての出力をゲートのサンプリング統計に反映
+        if self.evaluation_gate is not None:
+            self.evaluation_gate.record(evaluation_result.score, evaluation_result.passed)
+        return evaluation_result
     
     def _store_in_history(self, user_input: str, result: LLMResult) -> None:
         """Store interaction in history and update context providers / 対話を履歴に保存し、コンテキストプロバイダーを更新"""
@@ -0,0 +1,389 @@
+"""
+Code Index for SourceCodeProvider
+SourceCodeProvider用のコードインデックス
+
+This module provides a local inverted index over source files with BM25 scoring.
+Files are tokenized into identifiers (split on snake_case and camelCase),
+docstring/comment words and path components. The index is updated incrementally
+using file modification time and size, and can be persisted to a JSON file.
+
+このモジュールはソースファイルに対するBM25スコアリング付きのローカル転置インデックスを
+提供します。ファイルは識別子（snake_case・camelCaseで分割）、docstring/コメントの単語、
+パス要素にトークン化されます。インデックスはファイルの更新時刻とサイズを使って
+差分更新され、JSONファイルに永続化できます。
+"""
+
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Identifiers, numbers and runs of non-ASCII characters
+# 識別子、数値、非ASCII文字の連続
+_TOKEN_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|[0-9]+|[^\x00-\x7F\s]+')
+_CAMEL_PATTERN = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+
+# Very common words that carry no signal for file selection
+# ファイル選択に寄与しない頻出語
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from",
+    "how", "in", "is", "it", "of", "on", "or", "the", "this", "to", "what",
+    "where", "which", "with", "self", "none", "true", "false", "return",
+    "def", "class", "import", "if", "else", "not",
+})
+
+# Path tokens are repeated so that file and directory names weigh more
+# ファイル名・ディレクトリ名の重みを上げるためパストークンを繰り返す
+_PATH_TOKEN_WEIGHT = 3
+
+INDEX_FORMAT_VERSION = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenize source code or natural language text for indexing
+    インデックス用にソースコードまたは自然言語テキストをトークン化
+
+    Identifiers are kept whole and also split into their snake_case and
+    camelCase parts. Non-ASCII runs (e.g. Japanese) are split into character
+    bigrams.
+    識別子はそのまま保持し、snake_caseとcamelCaseの部分にも分割します。
+    非ASCII文字の連続（日本語など）は文字バイグラムに分割します。
+
+    Args:
+        text: Text to tokenize / トークン化するテキスト
+
+    Returns:
+        List[str]: Lowercased tokens / 小文字化されたトークン
+    """
+    tokens = []
+    for raw in _TOKEN_PATTERN.findall(text):
+        if not raw.isascii():
+            if len(raw) == 1:
+                tokens.append(raw)
+            else:
+                tokens.extend(raw[i:i + 2] for i in range(len(raw) - 1))
+            continue
+        word = raw.lower()
+        if len(word) > 1 and word not in _STOPWORDS:
+            tokens.append(word)
+        if word == raw and '_' not in raw:
+            # Plain lowercase word, nothing to split
+            # 分割不要な小文字のみの単語
+            continue
+        parts = [p.lower() for piece in raw.split('_') for p in _CAMEL_PATTERN.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if len(p) > 1 and p not in _STOPWORDS)
+    return tokens
+
+
+@dataclass
+class CodeSearchHit:
+    """
+    Single search result from CodeIndex
+    CodeIndexの検索結果1件
+
+    Attributes:
+        path: File path relative to the base path / ベースパスからの相対ファイルパス
+        score: BM25 score / BM25スコア
+        start_line: First line of the chunk (1-based) / チャンクの開始行（1始まり）
+        end_line: Last line of the chunk, None for whole files / チャンクの終了行（ファイル全体の場合はNone）
+    """
+    path: str
+    score: float
+    start_line: int = 1
+    end_line: Optional[int] = None
+
+
+class CodeIndex:
+    """
+    Incremental BM25 index over source files
+    ソースファイルに対する差分更新可能なBM25インデックス
+
+    Documents are whole files, or fixed-size line chunks when chunk_lines is set.
+    Each file is only re-tokenized when its (mtime, size) signature changes.
+    ドキュメントはファイル全体、またはchunk_linesが設定されている場合は固定行数の
+    チャンクです。各ファイルは(mtime, size)が変化した場合のみ再トークン化されます。
+    """
+
+    def __init__(
+        self,
+        chunk_lines: Optional[int] = None,
+        index_path: Optional[str | Path] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        save_interval: Optional[float] = 30.0
+    ):
+        """
+        Initialize the code index
+        コードインデックスを初期化
+
+        Args:
+            chunk_lines: Lines per chunk (None to index whole files) / チャンクあたりの行数（Noneでファイル全体）
+            index_path: JSON file to persist the index (None for in-memory only) / インデックス永続化用JSONファイル（Noneでメモリのみ）
+            k1: BM25 term frequency saturation / BM25の単語頻度飽和パラメータ
+            b: BM25 length normalization / BM25の文書長正規化パラメータ
+            save_interval: Minimum seconds between saves triggered by sync (None to save only on flush) / syncによる保存の最小間隔秒数（Noneでflush時のみ保存）
+        """
+        if chunk_lines is not None and chunk_lines <= 0:
+            raise ValueError("chunk_lines must be a positive integer")
+        self.chunk_lines = chunk_lines
+        self.index_path = Path(index_path) if index_path else None
+        self.k1 = k1
+        self.b = b
+        self.save_interval = save_interval
+
+        # Unsaved changes and the time of the last save
+        # 未保存の変更と最終保存時刻
+        self._dirty = False
+        self._last_save: Optional[float] = None
+
+        # File signatures and the document ids produced from each file
+        # ファイルシグネチャと各ファイルから生成されたドキュメントID
+        self._signatures: Dict[str, Tuple[float, int]] = {}
+        self._file_docs: Dict[str, List[str]] = {}
+
+        # Document data: term frequencies, length and line range
+        # ドキュメントデータ: 単語頻度、長さ、行範囲
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._doc_ranges: Dict[str, Tuple[str, int, Optional[int]]] = {}
+        self._total_length = 0
+
+        # Inverted index: term -> {doc_id: term frequency}
+        # 転置インデックス: 単語 -> {doc_id: 単語頻度}
+        self._postings: Dict[str, Dict[str, int]] = {}
+
+        if self.index_path is not None:
+            self.load()
+
+    @property
+    def document_count(self) -> int:
+        """Number of indexed documents / インデックス済みドキュメント数"""
+        return len(self._doc_terms)
+
+    @property
+    def file_count(self) -> int:
+        """Number of indexed files / インデックス済みファイル数"""
+        return len(self._signatures)
+
+    def _add_document(self, doc_id: str, path: str, start: int, end: Optional[int], terms: Dict[str, int]) -> None:
+        self._doc_terms[doc_id] = terms
+        length = sum(terms.values())
+        self._doc_lengths[doc_id] = length
+        self._doc_ranges[doc_id] = (path, start, end)
+        self._total_length += length
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        self._file_docs.setdefault(path, []).append(doc_id)
+
+    def _remove_documents(self, path: str) -> None:
+        for doc_id in self._file_docs.pop(path, []):
+            for term in self._doc_terms.pop(doc_id, {}):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= self._doc_lengths.pop(doc_id, 0)
+            self._doc_ranges.pop(doc_id, None)
+
+    def add_file(self, path: str, content: str, signature: Tuple[float, int] = (0.0, 0)) -> None:
+        """
+        Index (or re-index) a single file
+        単一ファイルをインデックス（または再インデックス）
+
+        Args:
+            path: File path relative to the base path / ベースパスからの相対ファイルパス
+            content: File content / ファイル内容
+            signature: (mtime, size) used to detect changes / 変更検出用の(mtime, size)
+        """
+        self._remove_documents(path)
+        self._signatures[path] = signature
+        self._dirty = True
+        path_terms = tokenize(path.replace('/', ' ').replace('\\', ' ').replace('.', ' ')) * _PATH_TOKEN_WEIGHT
+
+        if self.chunk_lines is None:
+            terms = Counter(tokenize(content))
+            terms.update(path_terms)
+            self._add_document(path, path, 1, None, dict(terms))
+            return
+
+        lines = content.splitlines()
+        for start in range(0, max(len(lines), 1), self.chunk_lines):
+            chunk = '\n'.join(lines[start:start + self.chunk_lines])
+            terms = Counter(tokenize(chunk))
+            terms.update(path_terms)
+            end = min(start + self.chunk_lines, len(lines))
+            self._add_document(f"{path}#L{start + 1}-L{end}", path, start + 1, end, dict(terms))
+
+    def remove_file(self, path: str) -> None:
+        """
+        Remove a file from the index
+        インデックスからファイルを削除
+
+        Args:
+            path: File path relative to the base path / ベースパスからの相対ファイルパス
+        """
+        self._remove_documents(path)
+        if self._signatures.pop(path, None) is not None:
+            self._dirty = True
+
+    def sync(self, signatures: Dict[str, Tuple[float, int]], loader: Callable[[str], Optional[str]]) -> bool:
+        """
+        Bring the index up to date with the given files
+        与えられたファイルに合わせてインデックスを最新化
+
+        Only new or changed files are loaded; files missing from signatures are removed.
+        Changes are persisted at most once per save_interval; call flush() to force a save.
+        新規または変更されたファイルのみ読み込み、signaturesにないファイルは削除します。
+        変更の永続化はsave_intervalごとに最大1回で、即時保存にはflush()を呼びます。
+
+        Args:
+            signatures: Mapping of path to (mtime, size) / パスから(mtime, size)へのマッピング
+            loader: Function returning file content (None if unreadable) / ファイル内容を返す関数（読めない場合はNone）
+
+        Returns:
+            bool: True if the index changed / インデックスが変更された場合True
+        """
+        changed = False
+        for path in [p for p in self._signatures if p not in signatures]:
+            self.remove_file(path)
+            changed = True
+        for path, signature in signatures.items():
+            if self._signatures.get(path) == tuple(signature):
+                continue
+            content = loader(path)
+            if content is None:
+                self.remove_file(path)
+            else:
+                self.add_file(path, content, (signature[0], signature[1]))
+            changed = True
+        if self._dirty and self.save_interval is not None and (
+            self._last_save is None or time.monotonic() - self._last_save >= self.save_interval
+        ):
+            self.save()
+        return changed
+
+    def flush(self) -> None:
+        """
+        Persist unsaved changes to index_path
+        未保存の変更をindex_pathに永続化
+        """
+        if self._dirty:
+            self.save()
+
+    def search(self, query: str, top_k: int = 10) -> List[CodeSearchHit]:
+        """
+        Rank documents for a natural-language or code query
+        自然言語またはコードのクエリでドキュメントをランク付け
+
+        Args:
+            query: Search query / 検索クエリ
+            top_k: Maximum number of hits / 最大ヒット数
+
+        Returns:
+            List[CodeSearchHit]: Hits sorted by descending score / スコア降順のヒット
+        """
+        doc_count = len(self._doc_terms)
+        if doc_count == 0 or top_k <= 0:
+            return []
+        avg_length = self._total_length / doc_count or 1.0
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+        hits = []
+        for doc_id, score in ranked:
+            path, start, end = self._doc_ranges[doc_id]
+            hits.append(CodeSearchHit(path=path, score=score, start_line=start, end_line=end))
+        return hits
+
+    def clear(self) -> None:
+        """
+        Remove all documents from the index
+        インデックスからすべてのドキュメントを削除
+        """
+        self._signatures.clear()
+        self._file_docs.clear()
+        self._doc_terms.clear()
+        self._doc_lengths.clear()
+        self._doc_ranges.clear()
+        self._postings.clear()
+        self._total_length = 0
+        self._dirty = True
+
+    def save(self) -> None:
+        """
+        Persist the index to index_path
+        インデックスをindex_pathに永続化
+        """
+        if self.index_path is None:
+            return
+        data = {
+            "version": INDEX_FORMAT_VERSION,
+            "chunk_lines": self.chunk_lines,
+            "files": {
+                path: {
+                    "signature": list(self._signatures[path]),
+                    "docs": [
+                        [self._doc_ranges[doc_id][1], self._doc_ranges[doc_id][2], self._doc_terms[doc_id]]
+                        for doc_id in self._file_docs.get(path, [])
+                    ]
+                }
+                for path in self._signatures
+            }
+        }
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(self.index_path.suffix + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def load(self) -> bool:
+        """
+        Load the index from index_path
+        index_pathからインデックスを読み込み
+
+        An index written with a different format version or chunk size is ignored.
+        フォーマットバージョンまたはチャンクサイズが異なるインデックスは無視されます。
+
+        Returns:
+            bool: True if an index was loaded / インデックスを読み込んだ場合True
+        """
+        if self.index_path is None or not self.index_path.exists():
+            return False
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not load code index: {e}")
+            return False
+        if data.get("version") != INDEX_FORMAT_VERSION or data.get("chunk_lines") != self.chunk_lines:
+            return False
+
+        self.clear()
+        for path, entry in data.get("files", {}).items():
+            self._signatures[path] = tuple(entry["signature"])
+            for start, end, terms in entry["docs"]:
+                doc_id = path if self.chunk_lines is None else f"{path}#L{start}-L{end}"
+                self._add_document(doc_id, path, start, end, terms)
+        self._dirty = False
+        return True
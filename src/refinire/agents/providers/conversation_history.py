@@ -25,6 +25,7 @@ class ConversationHistoryProvider(ContextProvider):
     """
     
     provider_name: ClassVar[str] = "conversation"
+    uses_previous_context: bool = False
     
     def __init__(self, history: List[str] = None, max_items: int = 10):
         """
@@ -11,7 +11,8 @@ supporting both character count and token count limits.
 import re
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
-from refinire.agents.context_provider import ContextProvider
+from refinire.agents.context_provider import ContextProvider, get_context_in_thread
+from refinire.core.tokenizer import Tokenizer, get_tokenizer
 
 
 class CutContextProvider(ContextProvider):
@@ -36,7 +37,8 @@ class CutContextProvider(ContextProvider):
         max_chars: Optional[int] = None,
         max_tokens: Optional[int] = None,
         cut_strategy: str = "end",  # "start", "end", "middle"
-        preserve_sections: bool = True
+        preserve_sections: bool = True,
+        tokenizer: Union[str, Tokenizer] = "whitespace"
     ):
         """
         Initialize the cut context provider
@@ -48,12 +50,17 @@ class CutContextProvider(ContextProvider):
             max_tokens: Maximum token count (None for no limit) / 最大トークン数（Noneで制限なし）
             cut_strategy: How to cut the context ("start", "end", "middle") / カット戦略（"start", "end", "middle"）
             preserve_sections: Whether to preserve complete sections when cutting / カット時に完全なセクションを保持するか
+            tokenizer: Tokenizer instance or name ("whitespace", "auto", "tiktoken", "heuristic") / Tokenizerインスタンスまたは名前
         """
         self.provider = provider
         self.max_chars = max_chars
         self.max_tokens = max_tokens
         self.cut_strategy = cut_strategy
         self.preserve_sections = preserve_sections
+        self.tokenizer = get_tokenizer(tokenizer)
+        # Chaining requirements follow the wrapped provider
+        # 連鎖の要否はラップされたプロバイダーに従う
+        self.uses_previous_context = getattr(provider, 'uses_previous_context', True)
         
         if cut_strategy not in ["start", "end", "middle"]:
             raise ValueError("cut_strategy must be 'start', 'end', or 'middle'")
@@ -97,6 +104,11 @@ class CutContextProvider(ContextProvider):
                     "type": "bool",
                     "default": True,
                     "description": "Whether to preserve complete sections when cutting"
+                },
+                "tokenizer": {
+                    "type": "str",
+                    "default": "whitespace",
+                    "description": "Token counter for max_tokens ('whitespace', 'auto', 'tiktoken', 'heuristic')"
                 }
             },
             "example": "cut_context:\n  provider:\n    type: conversation_history\n    max_items: 10\n  max_chars: 4000\n  cut_strategy: end"
@@ -138,24 +150,52 @@ class CutContextProvider(ContextProvider):
             max_chars=config.get('max_chars'),
             max_tokens=config.get('max_tokens'),
             cut_strategy=config.get('cut_strategy', 'end'),
-            preserve_sections=config.get('preserve_sections', True)
+            preserve_sections=config.get('preserve_sections', True),
+            tokenizer=config.get('tokenizer', 'whitespace')
         )
     
     def _count_tokens(self, text: str) -> int:
         """
-        Estimate token count for text (simple implementation)
-        テキストのトークン数を推定（簡易実装）
+        Count tokens in text with the configured tokenizer
+        設定されたトークナイザーでテキストのトークン数を数える
         
         Args:
             text: Text to count tokens for / トークン数を数えるテキスト
             
         Returns:
-            int: Estimated token count / 推定トークン数
+            int: Token count / トークン数
+        """
+        return self.tokenizer.count(text)
+    
+    def _pack_sections(self, sections: List[str], limit: int, measure, from_end: bool = False) -> str:
+        """
+        Concatenate whole sections from one end while they fit within limit
+        制限内に収まる間、一方の端から完全なセクションを連結
+        
+        Runs in linear time by tracking the running size instead of
+        measuring the growing result string.
+        増えていく結果文字列を測る代わりに累積サイズを追跡するため線形時間で動作します。
+        
+        Args:
+            sections: Sections in text order / テキスト順のセクション
+            limit: Size limit / サイズ制限
+            measure: Function returning the size of a section / セクションのサイズを返す関数
+            from_end: Pack from the last section backwards / 最後のセクションから逆順に詰める
+            
+        Returns:
+            str: Packed sections (empty if the first does not fit) / 詰めたセクション（最初が収まらない場合は空）
         """
-        # Simple token estimation: split by whitespace and punctuation
-        # 簡易トークン推定: 空白と句読点で分割
-        tokens = re.findall(r'\S+', text)
-        return len(tokens)
+        kept = []
+        total = 0
+        for section in (reversed(sections) if from_end else sections):
+            size = measure(section)
+            if total + size > limit:
+                break
+            kept.append(section)
+            total += size
+        if from_end:
+            kept.reverse()
+        return "".join(kept)
     
     def _cut_text(self, text: str, max_length: int, strategy: str) -> str:
         """
@@ -180,12 +220,7 @@ class CutContextProvider(ContextProvider):
                 # Try to cut at section boundaries
                 # セクション境界でカットを試行
                 sections = self._split_into_sections(text)
-                result = ""
-                for section in reversed(sections):
-                    if len(result + section) <= max_length:
-                        result = section + result
-                    else:
-                        break
+                result = self._pack_sections(sections, max_length, len, from_end=True)
                 return result if result else text[-max_length:]
             else:
                 return text[-max_length:]
@@ -197,12 +232,7 @@ class CutContextProvider(ContextProvider):
                 # Try to cut at section boundaries
                 # セクション境界でカットを試行
                 sections = self._split_into_sections(text)
-                result = ""
-                for section in sections:
-                    if len(result + section) <= max_length:
-                        result += section
-                    else:
-                        break
+                result = self._pack_sections(sections, max_length, len)
                 return result if result else text[:max_length]
             else:
                 return text[:max_length]
@@ -235,6 +265,48 @@ class CutContextProvider(ContextProvider):
         
         return text[:max_length]
     
+    def _cut_tokens(self, text: str, max_tokens: int, strategy: str) -> str:
+        """
+        Cut text to a token budget using the given strategy
+        指定された戦略を使用してテキストをトークン予算までカット
+        
+        Sections are packed by their (cached) token counts; when no whole
+        section fits, the text is truncated to the exact token limit.
+        セクションは（キャッシュされた）トークン数で詰められ、完全なセクションが
+        収まらない場合はテキストを正確なトークン上限まで切り詰めます。
+        
+        Args:
+            text: Text to cut / カットするテキスト
+            max_tokens: Maximum token count / 最大トークン数
+            strategy: Cutting strategy / カット戦略
+            
+        Returns:
+            str: Cut text / カットされたテキスト
+        """
+        count = self.tokenizer.count
+        if count(text) <= max_tokens:
+            return text
+        
+        if strategy == "middle":
+            separator = "\n...\n"
+            budget = max_tokens - count(separator)
+            if self.preserve_sections:
+                sections = self._split_into_sections(text)
+                if len(sections) > 2 and count(sections[0]) + count(sections[-1]) <= budget:
+                    return sections[0] + separator + sections[-1]
+                return self._cut_tokens(text, max_tokens, "end")
+            half = max(budget, 0) // 2
+            return (self.tokenizer.truncate(text, half, keep="start") + separator
+                    + self.tokenizer.truncate(text, half, keep="end"))
+        
+        from_end = strategy == "start"
+        if self.preserve_sections:
+            sections = self._split_into_sections(text)
+            result = self._pack_sections(sections, max_tokens, count, from_end=from_end)
+            if result:
+                return result
+        return self.tokenizer.truncate(text, max_tokens, keep="end" if from_end else "start")
+    
     def _split_into_sections(self, text: str) -> List[str]:
         """
         Split text into logical sections for better cutting
@@ -248,30 +320,32 @@ class CutContextProvider(ContextProvider):
         """
         # Split by double newlines, headers, or file markers
         # 二重改行、ヘッダー、またはファイルマーカーで分割
-        sections = re.split(r'\n\s*\n|^#\s+|^File:\s+', text, flags=re.MULTILINE)
-        # Filter out empty sections and add back the markers
-        # 空のセクションをフィルタリングし、マーカーを戻す
+        delimiter = re.compile(r'\n\s*\n|^#\s+|^File:\s+', flags=re.MULTILINE)
+        # First header or file marker in the text, added back to sections
+        # that start a new line after it
+        # テキスト中の最初のヘッダーまたはファイルマーカー。その後の行頭から
+        # 始まるセクションに戻される
+        first_marker = re.search(r'(^|\n)(#\s+|File:\s+)', text, re.MULTILINE)
+        
         result = []
-        for i, section in enumerate(sections):
+        position = 0
+        index = 0
+        for match in list(delimiter.finditer(text)) + [None]:
+            end = match.start() if match is not None else len(text)
+            section = text[position:end]
             if section.strip():
                 # Add back the marker if it was a header or file marker
                 # ヘッダーまたはファイルマーカーの場合はマーカーを戻す
-                if i > 0 and text.find(section) > 0:
-                    prev_char = text[text.find(section) - 1]
-                    if prev_char == '\n':
-                        # Check if there's a marker before this section
-                        # このセクションの前にマーカーがあるかチェック
-                        start_pos = text.find(section)
-                        if start_pos > 0:
-                            # Look for the marker
-                            # マーカーを探す
-                            marker_match = re.search(r'(^|\n)(#\s+|File:\s+)', text[:start_pos], re.MULTILINE)
-                            if marker_match:
-                                section = marker_match.group(2) + section
+                if (index > 0 and position > 0 and text[position - 1] == '\n'
+                        and first_marker is not None and first_marker.end() <= position):
+                    section = first_marker.group(2) + section
                 result.append(section.strip())
+            if match is not None:
+                position = match.end()
+                index += 1
         return result
     
-    def get_context(self, query: str, previous_context: Optional[str] = None, **kwargs) -> str:
+    def get_context(self, query: str, previous_context: Optional[str] = None, **kwargs: Any) -> str:
         """
         Get context from wrapped provider and cut if necessary
         ラップされたプロバイダーからコンテキストを取得し、必要に応じてカット
@@ -287,7 +361,41 @@ class CutContextProvider(ContextProvider):
         # Get context from wrapped provider
         # ラップされたプロバイダーからコンテキストを取得
         context = self.provider.get_context(query, previous_context, **kwargs)
+        return self._apply_limits(context)
+    
+    async def aget_context(self, query: str, previous_context: Optional[str] = None, **kwargs: Any) -> str:
+        """
+        Get context from wrapped provider asynchronously and cut if necessary
+        ラップされたプロバイダーから非同期でコンテキストを取得し、必要に応じてカット
         
+        Args:
+            query: User query / ユーザークエリ
+            previous_context: Previous context from other providers / 他のプロバイダーからの前のコンテキスト
+            **kwargs: Additional arguments / 追加の引数
+            
+        Returns:
+            str: Cut context / カットされたコンテキスト
+        """
+        # Duck-typed providers without aget_context run in a worker thread
+        # aget_contextを持たないダックタイピングのプロバイダーはワーカースレッドで実行
+        aget_context = getattr(self.provider, "aget_context", None)
+        if aget_context is not None:
+            context = await aget_context(query, previous_context, **kwargs)
+        else:
+            context = await get_context_in_thread(self.provider, query, previous_context, **kwargs)
+        return self._apply_limits(context)
+    
+    def _apply_limits(self, context: str) -> str:
+        """
+        Cut context to the configured character or token limit
+        設定された文字数またはトークン数の制限までコンテキストをカット
+        
+        Args:
+            context: Context from wrapped provider / ラップされたプロバイダーからのコンテキスト
+            
+        Returns:
+            str: Cut context / カットされたコンテキスト
+        """
         if not context:
             return ""
         
@@ -296,13 +404,7 @@ class CutContextProvider(ContextProvider):
         if self.max_tokens is not None:
             # Token-based cutting
             # トークンベースのカット
-            current_tokens = self._count_tokens(context)
-            if current_tokens > self.max_tokens:
-                # Estimate characters per token for rough conversion
-                # トークンあたりの文字数を推定して大まかな変換
-                chars_per_token = len(context) / current_tokens
-                max_chars = int(self.max_tokens * chars_per_token)
-                context = self._cut_text(context, max_chars, self.cut_strategy)
+            context = self._cut_tokens(context, self.max_tokens, self.cut_strategy)
         
         elif self.max_chars is not None:
             # Character-based cutting
@@ -26,6 +26,7 @@ class FixedFileProvider(ContextProvider):
     """
     
     provider_name: ClassVar[str] = "fixed_file"
+    uses_previous_context: bool = False
     
     def __init__(self, file_path: str, encoding: str = "utf-8", check_updates: bool = True):
         """
@@ -0,0 +1,188 @@
+"""
+Gitignore Matcher
+Gitignoreマッチャー
+
+This module compiles .gitignore patterns into combined regular expressions.
+Patterns follow git semantics: anchoring, directory-only patterns, ``**``
+wildcards, character classes and negation with ``!`` (last match wins).
+
+このモジュールは.gitignoreパターンを結合済みの正規表現にコンパイルします。
+パターンはgitの仕様に従います: アンカー、ディレクトリ限定パターン、``**``
+ワイルドカード、文字クラス、``!``による否定（最後に一致したものが優先）。
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Pattern, Tuple
+
+
+def _translate_glob(glob: str) -> str:
+    """
+    Translate a gitignore glob (without anchoring) into a regex fragment
+    gitignoreのグロブ（アンカーなし）を正規表現の断片に変換
+    """
+    result = []
+    i = 0
+    length = len(glob)
+    while i < length:
+        char = glob[i]
+        if char == '*':
+            if glob[i:i + 2] == '**':
+                at_start = i == 0 or glob[i - 1] == '/'
+                at_end = i + 2 == length or glob[i + 2] == '/'
+                if at_start and at_end:
+                    if i + 2 == length:
+                        # Trailing "/**" matches everything inside
+                        # 末尾の"/**"は配下のすべてに一致
+                        result.append('.*')
+                        i += 2
+                    else:
+                        # Leading or middle "**/" matches zero or more directories
+                        # 先頭または中間の"**/"は0個以上のディレクトリに一致
+                        result.append('(?:.*/)?')
+                        i += 3
+                    continue
+            result.append('[^/]*')
+            i += 1
+        elif char == '?':
+            result.append('[^/]')
+            i += 1
+        elif char == '[':
+            j = i + 1
+            if glob[j:j + 1] in ('!', '^'):
+                j += 1
+            if glob[j:j + 1] == ']':
+                j += 1
+            end = glob.find(']', j)
+            if end == -1:
+                result.append(re.escape(char))
+                i += 1
+                continue
+            body = glob[i + 1:end]
+            if body[:1] in ('!', '^'):
+                body = '^' + body[1:]
+            result.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif char == '\\' and i + 1 < length:
+            result.append(re.escape(glob[i + 1]))
+            i += 2
+        else:
+            result.append(re.escape(char))
+            i += 1
+    return ''.join(result)
+
+
+@dataclass
+class _PatternGroup:
+    """Consecutive patterns sharing the same polarity / 同じ極性を持つ連続したパターン"""
+    negated: bool
+    dir_regex: Optional[Pattern[str]]
+    file_regex: Optional[Pattern[str]]
+
+
+class GitIgnoreSpec:
+    """
+    Compiled patterns from a single .gitignore file
+    1つの.gitignoreファイルからコンパイルされたパターン
+
+    Paths passed to match are relative to the directory containing the
+    .gitignore file and use "/" as separator.
+    matchに渡すパスは.gitignoreファイルを含むディレクトリからの相対パスで、
+    区切り文字は"/"です。
+    """
+
+    def __init__(self, lines: Iterable[str]):
+        """
+        Compile gitignore lines
+        gitignoreの行をコンパイル
+
+        Args:
+            lines: Raw lines of a .gitignore file / .gitignoreファイルの生の行
+        """
+        self.patterns: List[str] = []
+        parsed: List[Tuple[bool, bool, str]] = []
+        for line in lines:
+            rule = self._parse_line(line)
+            if rule is not None:
+                parsed.append(rule)
+                self.patterns.append(line.strip())
+
+        # Group consecutive rules with the same polarity so that each group
+        # is a single alternation while last-match-wins is preserved
+        # 同じ極性の連続したルールをまとめ、各グループを1つの選択に
+        # しつつ「最後の一致が優先」を維持する
+        self._groups: List[_PatternGroup] = []
+        start = 0
+        while start < len(parsed):
+            negated = parsed[start][0]
+            end = start
+            while end < len(parsed) and parsed[end][0] == negated:
+                end += 1
+            rules = parsed[start:end]
+            dir_parts = [regex for _, _, regex in rules]
+            file_parts = [regex for _, dir_only, regex in rules if not dir_only]
+            self._groups.append(_PatternGroup(
+                negated=negated,
+                dir_regex=re.compile('(?:' + '|'.join(dir_parts) + ')\\Z') if dir_parts else None,
+                file_regex=re.compile('(?:' + '|'.join(file_parts) + ')\\Z') if file_parts else None,
+            ))
+            start = end
+
+    @staticmethod
+    def _parse_line(line: str) -> Optional[Tuple[bool, bool, str]]:
+        """
+        Parse one line into (negated, dir_only, regex)
+        1行を(negated, dir_only, regex)に解析
+        """
+        line = line.rstrip('\n').rstrip('\r')
+        # Trailing spaces are ignored unless escaped
+        # エスケープされていない末尾の空白は無視
+        stripped = line.rstrip(' ')
+        if stripped.endswith('\\') and len(stripped) < len(line):
+            stripped += ' '
+        line = stripped
+        if not line or line.startswith('#'):
+            return None
+
+        negated = False
+        if line.startswith('!'):
+            negated = True
+            line = line[1:]
+        elif line.startswith('\\#') or line.startswith('\\!'):
+            line = line[1:]
+
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            return None
+
+        # A slash at the start or middle anchors the pattern to this directory
+        # 先頭または中間のスラッシュはパターンをこのディレクトリに固定
+        anchored = '/' in line
+        line = line.lstrip('/')
+        regex = _translate_glob(line)
+        if not anchored:
+            regex = '(?:.*/)?' + regex
+        return negated, dir_only, regex
+
+    def match(self, rel_path: str, is_dir: bool = False) -> Optional[bool]:
+        """
+        Match a path against the compiled patterns
+        コンパイル済みパターンとパスを照合
+
+        Args:
+            rel_path: Path relative to the .gitignore directory / .gitignoreのディレクトリからの相対パス
+            is_dir: Whether the path is a directory / パスがディレクトリかどうか
+
+        Returns:
+            Optional[bool]: True if ignored, False if re-included by a negation, None if no pattern matched
+            Optional[bool]: 無視される場合True、否定で再包含される場合False、一致なしの場合None
+        """
+        for group in reversed(self._groups):
+            regex = group.dir_regex if is_dir else group.file_regex
+            if regex is not None and regex.match(rel_path):
+                return not group.negated
+        return None
+
+    def __bool__(self) -> bool:
+        return bool(self._groups)
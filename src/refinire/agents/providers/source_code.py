@@ -8,10 +8,13 @@ RefinireAgentのソースコードコンテキストを提供します。
 
 import os
 import re
-import fnmatch
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any, ClassVar, Optional, Set
+from typing import List, Dict, Any, ClassVar, Optional, Set, Tuple
 from refinire.agents.context_provider import ContextProvider
+from refinire.agents.providers.code_index import CodeIndex, CodeSearchHit
+from refinire.agents.providers.gitignore import GitIgnoreSpec
 
 
 class SourceCodeProvider(ContextProvider):
@@ -21,15 +24,17 @@ class SourceCodeProvider(ContextProvider):
     
     This provider analyzes the codebase structure, identifies relevant files
     based on user input and conversation history, and provides them as context.
-    It respects .gitignore files and can use internal RefinireAgent for
-    intelligent file selection.
+    It respects .gitignore files and ranks files for natural-language queries
+    with a local BM25 code index, without any LLM call.
     
     このプロバイダーはコードベース構造を分析し、ユーザー入力と会話履歴に基づいて
     関連ファイルを特定し、コンテキストとして提供します。.gitignoreファイルを
-    尊重し、インテリジェントなファイル選択のために内部RefinireAgentを使用できます。
+    尊重し、LLMを呼び出さずにローカルのBM25コードインデックスで自然言語クエリに
+    対するファイルをランク付けします。
     """
     
     provider_name: ClassVar[str] = "source_code"
+    uses_previous_context: bool = False
     
     def __init__(
         self, 
@@ -38,7 +43,12 @@ class SourceCodeProvider(ContextProvider):
         max_file_size: int = 10000,
         file_extensions: Optional[List[str]] = None,
         include_patterns: Optional[List[str]] = None,
-        exclude_patterns: Optional[List[str]] = None
+        exclude_patterns: Optional[List[str]] = None,
+        use_index: bool = False,
+        index_top_k: int = 5,
+        index_chunk_lines: Optional[int] = None,
+        index_path: Optional[str | Path] = None,
+        content_cache_bytes: int = 8 * 1024 * 1024
     ):
         """
         Initialize the source code provider
@@ -51,6 +61,11 @@ class SourceCodeProvider(ContextProvider):
             file_extensions: List of file extensions to include (None for all) / 含めるファイル拡張子のリスト（Noneで全て）
             include_patterns: List of patterns to include (None for all) / 含めるファイルパターンのリスト（Noneで全て）
             exclude_patterns: List of patterns to exclude (None for none) / 除外するファイルパターンのリスト（Noneでなし）
+            use_index: Rank files with the BM25 code index (opt-in) / BM25コードインデックスでファイルをランク付けするか（オプトイン）
+            index_top_k: Maximum number of index hits added to context / コンテキストに追加するインデックスヒットの最大数
+            index_chunk_lines: Lines per indexed chunk (None to index whole files) / インデックスのチャンク行数（Noneでファイル全体）
+            index_path: JSON file to persist the index (None for in-memory only) / インデックス永続化用JSONファイル（Noneでメモリのみ）
+            content_cache_bytes: Memory budget for cached file contents (0 to disable) / ファイル内容キャッシュのメモリ上限（0で無効）
         """
         self.base_path = Path(base_path).resolve()
         self.max_files = max_files
@@ -58,7 +73,7 @@ class SourceCodeProvider(ContextProvider):
         self.file_extensions = file_extensions or ['.py', '.js', '.ts', '.java', '.cpp', '.c', '.h', '.hpp']
         self.include_patterns = include_patterns
         self.exclude_patterns = exclude_patterns
-        self._gitignore_patterns = None
+        self._gitignore_patterns: Optional[List[str]] = None
         
         # Internal agent for intelligent file selection
         # インテリジェントなファイル選択用の内部エージェント
@@ -68,6 +83,33 @@ class SourceCodeProvider(ContextProvider):
         # ファイルツリーとgitignoreパターンのキャッシュ
         self._file_tree: Optional[List[str]] = None
         self._last_scan_time: float = 0
+        
+        # Per-directory listing cache keyed by directory mtime, and the
+        # (mtime, size) signature of every file in the current tree
+        # ディレクトリのmtimeをキーとしたディレクトリ一覧キャッシュと、
+        # 現在のツリー内の各ファイルの(mtime, size)シグネチャ
+        self._dir_cache: Dict[str, Tuple[int, List[str], Dict[str, Tuple[float, int]]]] = {}
+        self._file_signatures: Dict[str, Tuple[float, int]] = {}
+        
+        # Compiled .gitignore specs per directory with the file mtime they were loaded at
+        # ディレクトリごとのコンパイル済み.gitignoreと読み込み時のファイルmtime
+        self._ignore_specs: Dict[str, Tuple[Optional[int], Optional[GitIgnoreSpec]]] = {}
+        self._scan_metrics: Dict[str, Any] = self._empty_scan_metrics()
+        
+        # LRU cache of rendered file contents keyed by path and signature
+        # パスとシグネチャをキーとした読み込み済みファイル内容のLRUキャッシュ
+        self.content_cache_bytes = content_cache_bytes
+        self._content_cache: "OrderedDict[str, Tuple[Tuple[float, int], str]]" = OrderedDict()
+        self._content_cache_size = 0
+        
+        # BM25 code index, synced lazily with the file tree
+        # ファイルツリーと遅延同期されるBM25コードインデックス
+        self.use_index = use_index
+        self.index_top_k = index_top_k
+        self.index_chunk_lines = index_chunk_lines
+        self.index_path = index_path
+        self._code_index: Optional[CodeIndex] = None
+        self._indexed_tree: Optional[List[str]] = None
     
     @classmethod
     def get_config_schema(cls) -> Dict[str, Any]:
@@ -111,6 +153,31 @@ class SourceCodeProvider(ContextProvider):
                     "type": "list",
                     "default": None,
                     "description": "List of patterns to exclude"
+                },
+                "use_index": {
+                    "type": "bool",
+                    "default": False,
+                    "description": "Rank files for natural-language queries with a BM25 code index"
+                },
+                "index_top_k": {
+                    "type": "int",
+                    "default": 5,
+                    "description": "Maximum number of index hits added to context"
+                },
+                "index_chunk_lines": {
+                    "type": "int",
+                    "default": None,
+                    "description": "Lines per indexed chunk (None to index whole files)"
+                },
+                "index_path": {
+                    "type": "str",
+                    "default": None,
+                    "description": "JSON file to persist the code index"
+                },
+                "content_cache_bytes": {
+                    "type": "int",
+                    "default": 8 * 1024 * 1024,
+                    "description": "Memory budget in bytes for cached file contents (0 to disable)"
                 }
             },
             "example": "source_code:\n  base_path: src\n  max_files: 5\n  file_extensions: ['.py', '.js']"
@@ -154,94 +221,349 @@ class SourceCodeProvider(ContextProvider):
         
         return patterns
     
-    def _is_ignored(self, file_path: Path) -> bool:
+    def _is_ignored(self, file_path: Path, is_dir: Optional[bool] = None) -> bool:
         """
         Check if a file should be ignored based on gitignore patterns
         gitignoreパターンに基づいてファイルが無視されるべきかチェック
+        
+        The root and nested .gitignore files are honored, and a path inside an
+        ignored directory is ignored as well.
+        ルートとネストされた.gitignoreファイルを考慮し、無視されたディレクトリ内の
+        パスも無視されます。
+        
+        Args:
+            file_path: Path to check / チェックするパス
+            is_dir: Whether the path is a directory (None to check the filesystem) / ディレクトリかどうか（Noneでファイルシステムを確認）
         """
-        if not self._gitignore_patterns:
+        rel_path = self._relative_posix(file_path)
+        if rel_path is None:
+            return True  # Outside base path
+        if not rel_path:
             return False
+        if is_dir is None:
+            is_dir = (self.base_path / rel_path).is_dir()
+        
+        # Any ignored ancestor directory excludes the whole subtree
+        # 無視された祖先ディレクトリは配下全体を除外
+        parts = rel_path.split('/')
+        for depth in range(1, len(parts)):
+            if self._match_ignore('/'.join(parts[:depth]), is_dir=True):
+                return True
+        return self._match_ignore(rel_path, is_dir)
+    
+    def _relative_posix(self, file_path: Path) -> Optional[str]:
+        """
+        Convert a path to a "/"-separated path relative to base path
+        パスをベースパスからの"/"区切りの相対パスに変換
+        
+        Returns:
+            Optional[str]: Relative path, or None if outside base path / 相対パス（ベースパス外の場合はNone）
+        """
+        path = Path(file_path)
+        if not path.is_absolute():
+            path = path.resolve()
         try:
-            # Convert file_path to absolute path before relative_to
-            # file_pathを絶対パスに変換してからrelative_toを実行
-            abs_file_path = Path(file_path).resolve()
-            rel_path = abs_file_path.relative_to(self.base_path)
+            rel_path = path.relative_to(self.base_path)
         except ValueError:
-            return True  # Outside base path
-        rel_path_str = str(rel_path)
+            try:
+                rel_path = path.resolve().relative_to(self.base_path)
+            except ValueError:
+                return None
+        rel_str = rel_path.as_posix()
+        return "" if rel_str == "." else rel_str
+    
+    def _match_ignore(self, rel_path: str, is_dir: bool) -> bool:
+        """
+        Match a path against the .gitignore files of its ancestor directories
+        祖先ディレクトリの.gitignoreファイルとパスを照合
         
-        for pattern in self._gitignore_patterns:
-            # 完全一致
-            if rel_path_str == pattern:
-                return True
-            # ディレクトリ除外（/で終わるパターン）
-            if pattern.endswith('/') and rel_path_str.startswith(pattern.rstrip('/')):
-                return True
-            # ディレクトリ除外（/で終わらないパターン）
-            if not pattern.endswith('/') and rel_path_str.startswith(pattern + '/'):
-                return True
-            # サフィックス一致
-            if pattern.startswith('*.') and rel_path_str.endswith(pattern.lstrip('*')):
-                return True
-            # ワイルドカード一致
-            if '*' in pattern or '?' in pattern:
-                if fnmatch.fnmatch(rel_path_str, pattern):
-                    return True
+        Deeper .gitignore files take precedence, and within a file the last
+        matching pattern wins, so negations can re-include paths. Ancestor
+        directories are not checked here.
+        より深い.gitignoreが優先され、ファイル内では最後に一致したパターンが
+        優先されるため、否定でパスを再包含できます。祖先ディレクトリはここでは
+        チェックしません。
+        
+        Args:
+            rel_path: "/"-separated path relative to base path / ベースパスからの"/"区切り相対パス
+            is_dir: Whether the path is a directory / ディレクトリかどうか
+        """
+        parts = rel_path.split('/')
+        for depth in range(len(parts) - 1, -1, -1):
+            spec = self._ignore_spec('/'.join(parts[:depth]))
+            if spec:
+                result = spec.match('/'.join(parts[depth:]), is_dir)
+                if result is not None:
+                    return result
         return False
     
-    def _scan_file_tree(self) -> List[str]:
+    def _ignore_spec(self, rel_dir: str) -> Optional[GitIgnoreSpec]:
+        """
+        Get the compiled .gitignore of a directory, loading it on first use
+        ディレクトリのコンパイル済み.gitignoreを取得（初回使用時に読み込み）
+        
+        Args:
+            rel_dir: Directory relative to base path ("" for the root) / ベースパスからの相対ディレクトリ（ルートは""）
+        """
+        cached = self._ignore_specs.get(rel_dir)
+        if cached is not None:
+            return cached[1]
+        gitignore_path = (self.base_path / rel_dir / ".gitignore") if rel_dir else (self.base_path / ".gitignore")
+        mtime = self._stat_mtime(gitignore_path)
+        spec = None
+        if mtime is not None:
+            if rel_dir:
+                spec = GitIgnoreSpec(self._read_gitignore(gitignore_path))
+            else:
+                if self._gitignore_patterns is None:
+                    self._gitignore_patterns = self._load_gitignore_patterns()
+                spec = GitIgnoreSpec(self._gitignore_patterns)
+        self._ignore_specs[rel_dir] = (mtime, spec)
+        return spec
+    
+    def _read_gitignore(self, gitignore_path: Path) -> List[str]:
+        """Read raw lines of a .gitignore file / .gitignoreファイルの生の行を読み込み"""
+        try:
+            with open(gitignore_path, 'r', encoding='utf-8') as f:
+                return f.read().splitlines()
+        except Exception as e:
+            print(f"Warning: Could not read {gitignore_path}: {e}")
+            return []
+    
+    def _refresh_ignore_specs(self) -> None:
+        """
+        Reload .gitignore files that changed since they were compiled
+        コンパイル後に変更された.gitignoreファイルを再読み込み
+        
+        Cached directory listings below a changed .gitignore were filtered
+        with the old rules and are dropped.
+        変更された.gitignore配下のキャッシュ済みディレクトリ一覧は古いルールで
+        絞り込まれているため破棄します。
+        """
+        for rel_dir, (mtime, _) in list(self._ignore_specs.items()):
+            gitignore_path = (self.base_path / rel_dir / ".gitignore") if rel_dir else (self.base_path / ".gitignore")
+            if self._stat_mtime(gitignore_path) == mtime:
+                continue
+            del self._ignore_specs[rel_dir]
+            if not rel_dir:
+                self._gitignore_patterns = None
+            self._invalidate_dir_cache(rel_dir)
+    
+    def _invalidate_dir_cache(self, rel_dir: str) -> None:
+        """Drop cached listings of a directory and its descendants / ディレクトリとその配下のキャッシュ済み一覧を破棄"""
+        if not rel_dir:
+            self._dir_cache.clear()
+            return
+        prefix = rel_dir + '/'
+        for cached_dir in [d for d in self._dir_cache if d == rel_dir or d.startswith(prefix)]:
+            del self._dir_cache[cached_dir]
+    
+    def _scan_file_tree(self, restat: bool = False) -> List[str]:
         """
         Scan the file tree and return list of relevant files
         ファイルツリーをスキャンして関連ファイルのリストを返す
         
+        The scan is incremental: every directory is stat-ed, but only
+        directories whose mtime changed since the previous scan are listed
+        again. Editing a file in place does not change its directory mtime, so
+        files of unchanged directories keep their cached signatures; they are
+        re-stat-ed when read or ranked by the index, or on a full re-stat.
+        Cached files over max_file_size are always re-stat-ed so that a file
+        shrinking below the limit is picked up.
+        スキャンは差分方式です。すべてのディレクトリをstatしますが、前回のスキャン以降に
+        mtimeが変化したディレクトリのみ再一覧します。ファイルのその場での編集は
+        ディレクトリのmtimeを変えないため、変化のないディレクトリのファイルはキャッシュ済みの
+        シグネチャを使い、読み込み時・インデックスでのランク付け時・完全な再stat時に再statします。
+        max_file_sizeを超えるキャッシュ済みファイルは、上限未満に縮んだ場合に検出できるよう
+        常に再statします。
+        
+        Args:
+            restat: Re-stat every file of unchanged directories / 変化のないディレクトリの全ファイルを再statするか
+        
         Returns:
             List[str]: List of relevant file paths / 関連ファイルパスのリスト
         """
+        start_time = time.perf_counter()
         if not self.base_path.exists():
+            self._file_signatures = {}
             return []
         
-        # Load gitignore patterns if not cached
-        # キャッシュされていない場合はgitignoreパターンを読み込み
-        if self._gitignore_patterns is None:
-            self._gitignore_patterns = self._load_gitignore_patterns()
+        # Reload changed .gitignore files and drop listings filtered with old rules
+        # 変更された.gitignoreを再読み込みし、古いルールで絞り込んだ一覧を破棄
+        self._refresh_ignore_specs()
+        
+        signatures: Dict[str, Tuple[float, int]] = {}
+        dir_cache: Dict[str, Tuple[int, List[str], Dict[str, Tuple[float, int]]]] = {}
+        dirs_listed = 0
+        pending = [""]
         
-        relevant_files = []
+        while pending:
+            rel_dir = pending.pop()
+            abs_dir = self.base_path / rel_dir if rel_dir else self.base_path
+            dir_mtime = self._stat_mtime(abs_dir)
+            if dir_mtime is None:
+                continue
+            
+            cached = self._dir_cache.get(rel_dir)
+            if cached is not None and cached[0] == dir_mtime:
+                subdirs, files = cached[1], self._restat_files(cached[2], restat)
+            else:
+                # A .gitignore added to or removed from this directory changes
+                # the rules for the whole subtree
+                # このディレクトリでの.gitignoreの追加・削除は配下全体のルールを変える
+                known = self._ignore_specs.get(rel_dir)
+                gitignore_path = (abs_dir / ".gitignore")
+                if known is not None and known[0] != self._stat_mtime(gitignore_path):
+                    del self._ignore_specs[rel_dir]
+                    self._invalidate_dir_cache(rel_dir)
+                subdirs, files = self._list_directory(abs_dir, rel_dir)
+                dirs_listed += 1
+            
+            dir_cache[rel_dir] = (dir_mtime, subdirs, files)
+            signatures.update(
+                (file_path, signature) for file_path, signature in files.items()
+                if signature[1] <= self.max_file_size
+            )
+            pending.extend(reversed(subdirs))
+        
+        self._dir_cache = dir_cache
+        
+        # Keep the previous list object when nothing changed, so that derived
+        # caches such as the code index can skip work
+        # 変更がない場合は以前のリストオブジェクトを維持し、コードインデックスなどの
+        # 派生キャッシュが処理を省略できるようにする
+        if self._file_tree is not None and signatures == self._file_signatures:
+            relevant_files = self._file_tree
+        else:
+            relevant_files = list(signatures)
+        self._file_signatures = signatures
+        
+        elapsed = time.perf_counter() - start_time
+        self._last_scan_time = time.time()
+        self._scan_metrics["scan_count"] += 1
+        self._scan_metrics["total_scan_seconds"] += elapsed
+        self._scan_metrics["last_scan_seconds"] = elapsed
+        self._scan_metrics["directories_visited"] = len(dir_cache)
+        self._scan_metrics["directories_listed"] = dirs_listed
+        self._scan_metrics["files"] = len(relevant_files)
+        return relevant_files
+    
+    def _list_directory(self, abs_dir: Path, rel_dir: str) -> Tuple[List[str], Dict[str, Tuple[float, int]]]:
+        """
+        List one directory, returning kept subdirectories and file signatures
+        1つのディレクトリを一覧し、対象のサブディレクトリとファイルシグネチャを返す
         
-        for root, dirs, files in os.walk(self.base_path):
-            # Remove ignored directories
-            # 無視されるディレクトリを削除
-            dirs[:] = [d for d in dirs if not self._is_ignored(Path(root) / d)]
+        Files over max_file_size are kept here and filtered by the scan, so
+        that a file shrinking below the limit is picked up on re-stat.
+        max_file_sizeを超えるファイルもここでは保持し、スキャン時に除外します。
+        これにより、上限未満に縮んだファイルも再statで検出されます。
+        
+        Args:
+            abs_dir: Absolute directory path / ディレクトリの絶対パス
+            rel_dir: Directory path relative to base path / ベースパスからの相対ディレクトリパス
             
-            for file in files:
-                file_path = Path(root) / file
-                
-                # Check if file should be ignored
-                # ファイルが無視されるべきかチェック
-                if self._is_ignored(file_path):
-                    continue
-                
-                # Check file extension
-                # ファイル拡張子をチェック
-                if file_path.suffix not in self.file_extensions:
-                    continue
-                
-                # Check file size
-                # ファイルサイズをチェック
-                try:
-                    if file_path.stat().st_size > self.max_file_size:
-                        continue
-                except OSError:
+        Returns:
+            Tuple[List[str], Dict[str, Tuple[float, int]]]: Relative subdirectory paths and file signatures
+            Tuple[List[str], Dict[str, Tuple[float, int]]]: 相対サブディレクトリパスとファイルシグネチャ
+        """
+        subdirs: List[str] = []
+        files: Dict[str, Tuple[float, int]] = {}
+        try:
+            entries = sorted(os.scandir(abs_dir), key=lambda entry: entry.name)
+        except OSError:
+            return subdirs, files
+        
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    # Remove ignored directories (their ancestors are known not to be ignored)
+                    # 無視されるディレクトリを削除（祖先は無視されていないことが既知）
+                    if entry.name != '.git' and not self._match_ignore(rel_path, is_dir=True):
+                        subdirs.append(rel_path)
                     continue
-                
-                # Convert to relative path
-                # 相対パスに変換
-                try:
-                    rel_path = file_path.relative_to(self.base_path)
-                    relevant_files.append(str(rel_path))
-                except ValueError:
+                if not entry.is_file():
                     continue
+            except OSError:
+                continue
+            
+            # Check file extension before touching the ignore rules
+            # 無視ルールの前にファイル拡張子をチェック
+            if os.path.splitext(entry.name)[1] not in self.file_extensions:
+                continue
+            if self._match_ignore(rel_path, is_dir=False):
+                continue
+            
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files[rel_path] = (stat.st_mtime, stat.st_size)
+        return subdirs, files
+    
+    def _restat_files(self, files: Dict[str, Tuple[float, int]], restat: bool = False) -> Dict[str, Tuple[float, int]]:
+        """
+        Refresh the signatures of a cached directory listing
+        キャッシュされたディレクトリ一覧のシグネチャを更新
         
-        return relevant_files
+        Args:
+            files: Cached file signatures / キャッシュされたファイルシグネチャ
+            restat: Re-stat every file instead of only those over max_file_size / max_file_size超過分だけでなく全ファイルを再statするか
+            
+        Returns:
+            Dict[str, Tuple[float, int]]: Current signatures of the files that still exist / 存在するファイルの現在のシグネチャ
+        """
+        if not restat and all(signature[1] <= self.max_file_size for signature in files.values()):
+            return files
+        refreshed: Dict[str, Tuple[float, int]] = {}
+        for file_path, signature in files.items():
+            if not restat and signature[1] <= self.max_file_size:
+                refreshed[file_path] = signature
+                continue
+            try:
+                stat = os.stat(self.base_path / file_path)
+            except OSError:
+                continue
+            refreshed[file_path] = (stat.st_mtime, stat.st_size)
+        return refreshed
+    
+    @staticmethod
+    def _stat_mtime(path: Path) -> Optional[int]:
+        """Return the mtime of path in nanoseconds, or None if it does not exist / パスのmtime（ナノ秒）を返す（存在しない場合はNone）"""
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return None
+    
+    @staticmethod
+    def _empty_scan_metrics() -> Dict[str, Any]:
+        """Initial scan metrics / スキャン指標の初期値"""
+        return {
+            "scan_count": 0,
+            "total_scan_seconds": 0.0,
+            "last_scan_seconds": 0.0,
+            "directories_visited": 0,
+            "directories_listed": 0,
+            "files": 0,
+            "content_cache_hits": 0,
+            "content_cache_misses": 0,
+        }
+    
+    def get_scan_metrics(self) -> Dict[str, Any]:
+        """
+        Get file tree scan and content cache metrics
+        ファイルツリースキャンとコンテンツキャッシュの指標を取得
+        
+        Returns:
+            Dict[str, Any]: Scan counts and timings, directories visited and re-listed in the last scan,
+                file count, and content cache usage
+            Dict[str, Any]: スキャン回数と時間、直近スキャンで訪問・再一覧したディレクトリ数、
+                ファイル数、コンテンツキャッシュの使用状況
+        """
+        metrics = dict(self._scan_metrics)
+        metrics["content_cache_entries"] = len(self._content_cache)
+        metrics["content_cache_bytes"] = self._content_cache_size
+        return metrics
     
     def _find_related_files(self, query: str, history: Optional[List[str]], available_files: List[str]) -> List[str]:
         """
@@ -320,10 +642,84 @@ class SourceCodeProvider(ContextProvider):
 
     def _select_relevant_files(self, query: str, available_files: List[str], history: Optional[List[str]] = None) -> List[str]:
         """
-        Select relevant files based on query and history using heuristics
-        クエリと履歴に基づきヒューリスティックで関連ファイルを選択
+        Select relevant files based on query and history
+        クエリと履歴に基づき関連ファイルを選択
+        
+        Files mentioned explicitly (and their imports) come first, followed by
+        the best matches from the code index.
+        明示的に言及されたファイル（とそのimport）を先に、続いてコードインデックスの
+        上位一致を返します。
         """
-        return self._find_related_files(query, history, available_files)
+        related = self._find_related_files(query, history, available_files)
+        hits = self._search_index(query, exclude=set(related))
+        return related + list(dict.fromkeys(hit.path for hit in hits))
+
+    def _ensure_index(self) -> Optional[CodeIndex]:
+        """
+        Build or incrementally update the code index for the current file tree
+        現在のファイルツリーに対してコードインデックスを構築または差分更新
+        
+        Returns:
+            Optional[CodeIndex]: Synced index, or None if indexing is disabled / 同期済みインデックス（無効時はNone）
+        """
+        if not self.use_index or self._file_tree is None:
+            return None
+        if self._code_index is None:
+            self._code_index = CodeIndex(chunk_lines=self.index_chunk_lines, index_path=self.index_path)
+            self._indexed_tree = None
+        if self._indexed_tree is not self._file_tree:
+            signatures = {
+                file_path: self._file_signatures[file_path]
+                for file_path in self._file_tree
+                if file_path in self._file_signatures
+            }
+            self._code_index.sync(signatures, self._load_index_content)
+            self._indexed_tree = self._file_tree
+        return self._code_index
+
+    def _load_index_content(self, file_path: str) -> Optional[str]:
+        """
+        Read raw file content for indexing
+        インデックス用にファイル内容をそのまま読み込み
+        """
+        full_path = self.base_path / file_path
+        for encoding in ('utf-8', 'shift_jis'):
+            try:
+                with open(full_path, 'r', encoding=encoding) as f:
+                    return f.read()
+            except UnicodeDecodeError:
+                continue
+            except OSError:
+                return None
+        return None
+
+    def _search_index(self, query: str, exclude: Optional[Set[str]] = None) -> List[CodeSearchHit]:
+        """
+        Search the code index for files or chunks relevant to the query
+        クエリに関連するファイルまたはチャンクをコードインデックスから検索
+        
+        Args:
+            query: User query / ユーザークエリ
+            exclude: Files already selected / 既に選択済みのファイル
+            
+        Returns:
+            List[CodeSearchHit]: Hits within index_top_k and max_files / index_top_kとmax_files以内のヒット
+        """
+        index = self._ensure_index()
+        if index is None:
+            return []
+        exclude = exclude or set()
+        limit = min(self.index_top_k, self.max_files - len(exclude))
+        if limit <= 0:
+            return []
+        hits = index.search(query, top_k=limit + len(exclude))
+        
+        # Files edited in place are only re-stat-ed once they rank
+        # その場で編集されたファイルはランク付けされた時点で再statする
+        changed = [self._refresh_signature(path) for path in dict.fromkeys(hit.path for hit in hits)]
+        if any(changed):
+            hits = index.search(query, top_k=limit + len(exclude))
+        return [hit for hit in hits if hit.path not in exclude][:limit]
 
     def _select_relevant_files_llm(self, query: str, available_files: List[str], history: Optional[List[str]] = None) -> List[str]:
         """
@@ -338,6 +734,9 @@ class SourceCodeProvider(ContextProvider):
         Read file content with error handling
         エラーハンドリング付きでファイル内容を読み込み
         
+        Contents are cached by (path, mtime, size) within content_cache_bytes.
+        内容は(path, mtime, size)をキーとしてcontent_cache_bytesの範囲でキャッシュされます。
+        
         Args:
             file_path: File path to read / 読み込むファイルパス
             
@@ -346,19 +745,108 @@ class SourceCodeProvider(ContextProvider):
         """
         full_path = self.base_path / file_path
         
+        try:
+            stat = full_path.stat()
+        except OSError as e:
+            return f"# File: {file_path}\n# Error reading file: {e}\n"
+        signature = (stat.st_mtime, stat.st_size)
+        
+        cached = self._content_cache.get(file_path)
+        if cached is not None and cached[0] == signature:
+            self._content_cache.move_to_end(file_path)
+            self._scan_metrics["content_cache_hits"] += 1
+            return cached[1]
+        self._scan_metrics["content_cache_misses"] += 1
+        
+        self._refresh_signature(file_path, signature)
+        
         try:
             with open(full_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-                return f"# File: {file_path}\n{content}\n"
+                result = f"# File: {file_path}\n{content}\n"
         except UnicodeDecodeError:
             try:
                 with open(full_path, 'r', encoding='shift_jis') as f:
                     content = f.read()
-                    return f"# File: {file_path}\n{content}\n"
+                    result = f"# File: {file_path}\n{content}\n"
             except Exception as e:
                 return f"# File: {file_path}\n# Error reading file: {e}\n"
         except Exception as e:
             return f"# File: {file_path}\n# Error reading file: {e}\n"
+        
+        self._cache_content(file_path, signature, result)
+        return result
+    
+    def _refresh_signature(self, file_path: str, signature: Optional[Tuple[float, int]] = None) -> bool:
+        """
+        Re-stat a single file and keep the listing cache and code index in step
+        単一ファイルを再statし、一覧キャッシュとコードインデックスを追従させる
+        
+        Args:
+            file_path: File path relative to the base path / ベースパスからの相対ファイルパス
+            signature: Current (mtime, size) if already stat-ed / stat済みの場合の現在の(mtime, size)
+            
+        Returns:
+            bool: True if the file changed since it was last stat-ed / 前回のstat以降にファイルが変化した場合True
+        """
+        if signature is None:
+            try:
+                stat = (self.base_path / file_path).stat()
+            except OSError:
+                stat = None
+            if stat is None:
+                if self._file_signatures.pop(file_path, None) is None:
+                    return False
+                cached_dir = self._dir_cache.get(os.path.dirname(file_path))
+                if cached_dir is not None:
+                    cached_dir[2].pop(file_path, None)
+                if self._code_index is not None:
+                    self._code_index.remove_file(file_path)
+                return True
+            signature = (stat.st_mtime, stat.st_size)
+        if self._file_signatures.get(file_path, signature) == signature:
+            return False
+        self._file_signatures[file_path] = signature
+        cached_dir = self._dir_cache.get(os.path.dirname(file_path))
+        if cached_dir is not None and file_path in cached_dir[2]:
+            cached_dir[2][file_path] = signature
+        if self._code_index is not None:
+            content = self._load_index_content(file_path)
+            if content is None or signature[1] > self.max_file_size:
+                self._code_index.remove_file(file_path)
+            else:
+                self._code_index.add_file(file_path, content, signature)
+        return True
+    
+    def _cache_content(self, file_path: str, signature: Tuple[float, int], content: str) -> None:
+        """
+        Store content in the LRU cache, evicting old entries over budget
+        LRUキャッシュに内容を保存し、上限を超えた古いエントリを削除
+        """
+        size = len(content)
+        previous = self._content_cache.pop(file_path, None)
+        if previous is not None:
+            self._content_cache_size -= len(previous[1])
+        if size > self.content_cache_bytes:
+            return
+        self._content_cache[file_path] = (signature, content)
+        self._content_cache_size += size
+        while self._content_cache_size > self.content_cache_bytes:
+            _, (_, evicted) = self._content_cache.popitem(last=False)
+            self._content_cache_size -= len(evicted)
+    
+    def _read_hit_content(self, hit: CodeSearchHit) -> str:
+        """
+        Read the file or line range referenced by an index hit
+        インデックスヒットが指すファイルまたは行範囲を読み込み
+        """
+        if hit.end_line is None:
+            return self._read_file_content(hit.path)
+        content = self._load_index_content(hit.path)
+        if content is None:
+            return self._read_file_content(hit.path)
+        lines = content.splitlines()[hit.start_line - 1:hit.end_line]
+        return f"# File: {hit.path} (lines {hit.start_line}-{hit.end_line})\n" + "\n".join(lines) + "\n"
     
     def get_context(self, query: str, previous_context: Optional[str] = None, **kwargs) -> str:
         """
@@ -372,15 +860,19 @@ class SourceCodeProvider(ContextProvider):
             return ""
         # 履歴を取得
         history = kwargs.get('history', None)
-        # Select relevant files
-        relevant_files = self._select_relevant_files(query, self._file_tree, history)
-        if not relevant_files:
+        # Select explicitly related files, then fill with index hits
+        # 明示的に関連するファイルを選択し、インデックスのヒットで補完
+        related_files = self._find_related_files(query, history, self._file_tree)
+        hits = self._search_index(query, exclude=set(related_files))
+        if not related_files and not hits:
             return ""
         # Read and combine file contents
         context_parts = []
-        for file_path in relevant_files:
+        for file_path in related_files:
             content = self._read_file_content(file_path)
             context_parts.append(content)
+        for hit in hits:
+            context_parts.append(self._read_hit_content(hit))
         return "\n".join(context_parts)
     
     def update(self, interaction: Dict[str, Any]) -> None:
@@ -403,13 +895,23 @@ class SourceCodeProvider(ContextProvider):
         self._file_tree = None
         self._gitignore_patterns = None
         self._last_scan_time = 0
+        if self._code_index is not None:
+            self._code_index.flush()
+        self._code_index = None
+        self._indexed_tree = None
+        self._dir_cache = {}
+        self._file_signatures = {}
+        self._ignore_specs = {}
+        self._content_cache.clear()
+        self._content_cache_size = 0
+        self._scan_metrics = self._empty_scan_metrics()
     
     def refresh_file_tree(self) -> None:
         """
-        Manually refresh the file tree cache
-        ファイルツリーキャッシュを手動で更新
+        Manually refresh the file tree cache, re-stat-ing every file
+        すべてのファイルを再statしてファイルツリーキャッシュを手動で更新
         """
-        self._file_tree = self._scan_file_tree()
+        self._file_tree = self._scan_file_tree(restat=True)
     
     def get_file_count(self) -> int:
         """
@@ -7,15 +7,25 @@ based on configurable routing logic and classification results.
 # RouterAgent implementation for routing inputs based on classification.
 # RouterAgentは入力データを分析し、設定可能なルーティングロジックと分類結果に基づいて適切な処理パスにルーティングします。
 
-from typing import Any, Dict, List, Optional, Union, Callable, Literal
-from pydantic import BaseModel, Field, field_validator
+import asyncio
+import concurrent.futures
+import math
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple, Union, Callable, Literal
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from abc import ABC, abstractmethod
 
 from .flow.step import Step
 from .flow.context import Context
 from .pipeline.llm_pipeline import RefinireAgent, create_simple_agent
+from ..core.routing_cache import RoutingCache
 
 
+# Word tokens used by the embedding classifier's hashed features
+# 埋め込み分類器のハッシュ特徴で使う単語トークン
+_TOKEN_PATTERN = re.compile(r"\w+")
+
 
 class RouteClassifier(ABC):
     """
@@ -24,7 +34,7 @@ class RouteClassifier(ABC):
     """
     
     @abstractmethod
-    def classify(self, input_data: Any, context: Context) -> str:
+    def classify(self, input_data: Any, context: Context) -> Optional[str]:
         """
         Classify input data and return the route key.
         入力データを分類してルートキーを返します。
@@ -34,9 +44,26 @@ class RouteClassifier(ABC):
             context: The execution context / 実行コンテキスト
             
         Returns:
-            str: The route key for the classified input / 分類された入力のルートキー
+            Optional[str]: The route key, or None to use the default route / ルートキー（Noneの場合はデフォルトルート）
         """
         pass
+    
+    async def aclassify(self, input_data: Any, context: Context) -> Optional[str]:
+        """
+        Classify input data asynchronously and return the route key.
+        入力データを非同期で分類してルートキーを返します。
+        
+        Classifiers that wait on I/O override this; the default runs classify.
+        I/Oを待つ分類器はこれをオーバーライドします。デフォルトはclassifyを実行します。
+        
+        Args:
+            input_data: The input data to classify / 分類する入力データ
+            context: The execution context / 実行コンテキスト
+            
+        Returns:
+            Optional[str]: The route key, or None to use the default route / ルートキー（Noneの場合はデフォルトルート）
+        """
+        return self.classify(input_data, context)
 
 
 class LLMClassifier(RouteClassifier):
@@ -50,7 +77,8 @@ class LLMClassifier(RouteClassifier):
         pipeline: RefinireAgent,
         classification_prompt: str,
         routes: List[str],
-        examples: Optional[Dict[str, List[str]]] = None
+        examples: Optional[Dict[str, List[str]]] = None,
+        cache: Optional[RoutingCache] = None
     ):
         """
         Initialize LLM classifier.
@@ -61,19 +89,60 @@ class LLMClassifier(RouteClassifier):
             classification_prompt: Prompt template for classification / 分類用のプロンプトテンプレート
             routes: List of possible route keys / 可能なルートキーのリスト
             examples: Optional examples for each route / 各ルートのオプション例
+            cache: Optional cache of previous classifications / 過去の分類結果のオプションキャッシュ
         """
         self.pipeline = pipeline
         self.classification_prompt = classification_prompt
         self.routes = routes
         self.examples = examples or {}
+        self.cache = cache
     
-    def classify(self, input_data: Any, context: Context) -> str:
+    def classify(self, input_data: Any, context: Context) -> Optional[str]:
         """
         Classify input using LLM.
         LLMを使用して入力を分類します。
+        
+        Runs aclassify to completion; inside a running event loop it runs on a
+        worker thread instead of re-entering the loop.
+        aclassifyを完了まで実行します。実行中のイベントループ内では、ループに
+        再入せずワーカースレッドで実行します。
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No running event loop, safe to use asyncio.run()
+            # 実行中のイベントループがない場合、asyncio.run() を安全に使用
+            return asyncio.run(self.aclassify(input_data, context))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.aclassify(input_data, context)).result()
+    
+    async def aclassify(self, input_data: Any, context: Context) -> Optional[str]:
+        """
+        Classify input using LLM without blocking the event loop.
+        イベントループをブロックせずにLLMを使用して入力を分類します。
+        """
+        # Reuse a previous classification of the same or nearly the same input
+        # 同じまたはほぼ同じ入力の過去の分類を再利用
+        if self.cache is not None:
+            cached_route = self.cache.get(input_data, self.classification_prompt, self.routes)
+            if cached_route in self.routes:
+                return str(cached_route)
+        
+        try:
+            # Classify in a separate context so the router's context is not overwritten
+            # ルーターのコンテキストを上書きしないよう別のコンテキストで分類
+            result = await self.pipeline.run_async(self._build_prompt(input_data), Context())
+            return self._match_route(input_data, self._result_text(result))
+            
+        except Exception as e:
+            # Classification error occurred
+            return None  # Let RouterAgent handle fallback / RouterAgentにフォールバックを処理させる
+    
+    def _build_prompt(self, input_data: Any) -> str:
+        """
+        Build the classification prompt with examples.
+        例を含む分類プロンプトを構築します。
         """
-        # Build classification prompt with examples
-        # 例を含む分類プロンプトを構築
         examples_text = ""
         if self.examples:
             examples_text = "\n\nExamples:\n"
@@ -84,7 +153,7 @@ class LLMClassifier(RouteClassifier):
         
         routes_text = ", ".join(self.routes)
         
-        full_prompt = f"""
+        return f"""
 {self.classification_prompt}
 
 Available routes: {routes_text}
@@ -94,35 +163,59 @@ Input to classify: {input_data}
 
 Respond with only the route key (one of: {routes_text})
 """
-        
-        try:
-            result = self.pipeline.run(full_prompt, context)
-            
-            # Clean and validate the result
-            # 結果をクリーンアップして検証
-            classified_route = result.strip().lower()
-            
-            # Find matching route (case insensitive)
-            # 一致するルートを検索（大文字小文字を区別しない）
-            for route in self.routes:
-                if route.lower() == classified_route:
-                    return route
-            
-            # If no exact match, try partial matching
-            # 完全一致しない場合、部分一致を試行
-            for route in self.routes:
-                if route.lower() in classified_route or classified_route in route.lower():
-                    # Partial route match found
-                    return route
-            
-            # Return None to let RouterAgent handle fallback
-            # RouterAgentにフォールバックを処理させるためNoneを返す
-            # Could not classify input, returning None for RouterAgent fallback
+    
+    @staticmethod
+    def _result_text(result: Any) -> str:
+        """
+        Extract the generated text from a pipeline result.
+        パイプラインの結果から生成テキストを抽出します。
+        """
+        if isinstance(result, Context):
+            result = result.result
+        if hasattr(result, "content"):
+            result = result.content
+        return "" if result is None else str(result)
+    
+    def _match_route(self, input_data: Any, text: str) -> Optional[str]:
+        """
+        Match the LLM answer to a route key.
+        LLMの回答をルートキーに照合します。
+        """
+        # Clean and validate the result
+        # 結果をクリーンアップして検証
+        classified_route = text.strip().lower()
+        if not classified_route:
             return None
-            
-        except Exception as e:
-            # Classification error occurred
-            return None  # Let RouterAgent handle fallback / RouterAgentにフォールバックを処理させる
+        
+        # Find matching route (case insensitive)
+        # 一致するルートを検索（大文字小文字を区別しない）
+        for route in self.routes:
+            if route.lower() == classified_route:
+                self._cache_route(input_data, route, 1.0)
+                return route
+        
+        # If no exact match, try partial matching
+        # 完全一致しない場合、部分一致を試行
+        for route in self.routes:
+            if route.lower() in classified_route or classified_route in route.lower():
+                # Partial route match found
+                # Partial matches are less certain than exact ones
+                # 部分一致は完全一致より確実性が低い
+                self._cache_route(input_data, route, 0.5)
+                return route
+        
+        # Return None to let RouterAgent handle fallback
+        # RouterAgentにフォールバックを処理させるためNoneを返す
+        # Could not classify input, returning None for RouterAgent fallback
+        return None
+    
+    def _cache_route(self, input_data: Any, route: str, confidence: float) -> None:
+        """
+        Offer a classification to the cache.
+        分類結果をキャッシュに登録します。
+        """
+        if self.cache is not None:
+            self.cache.put(input_data, self.classification_prompt, self.routes, route, confidence)
 
 
 class RuleBasedClassifier(RouteClassifier):
@@ -162,19 +255,235 @@ class RuleBasedClassifier(RouteClassifier):
         return fallback_route
 
 
+class EmbeddingClassifier(RouteClassifier):
+    """
+    Nearest-centroid classifier trained on route examples.
+    ルート例で学習する最近傍重心分類器。
+
+    Examples are vectorized offline (hashed word/character n-gram TF-IDF, or a
+    user-supplied embedding function) and averaged into one centroid per route.
+    Inputs are routed to the most similar centroid without an LLM call; only
+    inputs whose cosine similarity falls below confidence_threshold are handed
+    to the fallback classifier.
+    例はオフラインでベクトル化され（ハッシュ化した単語・文字n-gramのTF-IDF、または
+    ユーザー提供の埋め込み関数）、ルートごとに1つの重心に平均化されます。入力はLLMを
+    呼び出さずに最も類似した重心にルーティングされ、コサイン類似度が
+    confidence_thresholdを下回る入力のみがフォールバック分類器に渡されます。
+    """
+
+    def __init__(
+        self,
+        examples: Dict[str, List[str]],
+        embedding_function: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        confidence_threshold: float = 0.25,
+        fallback: Optional[RouteClassifier] = None,
+        n_features: int = 2 ** 18,
+        char_ngram_range: Tuple[int, int] = (3, 5)
+    ):
+        """
+        Initialize and train the embedding classifier.
+        埋め込み分類器を初期化して学習します。
+
+        Args:
+            examples: Example texts for each route / 各ルートの例文
+            embedding_function: Optional batch embedding function; hashed TF-IDF is used when None
+                                オプションのバッチ埋め込み関数（Noneの場合はハッシュ化TF-IDFを使用）
+            confidence_threshold: Minimum similarity to accept a route without fallback
+                                  フォールバックなしでルートを採用する最小類似度
+            fallback: Classifier used below the threshold (None returns None) / 閾値未満で使用する分類器（Noneの場合Noneを返す）
+            n_features: Size of the hashed feature space / ハッシュ特徴空間のサイズ
+            char_ngram_range: Character n-gram lengths (inclusive) / 文字n-gramの長さ（両端含む）
+        """
+        self.embedding_function = embedding_function
+        self.confidence_threshold = confidence_threshold
+        self.fallback = fallback
+        self.n_features = n_features
+        self.char_ngram_range = char_ngram_range
+        self._idf: Dict[int, float] = {}
+        self._default_idf = 1.0
+        self._centroids: Dict[str, Dict[int, float]] = {}
+
+        # Counters / カウンター
+        self.fast_path = 0
+        self.fallbacks = 0
+
+        self.fit(examples)
+
+    @property
+    def routes(self) -> List[str]:
+        """Routes that have a centroid / 重心を持つルート"""
+        return list(self._centroids)
+
+    def fit(self, examples: Dict[str, List[str]]) -> None:
+        """
+        Train route centroids from example texts.
+        例文からルートの重心を学習します。
+
+        Args:
+            examples: Example texts for each route / 各ルートの例文
+        """
+        labeled = [(route, text) for route, texts in examples.items() for text in texts if text]
+        if not labeled:
+            raise ValueError("EmbeddingClassifier requires at least one classification example")
+
+        texts = [text for _, text in labeled]
+        if self.embedding_function is None:
+            # Inverse document frequency over all examples (smoothed as in scikit-learn)
+            # 全例に対する逆文書頻度（scikit-learnと同様に平滑化）
+            features = [self._hashed_features(text) for text in texts]
+            document_frequency: Dict[int, int] = {}
+            for counts in features:
+                for index in counts:
+                    document_frequency[index] = document_frequency.get(index, 0) + 1
+            total = len(features)
+            self._default_idf = math.log((1 + total) / 1) + 1
+            self._idf = {index: math.log((1 + total) / (1 + df)) + 1 for index, df in document_frequency.items()}
+            vectors = [self._weight(counts) for counts in features]
+        else:
+            vectors = self._embed(self.embedding_function, texts)
+
+        sums: Dict[str, Dict[int, float]] = {}
+        for (route, _), vector in zip(labeled, vectors):
+            centroid = sums.setdefault(route, {})
+            for index, value in vector.items():
+                centroid[index] = centroid.get(index, 0.0) + value
+        self._centroids = {route: self._normalize(centroid) for route, centroid in sums.items()}
+
+    def predict(self, input_data: Any) -> Tuple[Optional[str], float]:
+        """
+        Find the nearest route centroid without any fallback.
+        フォールバックなしで最も近いルート重心を求めます。
+
+        Args:
+            input_data: The input data to classify / 分類する入力データ
+
+        Returns:
+            Tuple[Optional[str], float]: (route key, cosine similarity) / （ルートキー、コサイン類似度）
+        """
+        text = str(input_data)
+        if self.embedding_function is None:
+            vector = self._weight(self._hashed_features(text))
+        else:
+            vector = self._embed(self.embedding_function, [text])[0]
+        best_route, best_score = None, 0.0
+        for route, centroid in self._centroids.items():
+            score = self._dot(vector, centroid)
+            if best_route is None or score > best_score:
+                best_route, best_score = route, score
+        return best_route, best_score
+
+    def classify(self, input_data: Any, context: Context) -> Optional[str]:
+        """
+        Classify input by nearest centroid, falling back below the threshold.
+        最近傍重心で入力を分類し、閾値未満の場合はフォールバックします。
+        """
+        route = self._nearest_route(input_data)
+        if route is not None or self.fallback is None:
+            return route
+        return self.fallback.classify(input_data, context)
+    
+    async def aclassify(self, input_data: Any, context: Context) -> Optional[str]:
+        """
+        Classify input by nearest centroid, awaiting the fallback below the threshold.
+        最近傍重心で入力を分類し、閾値未満の場合はフォールバックを待機します。
+        """
+        route = self._nearest_route(input_data)
+        if route is not None or self.fallback is None:
+            return route
+        return await self.fallback.aclassify(input_data, context)
+    
+    def _nearest_route(self, input_data: Any) -> Optional[str]:
+        """
+        Return the nearest route if it is confident enough, counting the outcome.
+        十分な信頼度があれば最も近いルートを返し、結果を数えます。
+        """
+        route, confidence = self.predict(input_data)
+        if route is not None and confidence >= self.confidence_threshold:
+            self.fast_path += 1
+            return route
+        self.fallbacks += 1
+        return None
+
+    def get_metrics(self) -> Dict[str, int]:
+        """
+        Get classification counters.
+        分類のカウンターを取得します。
+
+        Returns:
+            Dict[str, int]: Counters / カウンター
+        """
+        return {"fast_path": self.fast_path, "fallbacks": self.fallbacks}
+
+    def _hashed_features(self, text: str) -> Dict[int, int]:
+        """
+        Count hashed word and character n-grams.
+        ハッシュ化した単語・文字n-gramを数えます。
+        """
+        counts: Dict[int, int] = {}
+        words = _TOKEN_PATTERN.findall(text.lower())
+        grams = [f"w:{word}" for word in words]
+        grams.extend(f"b:{first} {second}" for first, second in zip(words, words[1:]))
+        low, high = self.char_ngram_range
+        for word in words:
+            padded = f" {word} "
+            for n in range(low, high + 1):
+                grams.extend(f"c:{padded[i:i + n]}" for i in range(max(len(padded) - n + 1, 1)))
+        for gram in grams:
+            index = zlib.crc32(gram.encode("utf-8")) % self.n_features
+            counts[index] = counts.get(index, 0) + 1
+        return counts
+
+    def _weight(self, counts: Dict[int, int]) -> Dict[int, float]:
+        """
+        Apply sublinear TF-IDF weighting and L2 normalization.
+        サブリニアTF-IDF重み付けとL2正規化を適用します。
+        """
+        return self._normalize({
+            index: (1 + math.log(count)) * self._idf.get(index, self._default_idf)
+            for index, count in counts.items()
+        })
+
+    def _embed(
+        self, embedding_function: Callable[[List[str]], List[List[float]]], texts: List[str]
+    ) -> List[Dict[int, float]]:
+        """
+        Embed texts with the embedding function as normalized sparse vectors.
+        埋め込み関数でテキストを正規化済みの疎ベクトルに変換します。
+        """
+        return [
+            self._normalize({index: float(value) for index, value in enumerate(embedding) if value})
+            for embedding in embedding_function(texts)
+        ]
+
+    @staticmethod
+    def _normalize(vector: Dict[int, float]) -> Dict[int, float]:
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if norm == 0:
+            return vector
+        return {index: value / norm for index, value in vector.items()}
+
+    @staticmethod
+    def _dot(first: Dict[int, float], second: Dict[int, float]) -> float:
+        if len(first) > len(second):
+            first, second = second, first
+        return sum(value * second.get(index, 0.0) for index, value in first.items())
+
+
 class RouterConfig(BaseModel):
     """
     Configuration for RouterAgent.
     RouterAgentの設定。
     """
     
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
     name: str = Field(description="Name of the router agent / ルーターエージェントの名前")
     
     routes: Dict[str, str] = Field(
         description="Mapping of route keys to next step names / ルートキーから次のステップ名へのマッピング"
     )
     
-    classifier_type: Literal["llm", "rule"] = Field(
+    classifier_type: Literal["llm", "rule", "embedding"] = Field(
         default="llm",
         description="Type of classifier to use / 使用する分類器のタイプ"
     )
@@ -196,6 +505,30 @@ class RouterConfig(BaseModel):
         description="Rules for classification / 分類のためのルール"
     )
     
+    # Embedding classifier options
+    embedding_function: Optional[Callable[[List[str]], List[List[float]]]] = Field(
+        default=None,
+        description="Batch embedding function (hashed TF-IDF if None) / バッチ埋め込み関数（Noneの場合はハッシュ化TF-IDF）"
+    )
+    
+    confidence_threshold: float = Field(
+        default=0.25,
+        ge=0.0,
+        le=1.0,
+        description="Minimum similarity for embedding classification / 埋め込み分類の最小類似度"
+    )
+    
+    llm_fallback: bool = Field(
+        default=True,
+        description="Whether low-confidence embedding results fall back to the LLM / 低信頼度の埋め込み結果をLLMにフォールバックするかどうか"
+    )
+    
+    # Caching options
+    routing_cache: Optional[RoutingCache] = Field(
+        default=None,
+        description="Cache of LLM classifications / LLM分類結果のキャッシュ"
+    )
+    
     # Fallback options
     default_route: Optional[str] = Field(
         default=None,
@@ -229,9 +562,10 @@ class RouterAgent(RefinireAgent):
     Router agent that classifies input and routes to appropriate next steps.
     入力を分類して適切な次のステップにルーティングするルーターエージェント。
     
-    The RouterAgent analyzes input data using either LLM-based or rule-based
-    classification and determines which processing path the input should follow.
-    RouterAgentはLLMベースまたはルールベースの分類を使用して入力データを分析し、
+    The RouterAgent analyzes input data using LLM-based, rule-based or
+    embedding-based classification and determines which processing path the
+    input should follow.
+    RouterAgentはLLMベース、ルールベース、または埋め込みベースの分類を使用して入力データを分析し、
     入力がどの処理パスに従うべきかを決定します。
     """
     
@@ -257,25 +591,9 @@ class RouterAgent(RefinireAgent):
         
         # Initialize classifier based on type
         # タイプに基づいて分類器を初期化
+        self.classifier: RouteClassifier
         if config.classifier_type == "llm":
-            if llm_pipeline is None:
-                # Create default LLM pipeline if none provided
-                # 提供されていない場合はデフォルトのLLMパイプラインを作成
-                llm_pipeline = create_simple_agent(
-                    name="router_classifier",
-                    instructions="You are a classification assistant. Classify the input text into the provided categories."
-                )
-            
-            # Use provided prompt or create default
-            # 提供されたプロンプトを使用するか、デフォルトを作成
-            prompt = config.classification_prompt or self._create_default_classification_prompt()
-            
-            self.classifier = LLMClassifier(
-                pipeline=llm_pipeline,
-                classification_prompt=prompt,
-                routes=list(config.routes.keys()),
-                examples=config.classification_examples
-            )
+            self.classifier = self._create_llm_classifier(llm_pipeline)
             
         elif config.classifier_type == "rule":
             if config.classification_rules is None:
@@ -283,9 +601,45 @@ class RouterAgent(RefinireAgent):
             
             self.classifier = RuleBasedClassifier(config.classification_rules)
             
+        elif config.classifier_type == "embedding":
+            if not config.classification_examples:
+                raise ValueError("classification_examples must be provided for embedding classifier")
+            
+            self.classifier = EmbeddingClassifier(
+                examples=config.classification_examples,
+                embedding_function=config.embedding_function,
+                confidence_threshold=config.confidence_threshold,
+                fallback=self._create_llm_classifier(llm_pipeline) if config.llm_fallback else None
+            )
+            
         else:
             raise ValueError(f"Unsupported classifier type: {config.classifier_type}")
     
+    def _create_llm_classifier(self, llm_pipeline: Optional[RefinireAgent]) -> LLMClassifier:
+        """
+        Create the LLM classifier, with a default pipeline if none is provided.
+        LLM分類器を作成します（提供されていない場合はデフォルトのパイプラインを使用）。
+        """
+        if llm_pipeline is None:
+            # Create default LLM pipeline if none provided
+            # 提供されていない場合はデフォルトのLLMパイプラインを作成
+            llm_pipeline = create_simple_agent(
+                name="router_classifier",
+                instructions="You are a classification assistant. Classify the input text into the provided categories."
+            )
+        
+        # Use provided prompt or create default
+        # 提供されたプロンプトを使用するか、デフォルトを作成
+        prompt = self.config.classification_prompt or self._create_default_classification_prompt()
+        
+        return LLMClassifier(
+            pipeline=llm_pipeline,
+            classification_prompt=prompt,
+            routes=list(self.config.routes.keys()),
+            examples=self.config.classification_examples,
+            cache=self.config.routing_cache
+        )
+    
     def _create_default_classification_prompt(self) -> str:
         """
         Create default classification prompt.
@@ -323,7 +677,7 @@ Choose the route that best matches the input's intent, content, or characteristi
             
             # Classify the input
             # 入力を分類
-            route_key = self.classifier.classify(input_data, ctx)
+            route_key = await self.classifier.aclassify(input_data, ctx)
             
             # Check if classification failed (returned None)
             # 分類が失敗したかチェック（Noneが返された）
@@ -7,10 +7,13 @@ RefinireAgentワークフローのルーティング専用エージェント
 import asyncio
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
+from agents import Agent
 
-from ..core.llm import get_llm
-from ..core.routing import RoutingResult
+from ..core.metrics import RequestMeter, get_metrics_registry
+from ..core.routing import RoutingResult, create_routing_decision_model
+from ..core.routing_cache import RoutingCache
 from .flow.context import Context
+from .shared_agents import get_shared_agent_registry
 
 
 class RoutingAgent:
@@ -34,6 +37,8 @@ class RoutingAgent:
         temperature: float = 0.1,  # 低温度でより確実な判定
         max_retries: int = 3,
         timeout: Optional[float] = None,
+        cache: Optional[RoutingCache] = None,
+        structured_output: bool = True,
         **kwargs
     ):
         """
@@ -48,6 +53,8 @@ class RoutingAgent:
             # provider: Automatically detected from model name patterns and environment variables
             max_retries: Maximum retry attempts
             timeout: Request timeout
+            cache: Optional routing decision cache shared across calls
+            structured_output: Request a schema-constrained decision instead of free-form JSON text
         """
         self.name = name
         self.routing_instruction = routing_instruction
@@ -56,15 +63,17 @@ class RoutingAgent:
         self.temperature = temperature
         self.max_retries = max_retries
         self.timeout = timeout
+        self.cache = cache
         self.kwargs = kwargs
         
-        # Initialize LLM with structured output
-        # 構造化出力でLLMを初期化
-        self.llm = get_llm(
-            model=model,
-            temperature=temperature,
-            **kwargs
-        )
+        # Compact decision schema with next_route limited to the destinations
+        # next_routeを分岐先に制限したコンパクトな判断スキーマ
+        self.output_model = create_routing_decision_model(self.routing_destinations) if structured_output else None
+        
+        # Share the model and SDK agent with other helpers of the same configuration
+        # 同じ設定の他の補助エージェントとモデルとSDKエージェントを共有
+        self.llm = get_shared_agent_registry().get_model(model, temperature, **kwargs)
+        self._sdk_agent: Optional[Agent[Any]] = None
     
     async def run_async(
         self, 
@@ -91,15 +100,34 @@ class RoutingAgent:
             6. Return updated context
         """
         try:
+            # Reuse a cached decision for the same prompt and the same (or nearly the same)
+            # generation; without a generation there is nothing to key the cache on
+            # 同じプロンプトと同じ（またはほぼ同じ）生成結果に対してはキャッシュされた判断を再利用。
+            # 生成結果がない場合はキャッシュのキーがないため使用しない
+            last_generation = context.shared_state.get('_last_generation')
+            cache = self.cache if last_generation else None
+            cache_scope = self._cache_scope(context)
+            if cache is not None:
+                cached = cache.get(last_generation, cache_scope, self.routing_destinations)
+                if cached is not None:
+                    routing_result = cached.model_copy(update={'content': str(last_generation)})
+                    context.routing_result = routing_result
+                    context.result = self._create_llm_result(routing_result, True, cache_hit=True)
+                    get_metrics_registry().record_cache_hit(self.model_name, self.name)
+                    return context
+            
             # Build routing prompt using shared_state
             # shared_stateを使用してルーティングプロンプトを構築
             routing_prompt = self._build_routing_prompt(context, input_text)
             
-            # Execute LLM call with structured output
-            # 構造化出力でLLM呼び出しを実行
+            # Execute LLM call with structured output; all attempts are metered as one request
+            # 構造化出力でLLM呼び出しを実行。全試行を1件のリクエストとして計測
+            meter = RequestMeter(self.model_name, self.name)
             for attempt in range(self.max_retries):
                 try:
+                    meter.start_attempt()
                     llm_result = await self._execute_llm_call(routing_prompt)
+                    meter.add_usage(llm_result)
                     
                     # Parse routing result
                     # ルーティング結果を解析
@@ -113,16 +141,23 @@ class RoutingAgent:
                         routing_result = self._create_fallback_routing_result(
                             context, routing_result.next_route
                         )
+                    elif cache is not None:
+                        cache.put(
+                            last_generation, cache_scope, self.routing_destinations,
+                            routing_result, routing_result.confidence
+                        )
                     
                     # Store results in context
                     # 結果をcontextに保存
                     context.routing_result = routing_result
                     context.result = self._create_llm_result(routing_result, True)
+                    meter.record(success=True)
                     
                     return context
                     
                 except Exception as e:
                     if attempt == self.max_retries - 1:
+                        meter.record(success=False)
                         # Final attempt failed, create error routing result
                         # 最終試行が失敗、エラールーティング結果を作成
                         error_routing = RoutingResult(
@@ -156,6 +191,13 @@ class RoutingAgent:
         """Synchronous wrapper for run_async"""
         return asyncio.run(self.run_async(input_text, context, **kwargs))
     
+    def _cache_scope(self, context: Context) -> str:
+        """
+        Cache scope combining the routing instruction and the previous prompt
+        ルーティング指示と直前のプロンプトを組み合わせたキャッシュのスコープ
+        """
+        return f"{self.routing_instruction}\x00{context.shared_state.get('_last_prompt', '')}"
+    
     def _build_routing_prompt(self, context: Context, input_text: str) -> str:
         """
         Build routing prompt using context shared_state and routing destinations
@@ -184,7 +226,15 @@ class RoutingAgent:
 {destinations_section}
 === ルーティング指示 ===
 {self.routing_instruction}
-
+"""
+        
+        if self.output_model is not None:
+            # The response schema defines the output fields
+            # 出力フィールドは応答スキーマで定義される
+            return prompt + """
+上記の情報に基づいて、適切なルーティング判断を行い、JSON形式で出力してください（判断理由は1文で簡潔に）。"""
+        
+        return prompt + f"""
 上記の情報に基づいて、適切なルーティング判断を行い、以下のJSON形式で出力してください：
 
 {{
@@ -193,8 +243,6 @@ class RoutingAgent:
   "confidence": 0.0〜1.0の信頼度,
   "reasoning": "判断理由の説明"
 }}"""
-        
-        return prompt
     
     def _format_routing_destinations(self) -> str:
         """
@@ -235,23 +283,27 @@ class RoutingAgent:
     
     async def _execute_llm_call(self, prompt: str) -> Any:
         """Execute LLM call with timeout handling"""
-        from agents import Runner, Agent
+        from agents import Runner
         
-        # Create a simple agent for the LLM call
-        # LLM呼び出し用のシンプルなエージェントを作成
-        temp_agent = Agent(
-            name="routing_agent",
-            instructions="You are a routing decision agent. Provide JSON output as requested.",
-            model=self.llm
-        )
+        # Build the SDK agent once and reuse it for every call and retry
+        # SDKエージェントを一度だけ構築し、すべての呼び出しとリトライで再利用
+        if self._sdk_agent is None:
+            self._sdk_agent = get_shared_agent_registry().get_agent(
+                name="routing_agent",
+                instructions="You are a routing decision agent. Provide JSON output as requested.",
+                model=self.model_name,
+                temperature=self.temperature,
+                output_type=self.output_model,
+                **self.kwargs
+            )
         
         if self.timeout:
             return await asyncio.wait_for(
-                Runner.run(temp_agent, prompt),
+                Runner.run(self._sdk_agent, prompt),
                 timeout=self.timeout
             )
         else:
-            return await Runner.run(temp_agent, prompt)
+            return await Runner.run(self._sdk_agent, prompt)
     
     def _parse_routing_result(self, llm_result: Any, context: Context) -> RoutingResult:
         """Parse LLM result into RoutingResult"""
@@ -265,6 +317,11 @@ class RoutingAgent:
             else:
                 content = str(llm_result)
             
+            # Structured output is already validated against the decision schema
+            # 構造化出力は判断スキーマで検証済み
+            if isinstance(content, BaseModel) and hasattr(content, 'next_route'):
+                return self._create_routing_result_from_decision(content, context)
+            
             # Try to parse as JSON if it looks like JSON
             # JSON形式の場合は解析を試行
             if isinstance(content, str) and content.strip().startswith('{'):
@@ -294,6 +351,23 @@ class RoutingAgent:
                 reasoning=f"Failed to parse routing result, using fallback: {str(e)}"
             )
     
+    def _create_routing_result_from_decision(self, decision: Any, context: Context) -> RoutingResult:
+        """
+        Convert a structured routing decision into a RoutingResult
+        構造化されたルーティング判断をRoutingResultに変換
+        """
+        reasoning = (decision.reasoning or '').strip()
+        if len(reasoning) < 10:
+            # RoutingResult requires at least 10 characters of reasoning
+            # RoutingResultは10文字以上の判断理由を必要とする
+            reasoning = f"Selected route '{decision.next_route}'. {reasoning}".strip()
+        return RoutingResult(
+            content=str(context.shared_state.get('_last_generation', '')),
+            next_route=decision.next_route,
+            confidence=min(max(float(decision.confidence), 0.0), 1.0),
+            reasoning=reasoning[:500]
+        )
+    
     def _analyze_content_for_routing(self, content: str, context: Context) -> RoutingResult:
         """Analyze content to determine routing when JSON parsing fails"""
         content_lower = content.lower()
@@ -351,7 +425,7 @@ class RoutingAgent:
             reasoning=f"無効なルート '{invalid_route}' が選択されました。利用可能な分岐先: {self.routing_destinations}。フォールバック先 '{fallback_route}' を使用します。"
         )
     
-    def _create_llm_result(self, routing_result: RoutingResult, success: bool) -> Any:
+    def _create_llm_result(self, routing_result: RoutingResult, success: bool, cache_hit: bool = False) -> Any:
         """Create LLMResult-like object for compatibility"""
         from ..agents.pipeline.llm_pipeline import LLMResult
         
@@ -362,7 +436,8 @@ class RoutingAgent:
                 'agent_name': self.name,
                 'agent_type': 'routing',
                 'model': self.model_name,
-                'temperature': self.temperature
+                'temperature': self.temperature,
+                'cache_hit': cache_hit
             },
             attempts=1
         )
\ No newline at end of file
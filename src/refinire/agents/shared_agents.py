@@ -0,0 +1,199 @@
+"""
+Shared Agents - Registry of reusable helper models and SDK agents
+共有エージェント - 再利用可能な補助モデルとSDKエージェントのレジストリ
+
+Routing and evaluation helpers run the same kind of LLM call over and over.
+Instead of building a model (and its HTTP client) and an agents.Agent per
+helper instance or per call, they fetch them from this registry, keyed by
+model, temperature, instructions and the remaining model options.
+ルーティング・評価の補助エージェントは同種のLLM呼び出しを繰り返し実行します。
+補助インスタンスごと・呼び出しごとにモデル（およびそのHTTPクライアント）と
+agents.Agentを構築する代わりに、モデル・温度・指示・その他のモデルオプションを
+キーとしてこのレジストリから取得します。
+"""
+
+import threading
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from agents import Agent, Model
+
+from ..core.llm import get_llm
+
+
+def _options_key(options: Dict[str, Any]) -> Optional[Tuple[Tuple[str, Any], ...]]:
+    """
+    Hashable key for keyword options, or None if an option is unhashable
+    キーワードオプションのハッシュ可能なキー（ハッシュ不能なオプションがあればNone）
+    """
+    key = tuple(sorted(options.items()))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class SharedAgentRegistry:
+    """
+    Thread-safe cache of models and SDK agents shared across helper agents
+    補助エージェント間で共有されるモデルとSDKエージェントのスレッドセーフなキャッシュ
+    """
+
+    def __init__(self) -> None:
+        self._models: Dict[Hashable, Model] = {}
+        self._agents: Dict[Hashable, Agent] = {}
+        self._lock = threading.Lock()
+
+        # Counters / カウンター
+        self.models_created = 0
+        self.agents_created = 0
+        self.hits = 0
+
+    def get_model(self, model: Optional[str], temperature: float, **options: Any) -> Model:
+        """
+        Get a shared model instance, creating it with get_llm on first use
+        共有モデルインスタンスを取得（初回使用時にget_llmで作成）
+
+        Args:
+            model: Model identifier / モデル識別子
+            temperature: Sampling temperature / サンプリング温度
+            **options: Additional get_llm arguments (e.g. namespace) / get_llmの追加引数（namespaceなど）
+
+        Returns:
+            Model: Model instance / モデルインスタンス
+        """
+        options_key = _options_key(options)
+        if options_key is None:
+            # Unhashable options cannot be shared safely
+            # ハッシュ不能なオプションは安全に共有できない
+            return get_llm(model=model, temperature=temperature, **options)
+        key = (model, temperature, options_key)
+        with self._lock:
+            cached = self._models.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+        created = get_llm(model=model, temperature=temperature, **options)
+        with self._lock:
+            existing = self._models.setdefault(key, created)
+            if existing is created:
+                self.models_created += 1
+            return existing
+
+    def get_agent(
+        self,
+        name: str,
+        instructions: str,
+        model: Optional[str],
+        temperature: float,
+        output_type: Optional[type] = None,
+        **options: Any
+    ) -> Agent:
+        """
+        Get a shared SDK agent for the given model and instructions
+        指定したモデルと指示の共有SDKエージェントを取得
+
+        Args:
+            name: SDK agent name / SDKエージェント名
+            instructions: System instructions / システム指示
+            model: Model identifier / モデル識別子
+            temperature: Sampling temperature / サンプリング温度
+            output_type: Structured output type (None for plain text) / 構造化出力の型（Noneの場合はテキスト）
+            **options: Additional get_llm arguments (e.g. namespace) / get_llmの追加引数（namespaceなど）
+
+        Returns:
+            Agent: SDK agent / SDKエージェント
+        """
+        options_key = _options_key(options)
+        if options_key is None:
+            return self._create_agent(name, instructions, model, temperature, output_type, options)
+        key = (name, instructions, model, temperature, output_type, options_key)
+        with self._lock:
+            cached = self._agents.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+        created = self._create_agent(name, instructions, model, temperature, output_type, options)
+        with self._lock:
+            existing = self._agents.setdefault(key, created)
+            if existing is created:
+                self.agents_created += 1
+            return existing
+
+    def _create_agent(
+        self,
+        name: str,
+        instructions: str,
+        model: Optional[str],
+        temperature: float,
+        output_type: Optional[type],
+        options: Dict[str, Any]
+    ) -> Agent:
+        agent_kwargs: Dict[str, Any] = {
+            "name": name,
+            "instructions": instructions,
+            "model": self.get_model(model, temperature, **options),
+        }
+        if output_type is not None:
+            agent_kwargs["output_type"] = output_type
+        return Agent(**agent_kwargs)
+
+    def clear(self) -> None:
+        """
+        Drop all shared models and agents
+        共有モデルとエージェントをすべて破棄
+        """
+        with self._lock:
+            self._models.clear()
+            self._agents.clear()
+
+    def get_metrics(self) -> Dict[str, int]:
+        """
+        Get registry counters
+        レジストリのカウンターを取得
+
+        Returns:
+            Dict[str, int]: Counters / カウンター
+        """
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "agents": len(self._agents),
+                "models_created": self.models_created,
+                "agents_created": self.agents_created,
+                "hits": self.hits,
+            }
+
+
+# Global shared agent registry
+# グローバル共有エージェントレジストリ
+_shared_agent_registry: Optional[SharedAgentRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_shared_agent_registry() -> SharedAgentRegistry:
+    """
+    Get the global shared agent registry
+    グローバル共有エージェントレジストリを取得
+
+    Returns:
+        SharedAgentRegistry: Global registry / グローバルレジストリ
+    """
+    global _shared_agent_registry
+    if _shared_agent_registry is None:
+        with _registry_lock:
+            if _shared_agent_registry is None:
+                _shared_agent_registry = SharedAgentRegistry()
+    return _shared_agent_registry
+
+
+def set_shared_agent_registry(registry: SharedAgentRegistry) -> None:
+    """
+    Set the global shared agent registry
+    グローバル共有エージェントレジストリを設定
+
+    Args:
+        registry: Registry to use / 使用するレジストリ
+    """
+    global _shared_agent_registry
+    _shared_agent_registry = registry
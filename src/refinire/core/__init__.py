@@ -12,6 +12,7 @@ __version__ = "0.2.0"
 
 # LLM abstraction layer
 from .llm import ProviderType, get_llm, get_available_models, get_available_models_async
+from .composite_model import CompositeModel
 
 # Provider model implementations
 from .anthropic import ClaudeModel
@@ -21,6 +22,22 @@ from .ollama import OllamaModel
 # Tracing and observability
 from .tracing import enable_console_tracing, disable_tracing
 from .trace_registry import TraceRegistry, TraceMetadata, get_global_registry, set_global_registry
+from .trace_retention import RetentionPolicy
+
+# LLM request metrics
+from .metrics import MetricsRegistry, get_metrics_registry, set_metrics_registry
+
+# Routing decision cache
+from .routing_cache import RoutingCache, normalize_routing_content
+
+# Endpoint circuit breakers
+from .circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    RefinireCircuitOpenError,
+    get_circuit_breaker_registry,
+    set_circuit_breaker_registry
+)
 
 # OpenTelemetry tracing (optional, requires openinference-instrumentation)
 try:
@@ -52,6 +69,9 @@ from .message import get_message, DEFAULT_LANGUAGE
 # Prompt management
 from .prompt_store import PromptStore, StoredPrompt, PromptReference, P, detect_system_language, get_default_storage_dir
 
+# Token counting and budgets
+from .tokenizer import Tokenizer, HeuristicTokenizer, WhitespaceTokenizer, TiktokenTokenizer, TokenBudget, get_tokenizer
+
 # Trace context management
 from .trace_context import (
     get_current_trace_context,
@@ -66,6 +86,7 @@ __all__ = [
     "get_llm", 
     "get_available_models", 
     "get_available_models_async",
+    "CompositeModel",
     
     # Provider models
     "ClaudeModel",
@@ -77,9 +98,26 @@ __all__ = [
     "disable_tracing",
     "TraceRegistry", 
     "TraceMetadata", 
+    "RetentionPolicy",
     "get_global_registry", 
     "set_global_registry",
     
+    # Metrics
+    "MetricsRegistry",
+    "get_metrics_registry",
+    "set_metrics_registry",
+    
+    # Routing cache
+    "RoutingCache",
+    "normalize_routing_content",
+    
+    # Circuit breakers
+    "CircuitBreaker",
+    "CircuitBreakerRegistry",
+    "RefinireCircuitOpenError",
+    "get_circuit_breaker_registry",
+    "set_circuit_breaker_registry",
+    
     # OpenTelemetry tracing
     "enable_opentelemetry_tracing",
     "disable_opentelemetry_tracing", 
@@ -99,6 +137,14 @@ __all__ = [
     "detect_system_language",
     "get_default_storage_dir",
     
+    # Token counting
+    "Tokenizer",
+    "HeuristicTokenizer",
+    "WhitespaceTokenizer",
+    "TiktokenTokenizer",
+    "TokenBudget",
+    "get_tokenizer",
+    
     # Trace context management
     "get_current_trace_context",
     "has_active_trace_context",
@@ -0,0 +1,399 @@
+"""
+Circuit Breaker - Fast-fail and health tracking for provider endpoints
+サーキットブレーカー - プロバイダーエンドポイントの即時失敗と健全性追跡
+
+Each endpoint (e.g. an OpenAI-compatible base URL such as a local Ollama
+server) gets a breaker with three states:
+- closed: requests flow; consecutive endpoint failures are counted
+- open: requests fail immediately with RefinireCircuitOpenError until the
+  recovery timeout has passed
+- half_open: a limited number of trial requests probe the endpoint; success
+  closes the circuit, failure opens it again
+各エンドポイント（ローカルOllamaサーバーなどのOpenAI互換ベースURL）は3つの
+状態を持つブレーカーを持ちます：
+- closed: リクエストを通し、エンドポイントの連続失敗を数える
+- open: 回復タイムアウトが経過するまでRefinireCircuitOpenErrorで即座に失敗する
+- half_open: 限られた数の試行リクエストでエンドポイントを調べ、成功すれば閉じ、
+  失敗すれば再び開く
+
+Only errors that indicate an unhealthy endpoint count as failures: network
+errors (connection, timeout) and server-side API errors (5xx). Client errors
+such as authentication or rate limiting do not trip the breaker.
+エンドポイントの不健全を示すエラーのみが失敗として数えられます：ネットワーク
+エラー（接続、タイムアウト）とサーバー側のAPIエラー（5xx）。認証やレート制限
+などのクライアントエラーではブレーカーは作動しません。
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .exceptions import RefinireAPIError, RefinireConnectionError, RefinireNetworkError
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class RefinireCircuitOpenError(RefinireConnectionError):
+    """
+    Request rejected because the endpoint's circuit is open
+    エンドポイントのサーキットが開いているためリクエストが拒否された
+
+    A RefinireConnectionError, so existing handlers for connection failures
+    also handle fast-failed requests.
+    RefinireConnectionErrorのサブクラスのため、接続失敗の既存ハンドラーで
+    即時失敗したリクエストも処理されます。
+    """
+
+    def __init__(
+        self,
+        message: str,
+        details: Optional[Dict[str, Any]] = None,
+        provider: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        retry_after: Optional[float] = None
+    ):
+        super().__init__(message, details, provider)
+        self.endpoint = endpoint
+        self.retry_after = retry_after  # Seconds until a trial request is allowed
+
+
+def is_endpoint_failure(exc: BaseException) -> bool:
+    """
+    Whether an error indicates an unhealthy endpoint
+    エラーがエンドポイントの不健全を示すかどうか
+
+    Args:
+        exc: Error raised by a request (preferably a mapped Refinire error) / リクエストで発生したエラー（マッピング済みのRefinireエラーが望ましい）
+
+    Returns:
+        bool: True for network errors and server-side API errors / ネットワークエラーとサーバー側APIエラーの場合True
+    """
+    if isinstance(exc, RefinireCircuitOpenError):
+        return False
+    if isinstance(exc, RefinireNetworkError):
+        return True
+    if isinstance(exc, RefinireAPIError):
+        return exc.status_code is None or exc.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """
+    Thread-safe closed/open/half-open circuit breaker for one endpoint
+    1つのエンドポイントのスレッドセーフなclosed/open/half-openサーキットブレーカー
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        provider: Optional[str] = None
+    ):
+        """
+        Initialize circuit breaker
+        サーキットブレーカーを初期化
+
+        Args:
+            endpoint: Endpoint identifier (e.g. base URL) / エンドポイント識別子（ベースURLなど）
+            failure_threshold: Consecutive failures that open the circuit / サーキットを開く連続失敗数
+            recovery_timeout: Seconds the circuit stays open before trial requests / 試行リクエストまでサーキットが開いている秒数
+            half_open_max_calls: Concurrent trial requests allowed while half-open / half-open中に許可する同時試行リクエスト数
+            provider: Provider name reported in errors / エラーで報告するプロバイダー名
+        """
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.provider = provider
+
+        self._state = CLOSED
+        self._opened_at: Optional[float] = None
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+        # Counters / カウンター
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.total_successes = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        """Current state ("closed", "open" or "half_open") / 現在の状態"""
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a request may be sent, reserving a trial slot when half-open
+        リクエストを送信できるか確認（half-open時は試行枠を確保）
+
+        Returns:
+            bool: True if the request may be sent / リクエストを送信できる場合True
+        """
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def before_call(self) -> None:
+        """
+        Raise RefinireCircuitOpenError unless a request may be sent
+        リクエストを送信できない場合はRefinireCircuitOpenErrorを発生
+
+        Raises:
+            RefinireCircuitOpenError: If the circuit is open / サーキットが開いている場合
+        """
+        if self.allow_request():
+            return
+        retry_after = self.retry_after()
+        raise RefinireCircuitOpenError(
+            message=f"Circuit open for {self.endpoint} after {self.consecutive_failures} consecutive failures",
+            details={"endpoint": self.endpoint, "last_error": self.last_error},
+            provider=self.provider,
+            endpoint=self.endpoint,
+            retry_after=retry_after
+        )
+
+    def record_success(self) -> None:
+        """
+        Record a successful request (closes a half-open circuit)
+        成功したリクエストを記録（half-openのサーキットを閉じる）
+        """
+        with self._lock:
+            self.total_successes += 1
+            self.consecutive_failures = 0
+            self._state = CLOSED
+            self._opened_at = None
+            self._half_open_calls = 0
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        """
+        Record an endpoint failure, opening the circuit at the threshold
+        エンドポイントの失敗を記録（閾値でサーキットを開く）
+
+        Args:
+            error: Error that caused the failure / 失敗の原因となったエラー
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self.total_failures += 1
+            self.consecutive_failures += 1
+            if error is not None:
+                self.last_error = str(error)
+            if state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = now
+                self._half_open_calls = 0
+
+    def release(self) -> None:
+        """
+        Give back the trial slot of a request that ended without an outcome (e.g. cancelled)
+        結果なしで終了したリクエスト（キャンセルなど）の試行枠を返却
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_error(self, error: BaseException) -> None:
+        """
+        Record the outcome of a request that raised error
+        エラーを発生させたリクエストの結果を記録
+
+        Endpoint failures count against the circuit; other errors mean the
+        endpoint answered, so they count as success.
+        エンドポイントの失敗はサーキットに計上され、その他のエラーはエンドポイントが
+        応答したことを意味するため成功として扱われます。
+        """
+        if is_endpoint_failure(error):
+            self.record_failure(error)
+        else:
+            self.record_success()
+
+    def retry_after(self) -> Optional[float]:
+        """Seconds until a trial request is allowed (None unless open) / 試行リクエストが許可されるまでの秒数（open以外はNone）"""
+        with self._lock:
+            if self._current_state(time.monotonic()) != OPEN or self._opened_at is None:
+                return None
+            return max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+
+    def reset(self) -> None:
+        """
+        Close the circuit and clear failure counts
+        サーキットを閉じて失敗数をクリア
+        """
+        with self._lock:
+            self._state = CLOSED
+            self._opened_at = None
+            self._half_open_calls = 0
+            self.consecutive_failures = 0
+
+    def get_health(self) -> Dict[str, Any]:
+        """
+        Get breaker state and counters
+        ブレーカーの状態とカウンターを取得
+
+        Returns:
+            Dict[str, Any]: Health information / 健全性情報
+        """
+        retry_after = self.retry_after()
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            return {
+                "endpoint": self.endpoint,
+                "state": state,
+                "healthy": state != OPEN,
+                "consecutive_failures": self.consecutive_failures,
+                "total_failures": self.total_failures,
+                "total_successes": self.total_successes,
+                "rejected": self.rejected,
+                "retry_after": retry_after,
+                "last_error": self.last_error,
+            }
+
+    def _current_state(self, now: float) -> str:
+        """State after applying the recovery timeout (lock held) / 回復タイムアウト適用後の状態（ロック保持中）"""
+        if self._state == OPEN and self._opened_at is not None and now - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+
+class CircuitBreakerRegistry:
+    """
+    Per-endpoint circuit breakers sharing one configuration
+    1つの設定を共有するエンドポイントごとのサーキットブレーカー
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, half_open_max_calls: int = 1):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open a circuit / サーキットを開く連続失敗数
+            recovery_timeout: Seconds a circuit stays open before trial requests / 試行リクエストまでサーキットが開いている秒数
+            half_open_max_calls: Concurrent trial requests allowed while half-open / half-open中に許可する同時試行リクエスト数
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str, provider: Optional[str] = None) -> CircuitBreaker:
+        """
+        Get the breaker for an endpoint, creating it on first use
+        エンドポイントのブレーカーを取得（初回使用時に作成）
+
+        Args:
+            endpoint: Endpoint identifier / エンドポイント識別子
+            provider: Provider name reported in errors / エラーで報告するプロバイダー名
+
+        Returns:
+            CircuitBreaker: Breaker for the endpoint / エンドポイントのブレーカー
+        """
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    endpoint,
+                    failure_threshold=self.failure_threshold,
+                    recovery_timeout=self.recovery_timeout,
+                    half_open_max_calls=self.half_open_max_calls,
+                    provider=provider
+                )
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def get_health(self) -> Dict[str, Any]:
+        """
+        Get health of all endpoints, e.g. for readiness probes
+        すべてのエンドポイントの健全性を取得（レディネスプローブなど）
+
+        Returns:
+            Dict[str, Any]: "healthy" (no open circuit) and per-endpoint details / "healthy"（開いたサーキットなし）とエンドポイントごとの詳細
+        """
+        with self._lock:
+            breakers = list(self._breakers.values())
+        endpoints = {breaker.endpoint: breaker.get_health() for breaker in breakers}
+        return {
+            "healthy": all(health["healthy"] for health in endpoints.values()),
+            "endpoints": endpoints,
+        }
+
+    def reset(self) -> None:
+        """
+        Close every circuit
+        すべてのサーキットを閉じる
+        """
+        with self._lock:
+            breakers = list(self._breakers.values())
+        for breaker in breakers:
+            breaker.reset()
+
+
+# Global circuit breaker registry
+# グローバルサーキットブレーカーレジストリ
+_circuit_breaker_registry: Optional[CircuitBreakerRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_circuit_breaker_registry() -> CircuitBreakerRegistry:
+    """
+    Get the global circuit breaker registry
+    グローバルサーキットブレーカーレジストリを取得
+
+    Returns:
+        CircuitBreakerRegistry: Global registry / グローバルレジストリ
+    """
+    global _circuit_breaker_registry
+    if _circuit_breaker_registry is None:
+        with _registry_lock:
+            if _circuit_breaker_registry is None:
+                _circuit_breaker_registry = CircuitBreakerRegistry()
+    return _circuit_breaker_registry
+
+
+def set_circuit_breaker_registry(registry: CircuitBreakerRegistry) -> None:
+    """
+    Set the global circuit breaker registry
+    グローバルサーキットブレーカーレジストリを設定
+
+    Args:
+        registry: Registry to use / 使用するレジストリ
+    """
+    global _circuit_breaker_registry
+    _circuit_breaker_registry = registry
+
+
+def resolve_endpoint(model: Any, fallback: str) -> str:
+    """
+    Endpoint identifier for a model: its client's base URL, or fallback
+    モデルのエンドポイント識別子：クライアントのベースURL、またはフォールバック
+
+    Args:
+        model: Model instance / モデルインスタンス
+        fallback: Identifier used when no base URL is available / ベースURLがない場合の識別子
+
+    Returns:
+        str: Endpoint identifier / エンドポイント識別子
+    """
+    client = getattr(model, "_client", None) or getattr(model, "openai_client", None)
+    base_url = getattr(client, "base_url", None)
+    if isinstance(base_url, (str, httpx.URL)) and str(base_url):
+        return str(base_url).rstrip("/")
+    return fallback
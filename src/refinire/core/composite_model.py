@@ -0,0 +1,253 @@
+"""
+Composite Model - Provider failover and hedged requests across models
+複合モデル - モデル間のプロバイダーフェイルオーバーとヘッジリクエスト
+
+A CompositeModel wraps several provider models behind the agents SDK Model
+interface. With the "failover" strategy, models are tried in order and the
+next one is used when a call fails. With the "hedge" strategy, a second
+model is also called when the first has not answered within its observed
+p95 latency, and the first successful answer wins. Models that fail
+repeatedly are skipped while their circuit breaker is open.
+CompositeModelは複数のプロバイダーモデルをagents SDKのModelインターフェースの
+背後にまとめます。"failover"戦略ではモデルを順に試し、呼び出しが失敗すると次の
+モデルを使用します。"hedge"戦略では、最初のモデルが観測されたp95レイテンシ内に
+応答しない場合に次のモデルも呼び出し、最初に成功した応答を採用します。失敗を
+繰り返すモデルはサーキットブレーカーが開いている間スキップされます。
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Literal, Optional, Sequence, Tuple
+
+from agents import Model
+
+from .circuit_breaker import OPEN, CircuitBreaker
+
+
+StrategyType = Literal["failover", "hedge"]
+
+
+class _ModelHealth:
+    """
+    Latency tracking and circuit breaker for one member model
+    1つのメンバーモデルのレイテンシ追跡とサーキットブレーカー
+    """
+
+    def __init__(self, label: str, latency_window: int, failure_threshold: int, cooldown: float):
+        self.latencies: Deque[float] = deque(maxlen=latency_window)
+        self.breaker = CircuitBreaker(label, failure_threshold=failure_threshold, recovery_timeout=cooldown)
+        self.hedge_wins = 0
+
+
+class CompositeModel(Model):
+    """
+    Model delegating to several provider models with failover or hedging
+    フェイルオーバーまたはヘッジで複数のプロバイダーモデルに委譲するモデル
+    """
+
+    def __init__(
+        self,
+        models: Sequence[Tuple[str, Model]],
+        strategy: StrategyType = "failover",
+        hedge_delay: Optional[float] = None,
+        hedge_percentile: float = 0.95,
+        default_hedge_delay: float = 2.0,
+        min_hedge_samples: int = 10,
+        latency_window: int = 200,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0
+    ):
+        """
+        Initialize composite model
+        複合モデルを初期化
+
+        Args:
+            models: (label, model) pairs in priority order / 優先順の（ラベル, モデル）ペア
+            strategy: "failover" or "hedge" / "failover"または"hedge"
+            hedge_delay: Fixed hedge delay in seconds (None uses the latency percentile) / 固定のヘッジ遅延秒数（Noneでレイテンシのパーセンタイルを使用）
+            hedge_percentile: Latency percentile used as hedge delay / ヘッジ遅延に使うレイテンシのパーセンタイル
+            default_hedge_delay: Hedge delay before enough latencies are observed / 十分なレイテンシが観測されるまでのヘッジ遅延
+            min_hedge_samples: Latencies required before the percentile is used / パーセンタイル使用前に必要なレイテンシ数
+            latency_window: Number of recent latencies kept per model / モデルごとに保持する最近のレイテンシ数
+            failure_threshold: Consecutive failures that open a model's circuit / モデルのサーキットを開く連続失敗数
+            cooldown: Seconds an open circuit skips the model / 開いたサーキットがモデルをスキップする秒数
+        """
+        if not models:
+            raise ValueError("CompositeModel requires at least one model")
+        if strategy not in ("failover", "hedge"):
+            raise ValueError(f"Unknown strategy: {strategy}. Must be 'failover' or 'hedge'")
+        self.models: List[Tuple[str, Model]] = list(models)
+        self.strategy = strategy
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_samples = min_hedge_samples
+        # Primary label, used where a model name is expected
+        # モデル名が期待される箇所で使われる主ラベル
+        self.model = self.models[0][0]
+
+        self._health: Dict[str, _ModelHealth] = {
+            label: _ModelHealth(label, latency_window, failure_threshold, cooldown) for label, _ in self.models
+        }
+        self._lock = threading.Lock()
+        self.hedges_launched = 0
+
+    async def get_response(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Get a response from the member models using the configured strategy
+        設定された戦略でメンバーモデルから応答を取得
+        """
+        candidates = self._candidates()
+        if self.strategy == "hedge" and len(candidates) > 1:
+            return await self._hedged_response(candidates, args, kwargs)
+
+        last_error: Optional[Exception] = None
+        for label, model in candidates:
+            started = time.monotonic()
+            try:
+                response = await model.get_response(*args, **kwargs)
+            except Exception as e:
+                self._record_failure(label)
+                last_error = e
+                continue
+            self._record_success(label, time.monotonic() - started)
+            return response
+        raise last_error or RuntimeError("CompositeModel has no model to call")
+
+    async def stream_response(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        """
+        Stream from the first model that starts streaming (no hedging)
+        ストリーミングを開始できた最初のモデルからストリーミング（ヘッジなし）
+
+        Failover only happens before the first event; once events were
+        yielded, an error is raised to the caller.
+        フェイルオーバーは最初のイベントの前にのみ行われ、イベントを返した後の
+        エラーは呼び出し元に送出されます。
+        """
+        last_error: Optional[Exception] = None
+        for label, model in self._candidates():
+            started = time.monotonic()
+            streamed = False
+            try:
+                async for event in model.stream_response(*args, **kwargs):
+                    streamed = True
+                    yield event
+            except Exception as e:
+                self._record_failure(label)
+                if streamed:
+                    raise
+                last_error = e
+                continue
+            self._record_success(label, time.monotonic() - started)
+            return
+        raise last_error or RuntimeError("CompositeModel has no model to call")
+
+    async def _hedged_response(
+        self,
+        candidates: List[Tuple[str, Model]],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any]
+    ) -> Any:
+        """
+        Launch the next model whenever the running ones fail or exceed the hedge delay
+        実行中のモデルが失敗またはヘッジ遅延を超えるたびに次のモデルを起動
+        """
+        pending: Dict[asyncio.Task[Any], Tuple[str, float]] = {}
+        remaining = list(candidates)
+        last_error: Optional[BaseException] = None
+
+        def launch() -> None:
+            label, model = remaining.pop(0)
+            task = asyncio.ensure_future(model.get_response(*args, **kwargs))
+            pending[task] = (label, time.monotonic())
+
+        launch()
+        try:
+            while pending:
+                # Wait for the hedge delay of the most recently launched model
+                # 最後に起動したモデルのヘッジ遅延だけ待機
+                newest_label = list(pending.values())[-1][0]
+                timeout = self._hedge_delay_for(newest_label) if remaining else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    with self._lock:
+                        self.hedges_launched += 1
+                    launch()
+                    continue
+                for task in done:
+                    label, started = pending.pop(task)
+                    if task.exception() is None:
+                        self._record_success(label, time.monotonic() - started)
+                        if label != candidates[0][0]:
+                            with self._lock:
+                                self._health[label].hedge_wins += 1
+                        return task.result()
+                    self._record_failure(label)
+                    last_error = task.exception()
+                if remaining and not pending:
+                    launch()
+        finally:
+            # Losing requests are cancelled, not counted as failures
+            # 敗れたリクエストはキャンセルし、失敗として数えない
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        raise last_error or RuntimeError("CompositeModel has no model to call")
+
+    def _hedge_delay_for(self, label: str) -> float:
+        """Hedge delay for a model: fixed, or its observed latency percentile / モデルのヘッジ遅延：固定値または観測レイテンシのパーセンタイル"""
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        with self._lock:
+            latencies = sorted(self._health[label].latencies)
+        if len(latencies) < self.min_hedge_samples:
+            return self.default_hedge_delay
+        index = min(len(latencies) - 1, int(self.hedge_percentile * len(latencies)))
+        return latencies[index]
+
+    def _candidates(self) -> List[Tuple[str, Model]]:
+        """
+        Models whose circuit is not open, in priority order (all models if none)
+        サーキットが開いていないモデル（優先順、該当なしの場合はすべてのモデル）
+
+        After the cooldown a circuit is half-open, so the model gets another chance.
+        クールダウン後のサーキットはhalf-openのため、モデルは再試行の機会を得ます。
+        """
+        healthy = [(label, model) for label, model in self.models if self._health[label].breaker.state != OPEN]
+        return healthy or list(self.models)
+
+    def _record_success(self, label: str, latency: float) -> None:
+        health = self._health[label]
+        with self._lock:
+            health.latencies.append(latency)
+        health.breaker.record_success()
+
+    def _record_failure(self, label: str) -> None:
+        # Any error fails over, so every error counts against the member
+        # どのエラーでもフェイルオーバーするため、すべてのエラーをメンバーに計上
+        self._health[label].breaker.record_failure()
+
+    def get_health(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get health and latency statistics per member model
+        メンバーモデルごとの健全性とレイテンシの統計を取得
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Statistics keyed by model label / モデルラベルをキーとする統計
+        """
+        health = {}
+        for label, stats in self._health.items():
+            breaker = stats.breaker.get_health()
+            health[label] = {
+                "healthy": breaker["healthy"],
+                "state": breaker["state"],
+                "requests": breaker["total_successes"] + breaker["total_failures"],
+                "failures": breaker["total_failures"],
+                "consecutive_failures": breaker["consecutive_failures"],
+                "hedge_wins": stats.hedge_wins,
+                "hedge_delay": self._hedge_delay_for(label),
+            }
+        return health
@@ -1,4 +1,4 @@
-﻿from typing import Literal, Optional, Any, List
+﻿from typing import Literal, Optional, Any, List, Union
 from agents import Model, OpenAIChatCompletionsModel, set_tracing_disabled
 # English: Import OpenAI client
 # 日本語: OpenAI クライアントをインポート
@@ -20,6 +20,7 @@ from .anthropic import ClaudeModel
 from .gemini import GeminiModel
 from .ollama import OllamaModel
 from .model_parser import parse_model_id, detect_provider_from_environment, get_provider_config
+from .composite_model import CompositeModel, StrategyType
 
 # Define the provider type hint
 ProviderType = Literal["openai", "google", "anthropic", "ollama", "azure", "groq", "lmstudio", "openrouter"]
@@ -52,13 +53,14 @@ def _get_env_var(key: str, default: str = "", namespace: Optional[str] = None) -
 
 
 def get_llm(
-    model: Optional[str] = None,
+    model: Optional[Union[str, List[str]]] = None,
     provider: Optional[ProviderType] = None,
     temperature: float = 0.3,
     api_key: Optional[str] = None,
     base_url: Optional[str] = None,
     thinking: bool = False,
     namespace: Optional[str] = None,
+    strategy: StrategyType = "failover",
     **kwargs: Any,
 ) -> Model:
     """
@@ -73,8 +75,10 @@ def get_llm(
     Args:
         provider (ProviderType): The LLM provider ("openai", "google", "anthropic", "ollama"). Defaults to "openai".
             LLM プロバイダー ("openai", "google", "anthropic", "ollama")。デフォルトは "openai"。
-        model (Optional[str]): The specific model name for the provider. If None, uses the default for the provider.
+        model (Optional[Union[str, List[str]]]): The specific model name for the provider. If None, uses the default for the provider.
+            A list of model IDs (e.g. ["openai://gpt-4o-mini", "anthropic://claude-3-5-haiku-latest"]) returns a CompositeModel.
             プロバイダー固有のモデル名。None の場合、プロバイダーのデフォルトを使用します。
+            モデルIDのリスト（例: ["openai://gpt-4o-mini", "anthropic://claude-3-5-haiku-latest"]）の場合はCompositeModelを返します。
         temperature (float): Sampling temperature. Defaults to 0.3.
             サンプリング温度。デフォルトは 0.3。
         api_key (Optional[str]): API key for the provider, if required.
@@ -85,6 +89,8 @@ def get_llm(
             Claude モデルの思考モードを有効にするか。デフォルトは False。
         namespace (Optional[str]): Environment variable namespace for oneenv. Defaults to None (empty namespace).
             oneenv用の環境変数名前空間。デフォルトは None (空の名前空間)。
+        strategy (StrategyType): "failover" or "hedge" when model is a list. Defaults to "failover".
+            model がリストの場合の戦略 ("failover" または "hedge")。デフォルトは "failover"。
         tracing (bool): Whether to enable tracing for the Agents SDK. Defaults to False.
             Agents SDK のトレーシングを有効化するか。デフォルトは False。
         **kwargs (Any): Additional keyword arguments to pass to the model constructor.
@@ -102,6 +108,19 @@ def get_llm(
     # 日本語: OpenAI Agents SDK のトレーシングを設定する
     # set_tracing_disabled(not tracing)
 
+    if isinstance(model, (list, tuple)):
+        # English: Build one model per ID; each ID carries its own provider
+        # 日本語: ID ごとにモデルを構築する。各 ID は自身のプロバイダーを持つ
+        if provider is not None or api_key or base_url:
+            raise ValueError(
+                "provider, api_key and base_url cannot be shared across a model list; "
+                "use provider prefixes and provider environment variables instead"
+            )
+        members = [
+            (model_id, get_llm(model=model_id, temperature=temperature, thinking=thinking, namespace=namespace, **kwargs))
+            for model_id in model
+        ]
+        return CompositeModel(members, strategy=strategy)
 
     if model is None:
         model = _get_env_var("REFINIRE_DEFAULT_LLM_MODEL", "gpt-4o-mini", namespace)
@@ -0,0 +1,519 @@
+"""
+Metrics - In-process LLM latency, token and cost metrics
+メトリクス - プロセス内のLLMレイテンシ・トークン・コストのメトリクス
+
+Agents record one observation per LLM request into a MetricsRegistry,
+grouped by model and agent. The registry can be read as a snapshot,
+rendered in the Prometheus text exposition format, or mirrored to
+OpenTelemetry metrics when opentelemetry-api is installed.
+エージェントはLLMリクエストごとに1件の観測値をモデル・エージェント別に
+MetricsRegistryへ記録します。レジストリはスナップショットとして読み取るか、
+Prometheusテキスト形式で出力するか、opentelemetry-apiがインストールされている
+場合はOpenTelemetryメトリクスに反映できます。
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from opentelemetry import metrics as otel_metrics
+    OPENTELEMETRY_METRICS_AVAILABLE = True
+except ImportError:
+    otel_metrics = None  # type: ignore
+    OPENTELEMETRY_METRICS_AVAILABLE = False
+
+
+# Histogram bucket upper bounds in seconds
+# ヒストグラムのバケット上限（秒）
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+# USD per one million (prompt, completion) tokens, matched by longest model prefix
+# 100万トークンあたりのUSD（プロンプト, 補完）。最長のモデル名前方一致で照合
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "o3-mini": (1.10, 4.40),
+    "o4-mini": (1.10, 4.40),
+    "o3": (2.00, 8.00),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-3-7-sonnet": (3.00, 15.00),
+    "claude-sonnet-4": (3.00, 15.00),
+    "claude-opus-4": (15.00, 75.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+_pricing_lock = threading.Lock()
+
+
+def set_model_pricing(model_prefix: str, prompt_per_million: float, completion_per_million: float) -> None:
+    """
+    Set or override the price of a model
+    モデルの料金を設定または上書き
+
+    Args:
+        model_prefix: Model name or prefix / モデル名またはその接頭辞
+        prompt_per_million: USD per million prompt tokens / プロンプト100万トークンあたりのUSD
+        completion_per_million: USD per million completion tokens / 補完100万トークンあたりのUSD
+    """
+    with _pricing_lock:
+        MODEL_PRICING[model_prefix] = (prompt_per_million, completion_per_million)
+
+
+def estimate_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """
+    Estimate the cost of a request in USD
+    リクエストのコストをUSDで推定
+
+    Args:
+        model: Model name, optionally prefixed by provider ("openai://gpt-4o") / モデル名
+        prompt_tokens: Prompt tokens / プロンプトトークン数
+        completion_tokens: Completion tokens / 補完トークン数
+
+    Returns:
+        Optional[float]: Estimated cost, or None if the model has no price / 推定コスト（料金不明の場合None）
+    """
+    if not model:
+        return None
+    name = model.split("://", 1)[-1].split(":", 1)[0].lower()
+    with _pricing_lock:
+        matches = [prefix for prefix in MODEL_PRICING if name.startswith(prefix)]
+        if not matches:
+            return None
+        prompt_price, completion_price = MODEL_PRICING[max(matches, key=len)]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def extract_usage(result: Any) -> Optional[Dict[str, int]]:
+    """
+    Extract token usage from an agents SDK run result
+    agents SDKの実行結果からトークン使用量を抽出
+
+    Args:
+        result: Result returned by Runner.run / Runner.runが返した結果
+
+    Returns:
+        Optional[Dict[str, int]]: prompt/completion/total tokens, or None if unavailable / トークン数（取得できない場合None）
+    """
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    prompt_tokens = getattr(usage, "input_tokens", None)
+    completion_tokens = getattr(usage, "output_tokens", None)
+    if not isinstance(prompt_tokens, int) or not isinstance(completion_tokens, int):
+        return None
+    total_tokens = getattr(usage, "total_tokens", None)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": total_tokens if isinstance(total_tokens, int) else prompt_tokens + completion_tokens,
+    }
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram in the Prometheus layout
+    Prometheus形式の固定バケットヒストグラム
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # Last slot counts values above the largest bucket (+Inf)
+        # 最後のスロットは最大バケットを超える値（+Inf）を数える
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """
+        Cumulative counts keyed by the "le" label
+        "le"ラベルをキーとする累積カウント
+        """
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            result.append((_format_number(bound), running))
+        result.append(("+Inf", running + self.counts[-1]))
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "average": self.sum / self.count if self.count else None,
+            "buckets": dict(self.cumulative()),
+        }
+
+
+class _LLMStats:
+    """
+    Counters and histograms for one (model, agent) pair
+    1つの(モデル, エージェント)の組のカウンターとヒストグラム
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.latency = Histogram(buckets)
+        self.time_to_first_token = Histogram(buckets)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": self.cost_usd,
+            "latency_seconds": self.latency.snapshot(),
+            "time_to_first_token_seconds": self.time_to_first_token.snapshot(),
+        }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of LLM request metrics
+    LLMリクエストメトリクスのスレッドセーフなレジストリ
+    """
+
+    def __init__(self, latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        """
+        Args:
+            latency_buckets: Histogram bucket upper bounds in seconds / ヒストグラムのバケット上限（秒）
+        """
+        self.latency_buckets = tuple(latency_buckets)
+        self._stats: Dict[Tuple[str, str], _LLMStats] = {}
+        self._lock = threading.Lock()
+        self._otel_instruments: Optional[Dict[str, Any]] = None
+
+    def _group(self, model: Optional[str], agent: Optional[str]) -> _LLMStats:
+        key = (model or "unknown", agent or "unknown")
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _LLMStats(self.latency_buckets)
+        return stats
+
+    def record_request(
+        self,
+        model: Optional[str],
+        agent: Optional[str],
+        latency: float,
+        success: bool = True,
+        time_to_first_token: Optional[float] = None,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cost_usd: Optional[float] = None,
+        retries: int = 0
+    ) -> Optional[float]:
+        """
+        Record one LLM request
+        1件のLLMリクエストを記録
+
+        Args:
+            model: Model name / モデル名
+            agent: Agent name / エージェント名
+            latency: Total request time in seconds / リクエスト全体の時間（秒）
+            success: Whether the request succeeded / リクエストが成功したか
+            time_to_first_token: Seconds until the first streamed token / 最初のストリームトークンまでの秒数
+            prompt_tokens: Prompt tokens used / 使用したプロンプトトークン数
+            completion_tokens: Completion tokens used / 使用した補完トークン数
+            cost_usd: Cost in USD (None estimates it from MODEL_PRICING) / USDのコスト（NoneでMODEL_PRICINGから推定）
+            retries: Retries made before the final attempt / 最終試行前のリトライ数
+
+        Returns:
+            Optional[float]: Recorded cost in USD, if known / 記録したUSDのコスト（判明している場合）
+        """
+        if cost_usd is None:
+            cost_usd = estimate_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            stats = self._group(model, agent)
+            stats.requests += 1
+            if not success:
+                stats.errors += 1
+            stats.retries += retries
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            if cost_usd:
+                stats.cost_usd += cost_usd
+            stats.latency.observe(latency)
+            if time_to_first_token is not None:
+                stats.time_to_first_token.observe(time_to_first_token)
+            instruments = self._otel_instruments
+        if instruments is not None:
+            self._record_opentelemetry(
+                instruments, model, agent, latency, success, time_to_first_token,
+                prompt_tokens, completion_tokens, cost_usd, retries
+            )
+        return cost_usd
+
+    def record_cache_hit(self, model: Optional[str], agent: Optional[str]) -> None:
+        """
+        Record a request answered from a cache without calling the LLM
+        LLMを呼ばずにキャッシュから応答したリクエストを記録
+        """
+        with self._lock:
+            self._group(model, agent).cache_hits += 1
+            instruments = self._otel_instruments
+        if instruments is not None:
+            instruments["cache_hits"].add(1, _attributes(model, agent))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get all metrics keyed by "model/agent"
+        "モデル/エージェント"をキーとする全メトリクスを取得
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Metrics per model and agent / モデル・エージェント別のメトリクス
+        """
+        with self._lock:
+            return {
+                f"{model}/{agent}": dict(stats.snapshot(), model=model, agent=agent)
+                for (model, agent), stats in self._stats.items()
+            }
+
+    def reset(self) -> None:
+        """Clear all recorded metrics / 記録された全メトリクスをクリア"""
+        with self._lock:
+            self._stats.clear()
+
+    def to_prometheus(self, prefix: str = "refinire_llm") -> str:
+        """
+        Render metrics in the Prometheus text exposition format
+        メトリクスをPrometheusテキスト形式で出力
+
+        Args:
+            prefix: Metric name prefix / メトリクス名の接頭辞
+
+        Returns:
+            str: Exposition text / 出力テキスト
+        """
+        with self._lock:
+            groups = [(model, agent, stats) for (model, agent), stats in sorted(self._stats.items())]
+            lines: List[str] = []
+
+            def counter(name: str, help_text: str, value_of: Callable[[_LLMStats], Iterable[Tuple[Dict[str, str], float]]]) -> None:
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                for model, agent, stats in groups:
+                    for extra, value in value_of(stats):
+                        labels = _labels(model=model, agent=agent, **extra)
+                        lines.append(f"{prefix}_{name}{labels} {_format_number(value)}")
+
+            def histogram(name: str, help_text: str, histogram_of: Callable[[_LLMStats], Histogram]) -> None:
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+                for model, agent, stats in groups:
+                    hist = histogram_of(stats)
+                    for bound, count in hist.cumulative():
+                        lines.append(f"{prefix}_{name}_bucket{_labels(model=model, agent=agent, le=bound)} {count}")
+                    lines.append(f"{prefix}_{name}_sum{_labels(model=model, agent=agent)} {_format_number(hist.sum)}")
+                    lines.append(f"{prefix}_{name}_count{_labels(model=model, agent=agent)} {hist.count}")
+
+            counter("requests_total", "LLM requests by outcome.",
+                    lambda s: [({"status": "success"}, s.requests - s.errors), ({"status": "error"}, s.errors)])
+            counter("tokens_total", "Tokens used by type.",
+                    lambda s: [({"type": "prompt"}, s.prompt_tokens), ({"type": "completion"}, s.completion_tokens)])
+            counter("cost_usd_total", "Estimated cost in USD.", lambda s: [({}, s.cost_usd)])
+            counter("retries_total", "Retried LLM requests.", lambda s: [({}, s.retries)])
+            counter("cache_hits_total", "Requests answered from a cache.", lambda s: [({}, s.cache_hits)])
+            histogram("request_duration_seconds", "Total LLM request latency.", lambda s: s.latency)
+            histogram("time_to_first_token_seconds", "Latency until the first streamed token.",
+                      lambda s: s.time_to_first_token)
+        return "\n".join(lines) + "\n"
+
+    def enable_opentelemetry(self, meter: Any = None) -> bool:
+        """
+        Mirror recorded metrics to OpenTelemetry instruments
+        記録されたメトリクスをOpenTelemetryの計器に反映
+
+        Args:
+            meter: OpenTelemetry Meter (None uses the global meter provider) / OpenTelemetryのMeter（Noneでグローバルプロバイダー）
+
+        Returns:
+            bool: True if enabled, False if opentelemetry-api is not installed / 有効化した場合True
+        """
+        if meter is None:
+            if not OPENTELEMETRY_METRICS_AVAILABLE:
+                return False
+            meter = otel_metrics.get_meter("refinire")
+        instruments = {
+            "requests": meter.create_counter("refinire.llm.requests", unit="1", description="LLM requests"),
+            "tokens": meter.create_counter("refinire.llm.tokens", unit="1", description="Tokens used"),
+            "cost": meter.create_counter("refinire.llm.cost", unit="USD", description="Estimated cost"),
+            "retries": meter.create_counter("refinire.llm.retries", unit="1", description="Retried requests"),
+            "cache_hits": meter.create_counter("refinire.llm.cache_hits", unit="1", description="Cache hits"),
+            "latency": meter.create_histogram("refinire.llm.duration", unit="s", description="Request latency"),
+            "ttft": meter.create_histogram(
+                "refinire.llm.time_to_first_token", unit="s", description="Latency until the first token"
+            ),
+        }
+        with self._lock:
+            self._otel_instruments = instruments
+        return True
+
+    def disable_opentelemetry(self) -> None:
+        """Stop mirroring metrics to OpenTelemetry / OpenTelemetryへの反映を停止"""
+        with self._lock:
+            self._otel_instruments = None
+
+    @staticmethod
+    def _record_opentelemetry(
+        instruments: Dict[str, Any], model: Optional[str], agent: Optional[str], latency: float, success: bool,
+        time_to_first_token: Optional[float], prompt_tokens: int, completion_tokens: int,
+        cost_usd: Optional[float], retries: int
+    ) -> None:
+        attributes = _attributes(model, agent)
+        try:
+            instruments["requests"].add(1, dict(attributes, status="success" if success else "error"))
+            if prompt_tokens:
+                instruments["tokens"].add(prompt_tokens, dict(attributes, type="prompt"))
+            if completion_tokens:
+                instruments["tokens"].add(completion_tokens, dict(attributes, type="completion"))
+            if cost_usd:
+                instruments["cost"].add(cost_usd, attributes)
+            if retries:
+                instruments["retries"].add(retries, attributes)
+            instruments["latency"].record(latency, attributes)
+            if time_to_first_token is not None:
+                instruments["ttft"].record(time_to_first_token, attributes)
+        except Exception:
+            # Metrics export must never break the application
+            # メトリクスのエクスポートがアプリケーションを壊してはならない
+            pass
+
+
+class RequestMeter:
+    """
+    Meter one logical LLM request made of one or more attempts
+    1回以上の試行からなる1件の論理LLMリクエストを計測
+
+    Usage of every attempt is summed, the latency spans all attempts, and
+    attempts after the first are recorded as retries.
+    全試行の使用量を合算し、レイテンシは全試行にわたって計測し、最初以降の試行は
+    リトライとして記録します。
+    """
+
+    def __init__(self, model: Optional[str], agent: Optional[str], registry: Optional[MetricsRegistry] = None):
+        """
+        Args:
+            model: Model name / モデル名
+            agent: Agent name / エージェント名
+            registry: Registry to record into (None uses the global registry) / 記録先のレジストリ（Noneでグローバルレジストリ）
+        """
+        self.model = model
+        self.agent = agent
+        self.registry = registry
+        self.attempts = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._started = time.perf_counter()
+
+    def start_attempt(self) -> None:
+        """Count one LLM call attempt / LLM呼び出しの試行を1回数える"""
+        self.attempts += 1
+
+    def add_usage(self, result: Any) -> None:
+        """Add the token usage of a run result / 実行結果のトークン使用量を加算"""
+        usage = extract_usage(result)
+        if usage is not None:
+            self.prompt_tokens += usage["prompt_tokens"]
+            self.completion_tokens += usage["completion_tokens"]
+
+    def record(self, success: bool) -> Optional[float]:
+        """
+        Record the request in the registry
+        リクエストをレジストリに記録
+
+        Returns:
+            Optional[float]: Recorded cost in USD, if known / 記録したUSDのコスト（判明している場合）
+        """
+        try:
+            registry = self.registry or get_metrics_registry()
+            return registry.record_request(
+                self.model,
+                self.agent,
+                time.perf_counter() - self._started,
+                success=success,
+                prompt_tokens=self.prompt_tokens,
+                completion_tokens=self.completion_tokens,
+                retries=max(self.attempts - 1, 0)
+            )
+        except Exception:
+            # Metrics must never break agent execution
+            # メトリクスがエージェントの実行を壊してはならない
+            return None
+
+
+def _attributes(model: Optional[str], agent: Optional[str]) -> Dict[str, str]:
+    return {"model": model or "unknown", "agent": agent or "unknown"}
+
+
+def _format_number(value: float) -> str:
+    """Format a number without a trailing .0 for integers / 整数の場合は.0なしで数値を整形"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _labels(**labels: Any) -> str:
+    """Render Prometheus labels with escaped values / 値をエスケープしてPrometheusラベルを出力"""
+    if not labels:
+        return ""
+    rendered = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in labels.items()
+    )
+    return "{" + rendered + "}"
+
+
+_global_metrics: Optional[MetricsRegistry] = None
+_global_metrics_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Get the global metrics registry
+    グローバルメトリクスレジストリを取得
+
+    Returns:
+        MetricsRegistry: Global registry / グローバルレジストリ
+    """
+    global _global_metrics
+    if _global_metrics is None:
+        with _global_metrics_lock:
+            if _global_metrics is None:
+                _global_metrics = MetricsRegistry()
+    return _global_metrics
+
+
+def set_metrics_registry(registry: MetricsRegistry) -> None:
+    """
+    Replace the global metrics registry
+    グローバルメトリクスレジストリを置き換え
+
+    Args:
+        registry: Registry to use globally / グローバルに使用するレジストリ
+    """
+    global _global_metrics
+    _global_metrics = registry
@@ -5,8 +5,12 @@ PromptStore class for managing prompts with multilingual support
 
 import os
 import locale
+import queue
 import sqlite3
-from typing import Dict, List, Optional, Set, Literal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Literal, Tuple, cast
 from dataclasses import dataclass, field
 from datetime import datetime
 import json
@@ -19,6 +23,12 @@ from .llm import get_llm
 LanguageCode = Literal["ja", "en"]
 SUPPORTED_LANGUAGES: Set[LanguageCode] = {"ja", "en"}
 
+# Translation states stored in the translation_status column
+# translation_status列に保存される翻訳状態
+TRANSLATION_PENDING = "pending"
+TRANSLATION_DONE = "done"
+TRANSLATION_FAILED = "failed"
+
 
 @dataclass
 class PromptReference:
@@ -31,6 +41,7 @@ class PromptReference:
     tag: Optional[str] = None
     language: LanguageCode = "en"
     retrieved_at: datetime = field(default_factory=datetime.now)
+    version: Optional[int] = None  # Prompt version the content came from / 内容の取得元のプロンプトバージョン
     
     def __str__(self) -> str:
         """Return the prompt content when used as string"""
@@ -45,6 +56,8 @@ class PromptReference:
         }
         if self.tag:
             metadata["prompt_tag"] = self.tag
+        if self.version is not None:
+            metadata["prompt_version"] = str(self.version)
         return metadata
 
 
@@ -99,6 +112,8 @@ class StoredPrompt:
     tag: Optional[str] = None  # Single tag for categorization
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
+    translation_status: Optional[str] = None  # "pending", "done", "failed" or None if not requested
+    version: Optional[int] = None  # Version number, starting at 1
     
     def get_content(self, language: Optional[LanguageCode] = None) -> str:
         """Get prompt content in specified language"""
@@ -122,7 +137,9 @@ class StoredPrompt:
             "content": self.content,
             "tag": self.tag,
             "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat()
+            "updated_at": self.updated_at.isoformat(),
+            "translation_status": self.translation_status,
+            "version": self.version
         }
     
     @classmethod
@@ -139,10 +156,64 @@ class StoredPrompt:
             content=data["content"],
             tag=tag,
             created_at=datetime.fromisoformat(data["created_at"]),
-            updated_at=datetime.fromisoformat(data["updated_at"])
+            updated_at=datetime.fromisoformat(data["updated_at"]),
+            translation_status=data.get("translation_status"),
+            version=data.get("version")
         )
 
 
+# Row layout shared by all prompt queries
+# 全てのプロンプトクエリで共通の行レイアウト
+_PROMPT_COLUMNS = "name, tag, content_en, content_ja, created_at, updated_at, translation_status, current_version"
+PromptRow = Tuple[str, Optional[str], Optional[str], Optional[str], str, str, Optional[str], Optional[int]]
+
+# Same layout for rows of prompt_versions joined with prompts; updated_at is
+# the version's creation time and only the current version has a status
+# prompt_versionsとpromptsを結合した行の同じレイアウト。updated_atはバージョンの
+# 作成時刻で、状態を持つのは現在のバージョンのみ
+_VERSION_COLUMNS = (
+    "p.name, p.tag, v.content_en, v.content_ja, p.created_at, v.created_at, "
+    "CASE WHEN v.version = p.current_version THEN p.translation_status END, v.version"
+)
+_VERSION_JOIN = "prompt_versions v JOIN prompts p ON p.name = v.name AND p.tag IS v.tag"
+
+# Names per "IN (...)" query, below SQLite's host parameter limit
+# "IN (...)"クエリあたりの名前数（SQLiteのパラメータ上限未満）
+_NAME_CHUNK_SIZE = 500
+
+# Queued translation: (name, tag, source language, source content)
+# キューに入った翻訳: (名前, タグ, 元の言語, 元の内容)
+TranslationJob = Tuple[str, Optional[str], LanguageCode, str]
+
+# Sentinel stopping the translation worker
+# 翻訳ワーカーを停止する番兵
+_STOP_TRANSLATIONS = object()
+
+
+def _row_to_prompt(row: PromptRow) -> StoredPrompt:
+    """
+    Convert a prompts table row to a StoredPrompt
+    promptsテーブルの行をStoredPromptに変換
+    """
+    name, tag, content_en, content_ja, created_at, updated_at, translation_status, version = row
+    
+    content_dict: Dict[LanguageCode, str] = {}
+    if content_en:
+        content_dict["en"] = content_en
+    if content_ja:
+        content_dict["ja"] = content_ja
+    
+    return StoredPrompt(
+        name=name,
+        content=content_dict,
+        tag=tag,
+        created_at=datetime.fromisoformat(created_at),
+        updated_at=datetime.fromisoformat(updated_at),
+        translation_status=translation_status,
+        version=version
+    )
+
+
 class PromptStore:
     """
     Store and manage prompts with multilingual support using SQLite
@@ -153,11 +224,41 @@ class PromptStore:
     
     All methods are class methods that use an internal singleton instance
     全てのメソッドは内部シングルトンインスタンスを使用するクラスメソッドです
+    
+    Each thread reuses one connection in WAL mode, and resolved prompts are
+    served from an in-memory cache that is invalidated on local writes and
+    when SQLite's data_version shows a write from another connection.
+    data_version is checked at most once per data_version_interval seconds
+    per thread.
+    各スレッドはWALモードの接続を1つ再利用し、解決済みプロンプトはメモリ内
+    キャッシュから返されます。キャッシュはローカルの書き込み時と、SQLiteの
+    data_versionが他の接続からの書き込みを示した時に無効化されます。
+    data_versionの確認はスレッドごとにdata_version_interval秒に最大1回です。
+    
+    Auto-translation runs in the background: stored prompts are marked
+    "pending" and a worker thread translates queued prompts in batches,
+    running up to translation_concurrency LLM calls at once.
+    自動翻訳はバックグラウンドで実行されます。保存されたプロンプトは"pending"と
+    マークされ、ワーカースレッドがキューのプロンプトをバッチで翻訳し、
+    最大translation_concurrency件のLLM呼び出しを同時に実行します。
+    
+    Every store creates an immutable row in prompt_versions; the prompts
+    table holds the current content and a pointer to the current version.
+    保存のたびにprompt_versionsに不変の行が作成され、promptsテーブルは現在の
+    内容と現在のバージョンへのポインタを保持します。
     """
     
     _instance: Optional['PromptStore'] = None
     _storage_dir: Optional[Path] = None
     
+    # Translation worker settings / 翻訳ワーカーの設定
+    translation_batch_size: int = 32  # Jobs written back per transaction / 1トランザクションで書き戻すジョブ数
+    translation_concurrency: int = 8  # Concurrent LLM calls / 同時LLM呼び出し数
+    translation_close_timeout: float = 30.0  # Seconds close() waits for pending translations / close()が保留中の翻訳を待つ秒数
+    
+    # Seconds between checks for writes from other connections / 他の接続からの書き込みを確認する間隔（秒）
+    data_version_interval: float = 0.1
+    
     def __init__(self, storage_dir: Optional[Path] = None):
         """
         Initialize PromptStore with SQLite database
@@ -172,6 +273,31 @@ class PromptStore:
         self.storage_dir = storage_dir
         self.db_path = storage_dir / "prompts.db"
         
+        # Per-thread connections keyed by the owning thread; the generation
+        # changes on close so stale thread-local connections are replaced
+        # 所有スレッドをキーとするスレッドごとの接続。closeで世代が変わり、
+        # 古いスレッドローカル接続は置き換えられる
+        self._local = threading.local()
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._connections_lock = threading.Lock()
+        self._generation = 0
+        
+        # Resolved rows keyed by (name, tag, version); None caches a miss.
+        # The cache generation changes on every invalidation, so a row read
+        # before a concurrent write is not stored after it
+        # (name, tag, version)をキーとする解決済みの行。Noneは未検出をキャッシュ。
+        # キャッシュ世代は無効化のたびに変わり、並行する書き込みの前に読んだ行が
+        # その後に保存されないようにする
+        self._cache: Dict[Tuple[str, Optional[str], Optional[int]], Optional[PromptRow]] = {}
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+        
+        # Background translation queue / バックグラウンド翻訳キュー
+        self._translation_queue: "queue.Queue[Any]" = queue.Queue()
+        self._translation_condition = threading.Condition()
+        self._translation_thread: Optional[threading.Thread] = None
+        self._pending_translations = 0
+        
         # Create directory if it doesn't exist
         storage_dir.mkdir(parents=True, exist_ok=True)
         
@@ -189,6 +315,8 @@ class PromptStore:
         
         # Create new instance if none exists or storage directory changed
         if cls._instance is None or cls._storage_dir != storage_dir:
+            if cls._instance is not None:
+                cls._instance.close()
             cls._instance = cls(storage_dir)
             cls._storage_dir = storage_dir
         
@@ -203,17 +331,151 @@ class PromptStore:
         Args:
             storage_dir: Directory to store database
         """
+        if cls._instance is not None:
+            cls._instance.close()
         cls._instance = None  # Force recreation with new directory
         cls._storage_dir = storage_dir
     
-    def _init_database(self):
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Get this thread's pooled connection, opening it on first use
+        このスレッドのプール済み接続を取得（初回使用時に開く）
+        
+        Returns:
+            sqlite3.Connection: Connection in WAL mode / WALモードの接続
+        """
+        local = self._local
+        conn: Optional[sqlite3.Connection] = getattr(local, "conn", None)
+        if conn is not None and local.generation == self._generation:
+            return conn
+        
+        # check_same_thread=False only so close() can run from any thread;
+        # each connection is used by the thread that opened it
+        # close()を任意のスレッドから実行できるようにするためのみcheck_same_thread=False。
+        # 各接続は開いたスレッドのみが使用する
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        local.conn = conn
+        local.generation = self._generation
+        local.data_version = None
+        local.next_version_check = 0.0
+        with self._connections_lock:
+            # Close connections left behind by threads that have exited
+            # 終了したスレッドが残した接続を閉じる
+            finished = [thread for thread in self._connections if not thread.is_alive()]
+            stale = [self._connections.pop(thread) for thread in finished]
+            self._connections[threading.current_thread()] = conn
+        for stale_conn in stale:
+            try:
+                stale_conn.close()
+            except sqlite3.Error:
+                pass
+        return conn
+    
+    def close(self) -> None:
+        """
+        Wait for queued translations, then close all pooled connections and clear the cache
+        キュー内の翻訳を待ってから、プール済みの全接続を閉じてキャッシュをクリア
+        
+        Translations still running after translation_close_timeout keep
+        their "pending" status in the database.
+        translation_close_timeout後も実行中の翻訳はデータベース上で"pending"のままです。
+        """
+        self._stop_translations()
+        with self._connections_lock:
+            self._generation += 1
+            connections, self._connections = list(self._connections.values()), {}
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._invalidate_cache()
+    
+    def _invalidate_cache(self) -> None:
+        """
+        Drop all cached prompts
+        キャッシュされた全プロンプトを破棄
+        """
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_generation += 1
+    
+    def _check_data_version(self, conn: sqlite3.Connection) -> None:
+        """
+        Invalidate the cache if another connection changed the database
+        他の接続がデータベースを変更した場合にキャッシュを無効化
+        
+        Checks are throttled to one per data_version_interval per thread.
+        確認はスレッドごとにdata_version_intervalあたり1回に抑えられます。
+        """
+        local = self._local
+        now = time.monotonic()
+        if now < local.next_version_check:
+            return
+        local.next_version_check = now + self.data_version_interval
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if local.data_version is not None and local.data_version != data_version:
+            self._invalidate_cache()
+        local.data_version = data_version
+    
+    def _resolve_row(self, name: str, tag: Optional[str], version: Optional[int] = None) -> Optional[PromptRow]:
+        """
+        Resolve a prompt row by name, tag and optional version through the cache
+        キャッシュ経由で名前、タグ、任意のバージョンからプロンプト行を解決
+        
+        Without a tag, the untagged prompt is used, or the only prompt with
+        the name if there is exactly one. This takes a single query.
+        タグなしの場合はタグなしプロンプト、または同名のプロンプトが1つだけの場合は
+        それを使用します。クエリは1回です。
+        """
+        conn = self._connection()
+        self._check_data_version(conn)
+        
+        key = (name, tag, version)
+        cache = self._cache
+        if key in cache:
+            return cache[key]
+        generation = self._cache_generation
+        
+        if version is not None:
+            current = self._resolve_row(name, tag)
+            row = None
+            if current is not None:
+                row = conn.execute(f"""
+                    SELECT {_VERSION_COLUMNS} FROM {_VERSION_JOIN}
+                    WHERE v.name = ? AND v.tag IS ? AND v.version = ?
+                """, (name, current[1], version)).fetchone()
+        elif tag is not None:
+            row = conn.execute(f"""
+                SELECT {_PROMPT_COLUMNS} FROM prompts WHERE name = ? AND tag = ?
+            """, (name, tag)).fetchone()
+        else:
+            # Untagged prompt first; a second row means the name is ambiguous
+            # タグなしプロンプトを優先し、2行目があれば名前が曖昧
+            rows = conn.execute(f"""
+                SELECT {_PROMPT_COLUMNS} FROM prompts WHERE name = ?
+                ORDER BY tag IS NOT NULL LIMIT 2
+            """, (name,)).fetchall()
+            if rows and (rows[0][1] is None or len(rows) == 1):
+                row = rows[0]
+            else:
+                row = None
+        
+        with self._cache_lock:
+            if self._cache_generation == generation:
+                cache[key] = row
+        return row
+    
+    def _init_database(self) -> None:
         """
         Initialize SQLite database and create tables
         SQLiteデータベースを初期化してテーブルを作成
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
+        conn = self._connection()
+        with conn:
+            conn.execute("""
                 CREATE TABLE IF NOT EXISTS prompts (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     name TEXT NOT NULL,
@@ -222,10 +484,51 @@ class PromptStore:
                     content_ja TEXT,
                     created_at TEXT NOT NULL,
                     updated_at TEXT NOT NULL,
+                    translation_status TEXT,
+                    current_version INTEGER,
                     UNIQUE(name, tag)
                 )
             """)
-            conn.commit()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS prompt_versions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    tag TEXT,
+                    version INTEGER NOT NULL,
+                    content_en TEXT,
+                    content_ja TEXT,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            
+            # Databases created by earlier versions lack these columns
+            # 以前のバージョンで作成されたデータベースにはこれらの列がない
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(prompts)")}
+            if "translation_status" not in columns:
+                conn.execute("ALTER TABLE prompts ADD COLUMN translation_status TEXT")
+            if "current_version" not in columns:
+                conn.execute("ALTER TABLE prompts ADD COLUMN current_version INTEGER")
+            
+            # Prompts stored before versioning become version 1
+            # バージョン管理以前に保存されたプロンプトはバージョン1になる
+            conn.execute("""
+                INSERT INTO prompt_versions (name, tag, version, content_en, content_ja, created_at)
+                SELECT name, tag, 1, content_en, content_ja, updated_at FROM prompts
+                WHERE current_version IS NULL
+            """)
+            conn.execute("UPDATE prompts SET current_version = 1 WHERE current_version IS NULL")
+            
+            # UNIQUE(name, tag) already serves lookups by name
+            # UNIQUE(name, tag)が名前による検索を担う
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_prompts_tag ON prompts(tag)")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_prompts_pending
+                ON prompts(name, tag) WHERE translation_status = 'pending'
+            """)
+            conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_prompt_versions_key
+                ON prompt_versions(name, tag, version)
+            """)
     
     @classmethod
     def store(
@@ -238,92 +541,396 @@ class PromptStore:
         storage_dir: Optional[Path] = None
     ) -> StoredPrompt:
         """
-        Store a prompt with automatic translation
+        Store a prompt and queue its translation
+        プロンプトを保存し翻訳をキューに入れる
         
         Args:
             name: Unique name for the prompt
             content: Prompt content
             tag: Optional single tag for categorization
             language: Language of the content. If None, detects from system.
-            auto_translate: Whether to automatically translate to other languages
+            auto_translate: Whether to translate to the other language in the background
+                            (see wait_for_translations)
+            
+        Returns:
+            StoredPrompt object (translation_status is "pending" while translating)
+        """
+        return cls.store_many(
+            [{"name": name, "content": content, "tag": tag}],
+            language=language,
+            auto_translate=auto_translate,
+            storage_dir=storage_dir
+        )[0]
+    
+    @classmethod
+    def store_many(
+        cls,
+        prompts: Iterable[Dict[str, Any]],
+        language: Optional[LanguageCode] = None,
+        auto_translate: bool = True,
+        storage_dir: Optional[Path] = None
+    ) -> List[StoredPrompt]:
+        """
+        Store many prompts in one transaction and queue their translations
+        複数のプロンプトを1トランザクションで保存し翻訳をキューに入れる
+        
+        Existing prompts are read with one query per chunk of names and all
+        writes use executemany, so importing large catalogs stays fast.
+        Each stored prompt gets a new version.
+        既存のプロンプトは名前のチャンクごとに1クエリで読み込まれ、全ての書き込みは
+        executemanyを使うため、大きなカタログのインポートも高速です。
+        保存された各プロンプトには新しいバージョンが付与されます。
+        
+        Args:
+            prompts: Dicts with "name", "content" and optional "tag" and "language".
+                     "content" may also be a {language: text} dict, as produced by export_all.
+                     "name"、"content"と任意の"tag"、"language"を持つ辞書。
+                     "content"はexport_allが出力する{言語: テキスト}形式の辞書も可
+            language: Default language of the content. If None, detects from system.
+                      内容のデフォルト言語。Noneの場合はシステムから検出
+            auto_translate: Whether to translate single-language prompts in the background
+                            単一言語のプロンプトをバックグラウンドで翻訳するか
+            storage_dir: Storage directory override / ストレージディレクトリの上書き
             
         Returns:
-            StoredPrompt object
+            List of StoredPrompt objects in input order / 入力順のStoredPromptオブジェクトのリスト
         """
         instance = cls._get_instance(storage_dir)
         
         if language is None:
             language = detect_system_language()
         
+        # Normalize input to (key, {language: content}) pairs
+        # 入力を(キー, {言語: 内容})のペアに正規化
+        entries: List[Tuple[Tuple[str, Optional[str]], Dict[str, str]]] = []
+        for prompt in prompts:
+            content = prompt["content"]
+            if isinstance(content, dict):
+                contents = {lang: text for lang, text in content.items() if lang in SUPPORTED_LANGUAGES and text}
+            else:
+                contents = {prompt.get("language") or language: content}
+            entries.append(((prompt["name"], prompt.get("tag")), contents))
+        
         now = datetime.now().isoformat()
+        conn = instance._connection()
+        # Current state per key: [content_en, content_ja, created_at, version]
+        # キーごとの現在の状態
+        state: Dict[Tuple[str, Optional[str]], List[Any]] = {}
+        new_keys: Set[Tuple[str, Optional[str]]] = set()
+        jobs: Dict[Tuple[str, Optional[str]], TranslationJob] = {}
+        versions: List[Tuple[Any, ...]] = []
+        rows: List[PromptRow] = []
         
-        with sqlite3.connect(instance.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Check if prompt exists
-            cursor.execute("""
-                SELECT content_en, content_ja, created_at FROM prompts 
-                WHERE name = ? AND tag IS ?
-            """, (name, tag))
-            
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Update existing prompt
-                content_en, content_ja, created_at = existing
-                if language == "en":
-                    content_en = content
-                else:
-                    content_ja = content
+        with conn:
+            existing = instance._fetch_current(conn, {name for (name, _), _ in entries})
+            for key, contents in entries:
+                current = state.get(key)
+                if current is None:
+                    current = existing.get(key)
+                    if current is None:
+                        current = [None, None, now, 0]
+                        new_keys.add(key)
+                    state[key] = current
+                if "en" in contents:
+                    current[0] = contents["en"]
+                if "ja" in contents:
+                    current[1] = contents["ja"]
+                current[3] += 1
                 
-                cursor.execute("""
-                    UPDATE prompts 
-                    SET content_en = ?, content_ja = ?, updated_at = ?
-                    WHERE name = ? AND tag IS ?
-                """, (content_en, content_ja, now, name, tag))
-            else:
-                # Insert new prompt
-                content_en = content if language == "en" else None
-                content_ja = content if language == "ja" else None
+                # Only the latest store of a key is translated
+                # キーの最新の保存のみ翻訳する
+                jobs.pop(key, None)
+                if auto_translate and len(contents) == 1:
+                    (source_language, source_content), = contents.items()
+                    jobs[key] = (key[0], key[1], cast(LanguageCode, source_language), source_content)
                 
-                cursor.execute("""
-                    INSERT INTO prompts (name, tag, content_en, content_ja, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (name, tag, content_en, content_ja, now, now))
-                created_at = now
+                status = TRANSLATION_PENDING if key in jobs else None
+                versions.append((key[0], key[1], current[3], current[0], current[1], now))
+                rows.append((key[0], key[1], current[0], current[1], current[2], now, status, current[3]))
             
-            conn.commit()
-            
-            # Auto-translate if requested
-            if auto_translate:
-                instance._translate_and_update(name, tag, language, content)
+            inserts = []
+            updates = []
+            for key, (content_en, content_ja, created_at, version) in state.items():
+                status = TRANSLATION_PENDING if key in jobs else None
+                if key in new_keys:
+                    inserts.append(key + (content_en, content_ja, created_at, now, status, version))
+                else:
+                    updates.append((content_en, content_ja, now, status, version) + key)
             
-            # Create and return StoredPrompt object
-            cursor.execute("""
-                SELECT content_en, content_ja, created_at, updated_at FROM prompts 
+            conn.executemany("""
+                INSERT INTO prompts (name, tag, content_en, content_ja, created_at, updated_at,
+                                     translation_status, current_version)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, inserts)
+            conn.executemany("""
+                UPDATE prompts 
+                SET content_en = ?, content_ja = ?, updated_at = ?, translation_status = ?, current_version = ?
                 WHERE name = ? AND tag IS ?
-            """, (name, tag))
+            """, updates)
+            conn.executemany("""
+                INSERT INTO prompt_versions (name, tag, version, content_en, content_ja, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, versions)
+        instance._invalidate_cache()
+        
+        # Translations run after the rows are committed
+        # 翻訳は行のコミット後に実行される
+        instance._enqueue_translations(list(jobs.values()))
+        
+        return [_row_to_prompt(row) for row in rows]
+    
+    @staticmethod
+    def _fetch_current(conn: sqlite3.Connection, names: Set[str]) -> Dict[Tuple[str, Optional[str]], List[Any]]:
+        """
+        Read the current state of all prompts with the given names
+        指定された名前の全プロンプトの現在の状態を読み込む
+        
+        Returns:
+            Dict mapping (name, tag) to [content_en, content_ja, created_at, version]
+        """
+        current: Dict[Tuple[str, Optional[str]], List[Any]] = {}
+        ordered = sorted(names)
+        for start in range(0, len(ordered), _NAME_CHUNK_SIZE):
+            chunk = ordered[start:start + _NAME_CHUNK_SIZE]
+            cursor = conn.execute(f"""
+                SELECT name, tag, content_en, content_ja, created_at, current_version
+                FROM prompts WHERE name IN ({", ".join("?" * len(chunk))})
+            """, chunk)
+            for name, tag, content_en, content_ja, created_at, version in cursor:
+                current[(name, tag)] = [content_en, content_ja, created_at, version or 0]
+        return current
+    
+    @classmethod
+    def export_all(cls, include_history: bool = False, storage_dir: Optional[Path] = None) -> Iterator[StoredPrompt]:
+        """
+        Stream all prompts without loading the whole catalog into memory
+        カタログ全体をメモリに読み込まずに全プロンプトをストリーム
+        
+        The output can be passed back to store_many as dicts (to_dict()).
+        出力は辞書（to_dict()）としてstore_manyに渡し直せます。
+        
+        Args:
+            include_history: Yield every version instead of only the current one
+                             現在のバージョンだけでなく全バージョンを返す
+            storage_dir: Storage directory override / ストレージディレクトリの上書き
+            
+        Returns:
+            Iterator of StoredPrompt objects ordered by name, tag (and version)
+            名前、タグ（とバージョン）順のStoredPromptオブジェクトのイテレータ
+        """
+        conn = cls._get_instance(storage_dir)._connection()
+        if include_history:
+            cursor = conn.execute(f"""
+                SELECT {_VERSION_COLUMNS} FROM {_VERSION_JOIN}
+                ORDER BY v.name, v.tag, v.version
+            """)
+        else:
+            cursor = conn.execute(f"""
+                SELECT {_PROMPT_COLUMNS} FROM prompts
+                ORDER BY name, tag
+            """)
+        for row in cursor:
+            yield _row_to_prompt(row)
+    
+    @classmethod
+    def list_versions(cls, name: str, tag: Optional[str] = None, storage_dir: Optional[Path] = None) -> List[StoredPrompt]:
+        """
+        List all versions of a prompt, oldest first
+        プロンプトの全バージョンを古い順にリスト
+        
+        Args:
+            name: Prompt name / プロンプト名
+            tag: Specific tag to identify the prompt / プロンプト識別用の特定タグ
+            storage_dir: Storage directory override / ストレージディレクトリの上書き
             
-            row = cursor.fetchone()
-            content_en, content_ja, created_at, updated_at = row
+        Returns:
+            List of StoredPrompt objects, one per version / バージョンごとのStoredPromptオブジェクトのリスト
+        """
+        instance = cls._get_instance(storage_dir)
+        current = instance._resolve_row(name, tag)
+        if current is None:
+            return []
+        cursor = instance._connection().execute(f"""
+            SELECT {_VERSION_COLUMNS} FROM {_VERSION_JOIN}
+            WHERE v.name = ? AND v.tag IS ?
+            ORDER BY v.version
+        """, (name, current[1]))
+        return [_row_to_prompt(row) for row in cursor]
+    
+    @classmethod
+    def wait_for_translations(cls, timeout: Optional[float] = None, storage_dir: Optional[Path] = None) -> bool:
+        """
+        Wait until all queued translations are written
+        キュー内の全翻訳が書き込まれるまで待機
+        
+        Args:
+            timeout: Maximum wait in seconds (None waits indefinitely) / 最大待機秒数（Noneで無制限）
+            storage_dir: Storage directory override / ストレージディレクトリの上書き
             
-            content_dict = {}
-            if content_en:
-                content_dict["en"] = content_en
-            if content_ja:
-                content_dict["ja"] = content_ja
+        Returns:
+            bool: True if no translations are pending / 保留中の翻訳がない場合True
+        """
+        return cls._get_instance(storage_dir)._wait_translations(timeout)
+    
+    @classmethod
+    def pending_translations(cls, storage_dir: Optional[Path] = None) -> List[StoredPrompt]:
+        """
+        List prompts whose translation has not been written yet
+        翻訳がまだ書き込まれていないプロンプトをリスト
+        
+        Args:
+            storage_dir: Storage directory override / ストレージディレクトリの上書き
             
-            return StoredPrompt(
-                name=name,
-                content=content_dict,
-                tag=tag,
-                created_at=datetime.fromisoformat(created_at),
-                updated_at=datetime.fromisoformat(updated_at)
-            )
+        Returns:
+            List of StoredPrompt objects with translation_status "pending"
+        """
+        conn = cls._get_instance(storage_dir)._connection()
+        cursor = conn.execute(f"""
+            SELECT {_PROMPT_COLUMNS} FROM prompts
+            WHERE translation_status = ?
+            ORDER BY name, tag
+        """, (TRANSLATION_PENDING,))
+        return [_row_to_prompt(row) for row in cursor]
     
+    def _enqueue_translations(self, jobs: List[TranslationJob]) -> None:
+        """
+        Queue translation jobs for the background worker
+        バックグラウンドワーカー用に翻訳ジョブをキューに入れる
+        """
+        if not jobs:
+            return
+        with self._translation_condition:
+            self._pending_translations += len(jobs)
+            if self._translation_thread is None or not self._translation_thread.is_alive():
+                self._translation_thread = threading.Thread(
+                    target=self._run_translations, name="refinire-prompt-translator", daemon=True
+                )
+                self._translation_thread.start()
+        for job in jobs:
+            self._translation_queue.put(job)
+    
+    def _wait_translations(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the translation queue to drain / 翻訳キューが空になるまで待機"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._translation_condition:
+            while self._pending_translations:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._translation_condition.wait(remaining)
+        return True
+    
+    def _stop_translations(self) -> None:
+        """Drain and stop the translation worker / 翻訳ワーカーを完了させて停止"""
+        thread = self._translation_thread
+        if thread is None or not thread.is_alive():
+            return
+        self._wait_translations(self.translation_close_timeout)
+        self._translation_queue.put(_STOP_TRANSLATIONS)
+        thread.join(self.translation_close_timeout)
+        self._translation_thread = None
+    
+    def _run_translations(self) -> None:
+        """
+        Translate queued prompts in batches with concurrent LLM calls
+        キューのプロンプトを同時LLM呼び出しでバッチ翻訳
+        """
+        executor = ThreadPoolExecutor(
+            max_workers=self.translation_concurrency, thread_name_prefix="refinire-prompt-translate"
+        )
+        try:
+            while True:
+                job = self._translation_queue.get()
+                if job is _STOP_TRANSLATIONS:
+                    return
+                batch = [job]
+                stop = False
+                while len(batch) < self.translation_batch_size:
+                    try:
+                        job = self._translation_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is _STOP_TRANSLATIONS:
+                        stop = True
+                        break
+                    batch.append(job)
+                
+                try:
+                    results = list(executor.map(self._translate_job, batch))
+                    self._write_translations(batch, results)
+                except Exception:
+                    # Rows keep their "pending" status
+                    # 行は"pending"状態のまま残る
+                    pass
+                finally:
+                    with self._translation_condition:
+                        self._pending_translations -= len(batch)
+                        self._translation_condition.notify_all()
+                if stop:
+                    return
+        finally:
+            executor.shutdown(wait=False)
+    
+    def _translate_job(self, job: TranslationJob) -> Optional[str]:
+        """
+        Translate one queued prompt, returning None on failure
+        キューの1プロンプトを翻訳（失敗時はNone）
+        """
+        name, tag, source_language, source_content = job
+        translation_prompt = self._translation_prompt(source_language, source_content)
+        if translation_prompt is None:
+            return None
+        try:
+            return self._translate_text(translation_prompt)
+        except Exception:
+            # Translation failed, but don't crash
+            return None
+    
+    def _write_translations(self, batch: List[TranslationJob], results: List[Optional[str]]) -> None:
+        """
+        Write a batch of translations in one transaction
+        翻訳のバッチを1トランザクションで書き込み
+        
+        A translation is only written if the source content is unchanged,
+        so a newer store of the same prompt is never overwritten. Each
+        written translation becomes a new version.
+        元の内容が変わっていない場合のみ翻訳を書き込むため、同じプロンプトの
+        より新しい保存が上書きされることはありません。書き込まれた翻訳は
+        それぞれ新しいバージョンになります。
+        """
+        now = datetime.now().isoformat()
+        conn = self._connection()
+        with conn:
+            for (name, tag, source_language, source_content), translated in zip(batch, results):
+                source_column = "content_en" if source_language == "en" else "content_ja"
+                target_column = "content_ja" if source_language == "en" else "content_en"
+                if translated:
+                    cursor = conn.execute(f"""
+                        UPDATE prompts
+                        SET {target_column} = ?, translation_status = ?, current_version = current_version + 1
+                        WHERE name = ? AND tag IS ? AND {source_column} IS ?
+                    """, (translated, TRANSLATION_DONE, name, tag, source_content))
+                    if cursor.rowcount:
+                        conn.execute("""
+                            INSERT INTO prompt_versions (name, tag, version, content_en, content_ja, created_at)
+                            SELECT name, tag, current_version, content_en, content_ja, ? FROM prompts
+                            WHERE name = ? AND tag IS ?
+                        """, (now, name, tag))
+                else:
+                    conn.execute(f"""
+                        UPDATE prompts SET translation_status = ?
+                        WHERE name = ? AND tag IS ? AND {source_column} IS ?
+                    """, (TRANSLATION_FAILED, name, tag, source_content))
+        self._invalidate_cache()
     
     @classmethod
-    def get_prompt(cls, name: str, tag: Optional[str] = None, storage_dir: Optional[Path] = None) -> Optional[StoredPrompt]:
+    def get_prompt(
+        cls,
+        name: str,
+        tag: Optional[str] = None,
+        storage_dir: Optional[Path] = None,
+        version: Optional[int] = None
+    ) -> Optional[StoredPrompt]:
         """
         Get the full StoredPrompt object by name and tag
         
@@ -331,61 +938,14 @@ class PromptStore:
             name: Prompt name
             tag: Specific tag to identify the prompt
             storage_dir: Storage directory override
+            version: Specific version. If None, uses the current version.
             
         Returns:
             StoredPrompt object or None if not found
         """
         instance = cls._get_instance(storage_dir)
-        
-        with sqlite3.connect(instance.db_path) as conn:
-            cursor = conn.cursor()
-            
-            if tag is not None:
-                cursor.execute("""
-                    SELECT name, tag, content_en, content_ja, created_at, updated_at 
-                    FROM prompts WHERE name = ? AND tag = ?
-                """, (name, tag))
-            else:
-                # First try to find untagged prompt
-                cursor.execute("""
-                    SELECT name, tag, content_en, content_ja, created_at, updated_at 
-                    FROM prompts WHERE name = ? AND tag IS NULL
-                """, (name,))
-                row = cursor.fetchone()
-                
-                if not row:
-                    # No untagged prompt, check if there's exactly one with this name
-                    cursor.execute("""
-                        SELECT name, tag, content_en, content_ja, created_at, updated_at 
-                        FROM prompts WHERE name = ?
-                    """, (name,))
-                    rows = cursor.fetchall()
-                    if len(rows) == 1:
-                        row = rows[0]
-                    else:
-                        return None
-            
-            if tag is not None:
-                row = cursor.fetchone()
-            
-            if not row:
-                return None
-            
-            name, tag, content_en, content_ja, created_at, updated_at = row
-            
-            content_dict = {}
-            if content_en:
-                content_dict["en"] = content_en
-            if content_ja:
-                content_dict["ja"] = content_ja
-            
-            return StoredPrompt(
-                name=name,
-                content=content_dict,
-                tag=tag,
-                created_at=datetime.fromisoformat(created_at),
-                updated_at=datetime.fromisoformat(updated_at)
-            )
+        row = instance._resolve_row(name, tag, version)
+        return _row_to_prompt(row) if row else None
     
     @classmethod
     def list_prompts(cls, name: Optional[str] = None, storage_dir: Optional[Path] = None) -> List[StoredPrompt]:
@@ -401,42 +961,22 @@ class PromptStore:
             List of StoredPrompt objects
         """
         instance = cls._get_instance(storage_dir)
+        conn = instance._connection()
         
-        with sqlite3.connect(instance.db_path) as conn:
-            cursor = conn.cursor()
-            
-            if name:
-                cursor.execute("""
-                    SELECT name, tag, content_en, content_ja, created_at, updated_at 
-                    FROM prompts WHERE name = ?
-                    ORDER BY name, tag
-                """, (name,))
-            else:
-                cursor.execute("""
-                    SELECT name, tag, content_en, content_ja, created_at, updated_at 
-                    FROM prompts
-                    ORDER BY name, tag
-                """)
-            
-            prompts = []
-            for row in cursor.fetchall():
-                name, tag, content_en, content_ja, created_at, updated_at = row
-                
-                content_dict = {}
-                if content_en:
-                    content_dict["en"] = content_en
-                if content_ja:
-                    content_dict["ja"] = content_ja
-                
-                prompts.append(StoredPrompt(
-                    name=name,
-                    content=content_dict,
-                    tag=tag,
-                    created_at=datetime.fromisoformat(created_at),
-                    updated_at=datetime.fromisoformat(updated_at)
-                ))
-            
-            return prompts
+        if name:
+            cursor = conn.execute(f"""
+                SELECT {_PROMPT_COLUMNS} 
+                FROM prompts WHERE name = ?
+                ORDER BY name, tag
+            """, (name,))
+        else:
+            cursor = conn.execute(f"""
+                SELECT {_PROMPT_COLUMNS} 
+                FROM prompts
+                ORDER BY name, tag
+            """)
+        
+        return [_row_to_prompt(row) for row in cursor]
     
     @classmethod
     def delete(cls, name: str, tag: Optional[str] = None, storage_dir: Optional[Path] = None) -> int:
@@ -454,23 +994,28 @@ class PromptStore:
             Number of prompts deleted
         """
         instance = cls._get_instance(storage_dir)
+        conn = instance._connection()
         
-        with sqlite3.connect(instance.db_path) as conn:
-            cursor = conn.cursor()
-            
+        with conn:
             if tag is not None:
-                cursor.execute("""
+                cursor = conn.execute("""
                     DELETE FROM prompts WHERE name = ? AND tag = ?
                 """, (name, tag))
+                conn.execute("""
+                    DELETE FROM prompt_versions WHERE name = ? AND tag = ?
+                """, (name, tag))
             else:
-                cursor.execute("""
+                cursor = conn.execute("""
                     DELETE FROM prompts WHERE name = ?
                 """, (name,))
+                conn.execute("""
+                    DELETE FROM prompt_versions WHERE name = ?
+                """, (name,))
             
             deleted_count = cursor.rowcount
-            conn.commit()
-            
-            return deleted_count
+        instance._invalidate_cache()
+        
+        return deleted_count
     
     @classmethod
     def get(
@@ -478,7 +1023,8 @@ class PromptStore:
         name: str,
         tag: Optional[str] = None,
         language: Optional[LanguageCode] = None,
-        storage_dir: Optional[Path] = None
+        storage_dir: Optional[Path] = None,
+        version: Optional[int] = None
     ) -> Optional[PromptReference]:
         """
         Get a prompt with metadata for tracing
@@ -489,89 +1035,50 @@ class PromptStore:
             tag: Specific tag to identify the prompt
             language: Desired language. If None, uses system language.
             storage_dir: Storage directory override
+            version: Specific version. If None, uses the current version.
             
         Returns:
-            PromptReference object with metadata or None if not found
+            PromptReference object with metadata (including the version) or None if not found
         """
         instance = cls._get_instance(storage_dir)
         
         if language is None:
             language = detect_system_language()
         
-        with sqlite3.connect(instance.db_path) as conn:
-            cursor = conn.cursor()
-            
-            if tag is not None:
-                # Look for exact match with name and tag
-                cursor.execute("""
-                    SELECT content_en, content_ja FROM prompts 
-                    WHERE name = ? AND tag = ?
-                """, (name, tag))
-            else:
-                # Look for prompt without tag, or if only one exists with this name
-                cursor.execute("""
-                    SELECT content_en, content_ja FROM prompts 
-                    WHERE name = ? AND tag IS NULL
-                """, (name,))
-                
-                row = cursor.fetchone()
-                if not row:
-                    # No untagged prompt, check if there's exactly one with this name
-                    cursor.execute("""
-                        SELECT content_en, content_ja FROM prompts 
-                        WHERE name = ?
-                    """, (name,))
-                    rows = cursor.fetchall()
-                    if len(rows) == 1:
-                        row = rows[0]
-                    else:
-                        return None
-                else:
-                    pass  # Use the untagged prompt
-            
-            if tag is not None:
-                row = cursor.fetchone()
-            
-            if not row:
-                return None
-            
-            content_en, content_ja = row
-            
-            # Get content in preferred language
-            if language == "en" and content_en:
-                content = content_en
-            elif language == "ja" and content_ja:
-                content = content_ja
-            elif content_en:
-                content = content_en
-            elif content_ja:
-                content = content_ja
-            else:
-                return None
+        row = instance._resolve_row(name, tag, version)
+        if not row:
+            return None
+        
+        content_en, content_ja = row[2], row[3]
+        
+        # Get content in preferred language
+        if language == "en" and content_en:
+            content = content_en
+        elif language == "ja" and content_ja:
+            content = content_ja
+        elif content_en:
+            content = content_en
+        elif content_ja:
+            content = content_ja
+        else:
+            return None
         
         return PromptReference(
             content=content,
             name=name,
             tag=tag,
-            language=language
+            language=language,
+            version=row[7]
         )
     
-    def _translate_and_update(
-        self,
-        name: str,
-        tag: Optional[str],
-        source_language: LanguageCode,
-        source_content: str
-    ):
+    @staticmethod
+    def _translation_prompt(source_language: LanguageCode, source_content: str) -> Optional[str]:
         """
-        Translate prompt and update database
-        プロンプトを翻訳してデータベースを更新
+        Build the translation request for the other supported language
+        もう一方の対応言語への翻訳リクエストを作成
         """
-        target_language = "ja" if source_language == "en" else "en"
-        
-        # Create translation prompt
-        if source_language == "en" and target_language == "ja":
-            translation_prompt = f"""Translate the following English prompt to Japanese.
+        if source_language == "en":
+            return f"""Translate the following English prompt to Japanese.
 Keep the technical meaning and intent exactly the same.
 Maintain any placeholders or variables as-is.
 
@@ -579,8 +1086,8 @@ English prompt:
 {source_content}
 
 Japanese translation:"""
-        elif source_language == "ja" and target_language == "en":
-            translation_prompt = f"""次の日本語のプロンプトを英語に翻訳してください。
+        else:
+            return f"""次の日本語のプロンプトを英語に翻訳してください。
 技術的な意味と意図を正確に保持してください。
 プレースホルダーや変数はそのまま維持してください。
 
@@ -588,44 +1095,26 @@ Japanese translation:"""
 {source_content}
 
 英語翻訳:"""
-        else:
-            return
+    
+    def _translate_text(self, translation_prompt: str) -> Optional[str]:
+        """
+        Get translation from LLM
+        LLMから翻訳を取得
+        """
+        llm = get_llm()
+        response = llm.agent.run(translation_prompt)
         
-        # Get translation from LLM
-        try:
-            llm = get_llm()
-            response = llm.agent.run(translation_prompt)
-            
-            if hasattr(response, 'messages') and response.messages:
-                translated_content = response.messages[-1].text.strip()
-                
-                # Update database with translation
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.cursor()
-                    
-                    if target_language == "en":
-                        cursor.execute("""
-                            UPDATE prompts SET content_en = ? 
-                            WHERE name = ? AND tag IS ?
-                        """, (translated_content, name, tag))
-                    else:
-                        cursor.execute("""
-                            UPDATE prompts SET content_ja = ? 
-                            WHERE name = ? AND tag IS ?
-                        """, (translated_content, name, tag))
-                    
-                    conn.commit()
-        except Exception as e:
-            # Translation failed, but don't crash
-            # Translation failure occurred
-            pass
+        if hasattr(response, 'messages') and response.messages:
+            return str(response.messages[-1].text).strip()
+        return None
 
 
 def P(
     name: str,
     tag: Optional[str] = None,
     language: Optional[LanguageCode] = None,
-    storage_dir: Optional[Path] = None
+    storage_dir: Optional[Path] = None,
+    version: Optional[int] = None
 ) -> Optional[PromptReference]:
     """
     Short alias for PromptStore.get() - convenient function for prompt retrieval
@@ -636,6 +1125,7 @@ def P(
         tag: Specific tag to identify the prompt / プロンプト識別用の特定タグ
         language: Desired language. If None, uses system language / 希望言語。Noneの場合はシステム言語を使用
         storage_dir: Storage directory override / ストレージディレクトリの上書き
+        version: Specific version. If None, uses the current version / 特定のバージョン。Noneの場合は現在のバージョン
         
     Returns:
         PromptReference object with metadata or None if not found
@@ -649,5 +1139,5 @@ def P(
         prompt = P("greeting", tag="formal", language="en")
         prompt = P("greeting")  # Uses default tag and system language
     """
-    return PromptStore.get(name=name, tag=tag, language=language, storage_dir=storage_dir)
+    return PromptStore.get(name=name, tag=tag, language=language, storage_dir=storage_dir, version=version)
     
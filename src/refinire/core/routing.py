@@ -8,9 +8,35 @@ including routing result data structures and related utilities.
 ルーティング結果のデータ構造と関連ユーティリティが含まれています。
 """
 
-from typing import Union, Any, Dict, Optional, Type, Pattern
-from pydantic import BaseModel, Field, field_validator
+from typing import Union, Any, Callable, Dict, Literal, Optional, Sequence, Type, Pattern
+from pydantic import BaseModel, Field, create_model, field_validator
 import re
+import threading
+
+
+# Generated routing models, keyed by their parameters
+# パラメータをキーとする生成済みルーティングモデル
+_MODEL_CACHE: Dict[Any, Type[BaseModel]] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+
+def _cached_model(key: Any, factory: Callable[[], Type[BaseModel]]) -> Type[BaseModel]:
+    """
+    Return a generated model from the cache, creating it on first use.
+    キャッシュから生成済みモデルを返す（初回使用時に作成）
+
+    Unhashable keys are not cached.
+    ハッシュ不能なキーはキャッシュされません。
+    """
+    try:
+        hash(key)
+    except TypeError:
+        return factory()
+    with _MODEL_CACHE_LOCK:
+        model = _MODEL_CACHE.get(key)
+        if model is None:
+            model = _MODEL_CACHE[key] = factory()
+    return model
 
 
 class RoutingResult(BaseModel):
@@ -244,6 +270,7 @@ def create_routing_result_model(content_type: Type[BaseModel]) -> Type[BaseModel
     
     Returns:
         A new RoutingResult class with the specified content type
+        (the same class is returned for the same content type)
     
     Example:
         >>> from pydantic import BaseModel, Field
@@ -258,9 +285,14 @@ def create_routing_result_model(content_type: Type[BaseModel]) -> Type[BaseModel
         ...     reasoning="Task completed successfully"
         ... )
     """
-    from pydantic import create_model
-    from typing import Union
-    
+    return _cached_model(("result", content_type), lambda: _build_routing_result_model(content_type))
+
+
+def _build_routing_result_model(content_type: Type[BaseModel]) -> Type[BaseModel]:
+    """
+    Build a RoutingResult model with custom content type (uncached).
+    カスタムコンテンツ型を持つRoutingResultモデルを構築（キャッシュなし）
+    """
     # Use Union[str, content_type] to ensure compatibility with both string and structured content
     # 文字列と構造化コンテンツの両方との互換性を確保するためUnion[str, content_type]を使用
     content_field_type = Union[str, content_type]
@@ -289,6 +321,40 @@ def create_routing_result_model(content_type: Type[BaseModel]) -> Type[BaseModel
     return DynamicRoutingResult
 
 
+def create_routing_decision_model(destinations: Optional[Sequence[str]] = None) -> Type[BaseModel]:
+    """
+    Create a compact structured-output model for routing decisions.
+    ルーティング判断用のコンパクトな構造化出力モデルを作成
+    
+    Unlike RoutingResult, the model does not ask the LLM to copy the generated
+    content, and next_route is restricted to the given destinations, so the
+    response schema itself rules out invalid routes. Models are cached per
+    destination list.
+    RoutingResultと異なり、このモデルは生成コンテンツのコピーをLLMに求めず、
+    next_routeは指定された分岐先に制限されるため、応答スキーマ自体が無効な
+    ルートを排除します。モデルは分岐先リストごとにキャッシュされます。
+    
+    Args:
+        destinations: Allowed route names (None allows any route) / 許可するルート名（Noneの場合は任意）
+    
+    Returns:
+        Type[BaseModel]: Model with next_route, confidence and reasoning fields
+                         next_route、confidence、reasoningフィールドを持つモデル
+    """
+    routes = tuple(dict.fromkeys(destinations or ()))
+    
+    def build() -> Type[BaseModel]:
+        route_type: Any = Literal[routes] if routes else str
+        return create_model(
+            'RoutingDecision',
+            next_route=(route_type, Field(description="Name of the next route to execute")),
+            confidence=(float, Field(description="Confidence of the decision between 0.0 and 1.0")),
+            reasoning=(str, Field(description="One short sentence explaining the decision")),
+        )
+    
+    return _cached_model(("decision", routes), build)
+
+
 # Default routing instructions for common use cases
 # 一般的なユースケース用のデフォルトルーティング指示
 DEFAULT_ROUTING_INSTRUCTIONS = {
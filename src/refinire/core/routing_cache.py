@@ -0,0 +1,360 @@
+"""
+Routing Cache - Reuse routing decisions for repeated and near-duplicate inputs
+ルーティングキャッシュ - 繰り返し・ほぼ重複する入力のルーティング判断を再利用
+
+Routing decisions are keyed on normalized content, the routing instruction
+and the set of destinations. Lookups first try an exact match on the
+normalized content, then (when enabled) a near-duplicate match using MinHash
+signatures indexed with locality-sensitive hashing. Only confident decisions
+are admitted, and entries expire after a TTL.
+ルーティング判断は正規化されたコンテンツ、ルーティング指示、分岐先の集合を
+キーとします。検索はまず正規化コンテンツの完全一致を試し、次に（有効な場合）
+局所性鋭敏型ハッシュで索引付けしたMinHash署名によるほぼ重複の一致を試します。信頼度の高い
+判断のみが登録され、エントリはTTL経過後に失効します。
+"""
+
+import hashlib
+import random
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+# Patterns replaced by placeholders during normalization
+# 正規化時にプレースホルダーに置き換えるパターン
+_URL_PATTERN = re.compile(r"https?://\S+")
+_EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_UUID_PATTERN = re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b")
+_NUMBER_PATTERN = re.compile(r"\d+(?:[.,:/-]\d+)*")
+_PUNCTUATION_PATTERN = re.compile(r"[^\w\s<>]")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Negation words and suffixes; near-duplicates must agree on these, since a
+# single "not" flips the intent while barely changing the text
+# 否定語と否定の語尾。1つの"not"はテキストをほとんど変えずに意図を反転させるため、
+# ほぼ重複の一致ではこれらが一致している必要がある
+_NEGATION_WORDS = frozenset({
+    "not", "no", "never", "nor", "none", "nothing", "without", "cannot", "cant",
+    "dont", "don", "doesn", "didn", "isn", "aren", "wasn", "weren", "won", "wouldn",
+    "shouldn", "couldn", "haven", "hasn", "hadn", "mustn",
+})
+_NEGATION_SUFFIXES = ("ない", "ません")
+
+# Prime modulus for MinHash permutations
+# MinHash置換用の素数の法
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalize_routing_content(text: str) -> str:
+    """
+    Normalize content so trivially different inputs share a cache key
+    些細な違いしかない入力が同じキャッシュキーになるようコンテンツを正規化
+
+    Applies NFKC and lowercasing, replaces URLs, e-mail addresses, UUIDs and
+    numbers with placeholders, and removes punctuation and extra whitespace.
+    NFKCと小文字化を適用し、URL、メールアドレス、UUID、数値をプレースホルダーに
+    置き換え、句読点と余分な空白を除去します。
+
+    Args:
+        text: Content to normalize / 正規化するコンテンツ
+
+    Returns:
+        str: Normalized content / 正規化されたコンテンツ
+    """
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    text = _URL_PATTERN.sub(" <url> ", text)
+    text = _EMAIL_PATTERN.sub(" <email> ", text)
+    text = _UUID_PATTERN.sub(" <id> ", text)
+    text = _NUMBER_PATTERN.sub(" <num> ", text)
+    text = _PUNCTUATION_PATTERN.sub(" ", text)
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def _negation_markers(normalized: str) -> FrozenSet[str]:
+    """Negation words and suffixes found in normalized content / 正規化コンテンツ中の否定語と否定の語尾"""
+    markers = {word for word in normalized.split() if word in _NEGATION_WORDS}
+    markers.update(suffix for suffix in _NEGATION_SUFFIXES if suffix in normalized)
+    return frozenset(markers)
+
+
+class _CacheEntry:
+    """
+    One cached routing decision
+    キャッシュされた1件のルーティング判断
+    """
+
+    __slots__ = ("value", "confidence", "expires_at", "signature", "negations")
+
+    def __init__(
+        self,
+        value: Any,
+        confidence: float,
+        expires_at: Optional[float],
+        signature: Optional[Tuple[int, ...]],
+        negations: FrozenSet[str] = frozenset()
+    ):
+        self.value = value
+        self.confidence = confidence
+        self.expires_at = expires_at
+        self.signature = signature
+        self.negations = negations
+
+
+class RoutingCache:
+    """
+    Thread-safe LRU cache of routing decisions with near-duplicate lookup
+    ほぼ重複検索に対応したスレッドセーフなルーティング判断のLRUキャッシュ
+
+    Near-duplicate lookup is opt-in through similarity_threshold. Inputs that
+    differ in negation ("cancel" / "do not cancel") never match each other.
+    ほぼ重複検索はsimilarity_thresholdによるオプトインです。否定の有無が異なる入力
+    （"cancel" / "do not cancel"）は互いに一致しません。
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = 3600.0,
+        max_entries: int = 10000,
+        min_confidence: float = 0.8,
+        similarity_threshold: Optional[float] = None,
+        num_perm: int = 32,
+        bands: int = 8,
+        shingle_size: int = 4,
+        normalizer: Callable[[str], str] = normalize_routing_content,
+        seed: int = 1
+    ):
+        """
+        Initialize routing cache
+        ルーティングキャッシュを初期化
+
+        Args:
+            ttl: Seconds an entry stays valid (None never expires) / エントリの有効秒数（Noneで無期限）
+            max_entries: Maximum number of entries / 最大エントリ数
+            min_confidence: Minimum confidence for a decision to be cached / キャッシュする判断の最小信頼度
+            similarity_threshold: Minimum estimated Jaccard similarity for near-duplicate hits (None disables them, the default)
+                                  ほぼ重複ヒットの最小推定Jaccard類似度（Noneで無効、デフォルト）
+            num_perm: Number of MinHash permutations / MinHash置換の数
+            bands: Number of LSH bands (must divide num_perm) / LSHバンド数（num_permを割り切る必要あり）
+            shingle_size: Character shingle length / 文字シングルの長さ
+            normalizer: Content normalization function / コンテンツ正規化関数
+            seed: Seed for the MinHash permutations / MinHash置換のシード
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.min_confidence = min_confidence
+        self.similarity_threshold = similarity_threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.normalizer = normalizer
+
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)
+        ]
+        self._rows = num_perm // bands
+        self._entries: "OrderedDict[Tuple[str, str], _CacheEntry]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], Set[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+
+        # Counters / カウンター
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, content: Any, instruction: str, destinations: Optional[Iterable[str]] = None) -> Optional[Any]:
+        """
+        Look up a cached routing decision
+        キャッシュされたルーティング判断を検索
+
+        Args:
+            content: Content being routed / ルーティング対象のコンテンツ
+            instruction: Routing instruction or classification prompt / ルーティング指示または分類プロンプト
+            destinations: Possible destinations / 分岐先の候補
+
+        Returns:
+            Optional[Any]: Cached decision, or None on a miss / キャッシュされた判断（ミスの場合None）
+        """
+        scope = self._scope(instruction, destinations)
+        normalized = self.normalizer(str(content))
+        key = (scope, self._digest(normalized))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._live_entry(key, now)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+
+        if self.similarity_threshold is not None:
+            signature = self._signature(normalized)
+            negations = _negation_markers(normalized)
+            with self._lock:
+                best_key, best_similarity = None, self.similarity_threshold
+                for candidate in self._candidates(scope, signature):
+                    entry = self._live_entry(candidate, now)
+                    if entry is None or entry.signature is None or entry.negations != negations:
+                        continue
+                    similarity = self._similarity(signature, entry.signature)
+                    if similarity >= best_similarity:
+                        best_key, best_similarity = candidate, similarity
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.near_hits += 1
+                    return self._entries[best_key].value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(
+        self,
+        content: Any,
+        instruction: str,
+        destinations: Optional[Iterable[str]],
+        value: Any,
+        confidence: float = 1.0
+    ) -> bool:
+        """
+        Cache a routing decision if it is confident enough
+        十分な信頼度があればルーティング判断をキャッシュ
+
+        Args:
+            content: Content that was routed / ルーティングされたコンテンツ
+            instruction: Routing instruction or classification prompt / ルーティング指示または分類プロンプト
+            destinations: Possible destinations / 分岐先の候補
+            value: Decision to cache / キャッシュする判断
+            confidence: Confidence of the decision (0.0-1.0) / 判断の信頼度（0.0〜1.0）
+
+        Returns:
+            bool: True if the decision was admitted / 判断が登録された場合True
+        """
+        if value is None or confidence < self.min_confidence:
+            with self._lock:
+                self.rejected += 1
+            return False
+
+        scope = self._scope(instruction, destinations)
+        normalized = self.normalizer(str(content))
+        key = (scope, self._digest(normalized))
+        signature = self._signature(normalized) if self.similarity_threshold is not None else None
+        negations = _negation_markers(normalized) if signature is not None else frozenset()
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(value, confidence, expires_at, signature, negations)
+            if signature is not None:
+                for band_key in self._band_keys(scope, signature):
+                    self._buckets.setdefault(band_key, set()).add(key)
+            self.admitted += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        """
+        Remove all entries
+        すべてのエントリを削除
+        """
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def get_metrics(self) -> Dict[str, int]:
+        """
+        Get cache counters
+        キャッシュのカウンターを取得
+
+        Returns:
+            Dict[str, int]: Counters / カウンター
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+            }
+
+    def _live_entry(self, key: Tuple[str, str], now: float) -> Optional[_CacheEntry]:
+        """Return an unexpired entry, dropping it if expired (lock held) / 失効していないエントリを返し、失効していれば削除（ロック保持中）"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at is not None and entry.expires_at <= now:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        """Remove an entry and its LSH bucket memberships (lock held) / エントリとLSHバケットの所属を削除（ロック保持中）"""
+        entry = self._entries.pop(key)
+        if entry.signature is None:
+            return
+        for band_key in self._band_keys(key[0], entry.signature):
+            members = self._buckets.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._buckets[band_key]
+
+    def _candidates(self, scope: str, signature: Tuple[int, ...]) -> Set[Tuple[str, str]]:
+        """Keys sharing at least one LSH band (lock held) / 少なくとも1つのLSHバンドを共有するキー（ロック保持中）"""
+        candidates: Set[Tuple[str, str]] = set()
+        for band_key in self._band_keys(scope, signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        return candidates
+
+    def _band_keys(self, scope: str, signature: Tuple[int, ...]) -> List[Tuple[str, int, Tuple[int, ...]]]:
+        rows = self._rows
+        return [(scope, band, signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def _signature(self, normalized: str) -> Tuple[int, ...]:
+        """
+        MinHash signature over character shingles
+        文字シングルに対するMinHash署名
+        """
+        size = self.shingle_size
+        shingles = {normalized[i:i + size] for i in range(max(len(normalized) - size + 1, 1))}
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+            for shingle in shingles
+        ]
+        return tuple(
+            min((a * value + b) % _MERSENNE_PRIME for value in hashes)
+            for a, b in self._permutations
+        )
+
+    @staticmethod
+    def _similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of two signatures / 2つの署名の推定Jaccard類似度"""
+        return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+    @staticmethod
+    def _scope(instruction: str, destinations: Optional[Iterable[str]]) -> str:
+        """Digest of the routing instruction and destination set / ルーティング指示と分岐先集合のダイジェスト"""
+        joined = "\x1f".join(sorted(destinations or ()))
+        return RoutingCache._digest(f"{instruction}\x00{joined}")
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,305 @@
+"""
+Tokenizer utilities for token-budgeted prompts
+トークン予算付きプロンプト用のトークナイザーユーティリティ
+
+English: Provides a pluggable token counting interface. When tiktoken is
+installed and its BPE tables are available offline, counts are exact for
+OpenAI models; otherwise a fast heuristic is used.
+日本語: プラガブルなトークン計数インターフェースを提供します。tiktokenが
+インストールされBPEテーブルがオフラインで利用可能な場合はOpenAIモデルに対して
+正確な値を、そうでない場合は高速なヒューリスティックを使用します。
+"""
+
+import re
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+
+# Word runs, digit groups (BPE vocabularies merge at most 3 digits),
+# single CJK/non-ASCII characters and single punctuation marks
+# 単語、数字グループ（BPE語彙は最大3桁をまとめる）、非ASCII文字1文字、記号1文字
+_HEURISTIC_PATTERN = re.compile(r"[A-Za-z]+|[0-9]{1,3}|[^\x00-\x7F]|[^\sA-Za-z0-9]")
+
+
+class Tokenizer(ABC):
+    """
+    English: Base class for token counters with a bounded per-text cache.
+    日本語: テキスト単位の上限付きキャッシュを持つトークンカウンターの基底クラス。
+    """
+
+    name: str = "base"
+
+    def __init__(self, cache_size: int = 4096):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+
+    @abstractmethod
+    def _count(self, text: str) -> int:
+        """Count tokens without caching / キャッシュなしでトークン数を数える"""
+
+    def count(self, text: str) -> int:
+        """
+        English: Count tokens in text, reusing cached counts for repeated sections.
+        日本語: テキストのトークン数を数える（同じセクションはキャッシュを再利用）。
+
+        Args:
+            text: Text to count / 数えるテキスト
+
+        Returns:
+            int: Token count / トークン数
+        """
+        if not text:
+            return 0
+        cached = self._cache.get(text)
+        if cached is not None:
+            self._cache.move_to_end(text)
+            return cached
+        tokens = self._count(text)
+        if self.cache_size > 0:
+            self._cache[text] = tokens
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int, keep: str = "start") -> str:
+        """
+        English: Cut text to at most max_tokens, keeping its start or end.
+        日本語: テキストをmax_tokens以内にカットし、先頭または末尾を保持する。
+
+        Uses a binary search on the character length, so the result is
+        exact for any tokenizer with O(log n) count calls.
+        文字数に対する二分探索を使うため、O(log n)回の計数でどのトークナイザーでも
+        正確な結果になります。
+
+        Args:
+            text: Text to cut / カットするテキスト
+            max_tokens: Token limit / トークン上限
+            keep: "start" to keep the beginning, "end" to keep the end / 先頭を残す場合"start"、末尾を残す場合"end"
+
+        Returns:
+            str: Cut text / カットされたテキスト
+        """
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            piece = text[:mid] if keep == "start" else text[len(text) - mid:]
+            if self._count(piece) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        # Drop whitespace left dangling at the cut
+        # カット位置に残った空白を除去
+        return text[:low].rstrip() if keep == "start" else text[len(text) - low:].lstrip()
+
+
+class WhitespaceTokenizer(Tokenizer):
+    """
+    English: Counts whitespace-separated words (legacy approximation).
+    日本語: 空白区切りの単語数を数える（従来の近似）。
+    """
+
+    name = "whitespace"
+
+    def _count(self, text: str) -> int:
+        return len(text.split())
+
+
+class HeuristicTokenizer(Tokenizer):
+    """
+    English: Fast offline approximation of BPE token counts.
+    日本語: BPEトークン数の高速なオフライン近似。
+
+    Words count one token per six letters, digits one token per three,
+    and every punctuation mark and non-ASCII character one token. This
+    slightly over-estimates English prose, which is the safe direction
+    for staying within a context window.
+    単語は6文字ごとに1トークン、数字は3桁ごとに1トークン、記号と非ASCII文字は
+    1文字1トークンとして数えます。英文ではやや多めに見積もるため、コンテキスト
+    ウィンドウを超えない安全側の近似です。
+    """
+
+    name = "heuristic"
+
+    def _count(self, text: str) -> int:
+        tokens = 0
+        for piece in _HEURISTIC_PATTERN.findall(text):
+            if piece.isalpha() and piece.isascii():
+                tokens += (len(piece) + 5) // 6
+            else:
+                tokens += 1
+        return tokens
+
+
+class TiktokenTokenizer(Tokenizer):
+    """
+    English: Exact BPE token counts using tiktoken.
+    日本語: tiktokenによる正確なBPEトークン数。
+    """
+
+    name = "tiktoken"
+
+    def __init__(self, encoding_name: str = "cl100k_base", cache_size: int = 4096):
+        super().__init__(cache_size=cache_size)
+        if not TIKTOKEN_AVAILABLE:
+            raise ImportError("tiktoken is not installed. Install with: pip install 'refinire[tokenizer]'")
+        self.encoding_name = encoding_name
+        self._encoding = tiktoken.get_encoding(encoding_name)
+
+    @classmethod
+    def for_model(cls, model: str, cache_size: int = 4096) -> "TiktokenTokenizer":
+        """
+        English: Create a tokenizer using the encoding tiktoken assigns to a model.
+        日本語: tiktokenがモデルに割り当てるエンコーディングでトークナイザーを作成する。
+        """
+        if not TIKTOKEN_AVAILABLE:
+            raise ImportError("tiktoken is not installed. Install with: pip install 'refinire[tokenizer]'")
+        try:
+            encoding_name = tiktoken.encoding_name_for_model(model)
+        except KeyError:
+            encoding_name = "o200k_base" if model.startswith(("gpt-4o", "gpt-4.1", "o1", "o3", "o4")) else "cl100k_base"
+        return cls(encoding_name=encoding_name, cache_size=cache_size)
+
+    def _count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+_TOKENIZER_CLASSES = {
+    "whitespace": WhitespaceTokenizer,
+    "heuristic": HeuristicTokenizer,
+}
+
+_default_tokenizers: Dict[str, Tokenizer] = {}
+
+
+def get_tokenizer(tokenizer: Union[str, Tokenizer, None] = None, model: Optional[str] = None) -> Tokenizer:
+    """
+    English: Resolve a tokenizer specification to a (shared) Tokenizer instance.
+    日本語: トークナイザー指定を（共有の）Tokenizerインスタンスに解決する。
+
+    "auto" (the default) uses tiktoken when it is installed and its tables
+    can be loaded, and falls back to the heuristic tokenizer otherwise.
+    "auto"（デフォルト）はtiktokenがインストールされテーブルを読み込める場合に
+    それを使い、それ以外はヒューリスティックにフォールバックします。
+
+    Args:
+        tokenizer: Tokenizer instance or name ("auto", "tiktoken", "heuristic", "whitespace") / Tokenizerインスタンスまたは名前
+        model: Model name used to pick the BPE encoding / BPEエンコーディング選択に使うモデル名
+
+    Returns:
+        Tokenizer: Tokenizer instance / Tokenizerインスタンス
+
+    Raises:
+        ValueError: If the tokenizer name is unknown / 未知のトークナイザー名の場合
+    """
+    if isinstance(tokenizer, Tokenizer):
+        return tokenizer
+    name = tokenizer or "auto"
+    key = f"{name}:{model or ''}"
+    cached = _default_tokenizers.get(key)
+    if cached is not None:
+        return cached
+
+    if name in ("auto", "tiktoken"):
+        try:
+            instance: Tokenizer = TiktokenTokenizer.for_model(model) if model else TiktokenTokenizer()
+        except Exception:
+            # Not installed, or BPE tables cannot be loaded offline
+            # 未インストール、またはBPEテーブルをオフラインで読み込めない
+            if name == "tiktoken":
+                raise
+            instance = HeuristicTokenizer()
+    elif name in _TOKENIZER_CLASSES:
+        instance = _TOKENIZER_CLASSES[name]()
+    else:
+        raise ValueError(f"Unknown tokenizer: {name}")
+
+    _default_tokenizers[key] = instance
+    return instance
+
+
+class TokenBudget:
+    """
+    English: A token budget shared by several parts of a prompt.
+    日本語: プロンプトの複数の部分で共有されるトークン予算。
+
+    Parts are admitted in order; a part that does not fit entirely is
+    truncated to the remaining budget.
+    部分は順番に受け入れられ、全体が収まらない部分は残り予算まで切り詰められます。
+    """
+
+    def __init__(self, max_tokens: int, tokenizer: Union[str, Tokenizer, None] = None, model: Optional[str] = None):
+        """
+        Args:
+            max_tokens: Total token budget / 合計トークン予算
+            tokenizer: Tokenizer instance or name / Tokenizerインスタンスまたは名前
+            model: Model name used to pick the BPE encoding / BPEエンコーディング選択に使うモデル名
+        """
+        if max_tokens < 0:
+            raise ValueError("max_tokens must be non-negative")
+        self.max_tokens = max_tokens
+        self.tokenizer = get_tokenizer(tokenizer, model=model)
+        self.used = 0
+
+    @property
+    def remaining(self) -> int:
+        """Tokens left in the budget / 予算の残りトークン数"""
+        return max(0, self.max_tokens - self.used)
+
+    def reserve(self, text: str) -> int:
+        """
+        English: Charge text that must be included in full (e.g. the user input).
+        日本語: 必ず全体を含めるテキスト（ユーザー入力など）を予算に計上する。
+
+        Returns:
+            int: Tokens charged / 計上したトークン数
+        """
+        tokens = self.tokenizer.count(text)
+        self.used += tokens
+        return tokens
+
+    def fit(self, text: str, keep: str = "start") -> str:
+        """
+        English: Admit text, truncating it to the remaining budget if needed.
+        日本語: テキストを受け入れ、必要に応じて残り予算まで切り詰める。
+
+        Args:
+            text: Text to admit / 受け入れるテキスト
+            keep: Part to keep when truncating ("start" or "end") / 切り詰め時に残す部分
+
+        Returns:
+            str: Admitted text (empty if the budget is exhausted) / 受け入れたテキスト（予算切れの場合は空）
+        """
+        if not text or self.remaining == 0:
+            return ""
+        tokens = self.tokenizer.count(text)
+        if tokens > self.remaining:
+            text = self.tokenizer.truncate(text, self.remaining, keep=keep)
+            tokens = self.tokenizer.count(text)
+        self.used += tokens
+        return text
+
+    def fit_all(self, parts: List[str], keep: str = "start") -> List[str]:
+        """
+        English: Admit parts in order until the budget is exhausted.
+        日本語: 予算が尽きるまで部分を順番に受け入れる。
+        """
+        admitted = []
+        for part in parts:
+            fitted = self.fit(part, keep=keep)
+            if fitted:
+                admitted.append(fitted)
+            if self.remaining == 0:
+                break
+        return admitted
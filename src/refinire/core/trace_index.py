@@ -0,0 +1,231 @@
+"""
+Trace Index - Secondary indexes for TraceRegistry searches
+トレースインデックス - TraceRegistry検索用のセカンダリインデックス
+
+Keeps hash maps for status, flow name, agent name and tag values, a
+trigram index over distinct names for substring search, and a sorted
+list of start times for range queries.
+ステータス、フロー名、エージェント名、タグ値のハッシュマップ、部分一致検索用の
+ユニークな名前に対するトライグラムインデックス、範囲検索用の開始時刻の
+ソート済みリストを保持します。
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Character trigrams of a string / 文字列の文字トライグラム"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _NameIndex:
+    """
+    Map names to trace IDs with case-insensitive substring lookup
+    大文字小文字を区別しない部分一致検索付きで名前をトレースIDに対応付け
+
+    Substring queries only look at distinct names (far fewer than traces);
+    queries of three or more characters are narrowed by trigrams first.
+    部分一致検索はユニークな名前（トレース数よりはるかに少ない）のみを対象とし、
+    3文字以上のクエリはまずトライグラムで絞り込みます。
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, Set[str]] = {}
+        self._lower: Dict[str, str] = {}
+        self._grams: Dict[str, Set[str]] = {}
+
+    def add(self, name: str, trace_id: str) -> None:
+        ids = self._ids.get(name)
+        if ids is None:
+            ids = self._ids[name] = set()
+            lowered = self._lower[name] = name.lower()
+            for gram in _trigrams(lowered):
+                self._grams.setdefault(gram, set()).add(name)
+        ids.add(trace_id)
+
+    def remove(self, name: str, trace_id: str) -> None:
+        ids = self._ids.get(name)
+        if ids is None:
+            return
+        ids.discard(trace_id)
+        if not ids:
+            del self._ids[name]
+            for gram in _trigrams(self._lower.pop(name)):
+                names = self._grams.get(gram)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del self._grams[gram]
+
+    def exact(self, name: str) -> Set[str]:
+        return self._ids.get(name, set())
+
+    def contains(self, needle: str) -> Set[str]:
+        needle = needle.lower()
+        if len(needle) >= 3:
+            gram_sets = sorted((self._grams.get(gram, set()) for gram in _trigrams(needle)), key=len)
+            names: Iterable[str] = set.intersection(*gram_sets) if gram_sets else set()
+        else:
+            names = self._ids.keys()
+        result: Set[str] = set()
+        for name in names:
+            if needle in self._lower[name]:
+                result |= self._ids[name]
+        return result
+
+
+class TraceIndex:
+    """
+    Secondary indexes over TraceMetadata objects
+    TraceMetadataオブジェクトに対するセカンダリインデックス
+
+    The registry must call remove before mutating an indexed field and
+    add afterwards; all lookups return sets of trace IDs.
+    レジストリはインデックス対象フィールドを変更する前にremoveを、変更後にaddを
+    呼ぶ必要があります。検索はすべてトレースIDの集合を返します。
+    """
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self._status: Dict[str, Set[str]] = {}
+        self._flows = _NameIndex()
+        self._agents = _NameIndex()
+        # Tag values that are hashable are looked up directly; others are
+        # compared against the stored traces
+        # ハッシュ可能なタグ値は直接検索し、それ以外は保存済みトレースと比較する
+        self._tags: Dict[str, Dict[Any, Set[str]]] = {}
+        self._unhashable_tags: Dict[str, Set[str]] = {}
+        self._times: List[Tuple[datetime, str]] = []
+
+    def add(self, trace: Any) -> None:
+        """
+        Index a trace
+        トレースをインデックスに追加
+
+        Args:
+            trace: TraceMetadata to index / インデックスに追加するTraceMetadata
+        """
+        trace_id = trace.trace_id
+        self._status.setdefault(trace.status, set()).add(trace_id)
+        if trace.flow_name:
+            self._flows.add(trace.flow_name, trace_id)
+        for agent_name in set(trace.agent_names):
+            self._agents.add(agent_name, trace_id)
+        for key, value in trace.tags.items():
+            try:
+                hash(value)
+            except TypeError:
+                self._unhashable_tags.setdefault(key, set()).add(trace_id)
+                continue
+            self._tags.setdefault(key, {}).setdefault(value, set()).add(trace_id)
+        insort(self._times, (trace.start_time, trace_id))
+
+    def remove(self, trace: Any) -> None:
+        """
+        Remove a trace from the index
+        トレースをインデックスから削除
+
+        Args:
+            trace: TraceMetadata with the values it was indexed with / インデックス時の値を持つTraceMetadata
+        """
+        trace_id = trace.trace_id
+        self._discard(self._status, trace.status, trace_id)
+        if trace.flow_name:
+            self._flows.remove(trace.flow_name, trace_id)
+        for agent_name in set(trace.agent_names):
+            self._agents.remove(agent_name, trace_id)
+        for key, value in trace.tags.items():
+            try:
+                hash(value)
+            except TypeError:
+                self._discard(self._unhashable_tags, key, trace_id)
+                continue
+            values = self._tags.get(key)
+            if values is not None:
+                self._discard(values, value, trace_id)
+                if not values:
+                    del self._tags[key]
+        position = bisect_left(self._times, (trace.start_time, trace_id))
+        if position < len(self._times) and self._times[position] == (trace.start_time, trace_id):
+            del self._times[position]
+
+    @staticmethod
+    def _discard(mapping: Dict[Any, Set[str]], key: Any, trace_id: str) -> None:
+        ids = mapping.get(key)
+        if ids is not None:
+            ids.discard(trace_id)
+            if not ids:
+                del mapping[key]
+
+    def by_status(self, status: str) -> Set[str]:
+        return self._status.get(status, set())
+
+    def by_flow_name(self, flow_name: str, exact_match: bool = False) -> Set[str]:
+        return self._flows.exact(flow_name) if exact_match else self._flows.contains(flow_name)
+
+    def by_agent_name(self, agent_name: str, exact_match: bool = False) -> Set[str]:
+        return self._agents.exact(agent_name) if exact_match else self._agents.contains(agent_name)
+
+    def by_tag(self, key: str, value: Any, traces: Dict[str, Any]) -> Set[str]:
+        """
+        Trace IDs whose tag key equals value
+        タグキーが値と等しいトレースID
+
+        Args:
+            key: Tag key / タグキー
+            value: Tag value / タグ値
+            traces: Registry traces used to check unhashable values / ハッシュ不可能な値の確認に使うレジストリのトレース
+        """
+        try:
+            result = set(self._tags.get(key, {}).get(value, ()))
+        except TypeError:
+            result = set()
+        for trace_id in self._unhashable_tags.get(key, ()):
+            if traces[trace_id].tags.get(key) == value:
+                result.add(trace_id)
+        return result
+
+    def _time_bounds(self, start_time: Optional[datetime], end_time: Optional[datetime]) -> Tuple[int, int]:
+        low = bisect_left(self._times, (start_time,)) if start_time else 0
+        high = len(self._times)
+        if end_time:
+            # Entries at exactly end_time are included
+            # ちょうどend_timeのエントリも含める
+            high = bisect_right(self._times, (end_time, chr(0x10FFFF)))
+        return low, max(low, high)
+
+    def count_in_range(self, start_time: Optional[datetime], end_time: Optional[datetime]) -> int:
+        low, high = self._time_bounds(start_time, end_time)
+        return high - low
+
+    def in_range(
+        self,
+        start_time: Optional[datetime],
+        end_time: Optional[datetime],
+        newest_first: bool = False,
+        limit: Optional[int] = None
+    ) -> List[str]:
+        """
+        Trace IDs started within a time range, ordered by start time
+        時間範囲内に開始したトレースIDを開始時刻順で返す
+
+        Args:
+            start_time: Inclusive lower bound / 下限（含む）
+            end_time: Inclusive upper bound / 上限（含む）
+            newest_first: Return the newest traces first / 新しいトレースから返す
+            limit: Maximum number of IDs / 最大ID数
+        """
+        low, high = self._time_bounds(start_time, end_time)
+        if limit is not None:
+            if newest_first:
+                low = max(low, high - limit)
+            else:
+                high = min(high, low + limit)
+        entries = self._times[low:high]
+        if newest_first:
+            entries.reverse()
+        return [trace_id for _, trace_id in entries]
@@ -7,13 +7,25 @@ Provides centralized trace management with search capabilities
 集中化されたトレース管理と検索機能を提供
 """
 
+import heapq
 import json
-from typing import Dict, List, Optional, Any, Union
+import logging
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Set, Tuple, Union
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 from pathlib import Path
 import threading
 
+from .trace_index import TraceIndex
+from .trace_retention import RetentionPolicy
+from .trace_stats import TraceStatistics
+from .trace_storage import TraceStore, create_trace_store
+from .trace_writer import TraceWriteBehind
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class TraceMetadata:
@@ -33,7 +45,33 @@ class TraceMetadata:
     duration_seconds: Optional[float]  # Total duration / 総実行時間
     tags: Dict[str, Any]  # Custom tags for filtering / フィルタリング用カスタムタグ
     artifacts: Dict[str, Any]  # Trace artifacts / トレース成果物
-    
+
+
+def _trace_to_record(trace: TraceMetadata) -> Dict[str, Any]:
+    """
+    Convert trace metadata to a JSON-serializable record
+    トレースメタデータをJSONシリアライズ可能なレコードに変換
+    """
+    record = asdict(trace)
+    for key in ("start_time", "end_time"):
+        if isinstance(record.get(key), datetime):
+            record[key] = record[key].isoformat()
+    return record
+
+
+def _record_to_trace(record: Dict[str, Any]) -> TraceMetadata:
+    """
+    Convert a stored record back to trace metadata
+    保存されたレコードをトレースメタデータに戻す
+    """
+    # Convert datetime strings back to datetime objects
+    # 日時文字列をdatetimeオブジェクトに戻す
+    if isinstance(record.get("start_time"), str):
+        record["start_time"] = datetime.fromisoformat(record["start_time"])
+    if isinstance(record.get("end_time"), str):
+        record["end_time"] = datetime.fromisoformat(record["end_time"])
+    return TraceMetadata(**record)
+
 
 class TraceRegistry:
     """
@@ -48,22 +86,80 @@ class TraceRegistry:
     - Export/import trace data / トレースデータのエクスポート/インポート
     """
     
-    def __init__(self, storage_path: Optional[str] = None):
+    def __init__(
+        self,
+        storage_path: Optional[str] = None,
+        storage_backend: str = "auto",
+        compact_ratio: float = 2.0,
+        compact_min_records: int = 1000,
+        retention: Optional[RetentionPolicy] = None,
+        stats_bucket_seconds: int = 60
+    ):
         """
         Initialize trace registry
         トレースレジストリを初期化
         
+        Changes are appended to a journal (JSON Lines, or SQLite for .db/.sqlite
+        paths) so each update costs O(1) I/O; the journal is compacted once it
+        holds compact_ratio records per live trace.
+        変更はジャーナル（JSON Lines、.db/.sqliteのパスではSQLite）に追記されるため
+        更新ごとのI/OはO(1)です。ジャーナルは有効トレース1件あたりcompact_ratio件の
+        レコードを超えると圧縮されます。
+        
         Args:
             storage_path: Path to store trace data / トレースデータの保存パス
+            storage_backend: "auto", "jsonl" or "sqlite" / ストレージバックエンド
+            compact_ratio: Journal records per live trace that trigger compaction / 圧縮を起動する有効トレースあたりのレコード数
+            compact_min_records: Minimum journal size before compaction / 圧縮前の最小ジャーナルサイズ
+            retention: Limits on trace count, age, size and artifact size / トレース数、経過時間、サイズ、成果物サイズの制限
+            stats_bucket_seconds: Width of the time buckets in get_time_series / get_time_seriesの時間バケットの幅（秒）
         """
         self.traces: Dict[str, TraceMetadata] = {}
         self.storage_path = Path(storage_path) if storage_path else None
         self._lock = threading.Lock()
+        # Secondary indexes kept in sync with self.traces
+        # self.tracesと同期して保持されるセカンダリインデックス
+        self._index = TraceIndex()
+        # Aggregates maintained alongside the indexes
+        # インデックスと並行して維持される集計
+        self._stats = TraceStatistics(bucket_seconds=stats_bucket_seconds)
+        self._store: Optional[TraceStore] = None
+        self._writer: Optional[TraceWriteBehind] = None
+        self._writer_lock = threading.Lock()
+        # Changed traces whose storage write failed, retried on the next commit
+        # ストレージ書き込みに失敗した変更済みトレース（次回のコミットで再試行）
+        self._unpersisted: Dict[str, TraceMetadata] = {}
+        
+        # Retention state: access order for LRU eviction and estimated sizes
+        # 保持状態: LRU追い出し用のアクセス順と推定サイズ
+        self.retention = retention
+        self._recency: "OrderedDict[str, None]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._retention_metrics: Dict[str, int] = {
+            "evicted_by_count": 0,
+            "evicted_by_age": 0,
+            "evicted_by_bytes": 0,
+            "artifacts_externalized": 0,
+            "artifacts_truncated": 0,
+            "artifacts_deleted": 0,
+        }
+        self._retention_stop = threading.Event()
+        self._retention_thread: Optional[threading.Thread] = None
+        
+        if self.storage_path:
+            store_options = {}
+            if storage_backend != "sqlite":
+                store_options = {"compact_ratio": compact_ratio, "compact_min_records": compact_min_records}
+            self._store = create_trace_store(str(self.storage_path), storage_backend, **store_options)
         
         # Load existing traces if storage path exists
         # 保存パスが存在する場合、既存のトレースを読み込み
         if self.storage_path and self.storage_path.exists():
             self.load_traces()
+        
+        if retention is not None and retention.enforce_interval:
+            self._start_retention_thread(retention.enforce_interval)
     
     def register_trace(
         self, 
@@ -71,7 +167,8 @@ class TraceRegistry:
         flow_name: Optional[str] = None,
         flow_id: Optional[str] = None,
         agent_names: Optional[List[str]] = None,
-        tags: Optional[Dict[str, Any]] = None
+        tags: Optional[Dict[str, Any]] = None,
+        start_time: Optional[datetime] = None
     ) -> None:
         """
         Register a new trace
@@ -83,24 +180,41 @@ class TraceRegistry:
             flow_id: Flow instance ID / フローインスタンスID
             agent_names: List of agent names / エージェント名のリスト
             tags: Custom tags / カスタムタグ
+            start_time: Trace start time (defaults to now) / トレース開始時刻（デフォルトは現在時刻）
         """
         with self._lock:
-            metadata = TraceMetadata(
-                trace_id=trace_id,
-                flow_name=flow_name,
-                flow_id=flow_id,
-                agent_names=agent_names or [],
-                start_time=datetime.now(),
-                end_time=None,
-                status="running",
-                total_spans=0,
-                error_count=0,
-                duration_seconds=None,
-                tags=tags or {},
-                artifacts={}
-            )
-            self.traces[trace_id] = metadata
-            self._save_if_configured()
+            metadata = self._register_locked(trace_id, flow_name, flow_id, agent_names, tags, start_time)
+            self._commit([metadata])
+    
+    def _register_locked(
+        self,
+        trace_id: str,
+        flow_name: Optional[str] = None,
+        flow_id: Optional[str] = None,
+        agent_names: Optional[List[str]] = None,
+        tags: Optional[Dict[str, Any]] = None,
+        start_time: Optional[datetime] = None
+    ) -> TraceMetadata:
+        """
+        Register a trace without persisting it (caller holds the lock)
+        永続化せずにトレースを登録（呼び出し側がロックを保持）
+        """
+        metadata = TraceMetadata(
+            trace_id=trace_id,
+            flow_name=flow_name,
+            flow_id=flow_id,
+            agent_names=agent_names or [],
+            start_time=start_time or datetime.now(),
+            end_time=None,
+            status="running",
+            total_spans=0,
+            error_count=0,
+            duration_seconds=None,
+            tags=tags or {},
+            artifacts={}
+        )
+        self._put_trace(metadata)
+        return metadata
     
     def update_trace(
         self,
@@ -110,7 +224,8 @@ class TraceRegistry:
         error_count: Optional[int] = None,
         artifacts: Optional[Dict[str, Any]] = None,
         add_agent_names: Optional[List[str]] = None,
-        add_tags: Optional[Dict[str, Any]] = None
+        add_tags: Optional[Dict[str, Any]] = None,
+        end_time: Optional[datetime] = None
     ) -> None:
         """
         Update trace metadata
@@ -124,37 +239,189 @@ class TraceRegistry:
             artifacts: Trace artifacts / トレース成果物
             add_agent_names: Additional agent names / 追加エージェント名
             add_tags: Additional tags / 追加タグ
+            end_time: Completion time for final statuses (defaults to now) / 終了ステータスの完了時刻（デフォルトは現在時刻）
         """
         with self._lock:
-            if trace_id not in self.traces:
-                return
+            trace = self._update_locked(
+                trace_id, status, total_spans, error_count, artifacts, add_agent_names, add_tags, end_time
+            )
+            if trace is not None:
+                self._commit([trace])
+    
+    def _update_locked(
+        self,
+        trace_id: str,
+        status: Optional[str] = None,
+        total_spans: Optional[int] = None,
+        error_count: Optional[int] = None,
+        artifacts: Optional[Dict[str, Any]] = None,
+        add_agent_names: Optional[List[str]] = None,
+        add_tags: Optional[Dict[str, Any]] = None,
+        end_time: Optional[datetime] = None
+    ) -> Optional[TraceMetadata]:
+        """
+        Update a trace without persisting it (caller holds the lock)
+        永続化せずにトレースを更新（呼び出し側がロックを保持）
+        
+        Returns:
+            Optional[TraceMetadata]: Updated trace, or None if unknown / 更新されたトレース（未知の場合None）
+        """
+        if trace_id not in self.traces:
+            return None
+        
+        trace = self.traces[trace_id]
+        self._index.remove(trace)
+        self._stats.remove(trace)
+        
+        if status:
+            trace.status = status
+            if status in ["completed", "error"]:
+                trace.end_time = end_time or datetime.now()
+                if trace.start_time:
+                    trace.duration_seconds = (trace.end_time - trace.start_time).total_seconds()
+        
+        if total_spans is not None:
+            trace.total_spans = total_spans
             
-            trace = self.traces[trace_id]
+        if error_count is not None:
+            trace.error_count = error_count
             
-            if status:
-                trace.status = status
-                if status in ["completed", "error"]:
-                    trace.end_time = datetime.now()
-                    if trace.start_time:
-                        trace.duration_seconds = (trace.end_time - trace.start_time).total_seconds()
+        if artifacts:
+            trace.artifacts.update(self._limit_artifacts(trace_id, artifacts))
             
-            if total_spans is not None:
-                trace.total_spans = total_spans
-                
-            if error_count is not None:
-                trace.error_count = error_count
-                
-            if artifacts:
-                trace.artifacts.update(artifacts)
-                
-            if add_agent_names:
-                trace.agent_names.extend(add_agent_names)
-                trace.agent_names = list(set(trace.agent_names))  # Remove duplicates
-                
-            if add_tags:
-                trace.tags.update(add_tags)
+        if add_agent_names:
+            trace.agent_names.extend(add_agent_names)
+            trace.agent_names = list(set(trace.agent_names))  # Remove duplicates
+            
+        if add_tags:
+            trace.tags.update(add_tags)
+        
+        self._index.add(trace)
+        self._stats.add(trace)
+        self._recency[trace_id] = None
+        self._recency.move_to_end(trace_id)
+        self._track_size(trace)
+        return trace
+    
+    def apply_batch(self, operations: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        Apply queued register/update operations under a single lock
+        キューに入った登録・更新操作を1回のロックで適用
+        
+        Changed traces are persisted together, so a batch costs one storage
+        write instead of one per operation. A failing operation is logged and
+        skipped; the traces changed by the other operations are still persisted.
+        変更されたトレースはまとめて永続化されるため、バッチは操作ごとではなく
+        1回のストレージ書き込みで済みます。失敗した操作はログに記録してスキップし、
+        他の操作で変更されたトレースは引き続き永続化されます。
+        
+        Args:
+            operations: ("register", kwargs) or ("update", kwargs) pairs / ("register", kwargs)または("update", kwargs)のペア
             
-            self._save_if_configured()
+        Returns:
+            int: Number of operations that failed / 失敗した操作の数
+        """
+        failed = 0
+        with self._lock:
+            changed: Dict[str, TraceMetadata] = {}
+            for operation, kwargs in operations:
+                trace: Optional[TraceMetadata]
+                try:
+                    if operation == "register":
+                        trace = self._register_locked(**kwargs)
+                    elif operation == "update":
+                        trace = self._update_locked(**kwargs)
+                    else:
+                        raise ValueError(f"Unsupported trace operation: {operation}")
+                except Exception:
+                    failed += 1
+                    logger.exception("Failed to apply trace %s operation for %s", operation, kwargs.get("trace_id"))
+                    continue
+                if trace is not None:
+                    changed[trace.trace_id] = trace
+            self._commit(list(changed.values()))
+        return failed
+    
+    def submit_register(self, **kwargs: Any) -> bool:
+        """
+        Queue register_trace on the write-behind queue
+        write-behindキューにregister_traceを登録
+        
+        The start time and the argument values are captured now, not when the
+        queue is flushed.
+        開始時刻と引数の値はキューのフラッシュ時ではなく現在の状態で記録されます。
+        
+        Returns:
+            bool: False if the operation was dropped / 操作が破棄された場合False
+        """
+        kwargs = self._snapshot_arguments(kwargs)
+        kwargs.setdefault("start_time", datetime.now())
+        return self.write_behind.submit("register", kwargs)
+    
+    def submit_update(self, **kwargs: Any) -> bool:
+        """
+        Queue update_trace on the write-behind queue
+        write-behindキューにupdate_traceを登録
+        
+        Returns:
+            bool: False if the operation was dropped / 操作が破棄された場合False
+        """
+        kwargs = self._snapshot_arguments(kwargs)
+        kwargs.setdefault("end_time", datetime.now())
+        return self.write_behind.submit("update", kwargs)
+    
+    @staticmethod
+    def _snapshot_arguments(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy list and dict arguments so later changes by the caller are not queued / 呼び出し元の後からの変更がキューに入らないようリスト・辞書引数をコピー"""
+        return {
+            key: value.copy() if isinstance(value, (list, dict, set)) else value
+            for key, value in kwargs.items()
+        }
+    
+    @property
+    def write_behind(self) -> TraceWriteBehind:
+        """
+        Write-behind queue for this registry, created on first use
+        このレジストリのwrite-behindキュー（初回使用時に作成）
+        """
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = TraceWriteBehind(self)
+        return self._writer
+    
+    def configure_write_behind(self, **options: Any) -> TraceWriteBehind:
+        """
+        Replace the write-behind queue with one using the given options
+        指定オプションのwrite-behindキューに置き換える
+        
+        Args:
+            **options: TraceWriteBehind options (max_queue_size, batch_size, overflow_policy, flush_timeout) / TraceWriteBehindのオプション
+            
+        Returns:
+            TraceWriteBehind: New queue / 新しいキュー
+        """
+        previous = self._writer
+        if previous is not None:
+            previous.close()
+        self._writer = TraceWriteBehind(self, **options)
+        return self._writer
+    
+    def flush_pending(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until queued write-behind operations are applied
+        キューに入ったwrite-behind操作が適用されるまで待機
+        
+        Args:
+            timeout: Maximum wait in seconds (None uses the queue default) / 最大待機秒数（Noneでキューのデフォルト）
+            
+        Returns:
+            bool: True if nothing is pending / 保留中の操作がない場合True
+        """
+        writer = self._writer
+        if writer is None or not writer.pending:
+            return True
+        return writer.flush(timeout)
     
     def search_by_flow_name(self, flow_name: str, exact_match: bool = False) -> List[TraceMetadata]:
         """
@@ -168,17 +435,9 @@ class TraceRegistry:
         Returns:
             List[TraceMetadata]: Matching traces / マッチするトレース
         """
+        self.flush_pending()
         with self._lock:
-            results = []
-            for trace in self.traces.values():
-                if trace.flow_name:
-                    if exact_match:
-                        if trace.flow_name == flow_name:
-                            results.append(trace)
-                    else:
-                        if flow_name.lower() in trace.flow_name.lower():
-                            results.append(trace)
-            return results
+            return self._traces_for(self._index.by_flow_name(flow_name, exact_match))
     
     def search_by_agent_name(self, agent_name: str, exact_match: bool = False) -> List[TraceMetadata]:
         """
@@ -192,19 +451,9 @@ class TraceRegistry:
         Returns:
             List[TraceMetadata]: Matching traces / マッチするトレース
         """
+        self.flush_pending()
         with self._lock:
-            results = []
-            for trace in self.traces.values():
-                for trace_agent in trace.agent_names:
-                    if exact_match:
-                        if trace_agent == agent_name:
-                            results.append(trace)
-                            break
-                    else:
-                        if agent_name.lower() in trace_agent.lower():
-                            results.append(trace)
-                            break
-            return results
+            return self._traces_for(self._index.by_agent_name(agent_name, exact_match))
     
     def search_by_tags(self, tags: Dict[str, Any], match_all: bool = True) -> List[TraceMetadata]:
         """
@@ -218,26 +467,20 @@ class TraceRegistry:
         Returns:
             List[TraceMetadata]: Matching traces / マッチするトレース
         """
+        self.flush_pending()
         with self._lock:
-            results = []
-            for trace in self.traces.values():
-                if match_all:
-                    # All search tags must be present and match
-                    # すべての検索タグが存在し、マッチする必要がある
-                    if all(
-                        key in trace.tags and trace.tags[key] == value
-                        for key, value in tags.items()
-                    ):
-                        results.append(trace)
-                else:
-                    # At least one search tag must match
-                    # 少なくとも1つの検索タグがマッチする必要がある
-                    if any(
-                        key in trace.tags and trace.tags[key] == value
-                        for key, value in tags.items()
-                    ):
-                        results.append(trace)
-            return results
+            if match_all and not tags:
+                return list(self.traces.values())
+            tag_sets = [self._index.by_tag(key, value, self.traces) for key, value in tags.items()]
+            if match_all:
+                # All search tags must be present and match
+                # すべての検索タグが存在し、マッチする必要がある
+                ids = self._intersect(tag_sets)
+            else:
+                # At least one search tag must match
+                # 少なくとも1つの検索タグがマッチする必要がある
+                ids = set().union(*tag_sets)
+            return self._traces_for(ids)
     
     def search_by_time_range(
         self, 
@@ -253,19 +496,11 @@ class TraceRegistry:
             end_time: Search until this time / この時刻まで検索
             
         Returns:
-            List[TraceMetadata]: Matching traces / マッチするトレース
+            List[TraceMetadata]: Matching traces ordered by start time / 開始時刻順のマッチするトレース
         """
+        self.flush_pending()
         with self._lock:
-            results = []
-            for trace in self.traces.values():
-                # Check if trace start time is within range
-                # トレース開始時刻が範囲内かチェック
-                if start_time and trace.start_time < start_time:
-                    continue
-                if end_time and trace.start_time > end_time:
-                    continue
-                results.append(trace)
-            return results
+            return [self.traces[trace_id] for trace_id in self._index.in_range(start_time, end_time)]
     
     def search_by_status(self, status: str) -> List[TraceMetadata]:
         """
@@ -278,8 +513,9 @@ class TraceRegistry:
         Returns:
             List[TraceMetadata]: Matching traces / マッチするトレース
         """
+        self.flush_pending()
         with self._lock:
-            return [trace for trace in self.traces.values() if trace.status == status]
+            return self._traces_for(self._index.by_status(status))
     
     def get_trace(self, trace_id: str) -> Optional[TraceMetadata]:
         """
@@ -292,8 +528,12 @@ class TraceRegistry:
         Returns:
             TraceMetadata | None: Trace metadata if found / 見つかった場合のトレースメタデータ
         """
+        self.flush_pending()
         with self._lock:
-            return self.traces.get(trace_id)
+            trace = self.traces.get(trace_id)
+            if trace is not None and trace_id in self._recency:
+                self._recency.move_to_end(trace_id)
+            return trace
     
     def get_all_traces(self) -> List[TraceMetadata]:
         """
@@ -303,6 +543,7 @@ class TraceRegistry:
         Returns:
             List[TraceMetadata]: All traces / すべてのトレース
         """
+        self.flush_pending()
         with self._lock:
             return list(self.traces.values())
     
@@ -346,98 +587,193 @@ class TraceRegistry:
         Returns:
             List[TraceMetadata]: Matching traces / マッチするトレース
         """
+        self.flush_pending()
         with self._lock:
-            results = list(self.traces.values())
-            
-            # Apply filters
-            # フィルタを適用
+            # Candidate sets from the hash and name indexes
+            # ハッシュインデックスと名前インデックスからの候補集合
+            candidate_sets = []
+            if status:
+                candidate_sets.append(self._index.by_status(status))
             if flow_name:
-                results = [t for t in results if t.flow_name and flow_name.lower() in t.flow_name.lower()]
-            
+                candidate_sets.append(self._index.by_flow_name(flow_name))
             if agent_name:
-                results = [
-                    t for t in results 
-                    if any(agent_name.lower() in agent.lower() for agent in t.agent_names)
-                ]
-            
+                candidate_sets.append(self._index.by_agent_name(agent_name))
             if tags:
-                results = [
-                    t for t in results
-                    if all(key in t.tags and t.tags[key] == value for key, value in tags.items())
-                ]
-            
-            if status:
-                results = [t for t in results if t.status == status]
+                candidate_sets.extend(self._index.by_tag(key, value, self.traces) for key, value in tags.items())
             
-            if start_time:
-                results = [t for t in results if t.start_time >= start_time]
+            if not candidate_sets:
+                # Only the time index applies: walk it from the newest entry
+                # 時間インデックスのみ適用: 最新のエントリから走査
+                trace_ids = self._index.in_range(start_time, end_time, newest_first=True, limit=max_results or None)
+                return [self.traces[trace_id] for trace_id in trace_ids]
             
-            if end_time:
-                results = [t for t in results if t.start_time <= end_time]
-            
-            # Sort by start time (newest first)
-            # 開始時刻でソート（新しい順）
-            results.sort(key=lambda t: t.start_time, reverse=True)
+            # Start from the most selective index; the time range is used as
+            # a base only when it is smaller than every candidate set
+            # 最も選択性の高いインデックスから開始し、時間範囲はすべての候補集合より
+            # 小さい場合のみ基点として使う
+            if (start_time or end_time) and self._index.count_in_range(start_time, end_time) < min(map(len, candidate_sets)):
+                ids = self._intersect(candidate_sets, set(self._index.in_range(start_time, end_time)))
+            else:
+                ids = self._intersect(candidate_sets)
+                if start_time or end_time:
+                    ids = {
+                        trace_id for trace_id in ids
+                        if (not start_time or self.traces[trace_id].start_time >= start_time)
+                        and (not end_time or self.traces[trace_id].start_time <= end_time)
+                    }
             
-            # Limit results
-            # 結果数を制限
+            # Sort by start time (newest first), using a heap for top-k
+            # 開始時刻でソート（新しい順）、上位k件にはヒープを使用
+            results = [self.traces[trace_id] for trace_id in ids]
             if max_results:
-                results = results[:max_results]
-            
+                return heapq.nlargest(max_results, results, key=lambda t: t.start_time)
+            results.sort(key=lambda t: t.start_time, reverse=True)
             return results
     
+    @staticmethod
+    def _intersect(sets: List[Set[str]], base: Optional[Set[str]] = None) -> Set[str]:
+        """
+        Intersect ID sets starting with the smallest
+        最小の集合から順にID集合の積を取る
+        """
+        ordered = sorted(sets, key=len)
+        if base is None:
+            if not ordered:
+                return set()
+            base, ordered = ordered[0], ordered[1:]
+        result = set(base)
+        for other in ordered:
+            if not result:
+                break
+            result &= other
+        return result
+    
+    def _traces_for(self, trace_ids: Set[str]) -> List[TraceMetadata]:
+        """
+        Traces for a set of IDs ordered by start time (caller holds the lock)
+        ID集合のトレースを開始時刻順で返す（呼び出し側がロックを保持）
+        """
+        results = [self.traces[trace_id] for trace_id in trace_ids]
+        results.sort(key=lambda t: t.start_time)
+        return results
+    
+    def _put_trace(self, trace: TraceMetadata) -> None:
+        """
+        Store a trace and index it, replacing any trace with the same ID
+        トレースを保存してインデックスに追加（同じIDのトレースは置き換え）
+        """
+        previous = self.traces.get(trace.trace_id)
+        if previous is not None:
+            self._index.remove(previous)
+            self._stats.remove(previous)
+        if trace.artifacts:
+            trace.artifacts = self._limit_artifacts(trace.trace_id, trace.artifacts)
+        self.traces[trace.trace_id] = trace
+        self._index.add(trace)
+        self._stats.add(trace)
+        self._recency[trace.trace_id] = None
+        self._recency.move_to_end(trace.trace_id)
+        self._track_size(trace)
+    
+    def _remove_trace(self, trace_id: str, delete_artifacts: bool = True) -> None:
+        """
+        Remove a trace, its index entries and its externalized artifact files
+        トレースとそのインデックスエントリ、外部化された成果物ファイルを削除
+        """
+        trace = self.traces.pop(trace_id, None)
+        if trace is not None:
+            self._index.remove(trace)
+            self._stats.remove(trace)
+            self._recency.pop(trace_id, None)
+            self._total_bytes -= self._sizes.pop(trace_id, 0)
+            if delete_artifacts and self.retention is not None and trace.artifacts:
+                self._retention_metrics["artifacts_deleted"] += self.retention.delete_artifacts(trace_id, trace.artifacts)
+    
+    def _limit_artifacts(self, trace_id: str, artifacts: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply the artifact size limit of the retention policy
+        保持ポリシーの成果物サイズ制限を適用
+        """
+        if self.retention is None:
+            return artifacts
+        limited, externalized, truncated = self.retention.limit_artifacts(trace_id, artifacts)
+        self._retention_metrics["artifacts_externalized"] += externalized
+        self._retention_metrics["artifacts_truncated"] += truncated
+        return limited
+    
+    def _track_size(self, trace: TraceMetadata) -> None:
+        """
+        Update the estimated size of a trace when a byte limit is set
+        バイト制限が設定されている場合、トレースの推定サイズを更新
+        """
+        if self.retention is None or self.retention.max_bytes is None:
+            return
+        size = len(json.dumps(_trace_to_record(trace), ensure_ascii=False, default=str).encode("utf-8"))
+        self._total_bytes += size - self._sizes.get(trace.trace_id, 0)
+        self._sizes[trace.trace_id] = size
+    
+
     def get_statistics(self) -> Dict[str, Any]:
         """
         Get trace statistics
         トレース統計を取得
         
+        Statistics are maintained incrementally, so this does not scan the
+        traces. Quantiles are estimates within 1% relative error.
+        統計は増分的に維持されるため、トレースを走査しません。分位点は相対誤差1%以内の
+        推定値です。
+        
         Returns:
             Dict[str, Any]: Statistics / 統計情報
         """
+        self.flush_pending()
         with self._lock:
-            total_traces = len(self.traces)
-            if total_traces == 0:
-                return {"total_traces": 0}
-            
-            statuses = {}
-            flow_names = set()
-            agent_names = set()
-            total_spans = 0
-            total_errors = 0
-            durations = []
+            return self._stats.summary()
+    
+    def get_flow_statistics(self, flow_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get statistics per flow name
+        フロー名ごとの統計を取得
+        
+        Args:
+            flow_name: Single flow to report (None for all flows) / 対象のフロー（Noneで全フロー）
             
-            for trace in self.traces.values():
-                # Status distribution
-                # ステータス分布
-                statuses[trace.status] = statuses.get(trace.status, 0) + 1
-                
-                # Collect names
-                # 名前を収集
-                if trace.flow_name:
-                    flow_names.add(trace.flow_name)
-                agent_names.update(trace.agent_names)
-                
-                # Aggregate metrics
-                # メトリクスを集計
-                total_spans += trace.total_spans
-                total_errors += trace.error_count
-                
-                if trace.duration_seconds is not None:
-                    durations.append(trace.duration_seconds)
+        Returns:
+            Dict[str, Any]: Statistics keyed by flow name, or for one flow / フロー名をキーとする統計、または1フローの統計
+        """
+        self.flush_pending()
+        with self._lock:
+            return self._stats.by_flow(flow_name)
+    
+    def get_agent_statistics(self, agent_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get statistics per agent name
+        エージェント名ごとの統計を取得
+        
+        Args:
+            agent_name: Single agent to report (None for all agents) / 対象のエージェント（Noneで全エージェント）
             
-            avg_duration = sum(durations) / len(durations) if durations else 0
+        Returns:
+            Dict[str, Any]: Statistics keyed by agent name, or for one agent / エージェント名をキーとする統計、または1エージェントの統計
+        """
+        self.flush_pending()
+        with self._lock:
+            return self._stats.by_agent(agent_name)
+    
+    def get_time_series(self, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Get statistics per time bucket of trace start times
+        トレース開始時刻の時間バケットごとの統計を取得
+        
+        Args:
+            since: Only include buckets from this time / この時刻以降のバケットのみ含める
             
-            return {
-                "total_traces": total_traces,
-                "status_distribution": statuses,
-                "unique_flow_names": len(flow_names),
-                "unique_agent_names": len(agent_names),
-                "total_spans": total_spans,
-                "total_errors": total_errors,
-                "average_duration_seconds": avg_duration,
-                "flow_names": list(flow_names),
-                "agent_names": list(agent_names)
-            }
+        Returns:
+            List[Dict[str, Any]]: Buckets oldest first, each with "bucket_start" / 古い順のバケット（各要素に"bucket_start"）
+        """
+        self.flush_pending()
+        with self._lock:
+            return self._stats.time_series(since)
     
     def export_traces(self, file_path: str, format: str = "json") -> None:
         """
@@ -448,6 +784,7 @@ class TraceRegistry:
             file_path: Output file path / 出力ファイルパス
             format: Export format (json, csv) / エクスポート形式
         """
+        self.flush_pending()
         with self._lock:
             if format == "json":
                 data = {
@@ -476,21 +813,14 @@ class TraceRegistry:
                 with open(file_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
                 
-                imported_count = 0
+                imported = []
                 for trace_data in data.get("traces", []):
-                    # Convert datetime strings back to datetime objects
-                    # 日時文字列をdatetimeオブジェクトに戻す
-                    if isinstance(trace_data.get("start_time"), str):
-                        trace_data["start_time"] = datetime.fromisoformat(trace_data["start_time"])
-                    if isinstance(trace_data.get("end_time"), str):
-                        trace_data["end_time"] = datetime.fromisoformat(trace_data["end_time"])
-                    
-                    trace = TraceMetadata(**trace_data)
-                    self.traces[trace.trace_id] = trace
-                    imported_count += 1
+                    trace = _record_to_trace(trace_data)
+                    self._put_trace(trace)
+                    imported.append(trace)
                 
-                self._save_if_configured()
-                return imported_count
+                self._commit(imported)
+                return len(imported)
             else:
                 raise ValueError(f"Unsupported import format: {format}")
     
@@ -505,68 +835,268 @@ class TraceRegistry:
         Returns:
             int: Number of removed traces / 削除されたトレース数
         """
+        self.flush_pending()
         with self._lock:
             cutoff_time = datetime.now() - timedelta(days=days)
             old_trace_ids = [
-                trace_id for trace_id, trace in self.traces.items()
-                if trace.start_time < cutoff_time
+                trace_id for trace_id in self._index.in_range(None, cutoff_time)
+                if self.traces[trace_id].start_time < cutoff_time
             ]
             
             for trace_id in old_trace_ids:
-                del self.traces[trace_id]
+                self._remove_trace(trace_id)
             
-            self._save_if_configured()
+            if self._store and old_trace_ids:
+                self._store.delete_many(old_trace_ids)
+                self._compact_if_needed()
             return len(old_trace_ids)
     
-    def _save_if_configured(self) -> None:
+    def _commit(self, changed: List[TraceMetadata]) -> None:
         """
-        Save traces to storage if configured
-        設定されている場合、トレースを保存
+        Enforce retention, then persist changed traces and evictions (caller holds the lock)
+        保持ポリシーを適用し、変更されたトレースと追い出しを永続化（呼び出し側がロックを保持）
+        
+        Traces whose write failed stay in memory and are retried on the next commit.
+        書き込みに失敗したトレースはメモリに残り、次回のコミットで再試行されます。
         """
-        if self.storage_path:
-            self.save_traces()
+        if self._unpersisted:
+            pending = dict(self._unpersisted)
+            pending.update((trace.trace_id, trace) for trace in changed)
+            changed = list(pending.values())
+            self._unpersisted = {}
+        evicted = self._enforce_retention_locked()
+        if evicted:
+            changed = [trace for trace in changed if trace.trace_id in self.traces]
+        try:
+            if evicted and self._store:
+                self._store.delete_many(evicted)
+            self._persist(changed)
+        except Exception:
+            self._unpersisted.update((trace.trace_id, trace) for trace in changed)
+            raise
+    
+    def _enforce_retention_locked(self) -> List[str]:
+        """
+        Evict traces beyond the retention limits (caller holds the lock)
+        保持制限を超えたトレースを追い出す（呼び出し側がロックを保持）
+        
+        Expired traces go first; then least recently used traces are evicted
+        until the count and byte limits hold. Running traces are only evicted
+        when finished ones are not enough, unless evict_running is set.
+        期限切れのトレースを最初に、その後件数とバイトの制限を満たすまで最も長く
+        使われていないトレースを追い出します。evict_runningが未設定の場合、実行中の
+        トレースは完了済みだけでは足りない場合にのみ追い出されます。
+        
+        Returns:
+            List[str]: Evicted trace IDs / 追い出されたトレースID
+        """
+        policy = self.retention
+        if policy is None:
+            return []
+        evicted: List[str] = []
+        
+        if policy.max_age_days is not None:
+            cutoff_time = datetime.now() - timedelta(days=policy.max_age_days)
+            expired = [
+                trace_id for trace_id in self._index.in_range(None, cutoff_time)
+                if self.traces[trace_id].start_time < cutoff_time
+            ]
+            for trace_id in expired:
+                self._remove_trace(trace_id)
+            self._retention_metrics["evicted_by_age"] += len(expired)
+            evicted.extend(expired)
+        
+        max_traces = policy.max_traces
+        max_bytes = policy.max_bytes
+        count = len(self.traces)
+        total_bytes = self._total_bytes
+        
+        def over_limit() -> bool:
+            return (max_traces is not None and count > max_traces) or (max_bytes is not None and total_bytes > max_bytes)
+        
+        if not over_limit():
+            return evicted
+        
+        # Choose victims in LRU order without mutating while iterating
+        # 反復中に変更しないようLRU順で追い出し対象を選ぶ
+        victims: List[str] = []
+        chosen = set()
+        passes = (True,) if policy.evict_running else (False, True)
+        for include_running in passes:
+            for trace_id in self._recency:
+                if not over_limit():
+                    break
+                if trace_id in chosen:
+                    continue
+                if not include_running and self.traces[trace_id].status == "running":
+                    continue
+                if max_traces is not None and count > max_traces:
+                    self._retention_metrics["evicted_by_count"] += 1
+                else:
+                    self._retention_metrics["evicted_by_bytes"] += 1
+                victims.append(trace_id)
+                chosen.add(trace_id)
+                count -= 1
+                total_bytes -= self._sizes.get(trace_id, 0)
+            if not over_limit():
+                break
+        
+        for trace_id in victims:
+            self._remove_trace(trace_id)
+        evicted.extend(victims)
+        return evicted
+    
+    def enforce_retention(self) -> int:
+        """
+        Apply the retention policy now
+        保持ポリシーを今すぐ適用
+        
+        Returns:
+            int: Number of evicted traces / 追い出されたトレース数
+        """
+        self.flush_pending()
+        with self._lock:
+            evicted = self._enforce_retention_locked()
+            if evicted and self._store:
+                self._store.delete_many(evicted)
+                self._compact_if_needed()
+            return len(evicted)
+    
+    def get_retention_metrics(self) -> Dict[str, int]:
+        """
+        Get eviction and artifact limit counters
+        追い出しと成果物制限のカウンターを取得
+        
+        Returns:
+            Dict[str, int]: Counters and current usage / カウンターと現在の使用量
+        """
+        with self._lock:
+            metrics = dict(self._retention_metrics)
+            metrics["evicted_total"] = (
+                metrics["evicted_by_count"] + metrics["evicted_by_age"] + metrics["evicted_by_bytes"]
+            )
+            metrics["current_traces"] = len(self.traces)
+            metrics["current_bytes"] = self._total_bytes
+            return metrics
+    
+    def _start_retention_thread(self, interval: float) -> None:
+        """
+        Start background retention enforcement
+        バックグラウンドでの保持ポリシー適用を開始
+        """
+        registry_ref = weakref.ref(self)
+        stop = self._retention_stop
+        
+        def run() -> None:
+            while not stop.wait(interval):
+                registry = registry_ref()
+                if registry is None:
+                    return
+                try:
+                    registry.enforce_retention()
+                except Exception:
+                    # Background enforcement must never break the application
+                    # バックグラウンド適用がアプリケーションを壊してはならない
+                    pass
+                del registry
+        
+        self._retention_thread = threading.Thread(target=run, name="refinire-trace-retention", daemon=True)
+        self._retention_thread.start()
+    
+    def _persist(self, traces: List[TraceMetadata]) -> None:
+        """
+        Append changed traces to storage if configured (caller holds the lock)
+        設定されている場合、変更されたトレースをストレージに追記（呼び出し側がロックを保持）
+        """
+        if self._store and traces:
+            self._store.put_many([_trace_to_record(trace) for trace in traces])
+            self._compact_if_needed()
+    
+    def _compact_if_needed(self) -> None:
+        """
+        Compact the journal once stale records dominate (caller holds the lock)
+        古いレコードが大半になったらジャーナルを圧縮（呼び出し側がロックを保持）
+        """
+        if self._store is not None and self._store.needs_compaction(len(self.traces)):
+            self._store.compact(_trace_to_record(trace) for trace in self.traces.values())
     
     def save_traces(self) -> None:
         """
-        Save traces to storage
-        トレースをストレージに保存
+        Save traces to storage by compacting the journal
+        ジャーナルを圧縮してトレースをストレージに保存
         """
-        if not self.storage_path:
+        if not self._store:
             return
         
-        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
-        self.export_traces(str(self.storage_path), "json")
+        self.flush_pending()
+        with self._lock:
+            self._store.compact(_trace_to_record(trace) for trace in self.traces.values())
     
     def load_traces(self) -> int:
         """
-        Load traces from storage
-        ストレージからトレースを読み込み
+        Load traces from storage by streaming the journal
+        ジャーナルをストリーム処理してストレージからトレースを読み込み
         
         Returns:
             int: Number of loaded traces / 読み込まれたトレース数
         """
-        if not self.storage_path or not self.storage_path.exists():
+        if not self._store or not self.storage_path or not self.storage_path.exists():
             return 0
         
-        return self.import_traces(str(self.storage_path), "json")
+        with self._lock:
+            for operation, value in self._store.load():
+                if operation == "put":
+                    self._put_trace(_record_to_trace(value))
+                else:
+                    # Replaying the journal; the files were deleted with the trace
+                    # ジャーナルの再生中。ファイルはトレースと共に削除済み
+                    self._remove_trace(value, delete_artifacts=False)
+            evicted = self._enforce_retention_locked()
+            if evicted:
+                self._store.delete_many(evicted)
+            self._compact_if_needed()
+            return len(self.traces)
+    
+    def close(self) -> None:
+        """
+        Close the storage backend
+        ストレージバックエンドを閉じる
+        """
+        if self._writer is not None:
+            self._writer.close()
+        self._retention_stop.set()
+        with self._lock:
+            if self._store:
+                self._store.close()
 
 
 # Global trace registry instance
 # グローバルトレースレジストリインスタンス
 _global_registry: Optional[TraceRegistry] = None
 
+# Default limits for the global registry in long-running processes
+# 長時間稼働するプロセスでのグローバルレジストリのデフォルト制限
+DEFAULT_GLOBAL_MAX_TRACES = 10000
+
 
 def get_global_registry() -> TraceRegistry:
     """
     Get global trace registry instance
     グローバルトレースレジストリインスタンスを取得
     
+    The default instance keeps at most DEFAULT_GLOBAL_MAX_TRACES traces and
+    leaves artifacts untouched; use set_global_registry to install a registry
+    with max_artifact_bytes or other limits.
+    デフォルトのインスタンスは最大DEFAULT_GLOBAL_MAX_TRACES件のトレースを保持し、
+    成果物はそのまま保持します。max_artifact_bytesなど別の制限を使う場合は
+    set_global_registryで設定してください。
+    
     Returns:
         TraceRegistry: Global registry instance / グローバルレジストリインスタンス
     """
     global _global_registry
     if _global_registry is None:
-        _global_registry = TraceRegistry()
+        _global_registry = TraceRegistry(retention=RetentionPolicy(max_traces=DEFAULT_GLOBAL_MAX_TRACES))
     return _global_registry
 
 
@@ -0,0 +1,146 @@
+"""
+Trace Retention - Retention policies for TraceRegistry
+トレース保持 - TraceRegistry用の保持ポリシー
+
+Bounds the memory used by a registry: traces are evicted by count, age and
+estimated size (least recently used first), and oversized artifacts are
+moved to files or replaced by a short preview.
+レジストリのメモリ使用量を制限します。トレースは件数、経過時間、推定サイズで
+（最も長く使われていないものから）追い出され、大きすぎる成果物はファイルに
+移動されるか短いプレビューに置き換えられます。
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Characters allowed in externalized artifact file names
+# 外部化された成果物ファイル名に使える文字
+_UNSAFE_NAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+# Length of the preview kept for truncated artifacts
+# 切り詰められた成果物に残すプレビューの長さ
+ARTIFACT_PREVIEW_CHARS = 200
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Retention limits for a TraceRegistry
+    TraceRegistryの保持制限
+
+    All limits are optional; None disables the corresponding check.
+    すべての制限は任意で、Noneの場合は対応するチェックを無効にします。
+    """
+    max_traces: Optional[int] = None  # Maximum number of traces / 最大トレース数
+    max_age_days: Optional[float] = None  # Maximum trace age in days / トレースの最大保持日数
+    max_bytes: Optional[int] = None  # Maximum estimated size of all traces / 全トレースの最大推定サイズ
+    max_artifact_bytes: Optional[int] = None  # Maximum serialized size of one artifact / 成果物1件の最大シリアライズサイズ
+    artifact_dir: Optional[str] = None  # Directory for oversized artifacts (None truncates them) / 大きな成果物の保存先（Noneで切り詰め）
+    enforce_interval: Optional[float] = None  # Seconds between background enforcement runs / バックグラウンド適用の間隔（秒）
+    evict_running: bool = False  # Whether running traces may be evicted before others / 実行中トレースを他より先に追い出せるか
+
+    def limit_artifacts(self, trace_id: str, artifacts: Dict[str, Any]) -> Tuple[Dict[str, Any], int, int]:
+        """
+        Externalize or truncate artifacts larger than max_artifact_bytes
+        max_artifact_bytesより大きい成果物を外部化または切り詰め
+
+        Args:
+            trace_id: Owning trace identifier / 所有トレースの識別子
+            artifacts: Artifacts to check / チェックする成果物
+
+        Returns:
+            Tuple[Dict[str, Any], int, int]: (artifacts, externalized count, truncated count) / （成果物、外部化数、切り詰め数）
+        """
+        if self.max_artifact_bytes is None or not artifacts:
+            return artifacts, 0, 0
+
+        limited: Dict[str, Any] = {}
+        externalized = truncated = 0
+        for key, value in artifacts.items():
+            serialized = json.dumps(value, ensure_ascii=False, default=str)
+            size = len(serialized.encode("utf-8"))
+            if size <= self.max_artifact_bytes:
+                limited[key] = value
+            elif self.artifact_dir:
+                limited[key] = {"$artifact_ref": self._write_artifact(self.artifact_dir, trace_id, key, serialized), "bytes": size}
+                externalized += 1
+            else:
+                logger.warning(
+                    "Truncated artifact %r of trace %s (%d bytes > max_artifact_bytes=%d); set artifact_dir to keep it",
+                    key, trace_id, size, self.max_artifact_bytes
+                )
+                limited[key] = {"$truncated": True, "bytes": size, "preview": serialized[:ARTIFACT_PREVIEW_CHARS]}
+                truncated += 1
+        return limited, externalized, truncated
+
+    def _write_artifact(self, artifact_dir: str, trace_id: str, key: str, serialized: str) -> str:
+        """
+        Write an artifact to artifact_dir and return its path
+        成果物をartifact_dirに書き込みパスを返す
+        """
+        directory = Path(artifact_dir) / _UNSAFE_NAME_CHARS.sub("_", trace_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{_UNSAFE_NAME_CHARS.sub('_', str(key))}.json"
+        path.write_text(serialized, encoding="utf-8")
+        return str(path)
+
+    def delete_artifacts(self, trace_id: str, artifacts: Dict[str, Any]) -> int:
+        """
+        Delete the files externalized for a trace
+        トレース用に外部化されたファイルを削除
+
+        Only references inside the trace's directory under artifact_dir are
+        deleted; the directory itself is removed once it is empty.
+        artifact_dir配下のトレース用ディレクトリ内の参照のみ削除し、
+        ディレクトリは空になった時点で削除します。
+
+        Args:
+            trace_id: Owning trace identifier / 所有トレースの識別子
+            artifacts: Artifacts of the removed trace / 削除されたトレースの成果物
+
+        Returns:
+            int: Number of deleted files / 削除したファイル数
+        """
+        if not self.artifact_dir:
+            return 0
+        directory = (Path(self.artifact_dir) / _UNSAFE_NAME_CHARS.sub("_", trace_id)).resolve()
+        deleted = 0
+        for value in artifacts.values():
+            if not isinstance(value, dict) or not isinstance(value.get("$artifact_ref"), str):
+                continue
+            path = Path(value["$artifact_ref"]).resolve()
+            if path.parent != directory:
+                continue
+            try:
+                path.unlink()
+                deleted += 1
+            except OSError:
+                pass
+        try:
+            directory.rmdir()
+        except OSError:
+            # Missing, or still holding files of another trace with the same sanitized id
+            # 存在しないか、同じサニタイズ後IDを持つ別トレースのファイルが残っている
+            pass
+        return deleted
+
+
+def load_artifact(reference: Dict[str, Any]) -> Any:
+    """
+    Load an artifact that was externalized by a retention policy
+    保持ポリシーによって外部化された成果物を読み込む
+
+    Args:
+        reference: Artifact value containing "$artifact_ref" / "$artifact_ref"を含む成果物の値
+
+    Returns:
+        Any: Original artifact value / 元の成果物の値
+    """
+    with open(reference["$artifact_ref"], "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,255 @@
+"""
+Trace Statistics - Incrementally maintained TraceRegistry statistics
+トレース統計 - 増分的に維持されるTraceRegistryの統計
+
+Counters and quantile sketches are updated as traces are added, updated
+and removed, so reading statistics costs O(groups) instead of a scan over
+every trace.
+カウンターと分位点スケッチはトレースの追加・更新・削除時に更新されるため、
+統計の読み取りは全トレースの走査ではなくO(グループ数)で済みます。
+"""
+
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with bounded relative error
+    相対誤差が制限されたストリーミング分位点スケッチ
+
+    Values are counted in logarithmic buckets (as in DDSketch), so any
+    quantile is within relative_accuracy of the true value, memory grows
+    with the log of the value range, and values can also be removed.
+    値は（DDSketchと同様に）対数バケットで数えられるため、任意の分位点は真の値から
+    relative_accuracy以内に収まり、メモリは値域の対数で増加し、値の削除も可能です。
+    """
+
+    # Values at or below this are counted in the zero bucket
+    # この値以下は0バケットで数える
+    MIN_VALUE = 1e-9
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Args:
+            relative_accuracy: Maximum relative error of quantiles / 分位点の最大相対誤差
+        """
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = {}
+        self._zero_count = 0
+        self.count = 0
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value: float, weight: int = 1) -> None:
+        """
+        Add (or, with a negative weight, remove) a value
+        値を追加（負の重みの場合は削除）
+
+        Args:
+            value: Value to count / 数える値
+            weight: Number of occurrences / 出現回数
+        """
+        self.count += weight
+        if value <= self.MIN_VALUE:
+            self._zero_count += weight
+            return
+        key = self._key(value)
+        remaining = self._buckets.get(key, 0) + weight
+        if remaining > 0:
+            self._buckets[key] = remaining
+        else:
+            self._buckets.pop(key, None)
+
+    def remove(self, value: float) -> None:
+        """
+        Remove a previously added value
+        以前に追加した値を削除
+        """
+        self.add(value, -1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile
+        分位点を推定
+
+        Args:
+            q: Quantile between 0 and 1 / 0から1の分位
+
+        Returns:
+            Optional[float]: Estimated value, or None if empty / 推定値（空の場合None）
+        """
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if rank < seen:
+                return 2 * self._gamma ** key / (self._gamma + 1)
+        return 2 * self._gamma ** max(self._buckets) / (self._gamma + 1) if self._buckets else 0.0
+
+    def quantiles(self, qs: Sequence[float] = (0.5, 0.9, 0.99)) -> Dict[str, Optional[float]]:
+        """
+        Estimate several quantiles keyed as "p50", "p90", ...
+        "p50"、"p90"などをキーとして複数の分位点を推定
+        """
+        return {f"p{round(q * 100):d}": self.quantile(q) for q in qs}
+
+
+class _GroupStats:
+    """
+    Counters and sketches for one group of traces
+    トレースの1グループのカウンターとスケッチ
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.statuses: Dict[str, int] = {}
+        self.total_spans = 0
+        self.total_errors = 0
+        self.error_traces = 0
+        self.duration_sum = 0.0
+        self.durations = QuantileSketch()
+        self.spans = QuantileSketch()
+
+    def apply(self, trace: Any, sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) a trace / トレースを追加（sign=1）または削除（sign=-1）"""
+        self.count += sign
+        remaining = self.statuses.get(trace.status, 0) + sign
+        if remaining > 0:
+            self.statuses[trace.status] = remaining
+        else:
+            self.statuses.pop(trace.status, None)
+        self.total_spans += sign * trace.total_spans
+        self.total_errors += sign * trace.error_count
+        if trace.error_count or trace.status == "error":
+            self.error_traces += sign
+        self.spans.add(trace.total_spans, sign)
+        if trace.duration_seconds is not None:
+            self.duration_sum += sign * trace.duration_seconds
+            self.durations.add(trace.duration_seconds, sign)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summarize the group / グループを要約"""
+        duration_count = self.durations.count
+        return {
+            "total_traces": self.count,
+            "status_distribution": dict(self.statuses),
+            "total_spans": self.total_spans,
+            "total_errors": self.total_errors,
+            "error_rate": self.error_traces / self.count if self.count else 0.0,
+            "average_duration_seconds": self.duration_sum / duration_count if duration_count else 0,
+            "duration_quantiles": self.durations.quantiles(),
+            "span_quantiles": self.spans.quantiles(),
+        }
+
+
+class TraceStatistics:
+    """
+    Aggregate statistics over all traces, per flow, per agent and per time bucket
+    全トレース、フロー別、エージェント別、時間バケット別の集計統計
+
+    The registry calls remove before mutating a trace and add afterwards,
+    mirroring the secondary indexes.
+    レジストリはセカンダリインデックスと同様に、トレースの変更前にremoveを、
+    変更後にaddを呼び出します。
+    """
+
+    def __init__(self, bucket_seconds: int = 60):
+        """
+        Args:
+            bucket_seconds: Width of time buckets keyed by trace start time / トレース開始時刻で区切る時間バケットの幅
+        """
+        self.bucket_seconds = bucket_seconds
+        self._overall = _GroupStats()
+        self._flows: Dict[str, _GroupStats] = {}
+        self._agents: Dict[str, _GroupStats] = {}
+        self._buckets: Dict[int, _GroupStats] = {}
+
+    def add(self, trace: Any) -> None:
+        self._apply(trace, 1)
+
+    def remove(self, trace: Any) -> None:
+        self._apply(trace, -1)
+
+    def _apply(self, trace: Any, sign: int) -> None:
+        self._overall.apply(trace, sign)
+        if trace.flow_name:
+            self._apply_group(self._flows, trace.flow_name, trace, sign)
+        for agent_name in set(trace.agent_names):
+            self._apply_group(self._agents, agent_name, trace, sign)
+        bucket = int(trace.start_time.timestamp()) // self.bucket_seconds * self.bucket_seconds
+        self._apply_group(self._buckets, bucket, trace, sign)
+
+    @staticmethod
+    def _apply_group(groups: Dict[Any, _GroupStats], key: Any, trace: Any, sign: int) -> None:
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = _GroupStats()
+        group.apply(trace, sign)
+        if group.count <= 0:
+            del groups[key]
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Overall statistics in the format of TraceRegistry.get_statistics
+        TraceRegistry.get_statisticsの形式の全体統計
+        """
+        if self._overall.count <= 0:
+            return {"total_traces": 0}
+        summary = self._overall.snapshot()
+        flow_names = list(self._flows)
+        agent_names = list(self._agents)
+        summary.update({
+            "unique_flow_names": len(flow_names),
+            "unique_agent_names": len(agent_names),
+            "flow_names": flow_names,
+            "agent_names": agent_names,
+        })
+        return summary
+
+    def by_flow(self, flow_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Statistics per flow name (or for one flow)
+        フロー名ごと（または1フロー）の統計
+        """
+        return self._select(self._flows, flow_name)
+
+    def by_agent(self, agent_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Statistics per agent name (or for one agent)
+        エージェント名ごと（または1エージェント）の統計
+        """
+        return self._select(self._agents, agent_name)
+
+    @staticmethod
+    def _select(groups: Dict[str, _GroupStats], name: Optional[str]) -> Dict[str, Any]:
+        if name is not None:
+            group = groups.get(name)
+            return group.snapshot() if group is not None else {"total_traces": 0}
+        return {key: group.snapshot() for key, group in groups.items()}
+
+    def time_series(self, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Statistics per time bucket, oldest first
+        時間バケットごとの統計（古い順）
+
+        Args:
+            since: Only buckets starting at or after this time / この時刻以降に始まるバケットのみ
+        """
+        threshold = since.timestamp() // self.bucket_seconds * self.bucket_seconds if since else None
+        series = []
+        for bucket in sorted(self._buckets):
+            if threshold is not None and bucket < threshold:
+                continue
+            entry = {"bucket_start": datetime.fromtimestamp(bucket)}
+            entry.update(self._buckets[bucket].snapshot())
+            series.append(entry)
+        return series
@@ -0,0 +1,328 @@
+"""
+Trace Storage - Append-only persistence backends for TraceRegistry
+トレースストレージ - TraceRegistry用の追記型永続化バックエンド
+
+Each registry change is written as one record, so persisting an update
+costs O(1) regardless of how many traces are stored. Startup replays the
+records as a stream instead of loading one large JSON document.
+レジストリの変更は1レコードとして書き込まれるため、更新の永続化コストは
+保存済みトレース数に関係なくO(1)です。起動時は1つの大きなJSON文書を
+読み込む代わりに、レコードをストリームとして再生します。
+"""
+
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+
+# Replayed operation: ("put", record) or ("delete", trace_id)
+# 再生される操作: ("put", record) または ("delete", trace_id)
+TraceOperation = Tuple[str, Any]
+
+
+class TraceStore(ABC):
+    """
+    Base class for trace persistence backends
+    トレース永続化バックエンドの基底クラス
+
+    Stores work on plain JSON-serializable trace records; conversion from
+    and to TraceMetadata is done by the registry.
+    ストアはJSONシリアライズ可能なトレースレコードを扱い、TraceMetadataとの
+    変換はレジストリが行います。
+    """
+
+    @abstractmethod
+    def load(self) -> Iterator[TraceOperation]:
+        """
+        Stream stored operations in write order
+        保存された操作を書き込み順にストリーム
+
+        Returns:
+            Iterator[TraceOperation]: ("put", record) or ("delete", trace_id) / 操作のイテレータ
+        """
+
+    @abstractmethod
+    def put_many(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Persist new or updated trace records
+        新規または更新されたトレースレコードを永続化
+
+        Args:
+            records: Trace records keyed by "trace_id" / "trace_id"を持つトレースレコード
+        """
+
+    @abstractmethod
+    def delete_many(self, trace_ids: List[str]) -> None:
+        """
+        Persist removal of traces
+        トレースの削除を永続化
+
+        Args:
+            trace_ids: Trace identifiers to remove / 削除するトレース識別子
+        """
+
+    @abstractmethod
+    def compact(self, records: Iterable[Dict[str, Any]]) -> None:
+        """
+        Replace stored data with the given live records
+        保存データを指定された有効レコードで置き換え
+
+        Args:
+            records: All live trace records / すべての有効なトレースレコード
+        """
+
+    def put(self, record: Dict[str, Any]) -> None:
+        """
+        Persist a single trace record
+        1件のトレースレコードを永続化
+        """
+        self.put_many([record])
+
+    def needs_compaction(self, live_count: int) -> bool:
+        """
+        Whether stale records justify a compaction
+        古いレコードが圧縮に値するほど溜まっているか
+
+        Args:
+            live_count: Number of live traces / 有効なトレース数
+
+        Returns:
+            bool: True if compact should be called / compactを呼ぶべき場合True
+        """
+        return False
+
+    def close(self) -> None:
+        """
+        Release file handles or connections
+        ファイルハンドルや接続を解放
+        """
+
+
+class JsonlTraceStore(TraceStore):
+    """
+    Append-only JSON Lines journal with periodic compaction
+    定期的な圧縮を伴う追記型JSON Linesジャーナル
+
+    Every change appends one line. Once the journal holds more than
+    compact_ratio records per live trace (and at least compact_min_records),
+    the registry rewrites it atomically with only the live traces, which
+    keeps the amortized write cost O(1).
+    変更ごとに1行を追記します。ジャーナルが有効トレース1件あたり
+    compact_ratioを超えるレコード（かつcompact_min_records以上）を保持すると、
+    レジストリが有効トレースのみでアトミックに書き直すため、償却書き込み
+    コストはO(1)に保たれます。
+    """
+
+    def __init__(self, path: Path, compact_ratio: float = 2.0, compact_min_records: int = 1000):
+        """
+        Args:
+            path: Journal file path / ジャーナルファイルのパス
+            compact_ratio: Journal records per live trace that trigger compaction / 圧縮を起動する有効トレースあたりのレコード数
+            compact_min_records: Minimum journal size before compaction / 圧縮前の最小ジャーナルサイズ
+        """
+        self.path = Path(path)
+        self.compact_ratio = compact_ratio
+        self.compact_min_records = compact_min_records
+        self.record_count = 0
+        self._file: Optional[TextIO] = None
+        # Set when the file is a legacy JSON snapshot that must be rewritten
+        # ファイルが書き直しの必要な旧形式のJSONスナップショットの場合に設定
+        self._legacy = False
+
+    def load(self) -> Iterator[TraceOperation]:
+        self.record_count = 0
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            first_line = f.readline()
+            if first_line.lstrip().startswith("{") and self._parse_line(first_line) is None:
+                # Snapshot written by earlier versions (one indented JSON document)
+                # 以前のバージョンが書き込んだスナップショット（インデント付きJSON文書1つ）
+                f.seek(0)
+                data = self._load_legacy(f)
+                if data is not None:
+                    self._legacy = True
+                    for record in data["traces"]:
+                        self.record_count += 1
+                        yield ("put", record)
+                    return
+                f.seek(0)
+                first_line = f.readline()
+            line = first_line
+            while line:
+                entry = self._parse_line(line)
+                # Torn or corrupt lines (e.g. after a crash) are skipped
+                # 破損した行（クラッシュ後など）はスキップ
+                if entry is not None:
+                    self.record_count += 1
+                    if entry.get("op") == "del":
+                        for trace_id in entry.get("ids", []):
+                            yield ("delete", trace_id)
+                    elif "trace" in entry:
+                        yield ("put", entry["trace"])
+                line = f.readline()
+
+    @staticmethod
+    def _load_legacy(f: Any) -> Optional[Dict[str, Any]]:
+        """Parse a legacy snapshot, or return None if the file is not one / 旧形式のスナップショットを解析（該当しない場合はNone）"""
+        try:
+            data = json.load(f)
+        except ValueError:
+            return None
+        if isinstance(data, dict) and isinstance(data.get("traces"), list):
+            return data
+        return None
+
+    @staticmethod
+    def _parse_line(line: str) -> Optional[Dict[str, Any]]:
+        """Parse one journal line / ジャーナルの1行を解析"""
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return None
+        return entry if isinstance(entry, dict) and "op" in entry else None
+
+    def _append(self, lines: List[str]) -> None:
+        """Append lines and flush them to the OS / 行を追記してOSにフラッシュ"""
+        if self._legacy:
+            # Never append journal lines to a legacy snapshot
+            # 旧形式のスナップショットにジャーナル行を追記しない
+            raise RuntimeError("Legacy trace snapshot must be compacted before appending")
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write("".join(lines))
+        self._file.flush()
+        self.record_count += len(lines)
+
+    def put_many(self, records: List[Dict[str, Any]]) -> None:
+        if records:
+            self._append([
+                json.dumps({"op": "put", "trace": record}, ensure_ascii=False, default=str) + "\n"
+                for record in records
+            ])
+
+    def delete_many(self, trace_ids: List[str]) -> None:
+        if trace_ids:
+            self._append([json.dumps({"op": "del", "ids": list(trace_ids)}, ensure_ascii=False) + "\n"])
+
+    def needs_compaction(self, live_count: int) -> bool:
+        if self._legacy:
+            return True
+        return self.record_count > max(self.compact_min_records, live_count * self.compact_ratio)
+
+    def compact(self, records: Iterable[Dict[str, Any]]) -> None:
+        self.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        count = 0
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps({"op": "put", "trace": record}, ensure_ascii=False, default=str) + "\n")
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.record_count = count
+        self._legacy = False
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SqliteTraceStore(TraceStore):
+    """
+    SQLite table of trace records in WAL mode
+    WALモードのSQLiteトレースレコードテーブル
+
+    Updates replace a single row, so no compaction is needed; compact
+    rewrites the table and truncates the write-ahead log.
+    更新は1行を置き換えるだけなので圧縮は不要です。compactはテーブルを
+    書き直し、先行書き込みログを切り詰めます。
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: Database file path / データベースファイルのパス
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # The registry serializes access with its own lock
+        # レジストリが独自のロックでアクセスを直列化する
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS traces (trace_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def load(self) -> Iterator[TraceOperation]:
+        cursor = self._conn.execute("SELECT data FROM traces ORDER BY rowid")
+        for (data,) in cursor:
+            try:
+                yield ("put", json.loads(data))
+            except ValueError:
+                continue
+
+    def put_many(self, records: List[Dict[str, Any]]) -> None:
+        if records:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO traces (trace_id, data) VALUES (?, ?)",
+                    [(record["trace_id"], json.dumps(record, ensure_ascii=False, default=str)) for record in records]
+                )
+
+    def delete_many(self, trace_ids: List[str]) -> None:
+        if trace_ids:
+            with self._conn:
+                self._conn.executemany("DELETE FROM traces WHERE trace_id = ?", [(trace_id,) for trace_id in trace_ids])
+
+    def compact(self, records: Iterable[Dict[str, Any]]) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM traces")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO traces (trace_id, data) VALUES (?, ?)",
+                ((record["trace_id"], json.dumps(record, ensure_ascii=False, default=str)) for record in records)
+            )
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        # Closing an already closed connection is a no-op
+        # 既に閉じた接続を閉じても何も起こらない
+        self._conn.close()
+
+
+_SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+def create_trace_store(storage_path: str, backend: str = "auto", **kwargs: Any) -> TraceStore:
+    """
+    Create a trace store for a path
+    パスに対するトレースストアを作成
+
+    Args:
+        storage_path: Storage file path / ストレージファイルのパス
+        backend: "auto", "jsonl" or "sqlite" ("auto" picks sqlite for .db/.sqlite files) / バックエンド名
+        **kwargs: Backend-specific options / バックエンド固有のオプション
+
+    Returns:
+        TraceStore: Store instance / ストアインスタンス
+
+    Raises:
+        ValueError: If the backend is unknown / 未知のバックエンドの場合
+    """
+    path = Path(storage_path)
+    if backend == "auto":
+        backend = "sqlite" if path.suffix.lower() in _SQLITE_SUFFIXES else "jsonl"
+    if backend == "jsonl":
+        return JsonlTraceStore(path, **kwargs)
+    if backend == "sqlite":
+        return SqliteTraceStore(path)
+    raise ValueError(f"Unsupported trace storage backend: {backend}")
@@ -0,0 +1,235 @@
+"""
+Trace Writer - Write-behind queue for trace registry updates
+トレースライター - トレースレジストリ更新用のwrite-behindキュー
+
+Flows submit register/update operations to a bounded queue and return
+immediately; a background thread applies them to the registry in batches.
+Registry reads wait for pending operations, so callers still see their
+own writes.
+フローは登録・更新操作を上限付きキューに投入してすぐに戻り、バックグラウンド
+スレッドがそれらをバッチでレジストリに適用します。レジストリの読み取りは保留中の
+操作を待つため、呼び出し側は自身の書き込みを参照できます。
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .trace_registry import TraceRegistry
+
+logger = logging.getLogger(__name__)
+
+# Writers flushed and stopped at interpreter shutdown
+# インタープリター終了時にフラッシュして停止するライター
+_active_writers: "weakref.WeakSet[TraceWriteBehind]" = weakref.WeakSet()
+
+_STOP = object()
+
+
+class TraceWriteBehind:
+    """
+    Bounded write-behind queue applying operations on a background thread
+    バックグラウンドスレッドで操作を適用する上限付きwrite-behindキュー
+    """
+
+    def __init__(
+        self,
+        registry: "TraceRegistry",
+        max_queue_size: int = 10000,
+        batch_size: int = 256,
+        overflow_policy: str = "drop",
+        flush_timeout: float = 5.0
+    ):
+        """
+        Initialize write-behind queue
+        write-behindキューを初期化
+
+        Args:
+            registry: Registry receiving the operations / 操作を受け取るレジストリ
+            max_queue_size: Maximum number of queued operations / キューに入れられる最大操作数
+            batch_size: Maximum operations applied per registry call / レジストリ呼び出しごとに適用する最大操作数
+            overflow_policy: "drop" to discard when full, "block" to wait for space / 満杯時に破棄する場合"drop"、空きを待つ場合"block"
+            flush_timeout: Default time in seconds that flush waits / flushのデフォルト待機秒数
+        """
+        if overflow_policy not in ("drop", "block"):
+            raise ValueError(f"Unsupported overflow policy: {overflow_policy}")
+        self._registry_ref = weakref.ref(registry)
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.overflow_policy = overflow_policy
+        self.flush_timeout = flush_timeout
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._condition = threading.Condition()
+        self._pending = 0
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        # Counters / カウンター
+        self.submitted = 0
+        self.applied = 0
+        self.dropped = 0
+        self.failed = 0
+        self.persist_failures = 0
+        self.batches = 0
+
+    @property
+    def pending(self) -> int:
+        """Operations submitted but not yet applied / 投入済みで未適用の操作数"""
+        return self._pending
+
+    def submit(self, operation: str, kwargs: Dict[str, Any]) -> bool:
+        """
+        Queue an operation without waiting for it to be applied
+        適用を待たずに操作をキューに入れる
+
+        Args:
+            operation: "register" or "update" / "register"または"update"
+            kwargs: Arguments for the registry method / レジストリメソッドの引数
+
+        Returns:
+            bool: False if the operation was dropped / 操作が破棄された場合False
+        """
+        if self._closed:
+            # After shutdown, apply synchronously so nothing is lost
+            # 終了後は何も失わないよう同期的に適用する
+            registry = self._registry_ref()
+            if registry is not None:
+                registry.apply_batch([(operation, kwargs)])
+            return True
+
+        self._ensure_thread()
+        with self._condition:
+            self._pending += 1
+        try:
+            self._queue.put((operation, kwargs), block=self.overflow_policy == "block")
+        except queue.Full:
+            with self._condition:
+                self._pending -= 1
+                self.dropped += 1
+                self._condition.notify_all()
+            return False
+        self.submitted += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all submitted operations are applied
+        投入されたすべての操作が適用されるまで待機
+
+        Args:
+            timeout: Maximum wait in seconds (None uses flush_timeout) / 最大待機秒数（Noneでflush_timeout）
+
+        Returns:
+            bool: True if the queue drained in time / 時間内にキューが空になった場合True
+        """
+        if threading.current_thread() is self._thread:
+            return self._pending == 0
+        deadline = time.monotonic() + (self.flush_timeout if timeout is None else timeout)
+        with self._condition:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Flush pending operations and stop the background thread
+        保留中の操作をフラッシュしてバックグラウンドスレッドを停止
+
+        Args:
+            timeout: Maximum wait in seconds (None uses flush_timeout) / 最大待機秒数（Noneでflush_timeout）
+        """
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put_nowait(_STOP)
+            except queue.Full:
+                pass
+            thread.join(self.flush_timeout if timeout is None else timeout)
+        _active_writers.discard(self)
+
+    def get_metrics(self) -> Dict[str, int]:
+        """
+        Get queue counters
+        キューのカウンターを取得
+
+        Returns:
+            Dict[str, int]: Counters / カウンター
+        """
+        return {
+            "submitted": self.submitted,
+            "applied": self.applied,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "persist_failures": self.persist_failures,
+            "batches": self.batches,
+            "pending": self._pending,
+        }
+
+    def _ensure_thread(self) -> None:
+        """Start the background thread on first use / 初回使用時にバックグラウンドスレッドを開始"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="refinire-trace-writer", daemon=True)
+                self._thread.start()
+                _active_writers.add(self)
+
+    def _run(self) -> None:
+        """Apply queued operations in batches / キューの操作をバッチで適用"""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch: List[Tuple[str, Dict[str, Any]]] = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            registry = self._registry_ref()
+            try:
+                failed = registry.apply_batch(batch) if registry is not None else 0
+                self.applied += len(batch) - failed
+                self.failed += failed
+            except Exception:
+                # Trace bookkeeping must never break the application; the
+                # operations were applied in memory and are persisted later
+                # トレース記録がアプリケーションを壊してはならない。操作はメモリ上に
+                # 適用済みで、後で永続化される
+                logger.exception("Failed to persist a batch of %d trace operations", len(batch))
+                self.applied += len(batch)
+                self.persist_failures += 1
+            finally:
+                self.batches += 1
+                with self._condition:
+                    self._pending -= len(batch)
+                    self._condition.notify_all()
+            if stop:
+                return
+
+
+@atexit.register
+def _close_active_writers() -> None:
+    """Flush write-behind queues at shutdown / 終了時にwrite-behindキューをフラッシュ"""
+    for writer in list(_active_writers):
+        writer.close()
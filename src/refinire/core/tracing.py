@@ -4,14 +4,22 @@ Console tracing utilities for agents_sdk_models.
 English: Provides ConsoleTracingProcessor for color-coded output of span data and utility functions to enable/disable tracing.
 日本語: Spanデータの色分け出力を行う ConsoleTracingProcessor とトレーシングの有効化/無効化ユーティリティを提供します。
 """
-from agents.tracing import TracingProcessor, set_trace_processors
+from agents.tracing import Span, Trace, TracingProcessor, set_trace_processors
 from agents.tracing.span_data import GenerationSpanData, ResponseSpanData
 from agents import set_tracing_disabled
 from .message import get_message, DEFAULT_LANGUAGE  # Import for localized trace labels
+from collections import deque
+from typing import Any, Callable, Deque, Dict, IO, List, Optional
+import atexit
+import json
 import sys
+import threading
+import time
+import weakref
+import zlib
 
 
-def _merge_msgs(msgs, role):
+def _merge_msgs(msgs: Any, role: str) -> str:
     """
     English: Merge message contents by role from a list of message dicts.
     日本語: メッセージのリストから指定したroleに一致するcontentを結合します。
@@ -19,12 +27,12 @@ def _merge_msgs(msgs, role):
     return "\n".join(m.get("content", "") for m in (msgs or []) if m.get("role") == role)
 
 
-def extract_output_texts(obj):
+def extract_output_texts(obj: Any) -> List[str]:
     """
     English: Recursively extract all text contents from output message objects or dicts.
     日本語: 出力メッセージのオブジェクトや辞書からtextフィールドを再帰的に抽出します。
     """
-    results = []
+    results: List[str] = []
     if isinstance(obj, list):
         for item in obj:
             results.extend(extract_output_texts(item))
@@ -46,103 +54,346 @@ def extract_output_texts(obj):
     return results
 
 
+class _BufferedConsoleWriter:
+    """
+    English: Collects trace records and writes them from a background thread in batches.
+    日本語: トレースレコードを収集し、バックグラウンドスレッドからまとめて書き込みます。
+    """
+
+    def __init__(
+        self,
+        output_stream: IO[str],
+        format_record: Callable[[Dict[str, Any]], str],
+        flush_interval: float = 0.5,
+        max_buffer_records: int = 10000,
+    ) -> None:
+        self.output_stream = output_stream
+        self.format_record = format_record
+        self.flush_interval = flush_interval
+        self.max_buffer_records = max_buffer_records
+        self.dropped = 0
+        self._records: Deque[Dict[str, Any]] = deque()
+        self._condition = threading.Condition()
+        # English: Serializes writes between the flush thread and force_flush callers.
+        # 日本語: フラッシュスレッドとforce_flush呼び出し元の書き込みを直列化します。
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def submit(self, record: Dict[str, Any]) -> None:
+        with self._condition:
+            closed = self._closed
+            if not closed:
+                if len(self._records) >= self.max_buffer_records:
+                    # English: Drop the oldest record rather than block the caller.
+                    # 日本語: 呼び出し元をブロックせず最も古いレコードを破棄します。
+                    self._records.popleft()
+                    self.dropped += 1
+                self._records.append(record)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="refinire-console-tracing", daemon=True)
+                    self._thread.start()
+                    _active_console_writers.add(self)
+        if closed:
+            # English: No flush thread runs after close, so write synchronously.
+            # 日本語: close後はフラッシュスレッドが動かないため同期的に書き込みます。
+            with self._write_lock:
+                self._write([record])
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._condition:
+                records = list(self._records)
+                self._records.clear()
+            self._write(records)
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        # English: Called with _write_lock held.
+        # 日本語: _write_lockを保持した状態で呼び出されます。
+        if not records:
+            return
+        try:
+            self.output_stream.write("".join(self.format_record(record) for record in records))
+            self.output_stream.flush()
+        except (ValueError, OSError):
+            # English: The stream was closed (e.g. at interpreter shutdown).
+            # 日本語: ストリームが閉じられています（インタープリター終了時など）。
+            pass
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(max(self.flush_interval, 1.0) * 2)
+        self.flush()
+        _active_console_writers.discard(self)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._closed:
+                    self._condition.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+
+# English: Buffered writers flushed at interpreter shutdown.
+# 日本語: インタープリター終了時にフラッシュするバッファ付きライター。
+_active_console_writers: "weakref.WeakSet[_BufferedConsoleWriter]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_console_writers() -> None:
+    for writer in list(_active_console_writers):
+        writer.close()
+
+
+def _truncate(text: str, limit: Optional[int]) -> str:
+    """
+    English: Shorten text to limit characters, noting how much was cut.
+    日本語: テキストをlimit文字に短縮し、省略した文字数を付記します。
+    """
+    if limit is None or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} chars truncated]"
+
+
 class ConsoleTracingProcessor(TracingProcessor):
     """
     English: A tracing processor that outputs Instruction, Prompt, and Output with colors to the console.
     日本語: Instruction、Prompt、Outputを色分けしてコンソールに出力するトレーシングプロセッサ。
+
+    English: With buffered=True spans are written in batches by a background thread, so the
+    thread that ends a span only extracts texts and queues a record. Sampling is decided
+    per trace ID (all spans of a trace are kept or dropped together); spans with errors
+    are always written unless always_sample_errors is False.
+    日本語: buffered=TrueではSpanはバックグラウンドスレッドによりまとめて書き込まれるため、
+    Spanを終了したスレッドはテキストを抽出してレコードをキューに入れるだけです。
+    サンプリングはトレースIDごとに決定され（トレース内の全Spanがまとめて残るか破棄されます）、
+    エラーのあるSpanはalways_sample_errorsがFalseでない限り常に書き込まれます。
     """
-    def __init__(self, output_stream=sys.stdout):
+    # English: Maximum number of trace names remembered for per-flow sampling.
+    # 日本語: フロー別サンプリング用に記憶するトレース名の最大数。
+    MAX_TRACKED_TRACES = 10000
+
+    def __init__(
+        self,
+        output_stream: Optional[IO[str]] = sys.stdout,
+        sample_rate: float = 1.0,
+        always_sample_errors: bool = True,
+        flow_sample_rates: Optional[Dict[str, float]] = None,
+        max_field_chars: Optional[int] = None,
+        output_format: str = "text",
+        buffered: bool = False,
+        flush_interval: float = 0.5,
+        max_buffer_records: int = 10000,
+    ) -> None:
+        """
+        English: Initialize the processor.
+        日本語: プロセッサを初期化します。
+
+        Args:
+            output_stream: Stream for logs / ログ出力用のストリーム
+            sample_rate: Fraction of traces written (0.0-1.0) / 書き込むトレースの割合
+            always_sample_errors: Always write spans with errors / エラーのあるSpanを常に書き込む
+            flow_sample_rates: Sample rates keyed by trace (flow) name / トレース（フロー）名ごとのサンプリング率
+            max_field_chars: Maximum characters per instruction/prompt/output (None for no limit) / 各フィールドの最大文字数
+            output_format: "text" for colored lines or "json" for JSON lines / 色付き行は"text"、JSON Linesは"json"
+            buffered: Write from a background thread / バックグラウンドスレッドから書き込む
+            flush_interval: Seconds between background flushes / バックグラウンドフラッシュの間隔（秒）
+            max_buffer_records: Buffered records kept before the oldest are dropped / 古いものを破棄するまでに保持するレコード数
+        """
+        if output_format not in ("text", "json"):
+            raise ValueError(f"Unsupported output format: {output_format}")
         # English: Initialize with an output stream for logs.
         # 日本語: ログ出力用の出力ストリームで初期化します。
         self.output_stream = output_stream
+        self.sample_rate = sample_rate
+        self.always_sample_errors = always_sample_errors
+        self.flow_sample_rates = dict(flow_sample_rates or {})
+        self.max_field_chars = max_field_chars
+        self.output_format = output_format
+        self.emitted = 0
+        self.sampled_out = 0
+        # English: Span ends arrive on SDK threads, so counters are updated under a lock.
+        # 日本語: Spanの終了はSDKのスレッドから届くため、カウンターはロック下で更新します。
+        self._metrics_lock = threading.Lock()
+        self._trace_names: Dict[str, Optional[str]] = {}
+        # English: Trace callbacks and span ends may run on different threads.
+        # 日本語: トレースのコールバックとSpanの終了は別スレッドで実行されることがあります。
+        self._trace_names_lock = threading.Lock()
+        self._writer: Optional[_BufferedConsoleWriter] = None
+        if buffered and output_stream is not None:
+            self._writer = _BufferedConsoleWriter(
+                output_stream, self._format_record, flush_interval, max_buffer_records
+            )
 
-    def on_trace_start(self, trace):
-        # No-op for trace start
-        pass
+    def on_trace_start(self, trace: Optional[Trace]) -> None:
+        # English: Remember trace names for per-flow sampling and JSON output.
+        # 日本語: フロー別サンプリングとJSON出力のためにトレース名を記憶します。
+        if trace is None:
+            return
+        trace_names = self._trace_names
+        with self._trace_names_lock:
+            if len(trace_names) >= self.MAX_TRACKED_TRACES:
+                trace_names.pop(next(iter(trace_names)), None)
+            trace_names[trace.trace_id] = getattr(trace, "name", None)
 
-    def on_trace_end(self, trace):
-        # No-op for trace end
-        pass
+    def on_trace_end(self, trace: Optional[Trace]) -> None:
+        if trace is not None:
+            with self._trace_names_lock:
+                self._trace_names.pop(trace.trace_id, None)
+
+    def _trace_name(self, trace_id: str) -> Optional[str]:
+        with self._trace_names_lock:
+            return self._trace_names.get(trace_id)
 
-    def on_span_start(self, span):
+    def on_span_start(self, span: Optional[Span[Any]]) -> None:
         # No-op for span start
         pass
 
-    def on_span_end(self, span):
-        # Called at the end of each span; outputs color-coded Instruction/Prompt/Output and logs span end
-        if span is None:
+    def _should_emit(self, span: Span[Any], trace_id: str) -> bool:
+        """
+        English: Decide whether a span is written.
+        日本語: Spanを書き込むかどうかを決定します。
+        """
+        if self.always_sample_errors and getattr(span, "error", None):
+            return True
+        trace_name = self._trace_name(trace_id)
+        rate = self.sample_rate if trace_name is None else self.flow_sample_rates.get(trace_name, self.sample_rate)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        # English: Hash the trace ID so every span of a trace gets the same decision.
+        # 日本語: トレースIDをハッシュし、トレース内の全Spanで同じ判定にします。
+        return zlib.crc32(str(trace_id).encode("utf-8")) / 0xFFFFFFFF < rate
+
+    def on_span_end(self, span: Optional[Span[Any]]) -> None:
+        # Called at the end of each span; queues color-coded Instruction/Prompt/Output
+        if span is None or self.output_stream is None:
             return
         data = span.span_data
-        instr = ""
-        prompt = ""
-        output = ""
         if isinstance(data, GenerationSpanData):
+            kind = "generation"
+        elif isinstance(data, ResponseSpanData) and getattr(data, 'response', None):
+            kind = "response"
+        else:
+            # Irrelevant span type
+            return
+
+        trace_id = getattr(span, 'trace_id', 'unknown')
+        if not self._should_emit(span, trace_id):
+            with self._metrics_lock:
+                self.sampled_out += 1
+            return
+
+        if kind == "generation":
             instr = _merge_msgs(data.input, "system")
             prompt = _merge_msgs(data.input, "user")
             output = "\n".join(extract_output_texts(data.output))
-        elif isinstance(data, ResponseSpanData) and getattr(data, 'response', None):
+        else:
             instr = data.response.instructions or ""
             prompt = _merge_msgs(data.input, "user")
             output = "\n".join(extract_output_texts(data.response.output))
+
+        limit = self.max_field_chars
+        record = {
+            "timestamp": time.time(),
+            "type": kind,
+            "trace_id": trace_id,
+            "span_id": getattr(span, 'span_id', 'unknown'),
+            "trace_name": self._trace_name(trace_id),
+            "instruction": _truncate(instr if isinstance(instr, str) else str(instr), limit),
+            "prompt": _truncate(prompt, limit),
+            "output": _truncate(output, limit),
+            "error": getattr(span, "error", None),
+        }
+        with self._metrics_lock:
+            self.emitted += 1
+        if self._writer is not None:
+            self._writer.submit(record)
         else:
-            # Irrelevant span type
-            return
-        
-        # Get trace ID and span ID for enhanced observability
-        # オブザーバビリティ向上のためtrace IDとspan IDを取得
-        trace_id = getattr(span, 'trace_id', 'unknown')
-        span_id = getattr(span, 'span_id', 'unknown')
-        
+            self.output_stream.write(self._format_record(record))
+            self.output_stream.flush()
+
+    def _format_record(self, record: Dict[str, Any]) -> str:
+        """
+        English: Format one span record as colored text or a JSON line.
+        日本語: 1件のSpanレコードを色付きテキストまたはJSON行に整形します。
+        """
+        if self.output_format == "json":
+            return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
         # Truncate IDs for better readability (show last 8 characters)
         # 可読性向上のためIDを短縮（末尾8文字を表示）
+        trace_id = record["trace_id"]
+        span_id = record["span_id"]
         trace_short = trace_id[-8:] if trace_id != 'unknown' else 'unknown'
         span_short = span_id[-8:] if span_id != 'unknown' else 'unknown'
         id_info = f"[trace:{trace_short} span:{span_short}]"
-        
+
         # Color-coded output with localized labels and ID information
         # ローカライズされたラベルとID情報付きの色分け出力
-        if self.output_stream is None:
-            return
-        if instr:
+        lines = []
+        if record["instruction"]:
             instr_label = get_message("trace_instruction", DEFAULT_LANGUAGE)
-            self.output_stream.write(f"\033[93m{instr_label} {id_info} {instr}\033[0m\n")
-        if prompt:
+            lines.append(f"\033[93m{instr_label} {id_info} {record['instruction']}\033[0m\n")
+        if record["prompt"]:
             prompt_label = get_message("trace_prompt", DEFAULT_LANGUAGE)
-            self.output_stream.write(f"\033[94m{prompt_label} {id_info} {prompt}\033[0m\n")
-        if output:
+            lines.append(f"\033[94m{prompt_label} {id_info} {record['prompt']}\033[0m\n")
+        if record["output"]:
             output_label = get_message("trace_output", DEFAULT_LANGUAGE)
-            self.output_stream.write(f"\033[92m{output_label} {id_info} {output}\033[0m\n")
-        self.output_stream.flush()
-        # # Log span end marker with error info
-        # info = span.export() or {}
-        # span_data = info.get('span_data') or span.span_data.export()
-        # name = span_data.get('name') if isinstance(span_data, dict) else None
-        # error = info.get('error', None)
-        # self.output_stream.write(f"[SPAN END] name={name}, error={error}\n")
-        # self.output_stream.flush()
-
-    def shutdown(self):
-        # No-op for shutdown
-        pass
+            lines.append(f"\033[92m{output_label} {id_info} {record['output']}\033[0m\n")
+        return "".join(lines)
 
-    def force_flush(self):
-        # Forces flush of the output stream
+    def get_metrics(self) -> Dict[str, int]:
+        """
+        English: Get counters of written, sampled-out and dropped spans.
+        日本語: 書き込み、サンプリング除外、破棄されたSpanのカウンターを取得します。
+        """
+        with self._metrics_lock:
+            emitted, sampled_out = self.emitted, self.sampled_out
+        return {
+            "emitted": emitted,
+            "sampled_out": sampled_out,
+            "dropped": self._writer.dropped if self._writer is not None else 0,
+        }
+
+    def shutdown(self) -> None:
+        # English: Write buffered records and stop the flush thread.
+        # 日本語: バッファ済みレコードを書き込み、フラッシュスレッドを停止します。
+        if self._writer is not None:
+            self._writer.close()
+
+    def force_flush(self) -> None:
+        # Forces flush of buffered records and the output stream
+        if self._writer is not None:
+            self._writer.flush()
         if hasattr(self, 'output_stream') and self.output_stream is not None:
             self.output_stream.flush()
 
 
-def enable_console_tracing():
+def enable_console_tracing(**options: Any) -> None:
     """
     English: Enable console tracing by registering ConsoleTracingProcessor and enabling tracing.
     日本語: ConsoleTracingProcessorを登録してトレーシングを有効化します。
+
+    Args:
+        **options: Keyword arguments for ConsoleTracingProcessor (e.g. sample_rate, output_format)
+                   ConsoleTracingProcessorのキーワード引数（sample_rate、output_formatなど）
     """
     # Enable tracing in Agents SDK
     set_tracing_disabled(False)
     # Register console tracing processor
-    set_trace_processors([ConsoleTracingProcessor()])
+    set_trace_processors([ConsoleTracingProcessor(**options)])
 
 
-def disable_tracing():
+def disable_tracing() -> None:
     """
     English: Disable all tracing.
     日本語: トレーシング機能をすべて無効化します。
@@ -0,0 +1,21 @@
+"""
+Shared test fixtures
+共有テストフィクスチャ
+"""
+
+import pytest
+
+from refinire.core.circuit_breaker import (
+    CircuitBreakerRegistry,
+    get_circuit_breaker_registry,
+    set_circuit_breaker_registry,
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_circuit_breakers():
+    """Give every test fresh endpoint circuit breakers / 各テストに新しいエンドポイントのサーキットブレーカーを与える"""
+    original = get_circuit_breaker_registry()
+    set_circuit_breaker_registry(CircuitBreakerRegistry())
+    yield
+    set_circuit_breaker_registry(original)
@@ -0,0 +1,175 @@
+"""
+Tests for endpoint circuit breakers
+エンドポイントのサーキットブレーカーのテスト
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import openai
+import pytest
+
+from refinire import RefinireAgent
+from refinire.core.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    RefinireCircuitOpenError,
+    is_endpoint_failure,
+    resolve_endpoint,
+)
+from refinire.core.exceptions import (
+    RefinireAPIError,
+    RefinireAuthenticationError,
+    RefinireConnectionError,
+    RefinireTimeoutError,
+)
+
+
+def at(seconds):
+    return patch("refinire.core.circuit_breaker.time.monotonic", return_value=seconds)
+
+
+class TestCircuitBreaker:
+    """Test state transitions / 状態遷移のテスト"""
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker("http://localhost:11434/v1", failure_threshold=3, recovery_timeout=10)
+        with at(0.0):
+            for _ in range(2):
+                breaker.record_failure(RuntimeError("refused"))
+            assert breaker.state == "closed"
+            breaker.record_failure(RuntimeError("refused"))
+            assert breaker.state == "open"
+            with pytest.raises(RefinireCircuitOpenError) as exc_info:
+                breaker.before_call()
+        assert exc_info.value.endpoint == "http://localhost:11434/v1"
+        assert exc_info.value.retry_after == pytest.approx(10.0)
+        assert isinstance(exc_info.value, RefinireConnectionError)
+        assert breaker.rejected == 1
+
+    def test_success_resets_consecutive_failures(self):
+        breaker = CircuitBreaker("endpoint", failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == "closed"
+
+    def test_half_open_trial_success_closes(self):
+        breaker = CircuitBreaker("endpoint", failure_threshold=1, recovery_timeout=10, half_open_max_calls=1)
+        with at(0.0):
+            breaker.record_failure()
+        with at(10.0):
+            assert breaker.state == "half_open"
+            assert breaker.allow_request() is True
+            # Only one trial request at a time
+            # 同時に1つの試行リクエストのみ
+            assert breaker.allow_request() is False
+            breaker.record_success()
+            assert breaker.state == "closed"
+
+    def test_half_open_trial_failure_reopens(self):
+        breaker = CircuitBreaker("endpoint", failure_threshold=3, recovery_timeout=10)
+        with at(0.0):
+            for _ in range(3):
+                breaker.record_failure()
+        with at(11.0):
+            breaker.before_call()
+            breaker.record_failure()
+            assert breaker.state == "open"
+            assert breaker.retry_after() == pytest.approx(10.0)
+
+    def test_error_classification(self):
+        assert is_endpoint_failure(RefinireConnectionError("refused"))
+        assert is_endpoint_failure(RefinireTimeoutError("slow"))
+        assert is_endpoint_failure(RefinireAPIError("boom", status_code=503))
+        assert not is_endpoint_failure(RefinireAPIError("bad request", status_code=400))
+        assert not is_endpoint_failure(RefinireAuthenticationError("bad key"))
+        assert not is_endpoint_failure(ValueError("parse"))
+
+    def test_record_error_ignores_client_errors(self):
+        breaker = CircuitBreaker("endpoint", failure_threshold=1)
+        breaker.record_error(RefinireAuthenticationError("bad key"))
+        assert breaker.state == "closed"
+        breaker.record_error(RefinireConnectionError("refused"))
+        assert breaker.state == "open"
+
+
+class TestCircuitBreakerRegistry:
+    """Test per-endpoint registry / エンドポイントごとのレジストリのテスト"""
+
+    def test_breakers_per_endpoint_and_health(self):
+        registry = CircuitBreakerRegistry(failure_threshold=1)
+        ollama = registry.get("http://localhost:11434/v1", provider="ollama")
+        assert registry.get("http://localhost:11434/v1") is ollama
+        registry.get("https://api.openai.com/v1").record_success()
+        assert registry.get_health()["healthy"] is True
+
+        ollama.record_failure(RuntimeError("refused"))
+        health = registry.get_health()
+        assert health["healthy"] is False
+        assert health["endpoints"]["http://localhost:11434/v1"]["state"] == "open"
+        assert health["endpoints"]["http://localhost:11434/v1"]["last_error"] == "refused"
+
+        registry.reset()
+        assert registry.get_health()["healthy"] is True
+
+    def test_resolve_endpoint(self):
+        model = Mock()
+        model._client.base_url = httpx.URL("http://localhost:11434/v1/")
+        assert resolve_endpoint(model, "fallback") == "http://localhost:11434/v1"
+        assert resolve_endpoint(object(), "fallback") == "fallback"
+
+
+class TestAgentIntegration:
+    """Test fast-fail in RefinireAgent / RefinireAgentでの即時失敗のテスト"""
+
+    def test_open_circuit_skips_requests(self):
+        breaker = CircuitBreaker("http://localhost:11434/v1", failure_threshold=2)
+        agent = RefinireAgent(
+            name="local",
+            generation_instructions="Answer",
+            model="gpt-4o-mini",
+            circuit_breaker=breaker
+        )
+        error = openai.APIConnectionError(request=httpx.Request("POST", "http://localhost:11434/v1/chat/completions"))
+
+        with patch("refinire.agents.pipeline.llm_pipeline.Runner") as mock_runner:
+            mock_runner.run = AsyncMock(side_effect=error)
+            for _ in range(2):
+                with pytest.raises(RefinireConnectionError):
+                    asyncio.run(agent._run_standalone("hello"))
+            with pytest.raises(RefinireCircuitOpenError):
+                asyncio.run(agent._run_standalone("hello"))
+
+        assert mock_runner.run.await_count == 2
+        assert breaker.get_health()["rejected"] == 1
+
+    def test_cancelled_trial_releases_slot(self):
+        breaker = CircuitBreaker("http://localhost:11434/v1", failure_threshold=1, recovery_timeout=10)
+        agent = RefinireAgent(
+            name="local",
+            generation_instructions="Answer",
+            model="gpt-4o-mini",
+            circuit_breaker=breaker
+        )
+        with at(0.0):
+            breaker.record_failure()
+
+        with at(10.0), patch("refinire.agents.pipeline.llm_pipeline.Runner") as mock_runner:
+            mock_runner.run = AsyncMock(side_effect=asyncio.CancelledError())
+            with pytest.raises(asyncio.CancelledError):
+                asyncio.run(agent._run_standalone("hello"))
+            # The trial slot is free again for the next request
+            # 次のリクエストのために試行枠が再び空いている
+            assert breaker.state == "half_open"
+            assert breaker.allow_request() is True
+
+    def test_shared_breaker_per_endpoint(self):
+        first = RefinireAgent(name="a", generation_instructions="Answer", model="gpt-4o-mini")
+        second = RefinireAgent(name="b", generation_instructions="Answer", model="gpt-4o-mini")
+        assert first.circuit_breaker is second.circuit_breaker
+
+    def test_breaker_can_be_disabled(self):
+        agent = RefinireAgent(name="a", generation_instructions="Answer", model="gpt-4o-mini", circuit_breaker=False)
+        assert agent.circuit_breaker is None
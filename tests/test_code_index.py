@@ -0,0 +1,155 @@
+"""
+Test Code Index
+コードインデックスのテスト
+
+This module tests the BM25 CodeIndex used by SourceCodeProvider.
+このモジュールはSourceCodeProviderが使用するBM25 CodeIndexをテストします。
+"""
+
+import pytest
+
+from refinire.agents.providers.code_index import CodeIndex, tokenize
+
+
+FILES = {
+    "src/auth/login.py": "def authenticate_user(username, password):\n    \"\"\"Check user credentials against the session store\"\"\"\n",
+    "src/billing/invoice.py": "class InvoiceGenerator:\n    \"\"\"Render monthly invoices as PDF\"\"\"\n",
+    "src/utils/strings.py": "def slugify(text):\n    return text.lower()\n",
+}
+
+
+def _build_index(**kwargs):
+    index = CodeIndex(**kwargs)
+    index.sync({path: (1.0, len(text)) for path, text in FILES.items()}, FILES.get)
+    return index
+
+
+class TestTokenize:
+    """Test cases for tokenize"""
+    
+    def test_splits_snake_and_camel_case(self):
+        """Identifiers are kept whole and split into parts"""
+        tokens = tokenize("authenticate_user InvoiceGenerator")
+        assert "authenticate_user" in tokens
+        assert "authenticate" in tokens
+        assert "invoicegenerator" in tokens
+        assert "invoice" in tokens
+        assert "generator" in tokens
+    
+    def test_drops_stopwords(self):
+        """Common words are not indexed"""
+        assert tokenize("how does the login work") == ["login", "work"]
+    
+    def test_non_ascii_bigrams(self):
+        """Non-ASCII runs are split into character bigrams"""
+        assert tokenize("請求書") == ["請求", "求書"]
+
+
+class TestCodeIndex:
+    """Test cases for CodeIndex"""
+    
+    def test_search_ranks_relevant_file_first(self):
+        """Natural-language queries find files by identifiers and docstrings"""
+        index = _build_index()
+        
+        hits = index.search("where are user credentials checked?")
+        
+        assert hits[0].path == "src/auth/login.py"
+        assert hits[0].end_line is None
+    
+    def test_search_matches_path_components(self):
+        """Directory and file names contribute to the score"""
+        index = _build_index()
+        
+        hits = index.search("billing")
+        
+        assert [hit.path for hit in hits] == ["src/billing/invoice.py"]
+    
+    def test_search_no_match(self):
+        """Unknown terms return no hits"""
+        index = _build_index()
+        assert index.search("kubernetes") == []
+    
+    def test_sync_only_reloads_changed_files(self):
+        """Unchanged signatures are not re-read and removed files are dropped"""
+        index = _build_index()
+        loaded = []
+        
+        def loader(path):
+            loaded.append(path)
+            return "def refund_payment():\n    pass\n"
+        
+        signatures = {path: (1.0, len(text)) for path, text in FILES.items()}
+        signatures["src/billing/invoice.py"] = (2.0, 40)
+        del signatures["src/utils/strings.py"]
+        changed = index.sync(signatures, loader)
+        
+        assert changed is True
+        assert loaded == ["src/billing/invoice.py"]
+        assert index.file_count == 2
+        assert index.search("slugify") == []
+        assert index.search("refund")[0].path == "src/billing/invoice.py"
+        assert index.search("pdf") == []
+        
+        assert index.sync(signatures, loader) is False
+    
+    def test_chunk_level_hits(self):
+        """Chunk mode returns line ranges within a file"""
+        index = CodeIndex(chunk_lines=2)
+        content = "import os\n\n\ndef parse_config():\n    pass\n"
+        index.add_file("config.py", content)
+        
+        hits = index.search("parse config")
+        
+        assert hits[0].path == "config.py"
+        assert (hits[0].start_line, hits[0].end_line) == (3, 4)
+    
+    def test_invalid_chunk_lines(self):
+        """chunk_lines must be positive"""
+        with pytest.raises(ValueError):
+            CodeIndex(chunk_lines=0)
+    
+    def test_persistence_roundtrip(self, tmp_path):
+        """A saved index is reloaded without re-reading files"""
+        index_path = tmp_path / "index.json"
+        _build_index(index_path=index_path)
+        assert index_path.exists()
+        
+        reloaded = CodeIndex(index_path=index_path)
+        assert reloaded.file_count == len(FILES)
+        assert reloaded.search("invoice")[0].path == "src/billing/invoice.py"
+        
+        signatures = {path: (1.0, len(text)) for path, text in FILES.items()}
+        assert reloaded.sync(signatures, lambda path: pytest.fail("should not reload")) is False
+    
+    def test_persisted_index_with_other_chunking_is_ignored(self, tmp_path):
+        """Changing chunk_lines invalidates a persisted index"""
+        index_path = tmp_path / "index.json"
+        _build_index(index_path=index_path)
+        
+        reloaded = CodeIndex(chunk_lines=10, index_path=index_path)
+        assert reloaded.file_count == 0
+    
+    def test_sync_saves_are_debounced(self, tmp_path):
+        """Changes within save_interval are only written on flush"""
+        index_path = tmp_path / "index.json"
+        index = _build_index(index_path=index_path, save_interval=3600)
+        saved = index_path.read_text()
+        
+        signatures = {path: (1.0, len(text)) for path, text in FILES.items()}
+        signatures["src/utils/strings.py"] = (2.0, 10)
+        assert index.sync(signatures, lambda path: "def shout(text): pass\n") is True
+        assert index_path.read_text() == saved
+        
+        index.flush()
+        assert CodeIndex(index_path=index_path).search("shout")[0].path == "src/utils/strings.py"
+    
+    def test_flush_without_changes_does_not_write(self, tmp_path):
+        """flush() skips the write when nothing changed since the index was loaded"""
+        index_path = tmp_path / "index.json"
+        _build_index(index_path=index_path)
+        reloaded = CodeIndex(index_path=index_path)
+        index_path.unlink()
+        
+        reloaded.flush()
+        assert not index_path.exists()
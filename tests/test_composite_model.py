@@ -0,0 +1,145 @@
+"""
+Tests for provider failover and hedged requests
+プロバイダーフェイルオーバーとヘッジリクエストのテスト
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from agents import Model
+
+from refinire import get_llm
+from refinire.core.composite_model import CompositeModel
+
+
+class FakeModel(Model):
+    """Model answering after a delay, or failing / 遅延後に応答する、または失敗するモデル"""
+
+    def __init__(self, answer, delay=0.0, error=None):
+        self.answer = answer
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def get_response(self, *args, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.answer
+
+    async def stream_response(self, *args, **kwargs):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        for chunk in self.answer.split():
+            yield chunk
+
+
+def respond(model):
+    return asyncio.run(model.get_response(None, "hi", None, [], None, [], None, previous_response_id=None))
+
+
+class TestFailover:
+    """Test ordered failover / 順序付きフェイルオーバーのテスト"""
+
+    def test_uses_primary_when_healthy(self):
+        primary, backup = FakeModel("primary"), FakeModel("backup")
+        model = CompositeModel([("a", primary), ("b", backup)])
+        assert respond(model) == "primary"
+        assert backup.calls == 0
+
+    def test_fails_over_on_error(self):
+        primary, backup = FakeModel("primary", error=RuntimeError("down")), FakeModel("backup")
+        model = CompositeModel([("a", primary), ("b", backup)])
+        assert respond(model) == "backup"
+        assert model.get_health()["a"]["failures"] == 1
+
+    def test_raises_last_error_when_all_fail(self):
+        model = CompositeModel([
+            ("a", FakeModel("a", error=RuntimeError("first"))),
+            ("b", FakeModel("b", error=RuntimeError("second"))),
+        ])
+        with pytest.raises(RuntimeError, match="second"):
+            respond(model)
+
+    def test_unhealthy_model_skipped_until_cooldown(self):
+        primary, backup = FakeModel("primary", error=RuntimeError("down")), FakeModel("backup")
+        model = CompositeModel([("a", primary), ("b", backup)], failure_threshold=2, cooldown=30.0)
+        with patch("refinire.core.circuit_breaker.time.monotonic", return_value=100.0):
+            respond(model)
+            respond(model)
+            respond(model)
+            assert model.get_health()["a"]["healthy"] is False
+        assert primary.calls == 2
+
+        primary.error = None
+        with patch("refinire.core.circuit_breaker.time.monotonic", return_value=131.0):
+            assert respond(model) == "primary"
+            assert model.get_health()["a"]["healthy"] is True
+
+    def test_stream_fails_over_before_first_event(self):
+        primary = FakeModel("primary", error=RuntimeError("down"))
+        model = CompositeModel([("a", primary), ("b", FakeModel("hello there"))])
+
+        async def collect():
+            return [event async for event in model.stream_response(None, "hi", None, [], None, [], None, previous_response_id=None)]
+
+        assert asyncio.run(collect()) == ["hello", "there"]
+
+
+class TestHedging:
+    """Test hedged requests / ヘッジリクエストのテスト"""
+
+    def test_slow_primary_is_hedged(self):
+        primary, backup = FakeModel("primary", delay=1.0), FakeModel("backup", delay=0.01)
+        model = CompositeModel([("a", primary), ("b", backup)], strategy="hedge", hedge_delay=0.05)
+        assert respond(model) == "backup"
+        assert primary.cancelled == 1
+        assert model.hedges_launched == 1
+        assert model.get_health()["b"]["hedge_wins"] == 1
+
+    def test_fast_primary_is_not_hedged(self):
+        primary, backup = FakeModel("primary", delay=0.01), FakeModel("backup")
+        model = CompositeModel([("a", primary), ("b", backup)], strategy="hedge", hedge_delay=0.5)
+        assert respond(model) == "primary"
+        assert backup.calls == 0
+
+    def test_primary_failure_launches_backup_immediately(self):
+        primary = FakeModel("primary", error=RuntimeError("down"))
+        backup = FakeModel("backup")
+        model = CompositeModel([("a", primary), ("b", backup)], strategy="hedge", hedge_delay=10.0)
+        assert respond(model) == "backup"
+        assert model.hedges_launched == 0
+
+    def test_hedge_delay_uses_latency_percentile(self):
+        model = CompositeModel([("a", FakeModel("a"))], min_hedge_samples=5, default_hedge_delay=2.0)
+        assert model._hedge_delay_for("a") == 2.0
+        for latency in (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0):
+            model._record_success("a", latency)
+        assert model._hedge_delay_for("a") == pytest.approx(1.0)
+
+
+class TestGetLLMList:
+    """Test composite creation through get_llm / get_llm経由の複合モデル作成のテスト"""
+
+    def test_list_returns_composite(self, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        model = get_llm(["openai://gpt-4o-mini", "openai://gpt-4o"], strategy="hedge")
+        assert isinstance(model, CompositeModel)
+        assert model.strategy == "hedge"
+        assert [label for label, _ in model.models] == ["openai://gpt-4o-mini", "openai://gpt-4o"]
+
+    def test_shared_api_key_rejected(self):
+        with pytest.raises(ValueError):
+            get_llm(["openai://gpt-4o-mini", "openai://gpt-4o"], api_key="sk-test")
+
+    def test_invalid_strategy(self):
+        with pytest.raises(ValueError):
+            CompositeModel([("a", FakeModel("a"))], strategy="random")
@@ -234,4 +234,21 @@ class TestContextProvider:
         # Test independence of clear calls
         provider1.clear()
         assert provider1.clear_calls == 1
-        assert provider2.clear_calls == 0 
\ No newline at end of file
+        assert provider2.clear_calls == 0 
+    
+    @pytest.mark.asyncio
+    async def test_aget_context_offloads_sync_provider(self):
+        """Test that default aget_context delegates to get_context"""
+        provider = MockContextProvider("async context")
+        
+        context = await provider.aget_context("query", "previous")
+        
+        assert context == "async context"
+        assert provider.context_calls[0]["query"] == "query"
+        assert provider.context_calls[0]["previous_context"] == "previous"
+    
+    def test_default_scheduling_attributes(self):
+        """Test default chaining and timeout attributes"""
+        provider = MockContextProvider()
+        assert provider.uses_previous_context is True
+        assert provider.timeout is None
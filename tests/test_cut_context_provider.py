@@ -4,6 +4,7 @@ CutContextProviderのテスト
 """
 
 import pytest
+import time
 from pathlib import Path
 from typing import Dict, Any
 from refinire.agents.providers.cut_context import CutContextProvider
@@ -323,4 +324,44 @@ This is the third section with even more content."""
         result = cut_provider.get_context("test query")
         # Should preserve file sections and cut from middle
         assert "File:" in result  # Check for file marker
-        assert len(result) <= 80 
\ No newline at end of file
+        assert len(result) <= 80 
+    
+    def test_token_cutting_is_exact(self):
+        """Test token-based cutting never exceeds max_tokens"""
+        class MockProvider:
+            def get_context(self, query, previous_context=None, **kwargs):
+                return " ".join(f"word{i}" for i in range(200))
+            
+            def update(self, interaction):
+                pass
+            
+            def clear(self):
+                pass
+        
+        for strategy in ("start", "end", "middle"):
+            cut_provider = CutContextProvider(
+                provider=MockProvider(),
+                max_tokens=50,
+                cut_strategy=strategy,
+                preserve_sections=False,
+                tokenizer="heuristic"
+            )
+            result = cut_provider.get_context("test query")
+            assert 0 < cut_provider.tokenizer.count(result) <= 50
+        
+        # "end" strategy keeps the beginning, "start" keeps the end
+        # "end"戦略は先頭を、"start"戦略は末尾を保持
+        end_provider = CutContextProvider(provider=MockProvider(), max_tokens=50, cut_strategy="end", tokenizer="heuristic")
+        assert end_provider.get_context("q").startswith("word0 ")
+        start_provider = CutContextProvider(provider=MockProvider(), max_tokens=50, cut_strategy="start", tokenizer="heuristic")
+        assert start_provider.get_context("q").endswith("word199")
+    
+    def test_split_into_sections_linear(self):
+        """Test section splitting on large inputs with duplicate sections"""
+        provider = ConversationHistoryProvider(max_items=5)
+        cut_provider = CutContextProvider(provider=provider, max_chars=100)
+        text = "\n\n".join("same section" for _ in range(5000))
+        start = time.time()
+        sections = cut_provider._split_into_sections(text)
+        assert time.time() - start < 1.0
+        assert sections == ["same section"] * 5000
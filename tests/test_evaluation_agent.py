@@ -6,13 +6,21 @@ EvaluationAgent機能のテスト
 
 import pytest
 import asyncio
+import json
+import re
 import sys
 import os
+from unittest.mock import AsyncMock, Mock, patch
 
 # Add the src directory to the path for local development
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from refinire.agents.evaluation_agent import EvaluationAgent, EvaluationResult
+from refinire.agents.evaluation_agent import (
+    BatchEvaluationOutput,
+    BatchItemScore,
+    EvaluationAgent,
+    EvaluationResult,
+)
 from refinire.agents.flow.context import Context
 
 
@@ -236,6 +244,181 @@ class TestEvaluationAgent:
             pass
 
 
+class TestCompactEvaluationPrompt:
+    """Test token-budgeted evaluation prompts / トークン予算付き評価プロンプトのテスト"""
+
+    def _long_context(self):
+        context = Context()
+        context.shared_state['_last_prompt'] = (
+            "You are a helpful writer.\n\nContext:\n"
+            + "Background sentence about the product. " * 800
+            + "\n\nUser input: Summarize the launch plan"
+        )
+        context.shared_state['_last_generation'] = "The launch plan has three phases. " * 150
+        return context
+
+    def test_prompt_has_no_content_echo(self, evaluation_agent, sample_context):
+        prompt = evaluation_agent._build_evaluation_prompt(sample_context, "")
+        assert '"content"' not in prompt
+        assert "評価対象コンテンツのコピー" not in prompt
+
+    def test_static_prefix_is_shared(self, evaluation_agent, sample_context):
+        other = Context()
+        other.shared_state['_last_prompt'] = "別のプロンプト"
+        other.shared_state['_last_generation'] = "別の生成結果"
+        prefix = evaluation_agent._get_static_prefix()
+        assert evaluation_agent._build_evaluation_prompt(sample_context, "").startswith(prefix)
+        assert evaluation_agent._build_evaluation_prompt(other, "").startswith(prefix)
+        assert evaluation_agent._get_static_prefix() is prefix
+
+    def test_prompt_fits_budget(self):
+        agent = EvaluationAgent(
+            name="budgeted",
+            evaluation_instruction="Judge accuracy",
+            prompt_token_budget=1000,
+            tokenizer="heuristic"
+        )
+        prompt = agent._build_evaluation_prompt(self._long_context(), "")
+        assert agent._tokenizer.count(prompt) <= 1000
+        # Both the instructions and the user input of the original prompt survive
+        # 元のプロンプトの指示とユーザー入力の両方が残る
+        assert "You are a helpful writer." in prompt
+        assert "User input: Summarize the launch plan" in prompt
+        assert "The launch plan has three phases." in prompt
+
+    def test_budget_disabled_by_default(self):
+        agent = EvaluationAgent(
+            name="unbounded",
+            evaluation_instruction="Judge accuracy"
+        )
+        context = self._long_context()
+        prompt = agent._build_evaluation_prompt(context, "")
+        assert agent._tokenizer is None
+        assert context.shared_state['_last_prompt'] in prompt
+        assert context.shared_state['_last_generation'] in prompt
+
+    def test_generation_keeps_minimum_share(self):
+        agent = EvaluationAgent(
+            name="tiny_budget",
+            evaluation_instruction="Judge accuracy " * 200,
+            prompt_token_budget=100,
+            tokenizer="heuristic"
+        )
+        prompt = agent._build_evaluation_prompt(self._long_context(), "")
+        generation = prompt.split("=== 生成結果 ===\n", 1)[1]
+        assert generation.startswith("The launch plan has three phases.")
+        assert agent._tokenizer.count(generation) >= EvaluationAgent.MIN_GENERATION_TOKENS - 1
+
+
+class TestBatchEvaluation:
+    """Test batched multi-item evaluation / 複数項目のバッチ評価のテスト"""
+
+    @staticmethod
+    def _items(count):
+        return [(f"prompt {i}", "good answer" if i % 2 == 0 else "bad answer") for i in range(count)]
+
+    @staticmethod
+    def _score_batch(prompt):
+        sections = re.findall(r"=== 項目 (\d+) ===\n--- 元のプロンプト ---\n.*?\n--- 生成結果 ---\n(\w+) answer", prompt)
+        return BatchEvaluationOutput(results=[
+            BatchItemScore(index=int(index), score=0.9 if quality == "good" else 0.2, feedback=quality)
+            for index, quality in sections
+        ])
+
+    def test_batches_reduce_calls(self, evaluation_agent):
+        calls = []
+
+        async def fake_run(agent, prompt):
+            calls.append(prompt)
+            return Mock(final_output=self._score_batch(prompt))
+
+        with patch("agents.Runner") as mock_runner:
+            mock_runner.run = AsyncMock(side_effect=fake_run)
+            results = evaluation_agent.evaluate_batch(self._items(25), batch_size=10)
+
+        assert len(calls) == 3
+        assert [r.passed for r in results] == [i % 2 == 0 for i in range(25)]
+        assert results[3].content == "bad answer"
+        assert results[0].metadata["batch_size"] == 10
+        assert '"content"' not in calls[0]
+
+    def test_batch_prompt_shares_budget(self):
+        agent = EvaluationAgent(
+            name="batch_budget",
+            evaluation_instruction="Judge accuracy",
+            prompt_token_budget=4000,
+            tokenizer="heuristic"
+        )
+        items = [(f"prompt {i} " + "context " * 2000, "answer " * 3000) for i in range(10)]
+        prompt = agent._build_batch_prompt(items)
+        assert agent._tokenizer.count(prompt) <= 4000 * 1.1
+        assert prompt.count("=== 項目 ") == 10
+
+    def test_incomplete_response_splits_batch(self, evaluation_agent):
+        calls = []
+
+        async def fake_run(agent, prompt):
+            calls.append(prompt)
+            output = self._score_batch(prompt)
+            if len(calls) == 1:
+                # Drop one item from the first response
+                # 最初の応答から1項目を欠落させる
+                output.results.pop()
+            return Mock(final_output=output)
+
+        with patch("agents.Runner") as mock_runner:
+            mock_runner.run = AsyncMock(side_effect=fake_run)
+            results = evaluation_agent.evaluate_batch(self._items(4), batch_size=4)
+
+        assert len(calls) == 3
+        assert [r.score for r in results] == [0.9, 0.2, 0.9, 0.2]
+
+    def test_single_item_falls_back_to_run_async(self, evaluation_agent):
+        async def fake_run(agent, prompt):
+            if agent.name == "batch_evaluation_agent":
+                return Mock(final_output="not json")
+            return Mock(final_output=json.dumps({"score": 0.8, "feedback": "ok"}))
+
+        with patch("agents.Runner") as mock_runner:
+            mock_runner.run = AsyncMock(side_effect=fake_run)
+            results = evaluation_agent.evaluate_batch(self._items(2), batch_size=2)
+
+        assert [r.score for r in results] == [0.8, 0.8]
+        assert all(r.passed for r in results)
+
+    def test_concurrency_limit(self, evaluation_agent):
+        active = 0
+        peak = 0
+
+        async def fake_run(agent, prompt):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return Mock(final_output=self._score_batch(prompt))
+
+        with patch("agents.Runner") as mock_runner:
+            mock_runner.run = AsyncMock(side_effect=fake_run)
+            results = evaluation_agent.evaluate_batch(self._items(40), batch_size=4, max_concurrency=2)
+
+        assert len(results) == 40
+        assert peak == 2
+
+    def test_call_failure_scores_zero(self, evaluation_agent):
+        with patch("agents.Runner") as mock_runner:
+            mock_runner.run = AsyncMock(side_effect=RuntimeError("unavailable"))
+            results = evaluation_agent.evaluate_batch(self._items(3), batch_size=3)
+
+        assert mock_runner.run.await_count == 1
+        assert all(r.score == 0.0 and not r.passed for r in results)
+        assert "unavailable" in results[0].feedback
+
+    def test_invalid_batch_size(self, evaluation_agent):
+        with pytest.raises(ValueError):
+            evaluation_agent.evaluate_batch(self._items(2), batch_size=0)
+
+
 class TestEvaluationResult:
     """EvaluationResult data model tests"""
     
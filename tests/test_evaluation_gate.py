@@ -0,0 +1,130 @@
+"""
+Tests for the evaluation gate
+評価ゲートのテスト
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from pydantic import BaseModel
+
+from refinire.agents.flow.context import Context
+from refinire.agents.pipeline import EvaluationGate, RefinireAgent
+
+
+class Answer(BaseModel):
+    title: str
+    body: str
+
+
+class TestLocalChecks:
+    """Test deterministic local checks / 決定的なローカルチェックのテスト"""
+
+    def test_empty_and_length_bounds(self):
+        gate = EvaluationGate(min_length=5, max_length=20)
+        assert gate.check("   ") == "Empty output"
+        assert "shorter" in gate.check("abc")
+        assert "longer" in gate.check("x" * 21)
+        assert gate.check("just right") is None
+
+    def test_schema_validation(self):
+        gate = EvaluationGate(output_model=Answer)
+        assert gate.check('{"title": "t", "body": "b"}') is None
+        assert gate.check(Answer(title="t", body="b")) is None
+        assert "Answer" in gate.check('{"title": "t"}')
+        assert "Answer" in gate.check("not json")
+
+    def test_custom_checks(self):
+        def no_apology(output):
+            return "sorry" not in output.lower()
+
+        gate = EvaluationGate(checks=[no_apology, lambda output: 1 / 0])
+        assert gate.check("Sorry, I cannot help") == "Heuristic check failed: no_apology"
+        assert "error" in gate.check("Here is the answer")
+
+    def test_local_failure_is_counted(self):
+        gate = EvaluationGate()
+        decision = gate.decide("")
+        assert decision.evaluate is False
+        assert decision.passed is False
+        assert gate.get_statistics()["local_failures"] == 1
+
+
+class TestSampling:
+    """Test sampling once pass rates are stable / 合格率安定後のサンプリングのテスト"""
+
+    def test_no_sampling_by_default(self):
+        gate = EvaluationGate(warmup=1)
+        gate.record(95.0, True)
+        assert all(gate.decide("answer").evaluate for _ in range(20))
+
+    def test_sampling_after_warmup(self):
+        gate = EvaluationGate(sample_rate=0.2, warmup=5, seed=1)
+        assert gate.decide("answer").evaluate is True
+        for _ in range(5):
+            gate.record(90.0, True)
+
+        decisions = [gate.decide("answer") for _ in range(200)]
+        skipped = [d for d in decisions if not d.evaluate]
+        assert 120 < len(skipped) < 200
+        assert all(d.passed and d.score == pytest.approx(90.0) for d in skipped)
+        stats = gate.get_statistics()
+        assert stats["sampling_active"] is True
+        assert stats["skipped"] == len(skipped)
+
+    def test_unstable_pass_rate_disables_sampling(self):
+        gate = EvaluationGate(sample_rate=0.1, warmup=4, stable_pass_rate=0.9)
+        for passed in (True, True, True, False):
+            gate.record(80.0, passed)
+        assert all(gate.decide("answer").evaluate for _ in range(20))
+
+    def test_invalid_sample_rate(self):
+        with pytest.raises(ValueError):
+            EvaluationGate(sample_rate=1.5)
+
+
+class TestAgentIntegration:
+    """Test the gate in RefinireAgent evaluation / RefinireAgent評価でのゲートのテスト"""
+
+    def _agent(self, gate):
+        agent = RefinireAgent(
+            name="gated",
+            generation_instructions="Answer",
+            evaluation_instructions="Judge",
+            model="gpt-4o-mini",
+            evaluation_gate=gate
+        )
+        evaluation_context = Mock()
+        evaluation_context.evaluation_result = Mock(score=0.9, passed=True, feedback="good", metadata={})
+        agent._evaluation_agent = Mock()
+        agent._evaluation_agent.run_async = AsyncMock(return_value=evaluation_context)
+        return agent
+
+    def test_local_failure_skips_llm(self):
+        agent = self._agent(EvaluationGate(min_length=10))
+        result = asyncio.run(agent._execute_evaluation("q", "short", Context()))
+        assert result.passed is False
+        assert result.metadata["local_failure"] is True
+        agent._evaluation_agent.run_async.assert_not_awaited()
+
+    def test_llm_results_are_recorded(self):
+        gate = EvaluationGate(sample_rate=0.0, warmup=2)
+        agent = self._agent(gate)
+        for _ in range(3):
+            result = asyncio.run(agent._execute_evaluation("q", "a long enough answer", Context()))
+
+        assert agent._evaluation_agent.run_async.await_count == 2
+        assert result.metadata["sampled_out"] is True
+        assert result.score == pytest.approx(90.0)
+        assert gate.get_statistics()["llm_evaluations"] == 2
+
+    def test_fallback_results_are_recorded(self):
+        gate = EvaluationGate()
+        agent = self._agent(gate)
+        agent._evaluation_agent.run_async = AsyncMock(side_effect=RuntimeError("evaluator down"))
+
+        result = asyncio.run(agent._execute_evaluation("q", "a long enough answer", Context()))
+
+        assert gate.get_statistics()["llm_evaluations"] == 1
+        assert gate._recent[-1] == (result.score, result.passed)
@@ -3,14 +3,40 @@ Tests for RefinireAgent context management integration
 RefinireAgentのコンテキスト管理統合テスト
 """
 
+import asyncio
 import pytest
 import tempfile
 import os
+import time
 from refinire.agents.pipeline.llm_pipeline import RefinireAgent
+from refinire.agents.context_provider import ContextProvider
 from refinire.agents.providers.conversation_history import ConversationHistoryProvider
 from refinire.agents.providers.fixed_file import FixedFileProvider
 
 
+class SlowProvider(ContextProvider):
+    """Provider that blocks for a fixed time before returning its context"""
+    
+    provider_name = "slow"
+    
+    def __init__(self, text: str, delay: float = 0.0, uses_previous_context: bool = False):
+        self.text = text
+        self.delay = delay
+        self.uses_previous_context = uses_previous_context
+        self.previous_contexts = []
+    
+    def get_context(self, query, previous_context=None, **kwargs):
+        time.sleep(self.delay)
+        self.previous_contexts.append(previous_context)
+        return self.text
+    
+    def update(self, interaction):
+        pass
+    
+    def clear(self):
+        pass
+
+
 class TestRefinireAgentContextIntegration:
     """Test cases for RefinireAgent context management integration"""
     
@@ -361,4 +387,116 @@ class TestRefinireAgentContextIntegration:
         # Should default to conversation provider when empty string
         assert len(agent.context_providers) == 1
         assert agent.context_providers[0].__class__.__name__ == "ConversationHistoryProvider"
-        assert agent.context_providers[0].max_items == 10 
\ No newline at end of file
+        assert agent.context_providers[0].max_items == 10 
+
+
+class TestRefinireAgentAsyncContext:
+    """Test cases for concurrent context provider execution"""
+    
+    def _make_agent(self, providers, **kwargs):
+        agent = RefinireAgent(
+            name="test_agent",
+            generation_instructions="You are a helpful assistant.",
+            context_providers_config=[],
+            **kwargs
+        )
+        agent.context_providers = providers
+        return agent
+    
+    @pytest.mark.asyncio
+    async def test_independent_providers_run_concurrently(self):
+        """Independent providers should overlap instead of running back to back"""
+        agent = self._make_agent([SlowProvider("A", 0.2), SlowProvider("B", 0.2), SlowProvider("C", 0.2)])
+        
+        start = time.perf_counter()
+        prompt = await agent._abuild_prompt("Hello")
+        elapsed = time.perf_counter() - start
+        
+        assert elapsed < 0.5
+        assert "A\n\nB\n\nC" in prompt
+    
+    @pytest.mark.asyncio
+    async def test_chained_provider_receives_previous_context(self):
+        """Chained providers should see the same previous_context as sequential execution"""
+        chained = SlowProvider("C", uses_previous_context=True)
+        agent = self._make_agent([SlowProvider("A", 0.05), SlowProvider("", 0.0), chained])
+        
+        await agent._abuild_prompt("Hello")
+        
+        assert chained.previous_contexts == ["A"]
+    
+    @pytest.mark.asyncio
+    async def test_provider_timeout_degrades_gracefully(self):
+        """A provider exceeding its time budget should contribute no context"""
+        slow = SlowProvider("slow context", 0.5)
+        slow.timeout = 0.05
+        agent = self._make_agent([slow, SlowProvider("fast context")])
+        
+        prompt = await agent._abuild_prompt("Hello")
+        
+        assert "slow context" not in prompt
+        assert "fast context" in prompt
+    
+    @pytest.mark.asyncio
+    async def test_timed_out_provider_is_not_reentered(self):
+        """A provider whose timed-out call is still running should be skipped, not called again"""
+        slow = SlowProvider("slow context", 0.3)
+        slow.timeout = 0.05
+        agent = self._make_agent([slow])
+        
+        await agent._abuild_prompt("Hello")
+        prompt = await agent._abuild_prompt("Hello again")
+        assert "slow context" not in prompt
+        
+        # Once the first call has finished, the provider is used again
+        # 最初の呼び出しが終わるとプロバイダーは再び使用される
+        await asyncio.sleep(0.4)
+        assert len(slow.previous_contexts) == 1
+        slow.timeout = None
+        prompt = await agent._abuild_prompt("Hello once more")
+        assert "slow context" in prompt
+    
+    @pytest.mark.asyncio
+    async def test_agent_default_provider_timeout(self):
+        """context_provider_timeout applies to providers without their own timeout"""
+        agent = self._make_agent([SlowProvider("slow context", 0.5)], context_provider_timeout=0.05)
+        
+        prompt = await agent._abuild_prompt("Hello")
+        
+        assert "Context:" not in prompt
+    
+    def test_timeout_from_config(self):
+        """The timeout key should be accepted for any provider type"""
+        agent = RefinireAgent(
+            name="test_agent",
+            generation_instructions="You are a helpful assistant.",
+            context_providers_config=[{"type": "conversation_history", "max_items": 5, "timeout": 2}]
+        )
+        assert agent.context_providers[0].timeout == 2.0
+    
+    def test_prompt_token_budget(self):
+        """Context and history should be trimmed to the shared prompt budget"""
+        context = " ".join(f"ctx{i}" for i in range(100))
+        agent = self._make_agent([SlowProvider(context)], prompt_token_budget=40, tokenizer="whitespace")
+        agent.session_history = [" ".join(f"hist{i}" for i in range(100))]
+        
+        prompt = agent._build_prompt("Hello there")
+        
+        assert len(prompt.split()) <= 40
+        assert "You are a helpful assistant." in prompt
+        assert prompt.endswith("User input: Hello there")
+        assert "ctx0 " in prompt
+        # Context fills the budget first, so no history is included
+        # コンテキストが先に予算を使い切るため履歴は含まれない
+        assert "hist" not in prompt
+    
+    def test_prompt_token_budget_keeps_recent_history(self):
+        """History keeps its most recent part when cut"""
+        agent = self._make_agent([], prompt_token_budget=30, tokenizer="whitespace")
+        agent.session_history = [" ".join(f"hist{i}" for i in range(100))]
+        
+        prompt = agent._build_prompt("Hello")
+        
+        assert len(prompt.split()) <= 30
+        assert "hist99" in prompt
+        assert "hist0 " not in prompt
@@ -0,0 +1,56 @@
+"""
+Test Gitignore Matcher
+Gitignoreマッチャーのテスト
+
+This module tests GitIgnoreSpec pattern compilation and matching.
+このモジュールはGitIgnoreSpecのパターンコンパイルと照合をテストします。
+"""
+
+import pytest
+
+from refinire.agents.providers.gitignore import GitIgnoreSpec
+
+
+class TestGitIgnoreSpec:
+    """Test cases for GitIgnoreSpec"""
+    
+    @pytest.mark.parametrize("pattern,path,is_dir,expected", [
+        ("*.pyc", "a/b/c.pyc", False, True),
+        ("*.pyc", "a/b/c.py", False, None),
+        ("build/", "build", True, True),
+        ("build/", "build", False, None),
+        ("build/", "src/build", True, True),
+        ("/build", "src/build", True, None),
+        ("/build", "build", True, True),
+        ("docs/_build", "docs/_build", True, True),
+        ("docs/_build", "src/docs/_build", True, None),
+        ("**/logs", "a/b/logs", True, True),
+        ("a/**/b", "a/b", False, True),
+        ("a/**/b", "a/x/y/b", False, True),
+        ("out/**", "out/x/y.js", False, True),
+        ("out/**", "out", True, None),
+        ("file?.txt", "file1.txt", False, True),
+        ("file?.txt", "file10.txt", False, None),
+        ("[abc].py", "b.py", False, True),
+        ("[!abc].py", "b.py", False, None),
+        ("\\#notes", "#notes", False, True),
+        ("trailing   ", "trailing", False, True),
+    ])
+    def test_pattern_semantics(self, pattern, path, is_dir, expected):
+        """Patterns follow git anchoring, directory and wildcard rules"""
+        assert GitIgnoreSpec([pattern]).match(path, is_dir) is expected
+    
+    def test_comments_and_blank_lines(self):
+        """Comments and blank lines produce no rules"""
+        spec = GitIgnoreSpec(["# comment", "", "   "])
+        assert not spec
+        assert spec.match("anything") is None
+    
+    def test_negation_last_match_wins(self):
+        """A later negation re-includes, a later pattern excludes again"""
+        spec = GitIgnoreSpec(["*.log", "!keep.log", "keep.log.d/"])
+        assert spec.match("debug.log") is True
+        assert spec.match("keep.log") is False
+        
+        spec = GitIgnoreSpec(["!keep.log", "*.log"])
+        assert spec.match("keep.log") is True
@@ -0,0 +1,213 @@
+"""
+Tests for LLM request metrics
+LLMリクエストメトリクスのテスト
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from agents.usage import Usage
+
+from refinire.core.metrics import (
+    MODEL_PRICING,
+    Histogram,
+    MetricsRegistry,
+    estimate_cost,
+    get_metrics_registry,
+    set_metrics_registry,
+    set_model_pricing,
+)
+
+
+class TestCostEstimation:
+    """Test model pricing / モデル料金のテスト"""
+
+    def test_longest_prefix_wins(self):
+        # gpt-4o-mini must not be priced as gpt-4o
+        # gpt-4o-miniはgpt-4oとして計算されてはならない
+        assert estimate_cost("gpt-4o-mini", 1_000_000, 0) == pytest.approx(0.15)
+        assert estimate_cost("gpt-4o-2024-08-06", 0, 1_000_000) == pytest.approx(10.0)
+
+    def test_provider_prefix_and_unknown_model(self):
+        assert estimate_cost("openai://gpt-4o-mini", 1_000_000, 1_000_000) == pytest.approx(0.75)
+        assert estimate_cost("my-local-model", 100, 100) is None
+        assert estimate_cost(None, 100, 100) is None
+
+    def test_custom_pricing(self):
+        set_model_pricing("my-custom-model", 1.0, 2.0)
+        try:
+            assert estimate_cost("my-custom-model", 1_000_000, 500_000) == pytest.approx(2.0)
+        finally:
+            MODEL_PRICING.pop("my-custom-model")
+
+
+class TestHistogram:
+    """Test histogram buckets / ヒストグラムバケットのテスト"""
+
+    def test_cumulative_buckets(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        assert histogram.cumulative() == [("0.1", 2), ("1", 3), ("+Inf", 4)]
+        assert histogram.sum == pytest.approx(3.65)
+        assert histogram.snapshot()["count"] == 4
+
+
+class TestMetricsRegistry:
+    """Test recording and exposition / 記録と出力のテスト"""
+
+    def test_record_and_snapshot(self):
+        registry = MetricsRegistry()
+        cost = registry.record_request("gpt-4o-mini", "writer", 0.8, prompt_tokens=1000, completion_tokens=200)
+        registry.record_request("gpt-4o-mini", "writer", 2.0, success=False, retries=2)
+        registry.record_request("gpt-4o-mini", "writer", 0.3, time_to_first_token=0.1)
+        registry.record_cache_hit("gpt-4o-mini", "writer")
+
+        stats = registry.snapshot()["gpt-4o-mini/writer"]
+        assert cost == pytest.approx((1000 * 0.15 + 200 * 0.60) / 1_000_000)
+        assert stats["requests"] == 3
+        assert stats["errors"] == 1
+        assert stats["retries"] == 2
+        assert stats["cache_hits"] == 1
+        assert stats["prompt_tokens"] == 1000
+        assert stats["completion_tokens"] == 200
+        assert stats["cost_usd"] == pytest.approx(cost)
+        assert stats["latency_seconds"]["count"] == 3
+        assert stats["time_to_first_token_seconds"]["count"] == 1
+
+        registry.reset()
+        assert registry.snapshot() == {}
+
+    def test_prometheus_exposition(self):
+        registry = MetricsRegistry(latency_buckets=(1.0,))
+        registry.record_request("gpt-4o", 'agent "x"', 0.5, prompt_tokens=10, completion_tokens=5)
+
+        text = registry.to_prometheus()
+        labels = 'model="gpt-4o",agent="agent \\"x\\""'
+        assert "# TYPE refinire_llm_requests_total counter" in text
+        assert f'refinire_llm_requests_total{{{labels},status="success"}} 1' in text
+        assert f'refinire_llm_tokens_total{{{labels},type="prompt"}} 10' in text
+        assert f'refinire_llm_request_duration_seconds_bucket{{{labels},le="1"}} 1' in text
+        assert f'refinire_llm_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+        assert f"refinire_llm_request_duration_seconds_count{{{labels}}} 1" in text
+        assert text.endswith("\n")
+
+    def test_opentelemetry_mirroring(self):
+        meter = Mock()
+        counters = {}
+        meter.create_counter.side_effect = lambda name, **kwargs: counters.setdefault(name, Mock())
+        meter.create_histogram.side_effect = lambda name, **kwargs: counters.setdefault(name, Mock())
+
+        registry = MetricsRegistry()
+        assert registry.enable_opentelemetry(meter) is True
+        registry.record_request("gpt-4o", "writer", 0.5, prompt_tokens=10, completion_tokens=5)
+
+        counters["refinire.llm.requests"].add.assert_called_once_with(
+            1, {"model": "gpt-4o", "agent": "writer", "status": "success"}
+        )
+        counters["refinire.llm.duration"].record.assert_called_once_with(0.5, {"model": "gpt-4o", "agent": "writer"})
+        assert counters["refinire.llm.tokens"].add.call_count == 2
+
+        registry.disable_opentelemetry()
+        registry.record_request("gpt-4o", "writer", 0.5)
+        assert counters["refinire.llm.requests"].add.call_count == 1
+
+    def test_global_registry(self):
+        original = get_metrics_registry()
+        replacement = MetricsRegistry()
+        try:
+            set_metrics_registry(replacement)
+            assert get_metrics_registry() is replacement
+        finally:
+            set_metrics_registry(original)
+
+
+class TestAgentMetrics:
+    """Test RefinireAgent integration / RefinireAgentとの統合テスト"""
+
+    @patch('refinire.agents.pipeline.llm_pipeline.Runner')
+    def test_usage_and_cost_recorded(self, mock_runner):
+        from refinire import RefinireAgent
+
+        mock_result = Mock()
+        mock_result.final_output = "Hello"
+        mock_result.context_wrapper.usage = Usage(requests=1, input_tokens=1000, output_tokens=100, total_tokens=1100)
+        mock_runner.run = AsyncMock(return_value=mock_result)
+
+        registry = MetricsRegistry()
+        agent = RefinireAgent(
+            name="metrics_agent", generation_instructions="Be brief", model="gpt-4o-mini", metrics=registry
+        )
+        result = asyncio.run(agent._run_standalone("Hi"))
+
+        assert result.success is True
+        assert result.metadata["usage"] == {"prompt_tokens": 1000, "completion_tokens": 100, "total_tokens": 1100}
+        assert result.metadata["cost_usd"] == pytest.approx((1000 * 0.15 + 100 * 0.60) / 1_000_000)
+        assert result.metadata["latency_seconds"] >= 0
+
+        stats = registry.snapshot()["gpt-4o-mini/metrics_agent"]
+        assert stats["requests"] == 1
+        assert stats["prompt_tokens"] == 1000
+
+    @patch('refinire.agents.pipeline.llm_pipeline.Runner')
+    def test_failed_request_recorded(self, mock_runner):
+        from refinire import RefinireAgent
+
+        mock_runner.run = AsyncMock(side_effect=ValueError("model error"))
+
+        registry = MetricsRegistry()
+        agent = RefinireAgent(
+            name="metrics_agent", generation_instructions="Be brief", model="gpt-4o-mini", metrics=registry
+        )
+        result = asyncio.run(agent._run_standalone("Hi"))
+
+        assert result.success is False
+        stats = registry.snapshot()["gpt-4o-mini/metrics_agent"]
+        assert stats["requests"] == 1
+        assert stats["errors"] == 1
+
+    def test_helper_agent_retries_recorded(self):
+        from refinire.agents.evaluation_agent import EvaluationAgent
+        from refinire.agents.routing_agent import RoutingAgent
+        from refinire.agents.flow.context import Context
+
+        usage = Usage(requests=1, input_tokens=100, output_tokens=10, total_tokens=110)
+        routed = Mock()
+        routed.final_output = '{"next_route": "greeting", "confidence": 0.9, "reasoning": "hello"}'
+        routed.context_wrapper.usage = usage
+        evaluated = Mock()
+        evaluated.final_output = '{"score": 0.9, "feedback": "good", "suggestions": []}'
+        evaluated.context_wrapper.usage = usage
+
+        original = get_metrics_registry()
+        registry = MetricsRegistry()
+        try:
+            set_metrics_registry(registry)
+            router = RoutingAgent(
+                name="router", routing_instruction="Route it", routing_destinations=["greeting"], model="gpt-4o-mini"
+            )
+            evaluator = EvaluationAgent(name="evaluator", evaluation_instruction="Evaluate it", model="gpt-4o-mini")
+            context = Context()
+            context.shared_state['_last_prompt'] = "Say hello"
+            context.shared_state['_last_generation'] = "Hello"
+            with patch('refinire.agents.routing_agent.asyncio.sleep', AsyncMock()), \
+                    patch.object(router, '_execute_llm_call', AsyncMock(side_effect=[TimeoutError(), routed])), \
+                    patch.object(evaluator, '_execute_llm_call', AsyncMock(side_effect=[TimeoutError(), TimeoutError(), evaluated])):
+                asyncio.run(router.run_async("", context))
+                asyncio.run(evaluator.run_async("", context))
+        finally:
+            set_metrics_registry(original)
+
+        assert context.routing_result.next_route == "greeting"
+        assert context.evaluation_result.score == 0.9
+        snapshot = registry.snapshot()
+        router_stats = snapshot["gpt-4o-mini/router"]
+        assert router_stats["requests"] == 1
+        assert router_stats["retries"] == 1
+        assert router_stats["prompt_tokens"] == 100
+        evaluator_stats = snapshot["gpt-4o-mini/evaluator"]
+        assert evaluator_stats["requests"] == 1
+        assert evaluator_stats["retries"] == 2
+        assert evaluator_stats["errors"] == 0
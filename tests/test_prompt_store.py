@@ -8,6 +8,7 @@ PromptStoreの実装をテストします。
 import pytest
 import tempfile
 import os
+import time
 from unittest.mock import patch, Mock
 from pathlib import Path
 from datetime import datetime
@@ -356,6 +357,388 @@ class TestPromptStore:
             assert result.get_content("en") == "Test content"
 
 
+class TestPromptStoreConnectionCache:
+    """Test pooled connections and the read-through cache."""
+    
+    @pytest.fixture
+    def storage_dir(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            PromptStore._instance = None
+            PromptStore._storage_dir = None
+            yield Path(temp_dir)
+            if PromptStore._instance is not None:
+                PromptStore._instance.close()
+            PromptStore._instance = None
+            PromptStore._storage_dir = None
+    
+    def test_connection_reused_in_wal_mode(self, storage_dir):
+        """Operations on one thread share a WAL-mode connection."""
+        PromptStore.store("test", "Content", auto_translate=False, storage_dir=storage_dir)
+        instance = PromptStore._get_instance(storage_dir)
+        conn = instance._connection()
+        
+        PromptStore.get("test", storage_dir=storage_dir)
+        PromptStore.list_prompts(storage_dir=storage_dir)
+        
+        assert instance._connection() is conn
+        assert len(instance._connections) == 1
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    
+    def test_connections_are_per_thread(self, storage_dir):
+        """Each thread gets its own connection."""
+        import threading
+        
+        PromptStore.store("test", "Content", auto_translate=False, storage_dir=storage_dir)
+        instance = PromptStore._get_instance(storage_dir)
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(PromptStore.get("test", language="en", storage_dir=storage_dir))
+        )
+        thread.start()
+        thread.join()
+        
+        assert results[0].content == "Content"
+        assert len(instance._connections) == 2
+    
+    def test_connections_of_finished_threads_are_closed(self, storage_dir):
+        """Connections of exited threads are dropped when a new one is opened."""
+        import sqlite3
+        import threading
+        
+        PromptStore.store("test", "Content", auto_translate=False, storage_dir=storage_dir)
+        instance = PromptStore._get_instance(storage_dir)
+        opened = []
+        for _ in range(5):
+            thread = threading.Thread(target=lambda: opened.append(instance._connection()))
+            thread.start()
+            thread.join()
+        
+        assert len(instance._connections) == 2
+        with pytest.raises(sqlite3.ProgrammingError):
+            opened[0].execute("SELECT 1")
+    
+    def test_cache_hit_skips_query(self, storage_dir):
+        """Repeated gets are served from the cache."""
+        PromptStore.store("test", "Content", tag="v1", auto_translate=False, storage_dir=storage_dir)
+        instance = PromptStore._get_instance(storage_dir)
+        PromptStore.get("test", tag="v1", language="en", storage_dir=storage_dir)
+        
+        statements = []
+        instance._connection().set_trace_callback(statements.append)
+        result = PromptStore.get("test", tag="v1", language="en", storage_dir=storage_dir)
+        
+        assert result.content == "Content"
+        assert not any("FROM prompts" in statement for statement in statements)
+    
+    def test_cache_invalidated_by_store_and_delete(self, storage_dir):
+        """Local writes invalidate cached prompts."""
+        PromptStore.store("test", "Old", auto_translate=False, language="en", storage_dir=storage_dir)
+        assert PromptStore.get("test", language="en", storage_dir=storage_dir).content == "Old"
+        
+        PromptStore.store("test", "New", auto_translate=False, language="en", storage_dir=storage_dir)
+        assert PromptStore.get("test", language="en", storage_dir=storage_dir).content == "New"
+        
+        PromptStore.delete("test", storage_dir=storage_dir)
+        assert PromptStore.get("test", storage_dir=storage_dir) is None
+    
+    def test_cache_invalidated_by_external_write(self, storage_dir):
+        """Writes from other connections are detected through data_version."""
+        import sqlite3
+        
+        PromptStore.store("test", "Old", auto_translate=False, language="en", storage_dir=storage_dir)
+        assert PromptStore.get("test", language="en", storage_dir=storage_dir).content == "Old"
+        
+        with sqlite3.connect(storage_dir / "prompts.db") as other:
+            other.execute("UPDATE prompts SET content_en = ? WHERE name = ?", ("External", "test"))
+        
+        time.sleep(PromptStore.data_version_interval)
+        assert PromptStore.get("test", language="en", storage_dir=storage_dir).content == "External"
+    
+    def test_row_read_before_concurrent_write_is_not_cached(self, storage_dir):
+        """A row read by another thread before a write is not cached after it."""
+        import threading
+        
+        PromptStore.store("test", "Old", auto_translate=False, language="en", storage_dir=storage_dir)
+        instance = PromptStore._get_instance(storage_dir)
+        queried = threading.Event()
+        written = threading.Event()
+        real_lock = instance._cache_lock
+        
+        class PausingLock:
+            """Pause the reader thread between its query and storing the row."""
+            def __enter__(self):
+                if threading.current_thread() is reader and not queried.is_set():
+                    queried.set()
+                    written.wait(5)
+                return real_lock.__enter__()
+            
+            def __exit__(self, *exc_info):
+                return real_lock.__exit__(*exc_info)
+        
+        instance._cache_lock = PausingLock()
+        results = []
+        reader = threading.Thread(
+            target=lambda: results.append(PromptStore.get("test", language="en", storage_dir=storage_dir))
+        )
+        reader.start()
+        assert queried.wait(5)
+        PromptStore.store("test", "New", auto_translate=False, language="en", storage_dir=storage_dir)
+        written.set()
+        reader.join()
+        
+        assert results[0].content == "Old"
+        time.sleep(PromptStore.data_version_interval)
+        assert PromptStore.get("test", language="en", storage_dir=storage_dir).content == "New"
+    
+    def test_data_version_check_is_throttled(self, storage_dir):
+        """Cache hits within data_version_interval do not query data_version."""
+        PromptStore.store("test", "Content", auto_translate=False, language="en", storage_dir=storage_dir)
+        PromptStore.get("test", language="en", storage_dir=storage_dir)
+        instance = PromptStore._get_instance(storage_dir)
+        
+        statements = []
+        instance._connection().set_trace_callback(statements.append)
+        for _ in range(10):
+            PromptStore.get("test", language="en", storage_dir=storage_dir)
+        
+        assert sum("data_version" in statement for statement in statements) <= 1
+    
+    def test_untagged_resolution(self, storage_dir):
+        """Without a tag, the untagged prompt or the only prompt is returned."""
+        PromptStore.store("single", "Tagged", tag="v1", auto_translate=False, language="en", storage_dir=storage_dir)
+        assert PromptStore.get("single", language="en", storage_dir=storage_dir).content == "Tagged"
+        
+        PromptStore.store("single", "Other", tag="v2", auto_translate=False, language="en", storage_dir=storage_dir)
+        assert PromptStore.get("single", language="en", storage_dir=storage_dir) is None
+        
+        PromptStore.store("single", "Untagged", auto_translate=False, language="en", storage_dir=storage_dir)
+        result = PromptStore.get_prompt("single", storage_dir=storage_dir)
+        assert result.tag is None
+        assert result.get_content("en") == "Untagged"
+
+
+class TestPromptStoreTranslations:
+    """Test background batched translations."""
+    
+    @pytest.fixture
+    def storage_dir(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            PromptStore._instance = None
+            PromptStore._storage_dir = None
+            yield Path(temp_dir)
+            if PromptStore._instance is not None:
+                PromptStore._instance.close()
+            PromptStore._instance = None
+            PromptStore._storage_dir = None
+    
+    def test_store_does_not_wait_for_translation(self, storage_dir):
+        """store returns before the translation finishes."""
+        import threading
+        
+        release = threading.Event()
+        
+        def slow_translate(self, prompt):
+            release.wait(5)
+            return "こんにちは"
+        
+        with patch.object(PromptStore, "_translate_text", slow_translate):
+            result = PromptStore.store("greet", "Hello", language="en", storage_dir=storage_dir)
+            assert result.translation_status == "pending"
+            assert [p.name for p in PromptStore.pending_translations(storage_dir=storage_dir)] == ["greet"]
+            
+            release.set()
+            assert PromptStore.wait_for_translations(timeout=5, storage_dir=storage_dir)
+        
+        stored = PromptStore.get_prompt("greet", storage_dir=storage_dir)
+        assert stored.translation_status == "done"
+        assert stored.get_content("ja") == "こんにちは"
+        assert PromptStore.get("greet", language="ja", storage_dir=storage_dir).content == "こんにちは"
+    
+    def test_store_many_translates_concurrently(self, storage_dir):
+        """store_many writes all prompts at once and translates them in parallel."""
+        import threading
+        
+        lock = threading.Lock()
+        active = []
+        peak = []
+        
+        def translate(self, prompt):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+            return "訳"
+        
+        prompts = [{"name": f"p{i}", "content": f"Prompt {i}"} for i in range(16)]
+        with patch.object(PromptStore, "_translate_text", translate):
+            started = time.monotonic()
+            results = PromptStore.store_many(prompts, language="en", storage_dir=storage_dir)
+            assert [r.name for r in results] == [p["name"] for p in prompts]
+            assert PromptStore.wait_for_translations(timeout=5, storage_dir=storage_dir)
+            elapsed = time.monotonic() - started
+        
+        assert max(peak) > 1
+        assert elapsed < 16 * 0.05
+        assert all(p.translation_status == "done" for p in PromptStore.list_prompts(storage_dir=storage_dir))
+    
+    def test_failed_translation_marked(self, storage_dir):
+        """Translation errors are recorded instead of raised."""
+        def fail(self, prompt):
+            raise RuntimeError("LLM unavailable")
+        
+        with patch.object(PromptStore, "_translate_text", fail):
+            PromptStore.store("greet", "Hello", language="en", storage_dir=storage_dir)
+            assert PromptStore.wait_for_translations(timeout=5, storage_dir=storage_dir)
+        
+        stored = PromptStore.get_prompt("greet", storage_dir=storage_dir)
+        assert stored.translation_status == "failed"
+        assert stored.content == {"en": "Hello"}
+    
+    def test_stale_translation_not_written(self, storage_dir):
+        """A translation of outdated content does not overwrite a newer store."""
+        instance = PromptStore._get_instance(storage_dir)
+        PromptStore.store("greet", "Hello", language="en", auto_translate=False, storage_dir=storage_dir)
+        PromptStore.store("greet", "Hi", language="en", auto_translate=False, storage_dir=storage_dir)
+        
+        instance._write_translations([("greet", None, "en", "Hello")], ["こんにちは"])
+        
+        stored = PromptStore.get_prompt("greet", storage_dir=storage_dir)
+        assert stored.content == {"en": "Hi"}
+        assert stored.translation_status is None
+    
+    def test_legacy_database_migrated(self, storage_dir):
+        """Databases without translation_status gain the column."""
+        import sqlite3
+        
+        with sqlite3.connect(storage_dir / "prompts.db") as conn:
+            conn.execute("""
+                CREATE TABLE prompts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, tag TEXT,
+                    content_en TEXT, content_ja TEXT, created_at TEXT NOT NULL, updated_at TEXT NOT NULL,
+                    UNIQUE(name, tag)
+                )
+            """)
+            conn.execute(
+                "INSERT INTO prompts (name, tag, content_en, content_ja, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                ("old", None, "Old prompt", None, "2024-01-01T00:00:00", "2024-01-01T00:00:00")
+            )
+        
+        stored = PromptStore.get_prompt("old", storage_dir=storage_dir)
+        assert stored.get_content("en") == "Old prompt"
+        assert stored.translation_status is None
+
+
+class TestPromptStoreVersions:
+    """Test versioned history and bulk import/export."""
+    
+    @pytest.fixture
+    def storage_dir(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            PromptStore._instance = None
+            PromptStore._storage_dir = None
+            yield Path(temp_dir)
+            if PromptStore._instance is not None:
+                PromptStore._instance.close()
+            PromptStore._instance = None
+            PromptStore._storage_dir = None
+    
+    def test_store_creates_versions(self, storage_dir):
+        """Each store adds an immutable version and moves the current pointer."""
+        first = PromptStore.store("greet", "Hello", language="en", auto_translate=False, storage_dir=storage_dir)
+        second = PromptStore.store("greet", "Hi", language="en", auto_translate=False, storage_dir=storage_dir)
+        
+        assert (first.version, second.version) == (1, 2)
+        assert PromptStore.get("greet", language="en", storage_dir=storage_dir).content == "Hi"
+        
+        old = PromptStore.get("greet", language="en", version=1, storage_dir=storage_dir)
+        assert old.content == "Hello"
+        assert old.get_metadata()["prompt_version"] == "1"
+        
+        versions = PromptStore.list_versions("greet", storage_dir=storage_dir)
+        assert [(v.version, v.get_content("en")) for v in versions] == [(1, "Hello"), (2, "Hi")]
+        assert PromptStore.get_prompt("greet", version=3, storage_dir=storage_dir) is None
+    
+    def test_translation_creates_version(self, storage_dir):
+        """A completed translation becomes the next version."""
+        with patch.object(PromptStore, "_translate_text", lambda self, prompt: "こんにちは"):
+            PromptStore.store("greet", "Hello", language="en", storage_dir=storage_dir)
+            assert PromptStore.wait_for_translations(timeout=5, storage_dir=storage_dir)
+        
+        versions = PromptStore.list_versions("greet", storage_dir=storage_dir)
+        assert [v.content for v in versions] == [{"en": "Hello"}, {"en": "Hello", "ja": "こんにちは"}]
+        assert PromptStore.get("greet", language="ja", storage_dir=storage_dir).version == 2
+    
+    def test_store_many_merges_duplicate_keys(self, storage_dir):
+        """Repeated keys in one batch become consecutive versions."""
+        results = PromptStore.store_many([
+            {"name": "greet", "content": "Hello", "language": "en"},
+            {"name": "greet", "content": "こんにちは", "language": "ja"},
+            {"name": "bye", "content": "Bye", "tag": "v1"},
+        ], language="en", auto_translate=False, storage_dir=storage_dir)
+        
+        assert [r.version for r in results] == [1, 2, 1]
+        stored = PromptStore.get_prompt("greet", storage_dir=storage_dir)
+        assert stored.content == {"en": "Hello", "ja": "こんにちは"}
+        assert stored.version == 2
+    
+    def test_export_and_import_round_trip(self, storage_dir):
+        """export_all output can be loaded back with store_many."""
+        PromptStore.store_many(
+            [{"name": f"p{i:04d}", "content": f"Prompt {i}", "tag": "bulk"} for i in range(2000)],
+            language="en", auto_translate=False, storage_dir=storage_dir
+        )
+        PromptStore.store("p0000", "Changed", tag="bulk", language="en", auto_translate=False, storage_dir=storage_dir)
+        
+        exported = PromptStore.export_all(storage_dir=storage_dir)
+        assert not isinstance(exported, list)
+        exported = [prompt.to_dict() for prompt in exported]
+        history = list(PromptStore.export_all(include_history=True, storage_dir=storage_dir))
+        assert len(exported) == 2000
+        assert len(history) == 2001
+        
+        with tempfile.TemporaryDirectory() as other_dir:
+            PromptStore.store_many(exported, auto_translate=False, storage_dir=Path(other_dir))
+            imported = PromptStore.get_prompt("p0000", tag="bulk", storage_dir=Path(other_dir))
+            assert imported.content == {"en": "Changed"}
+            assert len(PromptStore.list_prompts(storage_dir=Path(other_dir))) == 2000
+            PromptStore._instance.close()
+    
+    def test_delete_removes_history(self, storage_dir):
+        """Deleting a prompt also deletes its versions."""
+        PromptStore.store("greet", "Hello", language="en", auto_translate=False, storage_dir=storage_dir)
+        PromptStore.store("greet", "Hi", language="en", auto_translate=False, storage_dir=storage_dir)
+        PromptStore.delete("greet", storage_dir=storage_dir)
+        
+        assert list(PromptStore.export_all(include_history=True, storage_dir=storage_dir)) == []
+    
+    def test_unversioned_database_migrated(self, storage_dir):
+        """Prompts stored before versioning become version 1 and indexes are created."""
+        import sqlite3
+        
+        with sqlite3.connect(storage_dir / "prompts.db") as conn:
+            conn.execute("""
+                CREATE TABLE prompts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, tag TEXT,
+                    content_en TEXT, content_ja TEXT, created_at TEXT NOT NULL, updated_at TEXT NOT NULL,
+                    UNIQUE(name, tag)
+                )
+            """)
+            conn.execute(
+                "INSERT INTO prompts (name, tag, content_en, content_ja, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                ("old", "v1", "Old prompt", None, "2024-01-01T00:00:00", "2024-01-01T00:00:00")
+            )
+        
+        assert PromptStore.get_prompt("old", tag="v1", storage_dir=storage_dir).version == 1
+        updated = PromptStore.store("old", "New prompt", tag="v1", language="en", auto_translate=False, storage_dir=storage_dir)
+        assert updated.version == 2
+        
+        conn = PromptStore._get_instance(storage_dir)._connection()
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(prompts)")}
+        assert "idx_prompts_tag" in indexes
+
+
 class TestStoredPromptMethods:
     """Test StoredPrompt methods."""
     
@@ -4,6 +4,9 @@ Tests for RouterAgent functionality.
 RouterAgent機能のテスト。
 """
 
+import asyncio
+import time
+
 import pytest
 from unittest.mock import Mock, patch
 from typing import Any, Dict
@@ -13,6 +16,7 @@ from refinire.agents.router import (
     RouterConfig,
     LLMClassifier,
     RuleBasedClassifier,
+    EmbeddingClassifier,
     RouteClassifier,
     create_intent_router,
     create_content_type_router
@@ -61,16 +65,16 @@ class TestLLMClassifier:
     
     def test_classify_exact_match(self, classifier, mock_pipeline):
         """Test classification with exact route match."""
-        mock_pipeline.run.return_value = "route2"
+        mock_pipeline.run_async.return_value = "route2"
         context = Context()
         
         result = classifier.classify("test input", context)
         
         assert result == "route2"
-        mock_pipeline.run.assert_called_once()
+        mock_pipeline.run_async.assert_called_once()
         
         # Check that the prompt contains expected elements
-        call_args = mock_pipeline.run.call_args[0]
+        call_args = mock_pipeline.run_async.call_args[0]
         prompt = call_args[0]
         assert "Classify the input" in prompt
         assert "route1, route2, route3" in prompt
@@ -79,7 +83,7 @@ class TestLLMClassifier:
     
     def test_classify_case_insensitive_match(self, classifier, mock_pipeline):
         """Test classification with case insensitive matching."""
-        mock_pipeline.run.return_value = "ROUTE2"
+        mock_pipeline.run_async.return_value = "ROUTE2"
         context = Context()
         
         result = classifier.classify("test input", context)
@@ -88,7 +92,7 @@ class TestLLMClassifier:
     
     def test_classify_partial_match(self, classifier, mock_pipeline):
         """Test classification with partial matching."""
-        mock_pipeline.run.return_value = "I think it's route2 based on analysis"
+        mock_pipeline.run_async.return_value = "I think it's route2 based on analysis"
         context = Context()
         
         result = classifier.classify("test input", context)
@@ -97,7 +101,7 @@ class TestLLMClassifier:
     
     def test_classify_no_match_fallback(self, classifier, mock_pipeline):
         """Test classification fallback when no match found."""
-        mock_pipeline.run.return_value = "unknown_route"
+        mock_pipeline.run_async.return_value = "unknown_route"
         context = Context()
         
         result = classifier.classify("test input", context)
@@ -106,7 +110,7 @@ class TestLLMClassifier:
     
     def test_classify_error_fallback(self, classifier, mock_pipeline):
         """Test classification fallback when error occurs."""
-        mock_pipeline.run.side_effect = Exception("LLM error")
+        mock_pipeline.run_async.side_effect = Exception("LLM error")
         context = Context()
         
         result = classifier.classify("test input", context)
@@ -121,7 +125,7 @@ class TestLLMClassifier:
             routes=["route1", "route2"]
         )
         
-        mock_pipeline.run.return_value = "route1"
+        mock_pipeline.run_async.return_value = "route1"
         context = Context()
         
         result = classifier.classify("test input", context)
@@ -129,7 +133,7 @@ class TestLLMClassifier:
         assert result == "route1"
         
         # Check that prompt doesn't contain examples section
-        call_args = mock_pipeline.run.call_args[0]
+        call_args = mock_pipeline.run_async.call_args[0]
         prompt = call_args[0]
         assert "Examples:\n" not in prompt
 
@@ -329,7 +333,7 @@ class TestRouterAgent:
     
     def test_invalid_classifier_type_fails(self):
         """Test router fails with invalid classifier type."""
-        with pytest.raises(ValueError, match="Input should be 'llm' or 'rule'"):
+        with pytest.raises(ValueError, match="Input should be 'llm', 'rule' or 'embedding'"):
             RouterConfig(
                 name="test_router",
                 routes={"route1": "step1"},
@@ -339,7 +343,7 @@ class TestRouterAgent:
     @pytest.mark.asyncio
     async def test_router_run_successful_classification(self, llm_config, mock_pipeline):
         """Test successful routing execution."""
-        mock_pipeline.run.return_value = "route2"
+        mock_pipeline.run_async.return_value = "route2"
         router = RouterAgent(llm_config, mock_pipeline)
         context = Context()
         
@@ -353,7 +357,7 @@ class TestRouterAgent:
     @pytest.mark.asyncio
     async def test_router_run_with_invalid_route(self, llm_config, mock_pipeline):
         """Test routing with invalid route falls back to default."""
-        mock_pipeline.run.return_value = "invalid_route"
+        mock_pipeline.run_async.return_value = "invalid_route"
         router = RouterAgent(llm_config, mock_pipeline)
         context = Context()
         
@@ -365,7 +369,7 @@ class TestRouterAgent:
     @pytest.mark.asyncio
     async def test_router_run_classification_error(self, llm_config, mock_pipeline):
         """Test routing handles classification errors gracefully."""
-        mock_pipeline.run.side_effect = Exception("Classification error")
+        mock_pipeline.run_async.side_effect = Exception("Classification error")
         router = RouterAgent(llm_config, mock_pipeline)
         context = Context()
         
@@ -380,7 +384,7 @@ class TestRouterAgent:
     async def test_router_run_without_storing_results(self, llm_config, mock_pipeline):
         """Test routing without storing classification results."""
         llm_config.store_classification_result = False
-        mock_pipeline.run.return_value = "route2"
+        mock_pipeline.run_async.return_value = "route2"
         router = RouterAgent(llm_config, mock_pipeline)
         context = Context()
         
@@ -401,7 +405,7 @@ class TestRouterAgent:
             default_route="route2"
         )
         
-        mock_pipeline.run.return_value = "invalid_route"
+        mock_pipeline.run_async.return_value = "invalid_route"
         router = RouterAgent(config, mock_pipeline)
         context = Context()
         
@@ -471,3 +475,170 @@ class TestUtilityFunctions:
         
         assert router.name == "custom_content_router"
         assert router.config.routes == custom_types
+
+
+class TestEmbeddingClassifier:
+    """Test embedding/centroid classification functionality."""
+    
+    @pytest.fixture
+    def examples(self):
+        """Create route examples."""
+        return {
+            "question": ["How does this work?", "What is the difference between X and Y?", "Can you explain this feature?"],
+            "request": ["Please update my account", "I need to change my password", "Can you help me set this up?"],
+            "complaint": ["This is not working properly", "I'm having issues with the service", "This is frustrating and needs to be fixed"]
+        }
+    
+    def test_nearest_centroid_classification(self, examples):
+        """Test inputs are routed to the most similar examples without fallback."""
+        fallback = Mock(spec=RouteClassifier)
+        classifier = EmbeddingClassifier(examples, fallback=fallback)
+        
+        assert classifier.classify("How does the export feature work?", Context()) == "question"
+        assert classifier.classify("Please change my email address", Context()) == "request"
+        assert classifier.classify("The app is not working and I'm frustrated", Context()) == "complaint"
+        fallback.classify.assert_not_called()
+        assert classifier.get_metrics() == {"fast_path": 3, "fallbacks": 0}
+    
+    def test_low_confidence_uses_fallback(self, examples):
+        """Test inputs below the threshold are delegated to the fallback."""
+        fallback = Mock(spec=RouteClassifier)
+        fallback.classify.return_value = "request"
+        classifier = EmbeddingClassifier(examples, fallback=fallback)
+        
+        route, confidence = classifier.predict("zzz qqq")
+        assert confidence < classifier.confidence_threshold
+        assert classifier.classify("zzz qqq", Context()) == "request"
+        fallback.classify.assert_called_once()
+        assert classifier.get_metrics()["fallbacks"] == 1
+    
+    def test_low_confidence_without_fallback_returns_none(self, examples):
+        """Test None is returned below the threshold when no fallback exists."""
+        classifier = EmbeddingClassifier(examples, confidence_threshold=0.99)
+        assert classifier.classify("How does this work?", Context()) is None
+    
+    def test_custom_embedding_function(self):
+        """Test a pluggable embedding function replaces hashed TF-IDF."""
+        def embed(texts):
+            return [[1.0, 0.0] if "cat" in text else [0.0, 1.0] for text in texts]
+        
+        classifier = EmbeddingClassifier({"animal": ["cat food"], "other": ["tax form"]}, embedding_function=embed)
+        assert classifier.predict("a cat") == ("animal", pytest.approx(1.0))
+        assert classifier.predict("a car")[0] == "other"
+    
+    def test_requires_examples(self):
+        """Test training without examples fails."""
+        with pytest.raises(ValueError, match="at least one classification example"):
+            EmbeddingClassifier({"route1": []})
+    
+    def test_embedding_router(self, examples):
+        """Test RouterAgent wiring of the embedding classifier."""
+        pipeline = Mock(spec=RefinireAgent)
+        pipeline.run_async.return_value = "complaint"
+        config = RouterConfig(
+            name="embedding_router",
+            routes={"question": "qa_step", "request": "service_step", "complaint": "support_step"},
+            classifier_type="embedding",
+            classification_examples=examples
+        )
+        router = RouterAgent(config, pipeline)
+        
+        assert isinstance(router.classifier, EmbeddingClassifier)
+        assert isinstance(router.classifier.fallback, LLMClassifier)
+        assert router.route("Can you explain how this works?") == "qa_step"
+        pipeline.run_async.assert_not_called()
+        assert router.route("zzz qqq") == "support_step"
+        pipeline.run_async.assert_called_once()
+    
+    def test_embedding_router_without_llm_fallback(self, examples):
+        """Test the LLM fallback can be disabled."""
+        config = RouterConfig(
+            name="embedding_router",
+            routes={"question": "qa_step", "request": "service_step", "complaint": "support_step"},
+            classifier_type="embedding",
+            classification_examples=examples,
+            llm_fallback=False,
+            default_route="request"
+        )
+        with patch('refinire.agents.router.create_simple_agent') as mock_create:
+            router = RouterAgent(config)
+            mock_create.assert_not_called()
+        
+        assert router.classifier.fallback is None
+        assert router.route("zzz qqq") == "service_step"
+    
+    def test_embedding_router_without_examples_fails(self):
+        """Test embedding router fails without examples."""
+        config = RouterConfig(
+            name="test_router",
+            routes={"route1": "step1"},
+            classifier_type="embedding"
+        )
+        
+        with pytest.raises(ValueError, match="classification_examples must be provided"):
+            RouterAgent(config)
+
+
+class TestAsyncClassification:
+    """Test the async classification path."""
+    
+    @staticmethod
+    def _slow_pipeline(answer, delay=0.2):
+        """Create a pipeline whose run_async waits like an LLM call."""
+        async def run_async(prompt, ctx):
+            await asyncio.sleep(delay)
+            return answer
+        
+        pipeline = Mock(spec=RefinireAgent)
+        pipeline.run_async.side_effect = run_async
+        return pipeline
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_routers_do_not_block_loop(self):
+        """Test concurrent routers overlap their LLM calls."""
+        config = RouterConfig(
+            name="async_router",
+            routes={"route1": "step1", "route2": "step2"},
+            classifier_type="llm"
+        )
+        router = RouterAgent(config, self._slow_pipeline("route2"))
+        
+        started = time.perf_counter()
+        contexts = await asyncio.gather(*(router.run_async("input", Context()) for _ in range(10)))
+        elapsed = time.perf_counter() - started
+        
+        assert all(ctx.next_label == "step2" for ctx in contexts)
+        assert elapsed < 1.0  # Serialized calls would take about 2 seconds
+    
+    @pytest.mark.asyncio
+    async def test_sync_classify_inside_running_loop(self):
+        """Test the sync API works from inside an event loop."""
+        classifier = LLMClassifier(
+            pipeline=self._slow_pipeline("route1", delay=0),
+            classification_prompt="Classify the input",
+            routes=["route1", "route2"]
+        )
+        
+        assert classifier.classify("input", Context()) == "route1"
+    
+    def test_classifier_does_not_touch_router_context(self):
+        """Test the classification call runs in its own context."""
+        pipeline = self._slow_pipeline("route1", delay=0)
+        classifier = LLMClassifier(pipeline=pipeline, classification_prompt="Classify", routes=["route1"])
+        context = Context()
+        
+        classifier.classify("input", context)
+        
+        assert pipeline.run_async.call_args[0][1] is not context
+    
+    def test_result_text_from_context(self):
+        """Test generated text is read from a returned Context."""
+        ctx = Context()
+        ctx.content = "route2"
+        assert LLMClassifier._result_text(ctx) == "route2"
+        assert LLMClassifier._result_text(None) == ""
+    
+    def test_rule_classifier_default_aclassify(self):
+        """Test classifiers without I/O reuse classify for aclassify."""
+        classifier = RuleBasedClassifier({"route1": lambda x, ctx: True})
+        assert asyncio.run(classifier.aclassify("input", Context())) == "route1"
@@ -8,13 +8,16 @@ import pytest
 import asyncio
 import sys
 import os
+from unittest.mock import AsyncMock, Mock, patch
+
+from pydantic import ValidationError
 
 # Add the src directory to the path for local development
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from refinire.agents.routing_agent import RoutingAgent
 from refinire.agents.flow.context import Context
-from refinire.core.routing import RoutingResult
+from refinire.core.routing import RoutingResult, create_routing_decision_model
 
 
 @pytest.fixture
@@ -231,6 +234,71 @@ async def test_routing_agent_integration():
             assert result_context.routing.next_route == "error"
 
 
+class TestStructuredRouting:
+    """Test schema-constrained routing decisions"""
+    
+    def test_decision_model_cached_and_constrained(self):
+        """Decision models are cached per destination list and reject unknown routes"""
+        model = create_routing_decision_model(["greeting", "question"])
+        assert create_routing_decision_model(("greeting", "question")) is model
+        assert create_routing_decision_model(["greeting"]) is not model
+        
+        schema = model.model_json_schema()
+        assert schema["properties"]["next_route"]["enum"] == ["greeting", "question"]
+        assert "content" not in schema["properties"]
+        with pytest.raises(ValidationError):
+            model(next_route="unknown", confidence=0.5, reasoning="Not a destination")
+    
+    def test_sdk_agent_uses_decision_schema(self, routing_agent):
+        """The shared SDK agent is configured with the decision model"""
+        with patch("agents.Runner") as mock_runner:
+            mock_runner.run = AsyncMock(return_value=Mock())
+            asyncio.run(routing_agent._execute_llm_call("prompt"))
+        
+        assert routing_agent._sdk_agent.output_type is routing_agent.output_model
+    
+    def test_prompt_omits_content_echo(self, routing_agent, sample_context):
+        """Structured prompts do not ask the model to copy the generation"""
+        prompt = routing_agent._build_routing_prompt(sample_context, "")
+        assert "生成結果のコピー" not in prompt
+        
+        legacy = RoutingAgent(
+            name="legacy_router",
+            routing_instruction="Route it",
+            routing_destinations=["greeting"],
+            structured_output=False
+        )
+        assert legacy.output_model is None
+        assert "生成結果のコピー" in legacy._build_routing_prompt(sample_context, "")
+    
+    def test_parse_structured_decision(self, routing_agent, sample_context):
+        """Structured decisions become RoutingResults carrying the last generation"""
+        decision = routing_agent.output_model(next_route="greeting", confidence=1.4, reasoning="Hi")
+        llm_result = Mock()
+        llm_result.final_output = decision
+        
+        result = routing_agent._parse_routing_result(llm_result, sample_context)
+        
+        assert result.next_route == "greeting"
+        assert result.confidence == 1.0
+        assert result.content == sample_context.shared_state['_last_generation']
+        assert len(result.reasoning) >= 10
+    
+    def test_run_async_structured_without_retries(self, routing_agent, sample_context):
+        """A structured decision is accepted on the first attempt"""
+        llm_result = Mock()
+        llm_result.final_output = routing_agent.output_model(
+            next_route="question", confidence=0.9, reasoning="The user asks a question"
+        )
+        routing_agent._execute_llm_call = AsyncMock(return_value=llm_result)
+        
+        context = asyncio.run(routing_agent.run_async("", sample_context))
+        
+        routing_agent._execute_llm_call.assert_awaited_once()
+        assert context.routing_result.next_route == "question"
+        assert context.routing_result.reasoning == "The user asks a question"
+
+
 if __name__ == "__main__":
     # Run basic tests
     pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -0,0 +1,196 @@
+"""
+Tests for the routing decision cache
+ルーティング判断キャッシュのテスト
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from refinire.agents.flow.context import Context
+from refinire.agents.router import LLMClassifier
+from refinire.agents.routing_agent import RoutingAgent
+from refinire.core.routing_cache import RoutingCache, normalize_routing_content
+
+
+TICKET = "My order #48213 never arrived, please check the shipping status of my package today"
+
+
+class TestNormalization:
+    """Test content normalization / コンテンツ正規化のテスト"""
+
+    def test_placeholders_and_whitespace(self):
+        text = "Order 123 failed!  See https://example.com/x or mail ME@example.com"
+        assert normalize_routing_content(text) == "order <num> failed see <url> or mail <email>"
+
+    def test_trivial_differences_share_key(self):
+        assert normalize_routing_content("Ｈｅｌｌｏ,   World") == normalize_routing_content("hello world")
+
+
+class TestRoutingCache:
+    """Test exact and near-duplicate lookup / 完全一致とほぼ重複の検索のテスト"""
+
+    def test_exact_hit_after_normalization(self):
+        cache = RoutingCache()
+        assert cache.put(TICKET, "route tickets", ["shipping", "billing"], "shipping") is True
+
+        other_number = TICKET.replace("48213", "99120").upper()
+        assert cache.get(other_number, "route tickets", ["billing", "shipping"]) == "shipping"
+        assert cache.get_metrics()["hits"] == 1
+
+    def test_scope_includes_instruction_and_destinations(self):
+        cache = RoutingCache()
+        cache.put(TICKET, "route tickets", ["shipping", "billing"], "shipping")
+
+        assert cache.get(TICKET, "another instruction", ["shipping", "billing"]) is None
+        assert cache.get(TICKET, "route tickets", ["shipping", "refunds"]) is None
+
+    def test_near_duplicate_hit(self):
+        cache = RoutingCache(similarity_threshold=0.7)
+        cache.put(TICKET, "route tickets", ["shipping", "billing"], "shipping")
+
+        assert cache.get(TICKET + " thanks", "route tickets", ["shipping", "billing"]) == "shipping"
+        assert cache.get("I was charged twice on my credit card", "route tickets", ["shipping", "billing"]) is None
+        metrics = cache.get_metrics()
+        assert metrics["near_hits"] == 1
+        assert metrics["misses"] == 1
+
+    def test_near_duplicates_disabled(self):
+        cache = RoutingCache(similarity_threshold=None)
+        cache.put(TICKET, "route tickets", None, "shipping")
+        assert cache.get(TICKET + " thanks", "route tickets") is None
+
+    def test_near_duplicates_are_opt_in(self):
+        cache = RoutingCache()
+        cache.put(TICKET, "route tickets", None, "shipping")
+        assert cache.get(TICKET + " thanks", "route tickets") is None
+        assert cache.get_metrics()["near_hits"] == 0
+
+    def test_negation_is_not_a_near_duplicate(self):
+        cache = RoutingCache(similarity_threshold=0.5)
+        cache.put("I want to cancel my subscription", "route intents", ["cancel", "keep"], "cancel")
+        cache.put("サブスクリプションを解約したいので手続きをお願いします", "route intents", ["cancel", "keep"], "cancel")
+
+        assert cache.get("I do not want to cancel my subscription", "route intents", ["cancel", "keep"]) is None
+        assert cache.get("I don't want to cancel my subscription", "route intents", ["cancel", "keep"]) is None
+        assert cache.get("サブスクリプションを解約したくないので手続きをお願いします", "route intents", ["cancel", "keep"]) is None
+        assert cache.get("I want to cancel my subscription now", "route intents", ["cancel", "keep"]) == "cancel"
+
+    def test_confidence_admission(self):
+        cache = RoutingCache(min_confidence=0.8)
+        assert cache.put(TICKET, "route tickets", None, "shipping", confidence=0.5) is False
+        assert cache.get(TICKET, "route tickets") is None
+        assert cache.get_metrics()["rejected"] == 1
+
+    def test_ttl_expiry(self):
+        cache = RoutingCache(ttl=10)
+        with patch("refinire.core.routing_cache.time.monotonic", return_value=100.0):
+            cache.put(TICKET, "route tickets", None, "shipping")
+        with patch("refinire.core.routing_cache.time.monotonic", return_value=105.0):
+            assert cache.get(TICKET, "route tickets") == "shipping"
+        with patch("refinire.core.routing_cache.time.monotonic", return_value=111.0):
+            assert cache.get(TICKET, "route tickets") is None
+        assert cache.get_metrics()["expirations"] == 1
+        assert len(cache) == 0
+
+    def test_lru_eviction_cleans_buckets(self):
+        cache = RoutingCache(max_entries=2)
+        for index, text in enumerate(["alpha beta gamma", "delta epsilon zeta", "eta theta iota"]):
+            cache.put(text, "route", None, f"route{index}")
+
+        assert len(cache) == 2
+        assert cache.get("alpha beta gamma", "route") is None
+        assert cache.get_metrics()["evictions"] == 1
+        assert all(len(members) == 1 for members in cache._buckets.values())
+
+    def test_invalid_band_configuration(self):
+        with pytest.raises(ValueError, match="divisible"):
+            RoutingCache(num_perm=30, bands=8)
+
+
+class TestCachedRouting:
+    """Test cache integration in routers / ルーターへのキャッシュ統合のテスト"""
+
+    def test_llm_classifier_uses_cache(self):
+        pipeline = Mock()
+        pipeline.run_async = AsyncMock(return_value="shipping")
+        classifier = LLMClassifier(
+            pipeline=pipeline,
+            classification_prompt="Route support tickets",
+            routes=["shipping", "billing"],
+            cache=RoutingCache()
+        )
+
+        assert classifier.classify(TICKET, Context()) == "shipping"
+        assert classifier.classify(TICKET.replace("48213", "777"), Context()) == "shipping"
+        pipeline.run_async.assert_awaited_once()
+
+    def test_llm_classifier_does_not_cache_partial_matches(self):
+        pipeline = Mock()
+        pipeline.run_async = AsyncMock(return_value="probably shipping")
+        classifier = LLMClassifier(
+            pipeline=pipeline,
+            classification_prompt="Route support tickets",
+            routes=["shipping", "billing"],
+            cache=RoutingCache()
+        )
+
+        classifier.classify(TICKET, Context())
+        classifier.classify(TICKET, Context())
+        assert pipeline.run_async.await_count == 2
+
+    def test_routing_agent_uses_cache(self):
+        agent = RoutingAgent(
+            name="ticket_router",
+            routing_instruction="Route support tickets",
+            routing_destinations=["shipping", "billing"],
+            cache=RoutingCache()
+        )
+        llm_result = Mock()
+        llm_result.final_output = json.dumps(
+            {"content": "x", "next_route": "shipping", "confidence": 0.95, "reasoning": "order issue"}
+        )
+        agent._execute_llm_call = AsyncMock(return_value=llm_result)
+
+        first = Context()
+        first.shared_state["_last_generation"] = TICKET
+        asyncio.run(agent.run_async("", first))
+
+        second = Context()
+        second.shared_state["_last_generation"] = TICKET.replace("48213", "10001")
+        asyncio.run(agent.run_async("", second))
+
+        agent._execute_llm_call.assert_awaited_once()
+        assert second.routing_result.next_route == "shipping"
+        assert second.routing_result.content == second.shared_state["_last_generation"]
+        assert second.result.metadata["cache_hit"] is True
+        assert first.result.metadata["cache_hit"] is False
+
+    def test_routing_agent_cache_keyed_by_last_prompt(self):
+        agent = RoutingAgent(
+            name="ticket_router",
+            routing_instruction="Route support tickets",
+            routing_destinations=["shipping", "billing"],
+            cache=RoutingCache()
+        )
+        llm_result = Mock()
+        llm_result.final_output = json.dumps(
+            {"content": "x", "next_route": "shipping", "confidence": 0.95, "reasoning": "order issue"}
+        )
+        agent._execute_llm_call = AsyncMock(return_value=llm_result)
+
+        for last_prompt in ("Summarize the ticket", "Translate the ticket", "Summarize the ticket"):
+            context = Context()
+            context.shared_state["_last_prompt"] = last_prompt
+            context.shared_state["_last_generation"] = TICKET
+            asyncio.run(agent.run_async("", context))
+        assert agent._execute_llm_call.await_count == 2
+
+        # Without a generation the cache is neither read nor written
+        # 生成結果がない場合はキャッシュを読み書きしない
+        for _ in range(2):
+            asyncio.run(agent.run_async("", Context()))
+        assert agent._execute_llm_call.await_count == 4
+        assert len(agent.cache) == 2
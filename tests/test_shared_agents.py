@@ -0,0 +1,106 @@
+"""
+Tests for shared helper models and SDK agents
+共有補助モデルとSDKエージェントのテスト
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from refinire.agents.evaluation_agent import EvaluationAgent
+from refinire.agents.flow.context import Context
+from refinire.agents.routing_agent import RoutingAgent
+from refinire.agents.shared_agents import (
+    SharedAgentRegistry,
+    get_shared_agent_registry,
+    set_shared_agent_registry,
+)
+
+
+@pytest.fixture
+def registry():
+    """Install a fresh global registry for the test"""
+    original = get_shared_agent_registry()
+    replacement = SharedAgentRegistry()
+    set_shared_agent_registry(replacement)
+    yield replacement
+    set_shared_agent_registry(original)
+
+
+class TestSharedAgentRegistry:
+    """Test model and agent sharing / モデルとエージェントの共有のテスト"""
+
+    def test_models_shared_by_configuration(self, registry):
+        first = registry.get_model("gpt-4o-mini", 0.1)
+        assert registry.get_model("gpt-4o-mini", 0.1) is first
+        assert registry.get_model("gpt-4o-mini", 0.2) is not first
+        assert registry.get_model("gpt-4o-mini", 0.1, namespace="other") is not first
+        assert registry.get_metrics()["models_created"] == 3
+
+    def test_agents_keyed_by_instructions(self, registry):
+        first = registry.get_agent("helper", "Judge it", "gpt-4o-mini", 0.1)
+        assert registry.get_agent("helper", "Judge it", "gpt-4o-mini", 0.1) is first
+        other = registry.get_agent("helper", "Route it", "gpt-4o-mini", 0.1)
+        assert other is not first
+        # Agents with different instructions still share the model
+        # 指示が異なるエージェントもモデルは共有する
+        assert other.model is first.model
+        metrics = registry.get_metrics()
+        assert metrics["agents_created"] == 2
+        assert metrics["models_created"] == 1
+
+    def test_unhashable_options_are_not_cached(self, registry):
+        with patch("refinire.agents.shared_agents.get_llm") as mock_get_llm:
+            mock_get_llm.side_effect = lambda **kwargs: Mock()
+            first = registry.get_model("gpt-4o-mini", 0.1, extra_headers={"x": "1"})
+            second = registry.get_model("gpt-4o-mini", 0.1, extra_headers={"x": "1"})
+        assert first is not second
+        assert registry.get_metrics()["models"] == 0
+
+    def test_clear(self, registry):
+        first = registry.get_model("gpt-4o-mini", 0.1)
+        registry.clear()
+        assert registry.get_model("gpt-4o-mini", 0.1) is not first
+
+
+class TestHelperAgentReuse:
+    """Test routing/evaluation helpers reuse shared objects / ルーティング・評価補助の再利用テスト"""
+
+    def test_routing_agents_share_model(self, registry):
+        first = RoutingAgent(name="a_router", routing_instruction="Route it", model="gpt-4o-mini")
+        second = RoutingAgent(name="b_router", routing_instruction="Route it", model="gpt-4o-mini")
+        assert first.llm is second.llm
+
+    @patch("agents.Runner")
+    def test_routing_agent_builds_sdk_agent_once(self, mock_runner, registry):
+        llm_result = Mock()
+        llm_result.final_output = json.dumps(
+            {"content": "x", "next_route": "continue", "confidence": 0.9, "reasoning": "ok"}
+        )
+        mock_runner.run = AsyncMock(return_value=llm_result)
+
+        first = RoutingAgent(name="a_router", routing_instruction="Route it", model="gpt-4o-mini")
+        second = RoutingAgent(name="b_router", routing_instruction="Route it", model="gpt-4o-mini")
+        for agent in (first, first, second):
+            asyncio.run(agent.run_async("", Context()))
+
+        sdk_agents = {id(call.args[0]) for call in mock_runner.run.call_args_list}
+        assert len(sdk_agents) == 1
+        assert registry.get_metrics()["agents_created"] == 1
+
+    @patch("agents.Runner")
+    def test_evaluation_agent_uses_shared_sdk_agent(self, mock_runner, registry):
+        llm_result = Mock()
+        llm_result.final_output = json.dumps({"score": 0.9, "feedback": "good"})
+        mock_runner.run = AsyncMock(return_value=llm_result)
+
+        agent = EvaluationAgent(name="judge", evaluation_instruction="Judge it", model="gpt-4o-mini")
+        context = Context()
+        context.shared_state["_last_generation"] = "answer"
+        asyncio.run(agent.run_async("", context))
+
+        assert context.evaluation_result.score == pytest.approx(0.9)
+        assert mock_runner.run.call_args.args[0] is agent._sdk_agent
+        assert registry.get_metrics()["agents_created"] == 1
@@ -6,6 +6,7 @@ SourceCodeProviderのテスト
 import pytest
 import tempfile
 import os
+import time
 from pathlib import Path
 from refinire.agents.providers.source_code import SourceCodeProvider
 
@@ -63,6 +64,35 @@ class TestSourceCodeProvider:
         # Test that non-ignored files are not ignored
         assert not provider._is_ignored(Path("tests/sample_project/src/refinire/agents/context_provider.py"))
     
+    def test_nested_gitignore_and_negation(self, tmp_path):
+        """Test that nested .gitignore files and negations are honored"""
+        (tmp_path / ".gitignore").write_text("*.gen.py\n!keep.gen.py\n")
+        (tmp_path / "pkg" / "vendor").mkdir(parents=True)
+        (tmp_path / "pkg" / ".gitignore").write_text("vendor/\nlocal_*.py\n")
+        for name in ("a.gen.py", "keep.gen.py", "main.py", "pkg/local_conf.py", "pkg/mod.py", "pkg/vendor/lib.py"):
+            (tmp_path / name).write_text("X = 1\n")
+        provider = SourceCodeProvider(base_path=str(tmp_path))
+        
+        tree = sorted(provider._scan_file_tree())
+        
+        assert tree == ["keep.gen.py", "main.py", "pkg/mod.py"]
+        assert provider._is_ignored(tmp_path / "pkg" / "vendor" / "lib.py")
+        assert not provider._is_ignored(tmp_path / "main.py")
+    
+    def test_rescan_after_gitignore_change(self, tmp_path):
+        """Test that editing a nested .gitignore invalidates cached listings"""
+        (tmp_path / "pkg").mkdir()
+        (tmp_path / "pkg" / ".gitignore").write_text("")
+        (tmp_path / "pkg" / "mod.py").write_text("X = 1\n")
+        provider = SourceCodeProvider(base_path=str(tmp_path))
+        assert provider._scan_file_tree() == ["pkg/mod.py"]
+        
+        gitignore = tmp_path / "pkg" / ".gitignore"
+        gitignore.write_text("mod.py\n")
+        os.utime(gitignore, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        
+        assert provider._scan_file_tree() == []
+    
     def test_file_tree_scanning(self):
         """Test file tree scanning functionality"""
         provider = SourceCodeProvider(base_path="tests/sample_project")
@@ -291,6 +321,128 @@ class TestSourceCodeProvider:
         assert provider.include_patterns == ['src/**']
         assert provider.exclude_patterns == ['**/test_*']
     
+    def test_get_context_with_natural_language_query(self):
+        """Test that the code index finds files not mentioned by name"""
+        provider = SourceCodeProvider(base_path="tests/sample_project", use_index=True, index_top_k=2)
+        
+        context = provider.get_context("How is conversation history stored?")
+        
+        assert "# File: src/refinire/agents/providers/conversation_history.py" in context
+    
+    def test_get_context_without_index(self):
+        """Test that disabling the index keeps filename-only matching"""
+        provider = SourceCodeProvider(base_path="tests/sample_project", use_index=False)
+        
+        assert provider.get_context("How is conversation history stored?") == ""
+    
+    def test_get_context_with_chunk_index(self):
+        """Test that chunk-level indexing returns line ranges"""
+        provider = SourceCodeProvider(base_path="tests/sample_project", use_index=True, index_top_k=1, index_chunk_lines=20)
+        
+        context = provider.get_context("conversation history")
+        
+        assert "# File: src/refinire/agents/providers/conversation_history.py (lines" in context
+    
+    def test_incremental_rescan_lists_only_changed_directories(self, tmp_path):
+        """Test that a rescan only re-lists directories whose mtime changed"""
+        (tmp_path / "pkg_a").mkdir()
+        (tmp_path / "pkg_b").mkdir()
+        (tmp_path / "pkg_a" / "a.py").write_text("A = 1\n")
+        (tmp_path / "pkg_b" / "b.py").write_text("B = 1\n")
+        provider = SourceCodeProvider(base_path=str(tmp_path))
+        
+        first_tree = provider._scan_file_tree()
+        provider._file_tree = first_tree
+        assert provider.get_scan_metrics()["directories_listed"] == 3
+        
+        # Unchanged tree keeps the same list object
+        assert provider._scan_file_tree() is first_tree
+        assert provider.get_scan_metrics()["directories_listed"] == 0
+        
+        (tmp_path / "pkg_b" / "c.py").write_text("C = 1\n")
+        os.utime(tmp_path / "pkg_b", ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        tree = provider._scan_file_tree()
+        
+        metrics = provider.get_scan_metrics()
+        assert metrics["directories_listed"] == 1
+        assert metrics["directories_visited"] == 3
+        assert metrics["scan_count"] == 3
+        assert sorted(tree) == ["pkg_a/a.py", "pkg_b/b.py", "pkg_b/c.py"]
+    
+    def test_rescan_picks_up_in_place_edits(self, tmp_path):
+        """Test that files edited in place are re-indexed and re-checked against max_file_size"""
+        (tmp_path / "pkg").mkdir()
+        target = tmp_path / "pkg" / "store.py"
+        target.write_text("def load():\n    return 1\n")
+        (tmp_path / "pkg" / "other.py").write_text("VALUE = 1\n")
+        provider = SourceCodeProvider(base_path=str(tmp_path), max_file_size=200, use_index=True, index_top_k=1)
+        dir_mtime = (tmp_path / "pkg").stat().st_mtime_ns
+        
+        assert "pkg/store.py" not in provider.get_context("persist conversation history")
+        
+        target.write_text("def persist_conversation_history():\n    return 2\n")
+        os.utime(target, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        assert (tmp_path / "pkg").stat().st_mtime_ns == dir_mtime
+        
+        provider.refresh_file_tree()
+        assert "# File: pkg/store.py" in provider.get_context("persist conversation history")
+        assert provider.get_scan_metrics()["directories_listed"] == 0
+        
+        target.write_text("x" * 300)
+        os.utime(target, ns=(time.time_ns() + 2 * 10**9, time.time_ns() + 2 * 10**9))
+        assert "pkg/store.py" not in provider._scan_file_tree(restat=True)
+        
+        target.write_text("y = 1\n")
+        os.utime(target, ns=(time.time_ns() + 3 * 10**9, time.time_ns() + 3 * 10**9))
+        assert "pkg/store.py" in provider._scan_file_tree()
+    
+    def test_rescan_restats_only_read_or_ranked_files(self, tmp_path):
+        """Test that a per-turn rescan keeps cached signatures and ranked hits are re-stat-ed"""
+        (tmp_path / "pkg").mkdir()
+        target = tmp_path / "pkg" / "store.py"
+        target.write_text("def persist_conversation_history():\n    return 1\n")
+        (tmp_path / "pkg" / "other.py").write_text("VALUE = 1\n")
+        provider = SourceCodeProvider(base_path=str(tmp_path), use_index=True, index_top_k=1)
+        
+        assert "# File: pkg/store.py" in provider.get_context("persist conversation history")
+        cached_signature = provider._file_signatures["pkg/store.py"]
+        
+        target.write_text("def load():\n    return 2\n")
+        os.utime(target, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        provider.update({})
+        assert provider._file_signatures["pkg/store.py"] == cached_signature
+        
+        assert "pkg/store.py" not in provider.get_context("persist conversation history")
+        assert "return 2" in provider.get_context("load")
+    
+    def test_content_cache_hits_and_invalidation(self, tmp_path):
+        """Test that file contents are cached by (path, mtime, size)"""
+        target = tmp_path / "module.py"
+        target.write_text("VALUE = 1\n")
+        provider = SourceCodeProvider(base_path=str(tmp_path))
+        
+        assert "VALUE = 1" in provider._read_file_content("module.py")
+        assert "VALUE = 1" in provider._read_file_content("module.py")
+        assert provider.get_scan_metrics()["content_cache_hits"] == 1
+        
+        target.write_text("VALUE = 22\n")
+        assert "VALUE = 22" in provider._read_file_content("module.py")
+        assert provider.get_scan_metrics()["content_cache_misses"] == 2
+    
+    def test_content_cache_respects_memory_budget(self, tmp_path):
+        """Test that least recently used contents are evicted over budget"""
+        for name in ("a.py", "b.py", "c.py"):
+            (tmp_path / name).write_text("x" * 100)
+        provider = SourceCodeProvider(base_path=str(tmp_path), content_cache_bytes=250)
+        
+        for name in ("a.py", "b.py", "c.py"):
+            provider._read_file_content(name)
+        
+        metrics = provider.get_scan_metrics()
+        assert metrics["content_cache_entries"] == 2
+        assert metrics["content_cache_bytes"] <= 250
+        assert "a.py" not in provider._content_cache
+    
     def test_llm_stub_method(self):
         """Test that LLM-based file selection stub returns empty list"""
         provider = SourceCodeProvider(base_path="tests/sample_project")
@@ -0,0 +1,104 @@
+"""
+Tests for tokenizer utilities
+トークナイザーユーティリティのテスト
+"""
+
+import pytest
+
+from refinire.core.tokenizer import (
+    HeuristicTokenizer,
+    TokenBudget,
+    Tokenizer,
+    WhitespaceTokenizer,
+    get_tokenizer,
+)
+
+
+class CountingTokenizer(WhitespaceTokenizer):
+    """Whitespace tokenizer recording uncached calls / キャッシュなし呼び出しを記録"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def _count(self, text):
+        self.calls += 1
+        return super()._count(text)
+
+
+class TestTokenizer:
+    """Test tokenizer implementations / トークナイザー実装のテスト"""
+
+    def test_heuristic_counts(self):
+        """Test heuristic token counts / ヒューリスティックなトークン数のテスト"""
+        tokenizer = HeuristicTokenizer()
+        assert tokenizer.count("") == 0
+        assert tokenizer.count("hello world") == 2
+        assert tokenizer.count("internationalization") == 4
+        assert tokenizer.count("1234567") == 3
+        assert tokenizer.count("a, b!") == 4
+        assert tokenizer.count("こんにちは") == 5
+
+    def test_count_cache(self):
+        """Test repeated counts are served from the cache / 繰り返しの計数はキャッシュから返る"""
+        tokenizer = CountingTokenizer()
+        assert tokenizer.count("one two three") == 3
+        assert tokenizer.count("one two three") == 3
+        assert tokenizer.calls == 1
+
+    def test_cache_is_bounded(self):
+        """Test the cache evicts old entries / キャッシュが古いエントリを追い出す"""
+        tokenizer = WhitespaceTokenizer(cache_size=2)
+        for text in ("a", "b c", "d e f"):
+            tokenizer.count(text)
+        assert list(tokenizer._cache) == ["b c", "d e f"]
+
+    @pytest.mark.parametrize("keep", ["start", "end"])
+    def test_truncate(self, keep):
+        """Test truncation to an exact token limit / 正確なトークン上限への切り詰め"""
+        tokenizer = HeuristicTokenizer()
+        text = " ".join(f"w{i}" for i in range(100))
+        result = tokenizer.truncate(text, 10, keep=keep)
+        assert tokenizer.count(result) <= 10
+        assert tokenizer.count(result) >= 9
+        if keep == "start":
+            assert text.startswith(result)
+        else:
+            assert text.endswith(result)
+        assert tokenizer.truncate(text, 0) == ""
+        assert tokenizer.truncate("short", 10) == "short"
+
+    def test_get_tokenizer(self):
+        """Test tokenizer resolution / トークナイザー解決のテスト"""
+        assert isinstance(get_tokenizer("heuristic"), HeuristicTokenizer)
+        assert get_tokenizer("heuristic") is get_tokenizer("heuristic")
+        custom = WhitespaceTokenizer()
+        assert get_tokenizer(custom) is custom
+        assert isinstance(get_tokenizer(), Tokenizer)
+        with pytest.raises(ValueError):
+            get_tokenizer("unknown")
+
+
+class TestTokenBudget:
+    """Test shared token budgets / 共有トークン予算のテスト"""
+
+    def test_reserve_and_fit(self):
+        """Test reserved text reduces the remaining budget / 予約で残り予算が減る"""
+        budget = TokenBudget(10, tokenizer="whitespace")
+        assert budget.reserve("one two three") == 3
+        assert budget.remaining == 7
+        assert budget.fit("a b c") == "a b c"
+        assert budget.remaining == 4
+        assert budget.fit("1 2 3 4 5 6", keep="end") == "3 4 5 6"
+        assert budget.remaining == 0
+        assert budget.fit("more") == ""
+
+    def test_fit_all(self):
+        """Test parts are admitted in order / 部分が順番に受け入れられる"""
+        budget = TokenBudget(5, tokenizer="whitespace")
+        assert budget.fit_all(["a b", "c d", "e f", "g"]) == ["a b", "c d", "e"]
+
+    def test_negative_budget(self):
+        """Test negative budgets are rejected / 負の予算は拒否される"""
+        with pytest.raises(ValueError):
+            TokenBudget(-1)
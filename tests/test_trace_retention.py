@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test trace registry retention policies
+トレースレジストリの保持ポリシーのテスト
+"""
+
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from refinire import RetentionPolicy, TraceRegistry
+from refinire.core.trace_retention import load_artifact
+
+
+class TestTraceRetention:
+    """
+    Test RetentionPolicy enforcement
+    RetentionPolicyの適用をテスト
+    """
+
+    def test_max_traces_evicts_least_recently_used(self):
+        """Count limit evicts the least recently used trace / 件数制限で最も使われていないトレースを追い出す"""
+        registry = TraceRegistry(retention=RetentionPolicy(max_traces=3))
+        for i in range(3):
+            registry.register_trace(f"t{i}")
+            registry.update_trace(f"t{i}", status="completed")
+        registry.get_trace("t0")  # t1 is now least recently used
+        registry.register_trace("t3")
+
+        assert {trace.trace_id for trace in registry.get_all_traces()} == {"t0", "t2", "t3"}
+        assert registry.get_trace("t1") is None
+        metrics = registry.get_retention_metrics()
+        assert metrics["evicted_by_count"] == 1
+        assert metrics["evicted_total"] == 1
+        assert metrics["current_traces"] == 3
+
+    def test_running_traces_are_evicted_last(self):
+        """Finished traces are evicted before running ones / 実行中より完了済みのトレースを先に追い出す"""
+        registry = TraceRegistry(retention=RetentionPolicy(max_traces=2))
+        registry.register_trace("running")
+        registry.register_trace("done")
+        registry.update_trace("done", status="completed")
+        registry.register_trace("new")
+        assert registry.get_trace("running") is not None
+        assert registry.get_trace("done") is None
+
+    def test_max_age(self):
+        """Traces older than max_age_days are evicted / max_age_daysより古いトレースを追い出す"""
+        registry = TraceRegistry(retention=RetentionPolicy(max_age_days=1))
+        registry.register_trace("old", start_time=datetime.now() - timedelta(days=2))
+        registry.register_trace("new")
+        assert [trace.trace_id for trace in registry.get_all_traces()] == ["new"]
+        assert registry.get_retention_metrics()["evicted_by_age"] == 1
+
+    def test_max_bytes(self):
+        """Size limit keeps the estimated total under max_bytes / サイズ制限で推定合計をmax_bytes以下に保つ"""
+        registry = TraceRegistry(retention=RetentionPolicy(max_bytes=5000))
+        for i in range(20):
+            registry.register_trace(f"t{i}")
+            registry.update_trace(f"t{i}", status="completed", artifacts={"text": "x" * 400})
+        metrics = registry.get_retention_metrics()
+        assert 0 < metrics["current_bytes"] <= 5000
+        assert metrics["evicted_by_bytes"] > 0
+        assert registry.get_trace("t19") is not None
+        assert registry.get_trace("t0") is None
+
+    def test_artifact_truncation(self):
+        """Oversized artifacts are replaced by a preview / 大きすぎる成果物はプレビューに置き換えられる"""
+        registry = TraceRegistry(retention=RetentionPolicy(max_artifact_bytes=100))
+        registry.register_trace("t1")
+        registry.update_trace("t1", artifacts={"small": "ok", "large": "y" * 1000})
+        artifacts = registry.get_trace("t1").artifacts
+        assert artifacts["small"] == "ok"
+        assert artifacts["large"]["$truncated"] is True
+        assert artifacts["large"]["bytes"] > 1000
+        assert registry.get_retention_metrics()["artifacts_truncated"] == 1
+
+    def test_artifact_externalization(self, tmp_path):
+        """Oversized artifacts are written to artifact_dir / 大きすぎる成果物はartifact_dirに書き込まれる"""
+        policy = RetentionPolicy(max_artifact_bytes=100, artifact_dir=str(tmp_path / "artifacts"))
+        registry = TraceRegistry(retention=policy)
+        registry.register_trace("flow/1")
+        payload = {"rows": list(range(100))}
+        registry.update_trace("flow/1", artifacts={"result": payload})
+        reference = registry.get_trace("flow/1").artifacts["result"]
+        assert load_artifact(reference) == payload
+        assert registry.get_retention_metrics()["artifacts_externalized"] == 1
+
+    def test_evicted_trace_artifacts_are_deleted(self, tmp_path):
+        """Externalized files are deleted with their trace / 外部化ファイルはトレースと共に削除される"""
+        artifact_dir = tmp_path / "artifacts"
+        policy = RetentionPolicy(max_traces=1, max_artifact_bytes=100, artifact_dir=str(artifact_dir), evict_running=True)
+        registry = TraceRegistry(retention=policy)
+        outside = tmp_path / "outside.json"
+        outside.write_text("{}")
+        registry.register_trace("flow/1")
+        registry.update_trace("flow/1", artifacts={"result": "x" * 1000, "forged": {"$artifact_ref": str(outside)}})
+        reference = registry.get_trace("flow/1").artifacts["result"]
+        assert (artifact_dir / "flow_1").is_dir()
+
+        registry.register_trace("flow/2")
+        assert registry.get_trace("flow/1") is None
+        assert not Path(reference["$artifact_ref"]).exists()
+        assert not (artifact_dir / "flow_1").exists()
+        assert outside.exists()
+        assert registry.get_retention_metrics()["artifacts_deleted"] == 1
+
+    def test_artifact_truncation_is_logged(self, caplog):
+        """Truncating an artifact logs a warning / 成果物の切り詰めは警告としてログに記録される"""
+        registry = TraceRegistry(retention=RetentionPolicy(max_artifact_bytes=100))
+        registry.register_trace("t1")
+        with caplog.at_level("WARNING", logger="refinire.core.trace_retention"):
+            registry.update_trace("t1", artifacts={"large": "y" * 1000})
+        assert "Truncated artifact 'large' of trace t1" in caplog.text
+
+    def test_evictions_are_persisted(self, tmp_path):
+        """Evicted traces are removed from storage / 追い出されたトレースはストレージからも削除される"""
+        path = tmp_path / "traces.jsonl"
+        registry = TraceRegistry(storage_path=str(path), retention=RetentionPolicy(max_traces=2, evict_running=True))
+        for i in range(5):
+            registry.register_trace(f"t{i}")
+        registry.close()
+
+        reloaded = TraceRegistry(storage_path=str(path))
+        assert {trace.trace_id for trace in reloaded.get_all_traces()} == {"t3", "t4"}
+        reloaded.close()
+
+    def test_background_enforcement(self):
+        """Background thread applies age limits without writes / 書き込みなしでもバックグラウンドで期限を適用"""
+        registry = TraceRegistry(retention=RetentionPolicy(max_age_days=1 / 86400, enforce_interval=0.05))
+        registry.register_trace("t1")
+        deadline = time.time() + 5
+        while registry.get_retention_metrics()["current_traces"] and time.time() < deadline:
+            time.sleep(0.05)
+        assert registry.get_retention_metrics()["evicted_by_age"] == 1
+        registry.close()
+
+    def test_global_registry_defaults(self):
+        """The default global registry is bounded / デフォルトのグローバルレジストリには上限がある"""
+        from refinire.core import trace_registry
+        previous = trace_registry._global_registry
+        trace_registry._global_registry = None
+        try:
+            registry = trace_registry.get_global_registry()
+            assert registry.retention.max_traces == trace_registry.DEFAULT_GLOBAL_MAX_TRACES
+            assert registry.retention.max_artifact_bytes is None
+        finally:
+            trace_registry._global_registry = previous
@@ -104,6 +104,90 @@ class TestTraceRegistry:
             print(f"  - {trace.trace_id}: {trace.agent_names}")
         assert len(partial_results) >= 2  # At least traces with SupportAgent should match
 
+    
+    def test_search_by_tags(self):
+        """
+        Test search by tags, including unhashable values
+        ハッシュ不可能な値を含むタグ検索をテスト
+        """
+        self.registry.register_trace("trace1", tags={"env": "prod", "region": "us"})
+        self.registry.register_trace("trace2", tags={"env": "prod", "region": "eu"})
+        self.registry.register_trace("trace3", tags={"env": "dev", "labels": ["a", "b"]})
+        
+        assert {t.trace_id for t in self.registry.search_by_tags({"env": "prod"})} == {"trace1", "trace2"}
+        assert {t.trace_id for t in self.registry.search_by_tags({"env": "prod", "region": "eu"})} == {"trace2"}
+        assert {t.trace_id for t in self.registry.search_by_tags({"region": "eu", "env": "dev"}, match_all=False)} == {"trace2", "trace3"}
+        assert [t.trace_id for t in self.registry.search_by_tags({"labels": ["a", "b"]})] == ["trace3"]
+        assert self.registry.search_by_tags({"labels": ["b"]}) == []
+    
+    def test_indexes_follow_updates(self):
+        """
+        Test indexes reflect update_trace changes
+        インデックスがupdate_traceの変更を反映することをテスト
+        """
+        self.registry.register_trace("trace1", flow_name="flow", agent_names=["Writer"])
+        self.registry.update_trace("trace1", status="completed", add_agent_names=["Reviewer"], add_tags={"env": "test"})
+        
+        assert self.registry.search_by_status("running") == []
+        assert [t.trace_id for t in self.registry.search_by_status("completed")] == ["trace1"]
+        assert [t.trace_id for t in self.registry.search_by_agent_name("review")] == ["trace1"]
+        assert [t.trace_id for t in self.registry.search_by_tags({"env": "test"})] == ["trace1"]
+        
+        # Re-registering an ID replaces the old index entries
+        # 同じIDの再登録は古いインデックスエントリを置き換える
+        self.registry.register_trace("trace1", flow_name="other")
+        assert self.registry.search_by_flow_name("flow", exact_match=True) == []
+        assert self.registry.search_by_status("completed") == []
+    
+    def test_complex_search_matches_linear_scan(self):
+        """
+        Test the indexed query planner against a linear scan
+        インデックスを使うクエリプランナーを線形走査と比較してテスト
+        """
+        base_time = datetime(2024, 1, 1)
+        for i in range(200):
+            self.registry.register_trace(
+                f"trace{i:03d}",
+                flow_name=["support_flow", "billing_flow", "etl"][i % 3],
+                agent_names=[f"Agent{i % 5}"],
+                tags={"env": ["prod", "dev"][i % 2], "shard": i % 4}
+            )
+            self.registry.update_trace(f"trace{i:03d}", status=["completed", "error", "running"][i % 3 if i % 7 else 0])
+        for i, trace in enumerate(sorted(self.registry.get_all_traces(), key=lambda t: t.trace_id)):
+            # Give traces distinct, known start times
+            # 既知の異なる開始時刻を与える
+            self.registry._index.remove(trace)
+            trace.start_time = base_time + timedelta(minutes=i)
+            self.registry._index.add(trace)
+        
+        def linear(flow_name=None, agent_name=None, tags=None, status=None, start_time=None, end_time=None, max_results=None):
+            results = [
+                t for t in self.registry.get_all_traces()
+                if (not flow_name or (t.flow_name and flow_name.lower() in t.flow_name.lower()))
+                and (not agent_name or any(agent_name.lower() in a.lower() for a in t.agent_names))
+                and (not tags or all(t.tags.get(k) == v for k, v in tags.items()))
+                and (not status or t.status == status)
+                and (not start_time or t.start_time >= start_time)
+                and (not end_time or t.start_time <= end_time)
+            ]
+            results.sort(key=lambda t: t.start_time, reverse=True)
+            return [t.trace_id for t in (results[:max_results] if max_results else results)]
+        
+        queries = [
+            {},
+            {"flow_name": "FLOW"},
+            {"flow_name": "ill", "status": "error"},
+            {"agent_name": "agent3", "tags": {"env": "dev"}},
+            {"tags": {"shard": 2, "env": "prod"}, "max_results": 5},
+            {"start_time": base_time + timedelta(minutes=50), "end_time": base_time + timedelta(minutes=60)},
+            {"status": "completed", "start_time": base_time + timedelta(minutes=190)},
+            {"flow_name": "etl", "end_time": base_time + timedelta(minutes=30), "max_results": 3},
+            {"max_results": 10},
+            {"flow_name": "missing"},
+        ]
+        for query in queries:
+            assert [t.trace_id for t in self.registry.complex_search(**query)] == linear(**query), query
+
 
 if __name__ == "__main__":
     # Run basic tests
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test incrementally maintained trace statistics
+増分的に維持されるトレース統計のテスト
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from refinire import RetentionPolicy, TraceRegistry
+from refinire.core.trace_stats import QuantileSketch
+
+
+class TestQuantileSketch:
+    """
+    Test QuantileSketch
+    QuantileSketchをテスト
+    """
+
+    def test_relative_accuracy(self):
+        """Quantiles stay within the relative accuracy / 分位点が相対精度内に収まる"""
+        rng = random.Random(0)
+        values = [rng.lognormvariate(0, 2) for _ in range(5000)]
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+        ordered = sorted(values)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+
+    def test_remove_and_zero(self):
+        """Removed values no longer count; zeros are supported / 削除した値は数えず、0も扱える"""
+        sketch = QuantileSketch()
+        assert sketch.quantile(0.5) is None
+        for value in (0, 0, 10, 1000):
+            sketch.add(value)
+        sketch.remove(1000)
+        assert sketch.count == 3
+        assert sketch.quantile(0.0) == 0.0
+        assert sketch.quantile(1.0) == pytest.approx(10, rel=0.01)
+
+
+class TestTraceStatistics:
+    """
+    Test TraceRegistry statistics
+    TraceRegistryの統計をテスト
+    """
+
+    def test_statistics_match_full_scan(self):
+        """Incremental statistics equal a recomputation / 増分統計が再計算と一致する"""
+        registry = TraceRegistry(retention=RetentionPolicy(max_traces=150))
+        rng = random.Random(1)
+        for i in range(200):
+            registry.register_trace(f"t{i}", flow_name=f"flow{i % 4}", agent_names=[f"Agent{i % 3}"])
+            if i % 5:
+                registry.update_trace(
+                    f"t{i}",
+                    status="error" if i % 7 == 0 else "completed",
+                    total_spans=rng.randint(1, 20),
+                    error_count=1 if i % 7 == 0 else 0,
+                    add_agent_names=["Reviewer"] if i % 2 else None
+                )
+
+        stats = registry.get_statistics()
+        traces = registry.get_all_traces()
+        durations = [t.duration_seconds for t in traces if t.duration_seconds is not None]
+        statuses = {}
+        for trace in traces:
+            statuses[trace.status] = statuses.get(trace.status, 0) + 1
+
+        assert stats["total_traces"] == len(traces) == 150
+        assert stats["status_distribution"] == statuses
+        assert stats["total_spans"] == sum(t.total_spans for t in traces)
+        assert stats["total_errors"] == sum(t.error_count for t in traces)
+        assert stats["average_duration_seconds"] == pytest.approx(sum(durations) / len(durations))
+        assert set(stats["flow_names"]) == {t.flow_name for t in traces}
+        assert set(stats["agent_names"]) == {a for t in traces for a in t.agent_names}
+        assert stats["unique_agent_names"] == len(stats["agent_names"])
+
+        flow_stats = registry.get_flow_statistics()
+        assert sum(group["total_traces"] for group in flow_stats.values()) == 150
+        flow0 = [t for t in traces if t.flow_name == "flow0"]
+        assert registry.get_flow_statistics("flow0")["total_traces"] == len(flow0)
+        reviewer = [t for t in traces if "Reviewer" in t.agent_names]
+        assert registry.get_agent_statistics("Reviewer")["total_traces"] == len(reviewer)
+        assert registry.get_agent_statistics("Unknown") == {"total_traces": 0}
+
+    def test_empty_statistics(self):
+        """Empty registries keep the previous result shape / 空のレジストリは従来の結果形式を保つ"""
+        registry = TraceRegistry()
+        assert registry.get_statistics() == {"total_traces": 0}
+        registry.register_trace("t1")
+        registry.cleanup_old_traces(days=-1)
+        assert registry.get_statistics() == {"total_traces": 0}
+        assert registry.get_flow_statistics() == {}
+
+    def test_error_rate_and_quantiles(self):
+        """Error rate and span quantiles per flow / フローごとのエラー率とスパン分位点"""
+        registry = TraceRegistry()
+        for i in range(10):
+            registry.register_trace(f"t{i}", flow_name="flow")
+            registry.update_trace(f"t{i}", status="error" if i < 2 else "completed", total_spans=i + 1)
+        flow = registry.get_flow_statistics("flow")
+        assert flow["error_rate"] == pytest.approx(0.2)
+        assert flow["span_quantiles"]["p50"] == pytest.approx(5, rel=0.02)
+        assert flow["duration_quantiles"]["p99"] is not None
+
+    def test_time_series(self):
+        """Traces are rolled up into start time buckets / トレースが開始時刻のバケットに集計される"""
+        registry = TraceRegistry(stats_bucket_seconds=60)
+        base = datetime(2024, 1, 1, 12, 0, 0)
+        for i in range(6):
+            registry.register_trace(f"t{i}", start_time=base + timedelta(seconds=30 * i))
+        series = registry.get_time_series()
+        assert [entry["bucket_start"] for entry in series] == [base + timedelta(minutes=m) for m in range(3)]
+        assert [entry["total_traces"] for entry in series] == [2, 2, 2]
+        assert len(registry.get_time_series(since=base + timedelta(minutes=2))) == 1
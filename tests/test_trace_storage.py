@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test trace registry persistence backends
+トレースレジストリ永続化バックエンドのテスト
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from refinire.core.trace_registry import TraceRegistry
+from refinire.core.trace_storage import JsonlTraceStore, SqliteTraceStore, create_trace_store
+
+
+class TestTraceStorage:
+    """
+    Test journal-backed TraceRegistry storage
+    ジャーナルを使うTraceRegistryストレージをテスト
+    """
+
+    @pytest.mark.parametrize("file_name", ["traces.jsonl", "traces.db"])
+    def test_round_trip(self, tmp_path, file_name):
+        """Traces and updates survive a reload / トレースと更新が再読み込み後も残る"""
+        path = tmp_path / file_name
+        registry = TraceRegistry(storage_path=str(path))
+        registry.register_trace("t1", flow_name="flow_a", agent_names=["A"], tags={"env": "test"})
+        registry.register_trace("t2", flow_name="flow_b")
+        registry.update_trace("t1", status="completed", total_spans=3, artifacts={"result": "ok"})
+        registry.close()
+
+        reloaded = TraceRegistry(storage_path=str(path))
+        trace = reloaded.get_trace("t1")
+        assert len(reloaded.get_all_traces()) == 2
+        assert trace.status == "completed"
+        assert trace.total_spans == 3
+        assert trace.artifacts == {"result": "ok"}
+        assert trace.tags == {"env": "test"}
+        assert isinstance(trace.start_time, datetime)
+        assert isinstance(trace.end_time, datetime)
+        reloaded.close()
+
+    def test_updates_append_one_line(self, tmp_path):
+        """Each update appends a single journal line / 更新ごとに1行だけ追記される"""
+        path = tmp_path / "traces.jsonl"
+        registry = TraceRegistry(storage_path=str(path))
+        for i in range(50):
+            registry.register_trace(f"t{i}", flow_name="flow")
+        before = path.read_text(encoding="utf-8").count("\n")
+        registry.update_trace("t0", status="completed")
+        assert path.read_text(encoding="utf-8").count("\n") == before + 1
+        registry.close()
+
+    def test_deletions_are_persisted(self, tmp_path):
+        """Removed traces stay removed after reload / 削除したトレースは再読み込み後も削除されたまま"""
+        path = tmp_path / "traces.jsonl"
+        snapshot = tmp_path / "snapshot.json"
+        source = TraceRegistry()
+        source.register_trace("old")
+        source.export_traces(str(snapshot))
+        data = json.loads(snapshot.read_text(encoding="utf-8"))
+        data["traces"][0]["start_time"] = (datetime.now() - timedelta(days=60)).isoformat()
+        snapshot.write_text(json.dumps(data), encoding="utf-8")
+
+        registry = TraceRegistry(storage_path=str(path))
+        registry.import_traces(str(snapshot))
+        registry.register_trace("new")
+        assert registry.cleanup_old_traces(days=30) == 1
+        registry.close()
+
+        reloaded = TraceRegistry(storage_path=str(path))
+        assert reloaded.get_trace("old") is None
+        assert reloaded.get_trace("new") is not None
+        reloaded.close()
+
+    def test_compaction(self, tmp_path):
+        """Stale journal records are compacted away / 古いジャーナルレコードが圧縮で除去される"""
+        path = tmp_path / "traces.jsonl"
+        registry = TraceRegistry(storage_path=str(path), compact_ratio=2.0, compact_min_records=10)
+        registry.register_trace("t1")
+        for i in range(100):
+            registry.update_trace("t1", total_spans=i)
+        assert path.read_text(encoding="utf-8").count("\n") <= 10
+        registry.close()
+
+        reloaded = TraceRegistry(storage_path=str(path))
+        assert reloaded.get_trace("t1").total_spans == 99
+        reloaded.close()
+
+    def test_torn_line_is_skipped(self, tmp_path):
+        """A partially written last line does not break loading / 書きかけの最終行で読み込みが失敗しない"""
+        path = tmp_path / "traces.jsonl"
+        registry = TraceRegistry(storage_path=str(path))
+        registry.register_trace("t1")
+        registry.close()
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"op": "put", "trace": {"trace_id"')
+
+        reloaded = TraceRegistry(storage_path=str(path))
+        assert [trace.trace_id for trace in reloaded.get_all_traces()] == ["t1"]
+        reloaded.close()
+
+    def test_corrupt_first_line_is_skipped(self, tmp_path):
+        """A corrupt first line is skipped, not taken for a legacy snapshot / 破損した先頭行は旧形式と見なさずスキップ"""
+        path = tmp_path / "traces.jsonl"
+        registry = TraceRegistry(storage_path=str(path))
+        registry.register_trace("t1")
+        registry.close()
+        content = path.read_text(encoding="utf-8")
+        for garbage in ('{"op": "put", "tra\n', 'not json\n', '{"unrelated": true}\n'):
+            path.write_text(garbage + content, encoding="utf-8")
+
+            reloaded = TraceRegistry(storage_path=str(path))
+            assert [trace.trace_id for trace in reloaded.get_all_traces()] == ["t1"]
+            reloaded.close()
+            content = path.read_text(encoding="utf-8")
+
+    def test_legacy_snapshot_is_migrated(self, tmp_path):
+        """A JSON snapshot from earlier versions is loaded and rewritten / 旧形式のJSONスナップショットを読み込み書き直す"""
+        path = tmp_path / "traces.json"
+        source = TraceRegistry()
+        source.register_trace("legacy", flow_name="flow")
+        source.export_traces(str(path))
+
+        registry = TraceRegistry(storage_path=str(path))
+        assert registry.get_trace("legacy").flow_name == "flow"
+        first_line = path.read_text(encoding="utf-8").splitlines()[0]
+        assert json.loads(first_line)["op"] == "put"
+        registry.register_trace("new")
+        registry.close()
+
+        reloaded = TraceRegistry(storage_path=str(path))
+        assert {trace.trace_id for trace in reloaded.get_all_traces()} == {"legacy", "new"}
+        reloaded.close()
+
+    def test_create_trace_store(self, tmp_path):
+        """Backend selection by suffix and name / 拡張子と名前によるバックエンド選択"""
+        assert isinstance(create_trace_store(str(tmp_path / "a.jsonl")), JsonlTraceStore)
+        store = create_trace_store(str(tmp_path / "a.sqlite"))
+        assert isinstance(store, SqliteTraceStore)
+        store.close()
+        with pytest.raises(ValueError):
+            create_trace_store(str(tmp_path / "a.jsonl"), backend="unknown")
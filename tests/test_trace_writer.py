@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test write-behind trace registry updates
+write-behindによるトレースレジストリ更新のテスト
+"""
+
+import time
+
+import pytest
+
+from refinire import Flow, FunctionStep, get_global_registry, set_global_registry
+from refinire.core.trace_registry import TraceRegistry
+from refinire.core.trace_writer import TraceWriteBehind
+
+
+class TestTraceWriteBehind:
+    """
+    Test TraceWriteBehind queue
+    TraceWriteBehindキューをテスト
+    """
+
+    def test_reads_see_submitted_writes(self):
+        """Registry reads wait for queued operations / レジストリの読み取りは保留中の操作を待つ"""
+        registry = TraceRegistry()
+        assert registry.submit_register(trace_id="t1", flow_name="flow")
+        assert registry.submit_update(trace_id="t1", status="completed", total_spans=2)
+
+        trace = registry.get_trace("t1")
+        assert trace.status == "completed"
+        assert trace.total_spans == 2
+        assert trace.end_time is not None
+        registry.close()
+
+    def test_submit_does_not_wait_for_registry_lock(self):
+        """Submitting while the registry is busy returns immediately / レジストリがビジーでも即座に戻る"""
+        registry = TraceRegistry()
+        with registry._lock:
+            start = time.perf_counter()
+            for i in range(100):
+                registry.submit_register(trace_id=f"t{i}")
+            assert time.perf_counter() - start < 0.5
+            assert registry.write_behind.pending > 0
+        assert len(registry.get_all_traces()) == 100
+        # Operations queued while the lock was held are applied in batches
+        # ロック保持中に溜まった操作はバッチで適用される
+        assert registry.write_behind.batches < 100
+        registry.close()
+
+    def test_timestamps_are_captured_on_submit(self):
+        """Start and end times reflect submission, not application / 開始・終了時刻は適用時ではなく投入時"""
+        registry = TraceRegistry()
+        with registry._lock:
+            registry.submit_register(trace_id="t1")
+            registry.submit_update(trace_id="t1", status="completed")
+            submitted_at = time.time()
+            time.sleep(0.2)
+        trace = registry.get_trace("t1")
+        assert trace.end_time.timestamp() <= submitted_at
+        registry.close()
+
+    def test_arguments_are_captured_on_submit(self):
+        """Caller changes after submission are not applied / 投入後の呼び出し元の変更は適用されない"""
+        registry = TraceRegistry()
+        agent_names = ["agent_a"]
+        artifacts = {"result": "first"}
+        with registry._lock:
+            registry.submit_register(trace_id="t1", agent_names=agent_names)
+            registry.submit_update(trace_id="t1", artifacts=artifacts)
+            agent_names.append("agent_b")
+            artifacts["result"] = "changed"
+        trace = registry.get_trace("t1")
+        assert trace.agent_names == ["agent_a"]
+        assert trace.artifacts == {"result": "first"}
+        registry.close()
+
+    def test_drop_policy(self):
+        """Operations beyond the queue size are dropped and counted / キューサイズ超過の操作は破棄され計数される"""
+        registry = TraceRegistry()
+        writer = registry.configure_write_behind(max_queue_size=5, overflow_policy="drop")
+        with registry._lock:
+            results = [registry.submit_register(trace_id=f"t{i}") for i in range(50)]
+        assert not all(results)
+        assert writer.flush(timeout=5)
+        metrics = writer.get_metrics()
+        assert metrics["dropped"] == results.count(False)
+        assert metrics["applied"] == results.count(True)
+        assert len(registry.get_all_traces()) == results.count(True)
+        registry.close()
+
+    def test_block_policy_keeps_everything(self):
+        """Blocking policy waits for space instead of dropping / ブロックポリシーは破棄せず空きを待つ"""
+        registry = TraceRegistry()
+        writer = registry.configure_write_behind(max_queue_size=2, overflow_policy="block", batch_size=1)
+        for i in range(50):
+            assert registry.submit_register(trace_id=f"t{i}")
+        assert len(registry.get_all_traces()) == 50
+        assert writer.get_metrics()["dropped"] == 0
+        registry.close()
+
+    def test_close_flushes_and_falls_back_to_sync(self):
+        """Close applies pending work; later submits are synchronous / closeで保留分を適用し以降は同期"""
+        registry = TraceRegistry()
+        writer = registry.write_behind
+        registry.submit_register(trace_id="t1")
+        writer.close()
+        assert writer.pending == 0
+        registry.submit_register(trace_id="t2")
+        assert registry.traces.keys() == {"t1", "t2"}
+
+    def test_failing_operation_does_not_discard_batch(self, tmp_path):
+        """Other operations of a batch are applied and persisted / バッチの他の操作は適用・永続化される"""
+        path = tmp_path / "traces.jsonl"
+        registry = TraceRegistry(storage_path=str(path))
+        failed = registry.apply_batch([
+            ("register", {"trace_id": "t1"}),
+            ("unknown", {"trace_id": "t2"}),
+            ("update", {"trace_id": "t1", "unexpected": True}),
+            ("register", {"trace_id": "t3"}),
+        ])
+        assert failed == 2
+        assert registry.traces.keys() == {"t1", "t3"}
+        assert TraceRegistry(storage_path=str(path)).traces.keys() == {"t1", "t3"}
+        registry.close()
+
+    def test_failed_storage_write_is_retried(self, tmp_path):
+        """Traces whose write failed are persisted by the next commit / 書き込みに失敗したトレースは次回のコミットで永続化される"""
+        path = tmp_path / "traces.jsonl"
+        registry = TraceRegistry(storage_path=str(path))
+        put_many = registry._store.put_many
+
+        def failing_put_many(records):
+            raise OSError("disk full")
+
+        registry._store.put_many = failing_put_many
+        writer = registry.write_behind
+        registry.submit_register(trace_id="t1")
+        assert writer.flush(timeout=5)
+        assert writer.get_metrics()["persist_failures"] == 1
+        assert "t1" in registry.traces
+
+        registry._store.put_many = put_many
+        registry.register_trace(trace_id="t2")
+        assert TraceRegistry(storage_path=str(path)).traces.keys() == {"t1", "t2"}
+        registry.close()
+
+    def test_invalid_policy(self):
+        """Unknown overflow policies are rejected / 未知のオーバーフローポリシーは拒否される"""
+        with pytest.raises(ValueError):
+            TraceWriteBehind(TraceRegistry(), overflow_policy="ignore")
+
+    @pytest.mark.asyncio
+    async def test_flow_uses_write_behind(self):
+        """Flow trace bookkeeping goes through the queue / フローのトレース記録はキューを経由する"""
+        previous = get_global_registry()
+        registry = TraceRegistry()
+        set_global_registry(registry)
+        try:
+            def process(user_input, ctx):
+                ctx.shared_state["done"] = True
+                return ctx
+
+            flow = Flow(steps=[FunctionStep("process", process)], name="write_behind_flow")
+            await flow.run("input")
+
+            assert registry.write_behind.submitted >= 2
+            trace = registry.get_trace(flow.trace_id)
+            assert trace is not None
+            assert trace.flow_name == "write_behind_flow"
+            assert trace.status == "completed"
+        finally:
+            set_global_registry(previous)
+            registry.close()
@@ -60,6 +60,164 @@ class TestConsoleTracingProcessor:
         assert True
 
 
+def _generation_span(trace_id="trace_0123456789abcdef", span_id="span_0123456789abcdef",
+                     prompt="Hello", output="Hi there", error=None):
+    """Build a minimal ended generation span / 最小限の終了済みgeneration spanを作成"""
+    from agents.tracing.span_data import GenerationSpanData
+    span = MagicMock()
+    span.trace_id = trace_id
+    span.span_id = span_id
+    span.error = error
+    span.span_data = GenerationSpanData(
+        input=[{"role": "system", "content": "Be brief"}, {"role": "user", "content": prompt}],
+        output=[{"content": output}],
+    )
+    return span
+
+
+class TestConsoleTracingBufferingAndSampling:
+    """
+    Test buffered output, sampling, truncation and JSON lines
+    バッファ出力、サンプリング、切り詰め、JSON Linesをテスト
+    """
+
+    def test_buffered_output_written_on_flush(self):
+        """Records are written in batches, not on every span / レコードはSpanごとではなくまとめて書き込まれる"""
+        stream = StringIO()
+        processor = ConsoleTracingProcessor(output_stream=stream, buffered=True, flush_interval=60)
+        processor.on_span_end(_generation_span())
+
+        assert stream.getvalue() == ""
+        processor.force_flush()
+        output = stream.getvalue()
+        assert "Hello" in output and "Hi there" in output and "Be brief" in output
+        assert "[trace:89abcdef span:89abcdef]" in output
+        processor.shutdown()
+
+    def test_background_thread_flushes(self):
+        """The flush thread writes without force_flush / フラッシュスレッドがforce_flushなしで書き込む"""
+        import time
+        stream = StringIO()
+        processor = ConsoleTracingProcessor(output_stream=stream, buffered=True, flush_interval=0.01)
+        processor.on_span_end(_generation_span())
+
+        deadline = time.monotonic() + 2
+        while "Hi there" not in stream.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert "Hi there" in stream.getvalue()
+        processor.shutdown()
+
+    def test_unbuffered_output(self):
+        """Spans are written immediately by default / デフォルトではSpanを即座に書き込む"""
+        stream = StringIO()
+        processor = ConsoleTracingProcessor(output_stream=stream)
+        processor.on_span_end(_generation_span())
+
+        assert "Hi there" in stream.getvalue()
+
+    def test_records_after_shutdown_are_written(self):
+        """Spans ending after shutdown are written synchronously / shutdown後に終了したSpanは同期的に書き込む"""
+        stream = StringIO()
+        processor = ConsoleTracingProcessor(output_stream=stream, buffered=True, flush_interval=60)
+        processor.on_span_end(_generation_span(output="before"))
+        processor.shutdown()
+        processor.on_span_end(_generation_span(output="after"))
+
+        assert "before" in stream.getvalue()
+        assert "after" in stream.getvalue()
+
+    def test_sampling_per_trace_and_errors_always(self):
+        """Sampling keeps or drops whole traces; errors are always written / トレース単位でサンプリングしエラーは常に書き込む"""
+        stream = StringIO()
+        processor = ConsoleTracingProcessor(output_stream=stream, buffered=False, sample_rate=0.0)
+        processor.on_span_end(_generation_span(output="dropped"))
+        processor.on_span_end(_generation_span(output="failed", error={"message": "boom"}))
+
+        assert "dropped" not in stream.getvalue()
+        assert "failed" in stream.getvalue()
+        assert processor.get_metrics()["sampled_out"] == 1
+
+        processor = ConsoleTracingProcessor(output_stream=StringIO(), buffered=False, sample_rate=0.5)
+        decisions = {processor._should_emit(_generation_span(trace_id=f"trace_{i}"), f"trace_{i}") for _ in range(3) for i in [7]}
+        assert len(decisions) == 1
+        emitted = sum(processor._should_emit(_generation_span(), f"trace_{i}") for i in range(2000))
+        assert 800 < emitted < 1200
+
+    def test_per_flow_sample_rates(self):
+        """Trace names select per-flow rates / トレース名でフロー別の率を選択"""
+        stream = StringIO()
+        processor = ConsoleTracingProcessor(
+            output_stream=stream, buffered=False, sample_rate=0.0, flow_sample_rates={"checkout": 1.0}
+        )
+        trace = MagicMock()
+        trace.trace_id = "trace_checkout"
+        trace.name = "checkout"
+        processor.on_trace_start(trace)
+        processor.on_span_end(_generation_span(trace_id="trace_checkout", output="kept"))
+        processor.on_span_end(_generation_span(trace_id="trace_other", output="skipped"))
+        processor.on_trace_end(trace)
+
+        assert "kept" in stream.getvalue()
+        assert "skipped" not in stream.getvalue()
+
+    def test_truncation_and_json_lines(self):
+        """Huge fields are truncated and JSON mode writes one object per line / 巨大なフィールドは切り詰められJSONモードは1行1オブジェクト"""
+        stream = StringIO()
+        processor = ConsoleTracingProcessor(
+            output_stream=stream, buffered=False, max_field_chars=10, output_format="json"
+        )
+        processor.on_span_end(_generation_span(prompt="x" * 100))
+
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 1
+        record = json.loads(lines[0])
+        assert record["type"] == "generation"
+        assert record["trace_id"] == "trace_0123456789abcdef"
+        assert record["prompt"] == "x" * 10 + "... [90 chars truncated]"
+        assert record["output"] == "Hi there"
+
+    def test_fields_are_not_truncated_by_default(self):
+        """Without max_field_chars fields are written in full / max_field_charsなしではフィールドを全て書き込む"""
+        stream = StringIO()
+        processor = ConsoleTracingProcessor(output_stream=stream, buffered=False, output_format="json")
+        processor.on_span_end(_generation_span(prompt="x" * 10000))
+
+        assert json.loads(stream.getvalue())["prompt"] == "x" * 10000
+
+    def test_counters_from_many_threads(self):
+        """Counters stay exact when spans end on many threads / 多数のスレッドでSpanが終了してもカウンターは正確"""
+        import threading
+        processor = ConsoleTracingProcessor(output_stream=StringIO(), buffered=False, sample_rate=0.0)
+        span = _generation_span()
+
+        def end_spans():
+            for _ in range(500):
+                processor.on_span_end(span)
+
+        threads = [threading.Thread(target=end_spans) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert processor.get_metrics()["sampled_out"] == 4000
+
+    def test_buffer_limit_drops_oldest(self):
+        """A full buffer drops the oldest records / バッファが満杯になると最も古いレコードを破棄"""
+        stream = StringIO()
+        processor = ConsoleTracingProcessor(output_stream=stream, buffered=True, flush_interval=60, max_buffer_records=2)
+        for i in range(5):
+            processor.on_span_end(_generation_span(output=f"out-{i}"))
+        processor.shutdown()
+
+        assert "out-0" not in stream.getvalue()
+        assert "out-3" in stream.getvalue() and "out-4" in stream.getvalue()
+        assert processor.get_metrics()["dropped"] == 3
+
+    def test_invalid_output_format(self):
+        with pytest.raises(ValueError):
+            ConsoleTracingProcessor(output_format="xml")
+
+
 class TestTracingFunctions:
     """
     Test tracing utility functions